@@ -1,20 +1,65 @@
 import json
-import google.generativeai as genai
-from logger_config import logger
+import sys
+import threading
+from logger_config import logger, log_payload
 import config
 import re
 
-# Configure the Generative AI model
-try:
-    genai.configure(api_key=config.GOOGLE_API_KEY)
-except Exception as e:
-    logger.error(f"Failed to configure Google API key: {e}")
+# google.generativeai는 불러오는 데만 수 초가 걸리므로, 첫 AI 호출(또는 preload) 때 불러오고 설정합니다.
+_genai = None
+_genai_lock = threading.Lock()
+
+def _load_genai():
+    global _genai
+    with _genai_lock:
+        if _genai is None:
+            import google.generativeai as genai
+            # Configure the Generative AI model
+            try:
+                genai.configure(api_key=config.GOOGLE_API_KEY)
+            except Exception as e:
+                logger.error("Failed to configure Google API key: %s", e)
+            _genai = genai
+    return _genai
+
+def preload():
+    """AI SDK를 미리 불러옵니다. (거래 준비가 끝난 뒤 백그라운드에서 호출하면 첫 AI 판단이 지연되지 않음)"""
+    try:
+        _load_genai()
+    except Exception as e:
+        logger.error("AI SDK 로드 실패: %s", e)
+
+def _model(name):
+    return _load_genai().GenerativeModel(name)
+
+# EVALUATE_* 신호별로 호출할 판단 함수 이름
+AI_FUNCTION_NAMES = {
+    'EVALUATE_VANGUARD': 'get_ai_decision',
+    'EVALUATE_MAIN_FORCE': 'get_ai_main_force_decision',
+    'EVALUATE_TAKE_PROFIT': 'get_ai_take_profit_decision',
+}
+
+# AI 판단 제공자. 기본값(None)은 이 모듈의 Gemini 함수이며, 백테스트 등에서 같은 함수들을 가진 객체로 교체할 수 있습니다.
+_provider = None
+
+def set_provider(provider):
+    """AI 판단 제공자를 교체합니다. None을 주면 Gemini 호출로 돌아갑니다."""
+    global _provider
+    _provider = provider
+
+def request_decision(decision, ticker, briefing, previous_reasons=None):
+    """EVALUATE_* 신호에 해당하는 AI 판단을 현재 제공자에게 요청합니다."""
+    provider = _provider or sys.modules[__name__]
+    log_payload('ai_briefing', {'decision': decision, 'briefing': briefing, 'previous_reasons': list(previous_reasons or [])}, ticker)
+    return getattr(provider, AI_FUNCTION_NAMES[decision])(ticker, briefing, previous_reasons)
 
 def _parse_ai_response(ticker, response_text, function_name):
     """
     AI의 응답에서 JSON을 추출하고 파싱하는 내부 함수. (Fallback 로직 추가)
     """
-    logger.info(f"🤖 [{ticker}] ({function_name}) Original AI Response:\n{response_text}")
+    # 수 KB에 달하는 원문은 압축 사이드카 로그에만 남김
+    log_payload('ai_response', {'function': function_name, 'text': response_text}, ticker)
+    logger.info("🤖 [%s] (%s) AI 응답 수신 (%s자)", ticker, function_name, len(response_text))
     
     try:
         match = re.search(r'```json\s*(\{.*?\})\s*```', response_text, re.DOTALL)
@@ -22,14 +67,14 @@ def _parse_ai_response(ticker, response_text, function_name):
             json_text = match.group(1)
             return json.loads(json_text)
         else:
-            logger.info(f"[{ticker}] 마크다운 JSON 블록을 찾지 못해 전체 텍스트 파싱을 시도합니다.")
+            logger.info("[%s] 마크다운 JSON 블록을 찾지 못해 전체 텍스트 파싱을 시도합니다.", ticker)
             return json.loads(response_text.strip())
             
     except json.JSONDecodeError as e:
-        logger.error(f"AI 응답 JSON 파싱에 최종적으로 실패했습니다: {e}")
+        logger.error("AI 응답 JSON 파싱에 최종적으로 실패했습니다: %s", e)
         raise ValueError("AI 응답에서 유효한 JSON을 찾을 수 없습니다.")
     except Exception as e:
-        logger.error(f"AI 응답 처리 중 예기치 않은 오류 발생: {e}")
+        logger.error("AI 응답 처리 중 예기치 않은 오류 발생: %s", e)
         raise ValueError("AI 응답 처리 중 오류가 발생했습니다.")
 
 def get_ai_decision(ticker, briefing, previous_reasons=None):
@@ -37,7 +82,7 @@ def get_ai_decision(ticker, briefing, previous_reasons=None):
     Asks the AI to decide on a new entry ('Buy' or 'Hold') based on structured data.
     """
     try:
-        model = genai.GenerativeModel('gemini-2.5-pro')
+        model = _model('gemini-2.5-pro')
 
         reason_history = "No previous 'Hold' decisions."
         if previous_reasons:
@@ -103,10 +148,10 @@ def get_ai_decision(ticker, briefing, previous_reasons=None):
         return _parse_ai_response(ticker, response.text, "get_ai_decision")
 
     except ValueError as e: # _parse_ai_response가 발생시키는 오류
-        logger.error(f"[{ticker}] AI 응답 파싱 오류: {e}")
+        logger.error("[%s] AI 응답 파싱 오류: %s", ticker, e)
         return {"decision": "Hold", "reason": f"AI response parsing failed: {e}", "percentage": 0}
     except Exception as e:
-        logger.error(f"[{ticker}] AI 판단 중 일반 오류 발생: {e}")
+        logger.error("[%s] AI 판단 중 일반 오류 발생: %s", ticker, e)
         return {"decision": "Hold", "reason": f"AI analysis failed: {e}", "percentage": 0}
 
 def get_ai_main_force_decision(ticker, briefing, previous_reasons=None):
@@ -114,7 +159,7 @@ def get_ai_main_force_decision(ticker, briefing, previous_reasons=None):
     Asks the AI to determine the optimal timing for the 'main force' entry after a mechanical signal.
     """
     try:
-        model = genai.GenerativeModel('gemini-2.5-pro')
+        model = _model('gemini-2.5-pro')
         
         reason_history = "No previous 'Hold' decisions on this entry."
         if previous_reasons:
@@ -161,10 +206,10 @@ def get_ai_main_force_decision(ticker, briefing, previous_reasons=None):
         return _parse_ai_response(ticker, response.text, "get_ai_main_force_decision")
         
     except ValueError as e: # _parse_ai_response가 발생시키는 오류
-        logger.error(f"[{ticker}] AI 응답 파싱 오류: {e}")
+        logger.error("[%s] AI 응답 파싱 오류: %s", ticker, e)
         return {"decision": "Hold", "reason": f"AI response parsing failed: {e}", "percentage": 0}
     except Exception as e:
-        logger.error(f"[{ticker}] AI 판단 중 일반 오류 발생: {e}")
+        logger.error("[%s] AI 판단 중 일반 오류 발생: %s", ticker, e)
         return {"decision": "Hold", "reason": f"AI analysis failed: {e}", "percentage": 0}
 
 def get_ai_take_profit_decision(ticker, briefing, previous_reasons=None):
@@ -172,7 +217,7 @@ def get_ai_take_profit_decision(ticker, briefing, previous_reasons=None):
     Asks the AI to perform a quality check on a mechanical take-profit signal.
     """
     try:
-        model = genai.GenerativeModel('gemini-2.5-pro')
+        model = _model('gemini-2.5-pro')
 
         reason_history = "No previous 'Hold' decisions on this signal."
         if previous_reasons:
@@ -220,8 +265,8 @@ def get_ai_take_profit_decision(ticker, briefing, previous_reasons=None):
         return _parse_ai_response(ticker, response.text, "get_ai_take_profit_decision")
 
     except ValueError as e: # _parse_ai_response가 발생시키는 오류
-        logger.error(f"[{ticker}] AI 응답 파싱 오류: {e}")
+        logger.error("[%s] AI 응답 파싱 오류: %s", ticker, e)
         return {"decision": "Hold", "reason": f"AI response parsing failed: {e}", "percentage": 0}
     except Exception as e:
-        logger.error(f"[{ticker}] AI 판단 중 일반 오류 발생: {e}")
+        logger.error("[%s] AI 판단 중 일반 오류 발생: %s", ticker, e)
         return {"decision": "Hold", "reason": f"AI analysis failed: {e}", "percentage": 0}
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""
+AI 판단 기록/재생 제공자.
+
+- RecordingProvider: 실거래에서 get_ai_* 요청과 응답을 브리핑 지문(fingerprint) 단위로 로컬 SQLite 파일에 기록합니다.
+  브리핑 원문은 zlib으로 압축해 저장합니다.
+- ReplayProvider: 기록된 응답을 그대로 재생합니다. 같은 지문의 기록이 없으면 기록으로 적합한 결정적 대리 모델
+  (표준화한 브리핑 수치에 대한 k-최근접 이웃)로 판단하므로, 백테스트를 AI 경로까지 포함해 오프라인으로 돌릴 수 있습니다.
+
+둘 다 ai_interface.set_provider로 주입하는 제공자(get_ai_* 함수를 가진 객체)입니다.
+"""
+import sys
+import json
+import zlib
+import math
+import hashlib
+import sqlite3
+import threading
+from decimal import Decimal
+from datetime import datetime
+import numpy as np
+from logger_config import logger
+import config
+from fixed_point import Fixed
+
+# AI 호출 실패 시 ai_interface가 돌려주는 기본 응답. 실제 판단이 아니므로 기록하지 않습니다.
+_FAILURE_PREFIXES = ("AI response parsing failed", "AI analysis failed")
+_HOLD = {"decision": "Hold", "percentage": 0}
+
+# --- 브리핑 지문 ---
+def _canonical(value):
+    """브리핑 값을 프롬프트에 들어가는 정밀도(소수점 2자리)로 정규화합니다."""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, float, Decimal, Fixed, np.integer, np.floating)):
+        number = float(value)
+        return None if math.isnan(number) else round(number, 2)
+    return value
+
+def fingerprint(function_name, ticker, briefing):
+    payload = json.dumps([function_name, ticker, _canonical(briefing)], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode()).hexdigest()[:20]
+
+def _features(briefing):
+    """브리핑의 수치 값을 키 이름 순으로 펼칩니다. (키 목록, 값 배열)"""
+    keys, values = [], []
+    def walk(prefix, node):
+        if isinstance(node, dict):
+            for k, v in sorted(node.items()):
+                walk(f"{prefix}.{k}" if prefix else str(k), v)
+        elif node is None or isinstance(node, (bool, int, float)):
+            keys.append(prefix)
+            values.append(float(node or 0)) # 계산 실패(NaN)한 지표는 0으로 취급
+    walk("", _canonical(briefing))
+    return tuple(keys), np.array(values, dtype=float)
+
+# --- 기록 저장소 ---
+class AIRecordStore:
+    def __init__(self, path=None):
+        self.path = path or config.AI_REPLAY_CONFIG["STORE_FILE"]
+        self._lock = threading.Lock()
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS ai_records (
+                fingerprint TEXT PRIMARY KEY,
+                function_name TEXT NOT NULL,
+                ticker TEXT NOT NULL,
+                decision TEXT NOT NULL,
+                percentage REAL,
+                reason TEXT,
+                briefing BLOB,
+                previous_reasons BLOB,
+                recorded_at TEXT
+            )
+            """)
+
+    def save(self, function_name, ticker, briefing, previous_reasons, response):
+        row = (
+            fingerprint(function_name, ticker, briefing), function_name, ticker,
+            str(response.get('decision')), float(response.get('percentage') or 0), response.get('reason'),
+            zlib.compress(json.dumps(_canonical(briefing), ensure_ascii=False).encode()),
+            zlib.compress(json.dumps(list(previous_reasons or []), ensure_ascii=False).encode()),
+            datetime.now().isoformat(),
+        )
+        with self._lock, sqlite3.connect(self.path) as conn:
+            conn.execute("INSERT OR REPLACE INTO ai_records VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+
+    def load(self):
+        """[{fingerprint, function_name, ticker, decision, percentage, reason, briefing}] 목록을 반환합니다."""
+        with sqlite3.connect(self.path) as conn:
+            rows = conn.execute("SELECT fingerprint, function_name, ticker, decision, percentage, reason, briefing FROM ai_records ORDER BY recorded_at").fetchall()
+        return [{
+            'fingerprint': r[0], 'function_name': r[1], 'ticker': r[2], 'decision': r[3],
+            'percentage': r[4], 'reason': r[5], 'briefing': json.loads(zlib.decompress(r[6])),
+        } for r in rows]
+
+# --- 제공자 ---
+class RecordingProvider:
+    """실제 제공자(기본: ai_interface의 Gemini 함수)를 호출하고, 요청과 응답을 기록합니다."""
+    def __init__(self, store=None, inner=None):
+        self.store = store or AIRecordStore()
+        self.inner = inner
+
+    def _call(self, function_name, ticker, briefing, previous_reasons):
+        inner = self.inner or sys.modules['ai_interface']
+        response = getattr(inner, function_name)(ticker, briefing, previous_reasons)
+        if not str(response.get('reason', '')).startswith(_FAILURE_PREFIXES):
+            try:
+                self.store.save(function_name, ticker, briefing, previous_reasons, response)
+            except Exception as e:
+                logger.error(f"[{ticker}] AI 판단 기록 실패: {e}")
+        return response
+
+    def get_ai_decision(self, ticker, briefing, previous_reasons=None):
+        return self._call('get_ai_decision', ticker, briefing, previous_reasons)
+
+    def get_ai_main_force_decision(self, ticker, briefing, previous_reasons=None):
+        return self._call('get_ai_main_force_decision', ticker, briefing, previous_reasons)
+
+    def get_ai_take_profit_decision(self, ticker, briefing, previous_reasons=None):
+        return self._call('get_ai_take_profit_decision', ticker, briefing, previous_reasons)
+
+class SurrogateModel:
+    """한 함수·브리핑 형태의 기록에 적합한 k-최근접 이웃 모델. 같은 입력에는 항상 같은 판단을 돌려줍니다."""
+    def __init__(self, records, k):
+        self.k = min(k, len(records))
+        matrix = np.array([r['features'] for r in records])
+        self.mean = matrix.mean(axis=0)
+        self.scale = np.where(matrix.std(axis=0) > 0, matrix.std(axis=0), 1.0)
+        self.matrix = (matrix - self.mean) / self.scale
+        self.decisions = [r['decision'] for r in records]
+        self.percentages = np.array([r['percentage'] or 0 for r in records])
+
+    def predict(self, features):
+        distances = np.linalg.norm(self.matrix - (features - self.mean) / self.scale, axis=1)
+        nearest = np.argsort(distances, kind='stable')[:self.k]
+        votes = {}
+        for i in nearest:
+            votes[self.decisions[i]] = votes.get(self.decisions[i], 0) + 1
+        # 동률이면 Hold를 우선하고, 그다음은 이름 순으로 결정
+        decision = max(sorted(votes), key=lambda d: (votes[d], d == 'Hold'))
+        chosen = [i for i in nearest if self.decisions[i] == decision]
+        return {
+            "decision": decision,
+            "reason": f"Surrogate model ({self.k} nearest of {len(self.decisions)} records)",
+            "percentage": round(float(self.percentages[chosen].mean()), 4) if decision != 'Hold' else 0,
+        }
+
+class ReplayProvider:
+    """기록된 AI 응답을 재생합니다. 정확히 일치하는 기록이 없으면 대리 모델, 그마저 없으면 Hold를 돌려줍니다."""
+    def __init__(self, store=None, use_surrogate=True, k=None):
+        records = (store or AIRecordStore()).load()
+        self.exact = {r['fingerprint']: r for r in records}
+        self.use_surrogate = use_surrogate
+        self.k = k or config.AI_REPLAY_CONFIG["SURROGATE_K"]
+        self.models = {}
+        groups = {}
+        for r in records:
+            keys, values = _features(r['briefing'])
+            groups.setdefault((r['function_name'], keys), []).append({**r, 'features': values})
+        for group_key, group in groups.items():
+            self.models[group_key] = SurrogateModel(group, self.k)
+        self.stats = {'exact': 0, 'surrogate': 0, 'missing': 0}
+        logger.info(f"AI 재생 기록 {len(records)}건을 불러왔습니다. (대리 모델 {len(self.models)}개)")
+
+    def _replay(self, function_name, ticker, briefing):
+        record = self.exact.get(fingerprint(function_name, ticker, briefing))
+        if record:
+            self.stats['exact'] += 1
+            return {"decision": record['decision'], "reason": record['reason'], "percentage": record['percentage']}
+        keys, values = _features(briefing)
+        model = self.models.get((function_name, keys)) if self.use_surrogate else None
+        if model is None:
+            self.stats['missing'] += 1
+            return {**_HOLD, "reason": "No recorded AI response"}
+        self.stats['surrogate'] += 1
+        return model.predict(values)
+
+    def get_ai_decision(self, ticker, briefing, previous_reasons=None):
+        return self._replay('get_ai_decision', ticker, briefing)
+
+    def get_ai_main_force_decision(self, ticker, briefing, previous_reasons=None):
+        return self._replay('get_ai_main_force_decision', ticker, briefing)
+
+    def get_ai_take_profit_decision(self, ticker, briefing, previous_reasons=None):
+        return self._replay('get_ai_take_profit_decision', ticker, briefing)
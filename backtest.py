@@ -0,0 +1,269 @@
+"""
+저장된 캔들 위에서 TradingBot과 main의 주문/체결 처리 흐름을 그대로 재생하는 백테스트 엔진.
+
+- 시계: candle_clock.set_time_source로 15분봉 마감 시각을 주입합니다.
+- 체결: SimulatedFillModel이 pyupbit.Upbit와 같은 주문 메서드를 제공하며, 현재가(새 15분봉 시가)에 슬리피지를 더해 즉시 체결합니다.
+  시장가 매수는 실거래처럼 금액 전체를 VOLUME_SCALE 자릿수 수량으로 체결하고(한 단위도 살 수 없으면 체결 없이 취소),
+  매도 수량은 main이 TICKER_CONFIG 정밀도로 내림해 넘깁니다. 수수료는 실거래와 같이 process_sell_order에서 FEE_RATE로 계산됩니다.
+- AI: ai_interface.set_provider로 주입합니다. (기본값: 기록된 AI 판단이 있으면 ai_replay.ReplayProvider, 없으면 FixedAIProvider)
+- 결과: 별도 DB 파일의 trade_log(실거래와 같은 형식)와 15분 단위 총자산 곡선.
+
+지표 컬럼(BB/CCI/WMA/RSI/SuperTrend)과 캔들별 전략 신호(signals)는 전체 구간에서 한 번만 계산해 두고,
+각 단계에서는 창(window)과 마감된 캔들의 신호를 잘라 전달하므로 TradingBot은 조회만 합니다.
+"""
+import os
+import sys
+import time
+import uuid
+import tempfile
+import sqlite3
+import numpy as np
+import pandas as pd
+import pandas_ta as ta
+from decimal import Decimal, ROUND_DOWN
+from logger_config import logger
+import config
+from fixed_point import Fixed, money, VOLUME_SCALE
+import candle_clock
+import rate_limiter
+import database_manager as db
+import ai_interface
+import ai_replay
+import main as live
+from trading_bot import TradingBot
+import signals
+
+WINDOW = 50 # 실거래와 같은 캔들 조회 개수
+
+class FixedAIProvider:
+    """항상 정해진 비율로 진입/익절하는 결정적 AI 대체 제공자."""
+    def __init__(self, vanguard_pct=0.3, main_force_pct=1.0, take_profit_pct=0.5):
+        self.vanguard_pct = vanguard_pct
+        self.main_force_pct = main_force_pct
+        self.take_profit_pct = take_profit_pct
+
+    def get_ai_decision(self, ticker, briefing, previous_reasons=None):
+        return {"decision": "Buy", "reason": "Backtest fixed provider", "percentage": self.vanguard_pct}
+
+    def get_ai_main_force_decision(self, ticker, briefing, previous_reasons=None):
+        return {"decision": "BUY_MAIN_FORCE", "reason": "Backtest fixed provider", "percentage": self.main_force_pct}
+
+    def get_ai_take_profit_decision(self, ticker, briefing, previous_reasons=None):
+        return {"decision": "Sell", "reason": "Backtest fixed provider", "percentage": self.take_profit_pct}
+
+class SimulatedFillModel:
+    """pyupbit.Upbit의 주문 관련 메서드를 흉내 내는 즉시 체결 모델."""
+    def __init__(self, krw_balance=0, slippage=0.0):
+        self.krw_balance = krw_balance
+        self.slippage = Decimal(str(slippage))
+        self.prices = {}
+        self.orders = {}
+
+    def set_price(self, ticker, price):
+        self.prices[ticker] = Decimal(str(price))
+
+    def _fill(self, ticker, side, volume, price):
+        order_uuid = str(uuid.uuid4())
+        filled = volume > 0
+        self.orders[order_uuid] = {
+            'uuid': order_uuid, 'market': ticker, 'side': side, 'state': 'done' if filled else 'cancel',
+            'executed_volume': str(volume),
+            'trades': [{'price': str(price), 'volume': str(volume)}] if filled else [],
+        }
+        return {'uuid': order_uuid}
+
+    def buy_market_order(self, ticker, krw_amount):
+        """
+        KRW 금액 시장가 매수. 업비트 시장가 매수처럼 체결 수량은 주문 수량 단위(TICKER_CONFIG)와 무관하게 VOLUME_SCALE 자릿수이며,
+        금액을 넘지 않도록 내림합니다. 한 단위도 살 수 없으면 체결 없이 취소된 주문이 되어 main이 차감한 금액을 돌려줍니다.
+        """
+        price = self.prices[ticker] * (1 + self.slippage)
+        volume = Fixed.from_decimal(Decimal(str(krw_amount)) / price).rescale(VOLUME_SCALE, ROUND_DOWN)
+        return self._fill(ticker, 'bid', volume, price)
+
+    def sell_market_order(self, ticker, volume):
+        price = self.prices[ticker] * (1 - self.slippage)
+        return self._fill(ticker, 'ask', Decimal(str(volume)), price)
+
+    def get_order(self, order_uuid):
+        return self.orders.get(order_uuid)
+
+    def cancel_order(self, order_uuid):
+        return self.orders.get(order_uuid)
+
+    def get_balance(self, ticker="KRW"):
+        return self.krw_balance
+
+_replay_provider = None
+
+def default_ai_provider():
+    """기록된 실거래 AI 판단이 있으면 재생 제공자(프로세스당 한 번 로드), 없으면 FixedAIProvider를 반환합니다."""
+    global _replay_provider
+    if not (config.AI_REPLAY_CONFIG["USE_IN_BACKTEST"] and os.path.exists(config.AI_REPLAY_CONFIG["STORE_FILE"])):
+        return FixedAIProvider()
+    if _replay_provider is None:
+        _replay_provider = ai_replay.ReplayProvider()
+    return _replay_provider
+
+def resample_candles(df_15m, timeframe):
+    """15분봉을 업비트 정렬(60분봉: 정시, 240분봉: KST 01/05/09/13/17/21시)에 맞춰 상위 타임프레임으로 합칩니다."""
+    rule = {'60m': ('60min', '0h'), '240m': ('240min', '1h')}[timeframe]
+    agg = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+    if 'value' in df_15m.columns:
+        agg['value'] = 'sum'
+    return df_15m.resample(rule[0], offset=rule[1]).agg(agg).dropna(subset=['open'])
+
+def _add_cci_wma(df, length):
+    cci_col = f"CCI_{length}"
+    if cci_col not in df.columns:
+        df.ta.cci(length=length, append=True, col_names=(cci_col,))
+    if f"WMA_9_{cci_col}" not in df.columns:
+        weights = np.arange(1, 10, dtype=float)
+        values = df[cci_col].to_numpy(dtype=float)
+        wma = np.full(len(values), np.nan)
+        if len(values) >= 9:
+            wma[8:] = np.lib.stride_tricks.sliding_window_view(values, 9) @ weights / weights.sum()
+        df[f"WMA_9_{cci_col}"] = wma
+
+def add_base_indicators(df):
+    """전략 파라미터와 무관한 지표(조건1/2의 CCI_20·WMA, AI 브리핑용 RSI_14)를 df에 추가합니다."""
+    _add_cci_wma(df, 20)
+    if 'RSI_14' not in df.columns:
+        df.ta.rsi(length=14, append=True)
+    return df
+
+def precompute_indicators(df):
+    """
+    TradingBot이 사용하는 지표 컬럼을 전체 구간에 대해 한 번만 계산합니다. (컬럼 이름은 TradingBot과 동일)
+    이미 있는 컬럼은 다시 계산하지 않으며, 원본 df는 얕은 복사로 보호하므로 공유 배열 위의 프레임도 복사 없이 사용할 수 있습니다.
+    """
+    df = df.copy(deep=False)
+    sc = config.STRATEGY_CONFIG
+    if f"BBL_{sc['bbands_length']}_{sc['bbands_std']}" not in df.columns:
+        df.ta.bbands(length=sc['bbands_length'], std=sc['bbands_std'], append=True)
+    _add_cci_wma(df, sc['cci_length'])
+    return add_base_indicators(df)
+
+class BacktestEngine:
+    """한 코인의 TradingBot 상태 머신(NONE → VANGUARD_IN → FULL_POSITION/PARTIAL_EXIT)을 과거 15분봉 위에서 재생합니다."""
+    def __init__(self, ticker, candles_15m, candles_60m=None, candles_240m=None,
+                 initial_capital=1000000, ai_provider=None, slippage=0.0, db_file=None):
+        self.ticker = ticker
+        self.initial_capital = money(initial_capital)
+        self.frames = {
+            '15m': precompute_indicators(candles_15m),
+            '60m': precompute_indicators(candles_60m if candles_60m is not None else resample_candles(candles_15m, '60m')),
+            '240m': precompute_indicators(candles_240m if candles_240m is not None else resample_candles(candles_15m, '240m')),
+        }
+        self.ai_provider = ai_provider or default_ai_provider()
+        self.exchange = SimulatedFillModel(slippage=slippage)
+        self.db_file = db_file or os.path.join(tempfile.mkdtemp(prefix="backtest_"), "backtest.db")
+        self.current_time = None
+
+    def _step_positions(self, close_times):
+        """각 마감 시각에서 타임프레임별로 '진행 중인 캔들'까지 포함하는 창의 끝 위치를 한 번에 계산합니다."""
+        naive = close_times.tz_localize(None)
+        ends = {}
+        for tf, df in self.frames.items():
+            floors = candle_clock.floor_to_close(close_times, tf).tz_localize(None) if tf != '15m' else naive
+            ends[tf] = np.searchsorted(df.index.values, floors.values, side='right')
+        return ends
+
+    def run(self, start=None, end=None):
+        df_15m = self.frames['15m']
+        close_times = df_15m.index[WINDOW:]
+        if start is not None:
+            close_times = close_times[close_times >= pd.Timestamp(start)]
+        if end is not None:
+            close_times = close_times[close_times <= pd.Timestamp(end)]
+        close_times = close_times.tz_localize(config.TIMEZONE)
+        ends = self._step_positions(close_times)
+        # 캔들별 신호를 타임프레임마다 전체 구간에서 한 번 계산 (실거래와 같은 signals 구현, 창 크기로 데이터 부족 판단 재현)
+        signal_records = {tf: signals.compute_records(df, tf, WINDOW) for tf, df in self.frames.items()}
+        opens = df_15m['open'].to_numpy()
+
+        previous_db_file = db.DB_FILE
+        previous_chained_assignment = pd.options.mode.chained_assignment
+        pd.options.mode.chained_assignment = None
+        db.set_db_file(self.db_file)
+        candle_clock.set_time_source(lambda: self.current_time)
+        ai_interface.set_provider(self.ai_provider)
+        rate_limiter.set_enabled(False)
+        equity = np.empty(len(close_times))
+        windows = {} # (타임프레임, 끝 위치)별로 잘라 둔 창. 60분/240분봉 창은 여러 단계에서 재사용됩니다.
+        started = time.perf_counter()
+        try:
+            db.create_tables()
+            self.current_time = close_times[0]
+            bot = TradingBot(self.ticker, {"capital": self.initial_capital})
+            for step, close_time in enumerate(close_times):
+                self.current_time = close_time
+                price = opens[ends['15m'][step] - 1] # 방금 열린 15분봉의 시가 = 마감 직후 현재가
+                self.exchange.set_price(self.ticker, price)
+
+                cached_data = {}
+                for tf, df in self.frames.items():
+                    key = (tf, ends[tf][step])
+                    if key not in windows:
+                        windows[key] = df.iloc[max(0, key[1] - WINDOW):key[1]]
+                    cached_data[tf] = windows[key]
+                cached_data['price'] = price
+                live.reset_daily_state(bot, close_time.strftime('%Y-%m-%d'))
+                closed_event = (close_time, candle_clock.closed_timeframes_at(close_time))
+                ticker_signals = {tf: signal_records[tf][ends[tf][step] - 2] if ends[tf][step] >= 2 else None for tf in self.frames}
+                live.run_bot_cycle(self.exchange, bot, cached_data, closed_event, close_time, ticker_signals)
+
+                equity[step] = float(live.bot_equity(bot.state, price))
+        finally:
+            candle_clock.set_time_source(None)
+            ai_interface.set_provider(None)
+            rate_limiter.set_enabled(True)
+            db.set_db_file(previous_db_file)
+            pd.options.mode.chained_assignment = previous_chained_assignment
+
+        elapsed = time.perf_counter() - started
+        conn = sqlite3.connect(self.db_file)
+        trades = pd.read_sql_query("SELECT * FROM trade_log ORDER BY id", conn)
+        conn.close()
+        equity_curve = pd.Series(equity, index=close_times, name='total_equity')
+        summary = summarize(trades, equity_curve, float(self.initial_capital))
+        summary['elapsed_sec'] = round(elapsed, 2)
+        summary['steps'] = len(close_times)
+        logger.info(f"[{self.ticker}] 백테스트 완료: {summary}")
+        return {'trades': trades, 'equity': equity_curve, 'summary': summary, 'db_file': self.db_file}
+
+def summarize(trades, equity_curve, initial_capital):
+    pnl = pd.to_numeric(trades['pnl'], errors='coerce') if not trades.empty else pd.Series(dtype=float)
+    wins, losses = pnl[pnl > 0], pnl[pnl < 0]
+    final_equity = equity_curve.iloc[-1] if len(equity_curve) else initial_capital
+    drawdown = (equity_curve / equity_curve.cummax() - 1).min() if len(equity_curve) else 0.0
+    returns = equity_curve.pct_change().dropna()
+    # 15분 단위 수익률 기준 연환산 샤프 비율 (무위험 수익률 0)
+    sharpe = returns.mean() / returns.std() * np.sqrt(365 * 96) if len(returns) > 1 and returns.std() > 0 else 0.0
+    return {
+        'trades': int(len(pnl)),
+        'win_rate': round(len(wins) / len(pnl) * 100, 2) if len(pnl) else 0.0,
+        'profit_factor': round(wins.sum() / abs(losses.sum()), 2) if len(losses) else float('inf'),
+        'total_return_pct': round((final_equity / initial_capital - 1) * 100, 2),
+        'max_drawdown_pct': round(float(drawdown) * 100, 2),
+        'sharpe': round(float(sharpe), 2),
+    }
+
+def load_candles_csv(path):
+    """open/high/low/close/volume 컬럼과 시각 인덱스(KST, tz 없음)를 가진 CSV를 읽습니다."""
+    return pd.read_csv(path, index_col=0, parse_dates=True).sort_index()
+
+if __name__ == "__main__":
+    # 사용법: python backtest.py KRW-BTC candles_15m.csv  또는  python backtest.py KRW-BTC history (candle_store 저장소)
+    if len(sys.argv) < 3:
+        print("사용법: python backtest.py <TICKER> <15분봉 CSV 또는 캔들 저장소 경로>")
+        sys.exit(1)
+    if os.path.isdir(sys.argv[2]):
+        import candle_store
+        frames = [candle_store.load_frame(sys.argv[1], tf, root=sys.argv[2]) for tf in ['15m', '60m', '240m']]
+        engine = BacktestEngine(sys.argv[1], *frames)
+    else:
+        engine = BacktestEngine(sys.argv[1], load_candles_csv(sys.argv[2]))
+    result = engine.run()
+    print(result['summary'])
+    print(f"거래 내역: {result['db_file']} (trade_log 테이블)")
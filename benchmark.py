@@ -0,0 +1,247 @@
+"""
+주요 실행 경로의 성능 벤치마크와 회귀 검사.
+
+네트워크 없이 합성 캔들, 모의 거래소(exchange_sim), 고정 AI 제공자(backtest.FixedAIProvider)로 실행합니다.
+- 전략: TradingBot.run_strategy (포지션 상태별, 신호 조회), 신호 계산(signals.compute_all), 지표 계산, _c_check_trailing_stop
+- 장부: main의 매수/매도/총자산 계산과 같은 연산을 Fixed와 Decimal로 각각 실행 (고정소수점 전환 비용 확인용)
+- DB  : db.update_state, db.load_all_states, db.log_trade, dashboard.load_data_from_db
+- 전체: scale_replay로 실제 run_trading_cycle을 재생한 주기당 시간
+
+각 항목은 REPEAT회 측정하여 가장 빠른 회차의 호출당 시간을 기준선(BASELINE_FILE)과 비교하고, 허용 비율을 넘게
+느려진 항목이 있으면 종료 코드 1로 끝납니다. 기준선은 측정한 기계와 라이브러리 버전에서만 의미가 있습니다.
+
+사용법: python benchmark.py [save] [항목 이름 일부 ...]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import platform
+import tempfile
+from datetime import datetime
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+import pandas_ta as ta
+from logger_config import logger
+import config
+import candle_clock
+from fixed_point import Fixed, money, volume
+import database_manager as db
+import backtest
+import scale_replay
+from trading_bot import TradingBot
+import signals
+
+# --- 합성 입력 ---
+def make_cached_data(seed=None, days=30):
+    """마지막 시점의 15분/1시간/4시간봉 50개와 현재가. fetch_ticker_data가 돌려주는 형태와 같습니다."""
+    seed = config.BENCHMARK_CONFIG["SEED"] if seed is None else seed
+    df_15m = scale_replay.synthetic_candles(["KRW-BENCH"], "2025-01-01", days, seed=seed)["KRW-BENCH"]
+    data = {'15m': df_15m.tail(50),
+            '60m': backtest.resample_candles(df_15m, '60m').tail(50),
+            '240m': backtest.resample_candles(df_15m, '240m').tail(50)}
+    data['price'] = float(df_15m['close'].iloc[-1])
+    return data
+
+def fresh(data):
+    """지표 열이 추가되지 않은 새 복사본. (전략이 DataFrame에 지표를 덧붙이므로 호출마다 새로 준비)"""
+    return {k: v.copy() if isinstance(v, pd.DataFrame) else v for k, v in data.items()}
+
+STRATEGY_STATES = {
+    'none': {"position_status": "NONE"},
+    'vanguard_in': {"position_status": "VANGUARD_IN", "avg_entry_price": money(100), "total_position_size": volume(1)},
+    'full_position': {"position_status": "FULL_POSITION", "avg_entry_price": money(100), "total_position_size": volume(1),
+                      "is_take_profit_ready": True},
+    'trailing_stop': {"position_status": "PARTIAL_EXIT", "avg_entry_price": money(100), "total_position_size": volume(1),
+                      "trailing_stop_active": True},
+}
+ALL_CLOSED = {'15m', '60m', '240m'}
+
+def _trade_row(i):
+    return {'ticker': f"KRW-B{i % 50:03d}", 'entry_time': '2025-01-01 00:00:00', 'exit_time': f"2025-01-02 00:{i % 60:02d}:00",
+            'pnl': money('1234.5'), 'pnl_percentage': money('1.2'), 'exit_reason': 'benchmark', 'entry_ai_reason': 'benchmark',
+            'avg_entry_price': money(100), 'exit_price': money('101.2'), 'quantity': volume(10), 'total_fee': money('0.5')}
+
+def _fill_db(bots=100, trades=2000, capital_rows=20000):
+    """대시보드/상태 로딩 측정용으로 실제 운영 규모와 비슷한 행 수를 채웁니다."""
+    db.create_tables()
+    for i in range(bots):
+        db.update_state(f"KRW-B{i:03d}", {**TradingBot(f"KRW-B{i:03d}").state, "capital": money(1000000)})
+    conn = db.connect_db()
+    conn.execute("BEGIN")
+    conn.executemany("INSERT INTO trade_log (ticker, entry_time, exit_time, pnl, pnl_percentage, exit_reason, entry_ai_reason, avg_entry_price, exit_price, quantity, total_fee) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                     [tuple(str(v) if isinstance(v, Fixed) else v for v in _trade_row(i).values()) for i in range(trades)])
+    start = pd.Timestamp("2024-01-01")
+    conn.executemany("INSERT OR REPLACE INTO capital_log (timestamp, total_equity) VALUES (?, ?)",
+                     [((start + pd.Timedelta(minutes=15 * i)).strftime('%Y-%m-%d %H:%M:%S'), 1e8 + i) for i in range(capital_rows)])
+    conn.execute("COMMIT")
+    conn.close()
+
+# --- 측정 ---
+def measure(func, setup=None):
+    """setup()이 준비한 인자로 func를 반복 호출해 회차별 호출당 시간(초)을 잽니다. setup 시간은 제외합니다."""
+    bc = config.BENCHMARK_CONFIG
+    rounds = []
+    for _ in range(bc["REPEAT"]):
+        elapsed, calls = 0.0, 0
+        while elapsed < bc["MIN_ROUND_SEC"] or calls == 0:
+            args = setup() if setup else ()
+            started = time.perf_counter()
+            func(*args)
+            elapsed += time.perf_counter() - started
+            calls += 1
+        rounds.append(elapsed / calls)
+    return {'best_sec': min(rounds), 'median_sec': float(np.median(rounds)), 'calls': calls}
+
+def strategy_cases():
+    data = make_cached_data()
+    cases = {}
+    for name, state in STRATEGY_STATES.items():
+        def setup(state=state):
+            d = fresh(data)
+            return TradingBot("KRW-BENCH", dict(state)), d, signals.compute_all(d)
+        cases[f"run_strategy[{name}]"] = (lambda bot, d, sig: bot.run_strategy(d, closed_timeframes=ALL_CLOSED, signals=sig), setup)
+    cases["signals.compute_all"] = (signals.compute_all, lambda: (fresh(data),))
+    cases["indicator[cci]"] = (lambda df: df.ta.cci(length=20, append=True, col_names=("CCI_20",)), lambda: (data['60m'].copy(),))
+    cases["indicator[bbands]"] = (lambda df: df.ta.bbands(length=config.STRATEGY_CONFIG['bbands_length'], std=config.STRATEGY_CONFIG['bbands_std'], append=True),
+                                  lambda: (data['60m'].copy(),))
+    cases["indicator[rsi]"] = (lambda df: df.ta.rsi(length=14, append=True), lambda: (data['60m'].copy(),))
+    cases["indicator[supertrend]"] = (lambda df: df.ta.supertrend(length=config.STRATEGY_CONFIG.get('SUPERTREND_PERIOD', 10),
+                                                                  multiplier=config.STRATEGY_CONFIG.get('SUPERTREND_MULTIPLIER', 2.0), append=True),
+                                      lambda: (data['60m'].copy(),))
+    trailing_signals = signals.compute_all(fresh(data))
+    cases["_c_check_trailing_stop"] = (lambda bot: bot._c_check_trailing_stop(trailing_signals, data['price']),
+                                       lambda: (TradingBot("KRW-BENCH", dict(STRATEGY_STATES['trailing_stop'])),))
+    return cases
+
+def _ledger_ops(to_money, to_volume, prices):
+    """process_buy_order/process_sell_order/bot_equity와 같은 장부 계산을 가격 문자열마다 한 번씩 반복합니다."""
+    capital, size, avg_price = to_money('1000000'), to_volume('0'), to_money('0')
+    for text in prices:
+        price, qty = to_money(text), to_volume('0.01234567')
+        avg_price = (avg_price * size + price * qty) / (size + qty)
+        size += qty
+        capital -= price * qty
+        if capital + price * size > capital: # 총자산 계산과 비교
+            entry_cost, exit_value = avg_price * qty, price * qty
+            fee = (entry_cost + exit_value) * config.FEE_RATE
+            capital += entry_cost + (exit_value - entry_cost) - fee
+            size -= qty
+    return capital
+
+def ledger_cases():
+    closes = scale_replay.synthetic_candles(["KRW-BENCH"], "2025-01-01", 10, seed=config.BENCHMARK_CONFIG["SEED"])["KRW-BENCH"]['close']
+    prices = [f"{p:.2f}" for p in closes]
+    return {
+        "ledger[fixed]": (lambda: _ledger_ops(money, volume, prices), None),
+        "ledger[decimal]": (lambda: _ledger_ops(Decimal, Decimal, prices), None),
+    }
+
+def db_cases():
+    state = {**TradingBot("KRW-B000").state, "capital": money(1000000), "entry_ai_reasons": ["a", "b"]}
+    counter = iter(range(10**9))
+    def load_dashboard():
+        import dashboard # streamlit 페이지 코드가 함께 실행되므로 처음 필요할 때 불러옴
+        dashboard.load_data_from_db.clear() # 캐시 적중이 아닌 실제 로딩 시간을 측정
+        return dashboard.load_data_from_db()
+    return {
+        "db.update_state": (lambda: db.update_state("KRW-B000", state), None),
+        "db.load_all_states": (db.load_all_states, None),
+        "db.log_trade": (lambda: db.log_trade(_trade_row(next(counter))), None),
+        "dashboard.load_data_from_db": (load_dashboard, None),
+    }
+
+def cycle_case(tickers=20, days=10):
+    """scale_replay로 실제 run_trading_cycle을 재생하고 주기당 시간의 중앙값을 반환합니다."""
+    candles = scale_replay.synthetic_candles([f"KRW-SIM{i:03d}" for i in range(tickers)], "2025-01-01", days, seed=config.BENCHMARK_CONFIG["SEED"])
+    rounds = []
+    for _ in range(max(1, config.BENCHMARK_CONFIG["REPEAT"] // 2)):
+        result = scale_replay.run_replay(candles, exchange_overrides={"FILL_MODE": "immediate"})
+        rounds.append(float(np.median(result['cycle_ms'])) / 1000)
+    return {'best_sec': min(rounds), 'median_sec': float(np.median(rounds)), 'calls': len(result['cycle_ms'])}
+
+def run_benchmarks(selected=None):
+    """모든(또는 이름에 selected 문자열이 들어간) 항목을 측정해 {이름: 결과}를 반환합니다."""
+    work_dir = tempfile.mkdtemp(prefix="benchmark_")
+    saved = {'db_file': db.DB_FILE, 'config_db': config.DB_FILE, 'level': logger.level}
+    results = {}
+    try:
+        logger.setLevel(logging.ERROR)
+        db.set_db_file(os.path.join(work_dir, "bench.db"))
+        config.DB_FILE = db.DB_FILE # 대시보드가 같은 파일을 읽도록
+        _fill_db()
+        cases = {**strategy_cases(), **ledger_cases(), **db_cases(), "trading_cycle": None}
+        for name, case in cases.items():
+            if selected and not any(s in name for s in selected):
+                continue
+            try:
+                results[name] = cycle_case() if case is None else measure(*case)
+            except ImportError as e:
+                logger.error(f"[벤치마크] {name} 건너뜀: {e}")
+                continue
+            print(f"{name:>32}: {results[name]['best_sec'] * 1000:10.3f} ms (중앙값 {results[name]['median_sec'] * 1000:.3f} ms)")
+    finally:
+        db.set_db_file(saved['db_file'])
+        config.DB_FILE = saved['config_db']
+        logger.setLevel(saved['level'])
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+# --- 기준선 ---
+def environment():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'pandas_ta': getattr(ta, 'version', None), 'machine': platform.machine(), 'node': platform.node()}
+
+def save_baseline(results, path=None):
+    """측정 결과를 기준선 파일에 병합하여 저장합니다. (선택한 항목만 갱신)"""
+    path = path or config.BENCHMARK_CONFIG["BASELINE_FILE"]
+    baseline = load_baseline(path) or {'results': {}}
+    baseline['results'].update({name: r['best_sec'] for name, r in results.items()})
+    baseline.update(saved_at=datetime.now().isoformat(timespec='seconds'), environment=environment())
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, ensure_ascii=False)
+    return baseline
+
+def load_baseline(path=None):
+    path = path or config.BENCHMARK_CONFIG["BASELINE_FILE"]
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def compare(results, baseline):
+    """기준선 대비 비율을 계산합니다. [(이름, 기준 초, 현재 초, 비율, 허용 비율, 회귀 여부)]"""
+    bc = config.BENCHMARK_CONFIG
+    rows = []
+    for name, result in results.items():
+        base = baseline['results'].get(name)
+        if not base:
+            continue
+        limit = bc["THRESHOLDS"].get(name, bc["REGRESSION_THRESHOLD"])
+        ratio = result['best_sec'] / base
+        rows.append((name, base, result['best_sec'], ratio, limit, ratio > 1 + limit))
+    return rows
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    save = bool(args) and args[0] == 'save'
+    selected = args[1:] if save else args
+    results = run_benchmarks(selected or None)
+    if save:
+        save_baseline(results)
+        print(f"기준선을 저장했습니다: {config.BENCHMARK_CONFIG['BASELINE_FILE']} ({len(results)}개 항목)")
+        sys.exit(0)
+    baseline = load_baseline()
+    if baseline is None:
+        print("기준선이 없습니다. 먼저 'python benchmark.py save'로 저장하세요.")
+        sys.exit(0)
+    if baseline.get('environment') != environment():
+        print(f"주의: 기준선 측정 환경이 다릅니다. {baseline.get('environment')}")
+    regressions = 0
+    for name, base, current, ratio, limit, regressed in compare(results, baseline):
+        regressions += regressed
+        print(f"{'회귀' if regressed else '통과'} {name:>32}: {base * 1000:10.3f} → {current * 1000:10.3f} ms ({ratio:5.2f}배, 허용 {1 + limit:.2f}배)")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,156 @@
+"""
+(코인, 타임프레임)별 고정 용량 캔들 링 버퍼.
+
+주기마다 DataFrame을 새로 만들고 지표 열을 덧붙였다가 버리는 대신, 미리 할당한 float64 배열에 OHLCV와 지표 열을 함께
+보관합니다. 새 캔들은 링에 덮어쓰고(진행 중인 캔들은 같은 자리를 갱신), 지표는 갱신될 때 indicators의 NumPy 구현으로
+최근 창 전체에 대해 다시 계산해 같은 배열에 씁니다. 코인 수가 늘어도 코인당 메모리는 (용량 × 열 수)로 고정입니다.
+
+TradingBot은 링을 직접 읽지 않고, 캔들이 마감될 때 signals가 링(백테스트는 DataFrame)으로 계산한 신호를 조회합니다.
+"""
+import threading
+import numpy as np
+import pandas as pd
+import config
+import indicators
+
+BASE_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'value']
+
+def indicator_columns(timeframe):
+    """타임프레임별로 TradingBot이 읽는 지표 열 이름 → 계산 함수(열 이름별 배열 딕셔너리 → 배열)."""
+    sc = config.STRATEGY_CONFIG
+    specs = {'RSI_14': lambda a: indicators.rsi(a['close'], 14)}
+    if timeframe in ('60m', '240m'):
+        bb_len, bb_std = sc['bbands_length'], sc['bbands_std']
+        def bands(a): # 한 번 계산해 세 열에 사용
+            if '_bbands' not in a:
+                a['_bbands'] = indicators.bbands(a['close'], bb_len, bb_std)
+            return a['_bbands']
+        specs[f"BBL_{bb_len}_{bb_std}"] = lambda a: bands(a)[0]
+        specs[f"BBM_{bb_len}_{bb_std}"] = lambda a: bands(a)[1]
+        specs[f"BBU_{bb_len}_{bb_std}"] = lambda a: bands(a)[2]
+        for length in sorted({20, sc['cci_length']}):
+            specs[f"CCI_{length}"] = lambda a, n=length: indicators.cci(a['high'], a['low'], a['close'], n)
+            specs[f"WMA_9_CCI_{length}"] = lambda a, n=length: indicators.wma(a[f"CCI_{n}"], 9)
+    if timeframe == sc.get('SUPERTREND_TIMEFRAME', '60m'):
+        period, multiplier = sc.get('SUPERTREND_PERIOD', 10), sc.get('SUPERTREND_MULTIPLIER', 2.0)
+        props = f"_{period}_{multiplier:.1f}"
+        def trend(a):
+            if '_supertrend' not in a:
+                a['_supertrend'] = indicators.supertrend(a['high'], a['low'], a['close'], period, multiplier)
+            return a['_supertrend']
+        specs[f"SUPERT{props}"] = lambda a: trend(a)[0]
+        specs[f"SUPERTl{props}"] = lambda a: trend(a)[2]
+    return specs
+
+class CandleRing:
+    """
+    행을 두 번(i, i + capacity) 기록하는 링 버퍼. 최근 n개 행이 항상 하나의 연속 구간이므로 복사 없이 뷰로 읽습니다.
+    """
+    def __init__(self, timeframe, capacity=None):
+        self.timeframe = timeframe
+        self.capacity = capacity or config.CANDLE_BUFFER_CONFIG["CAPACITY"]
+        self.specs = indicator_columns(timeframe)
+        self.columns = {name: i for i, name in enumerate(BASE_FIELDS + list(self.specs))}
+        self._data = np.full((2 * self.capacity, len(self.columns)), np.nan)
+        self._ts = np.zeros(2 * self.capacity, dtype=np.int64)
+        self._head = 0 # 다음에 쓸 위치
+        self._count = 0
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def _window(self):
+        end = self._head + self.capacity
+        return slice(end - len(self), end)
+
+    def _write(self, pos, ts, row):
+        self._ts[pos] = self._ts[pos + self.capacity] = ts
+        self._data[pos, :len(BASE_FIELDS)] = self._data[pos + self.capacity, :len(BASE_FIELDS)] = row
+
+    def update(self, ts, values):
+        """시각(int64 초) 오름차순의 캔들을 병합합니다. 값이 바뀐 경우에만 지표를 다시 계산하고 True를 반환합니다."""
+        changed = False
+        last_ts = self._ts[self._window()][-1] if self._count else None
+        last_pos = (self._head - 1) % self.capacity
+        for t, row in zip(ts, values):
+            if last_ts is not None and t < last_ts:
+                continue # 이미 지난 캔들
+            if last_ts is not None and t == last_ts:
+                if np.array_equal(self._data[last_pos, :len(BASE_FIELDS)], row):
+                    continue
+                self._write(last_pos, t, row) # 진행 중인 캔들 갱신
+            else:
+                self._write(self._head, t, row)
+                last_pos, self._head = self._head, (self._head + 1) % self.capacity
+                self._count += 1
+                last_ts = t
+            changed = True
+        if changed:
+            self._recompute()
+        return changed
+
+    def update_frame(self, df):
+        if df is None or df.empty:
+            return False
+        # 인덱스 해상도(pandas 2는 ns, 3은 문자열 파싱 시 us 등)와 무관하게 초 단위로
+        return self.update(df.index.as_unit('s').asi8, df[BASE_FIELDS].to_numpy(dtype=np.float64))
+
+    def _recompute(self):
+        window = self._window()
+        arrays = {name: self._data[window, i] for name, i in self.columns.items()}
+        rows = np.arange(window.start, window.stop) % self.capacity
+        for name, func in self.specs.items():
+            result = func(arrays)
+            arrays[name] = result # WMA처럼 앞서 계산한 지표를 쓰는 열을 위해
+            col = self.columns[name]
+            self._data[rows, col] = self._data[rows + self.capacity, col] = result
+
+    # --- 읽기 ---
+    def column(self, name):
+        """최근 행들의 열 값 (오래된 것부터, 읽기 전용 뷰)."""
+        view = self._data[self._window(), self.columns[name]]
+        view.flags.writeable = False
+        return view
+
+    def timestamps(self):
+        return self._ts[self._window()]
+
+    def to_frame(self):
+        """디버깅/표시용 DataFrame (복사본)."""
+        index = pd.to_datetime(self.timestamps(), unit='s')
+        return pd.DataFrame(self._data[self._window()].copy(), index=index, columns=list(self.columns))
+
+class CandleBufferStore:
+    """코인별 링 버퍼 모음. 한 코인의 링은 그 코인의 워커(bot.lock 보유)만 갱신합니다."""
+    def __init__(self, capacity=None):
+        self.capacity = capacity
+        self.rings = {}
+        self._lock = threading.Lock()
+
+    def ring(self, ticker, timeframe):
+        key = (ticker, timeframe)
+        ring = self.rings.get(key)
+        if ring is None:
+            with self._lock:
+                ring = self.rings.setdefault(key, CandleRing(timeframe, self.capacity))
+        return ring
+
+    def update(self, ticker, data):
+        """fetch_ticker_data 결과의 DataFrame들을 링에 병합하고, 같은 키에 링을 담은 딕셔너리를 반환합니다."""
+        if data is None:
+            return None
+        result = {'price': data.get('price')}
+        for tf in ['15m', '60m', '240m']:
+            df = data.get(tf)
+            if df is None:
+                result[tf] = None
+                continue
+            ring = self.ring(ticker, tf)
+            ring.update_frame(df)
+            result[tf] = ring if len(ring) else None
+        return result
+
+    def drop(self, ticker):
+        with self._lock:
+            for tf in ['15m', '60m', '240m']:
+                self.rings.pop((ticker, tf), None)
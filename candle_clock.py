@@ -0,0 +1,122 @@
+import time
+from collections import namedtuple
+import pandas as pd
+from logger_config import logger
+import config
+
+# 업비트 분봉은 UTC 00:00 기준으로 정렬됩니다. (4시간봉 마감: KST 01, 05, 09, 13, 17, 21시)
+TIMEFRAME_MINUTES = {'15m': 15, '60m': 60, '240m': 240}
+BASE_TIMEFRAME = '15m'
+
+# 현재 시각을 돌려주는 함수. 백테스트/리플레이에서 set_time_source로 시뮬레이션 시계를 주입합니다.
+_time_source = None
+
+def now():
+    """현재 시각(KST). 주입된 시계가 있으면 그 시각을 반환합니다."""
+    if _time_source is not None:
+        return _time_source()
+    return pd.Timestamp.now(tz=config.TIMEZONE)
+
+def set_time_source(source):
+    """시계를 주입합니다. None을 주면 실제 시계로 돌아갑니다."""
+    global _time_source
+    _time_source = source
+
+# (ticker, timeframe) 캔들 하나가 close_time(KST)에 마감되었음을 나타내는 이벤트
+CandleCloseEvent = namedtuple('CandleCloseEvent', ['ticker', 'timeframe', 'close_time'])
+
+_MINUTE_NS = 60 * 10**9
+
+def floor_to_close(ts, timeframe):
+    """ts 시점(Timestamp 또는 DatetimeIndex) 기준으로 가장 최근에 마감된 timeframe 캔들의 마감 시각(KST)을 반환합니다."""
+    step_ns = TIMEFRAME_MINUTES[timeframe] * _MINUTE_NS
+    if ts.tzinfo is None:
+        ts = ts.tz_localize(config.TIMEZONE)
+    if isinstance(ts, pd.Timestamp): # 주기마다 호출되므로 정수 연산으로 처리
+        return pd.Timestamp(ts.value - ts.value % step_ns, tz='UTC').tz_convert(config.TIMEZONE)
+    return ts.tz_convert('UTC').floor(f"{TIMEFRAME_MINUTES[timeframe]}min").tz_convert(config.TIMEZONE)
+
+def closed_timeframes_at(close_time):
+    """close_time에 함께 마감되는 타임프레임 집합을 반환합니다. (예: 09:00 → 15m, 60m, 240m)"""
+    if close_time.tzinfo is None:
+        close_time = close_time.tz_localize(config.TIMEZONE)
+    base_minutes = (close_time.value // _MINUTE_NS) // TIMEFRAME_MINUTES[BASE_TIMEFRAME] * TIMEFRAME_MINUTES[BASE_TIMEFRAME]
+    return {tf for tf, minutes in TIMEFRAME_MINUTES.items() if base_minutes % minutes == 0}
+
+def group_events(events):
+    """이벤트 목록을 코인별 (가장 최근 마감 시각, 마감된 타임프레임 집합)으로 묶습니다."""
+    grouped = {}
+    for event in events:
+        latest, closed = grouped.get(event.ticker, (None, set()))
+        closed.add(event.timeframe)
+        if latest is None or event.close_time > latest:
+            latest = event.close_time
+        grouped[event.ticker] = (latest, closed)
+    return grouped
+
+class CandleClock:
+    """
+    로컬 시계 또는 캔들 피드를 기준으로 (ticker, timeframe)별 '캔들 마감' 이벤트를 발생시킵니다.
+    마지막으로 발생시킨 마감 시각을 기억하므로, 주기가 늦게 시작되거나 길게 실행되어도 경계를 건너뛰지 않습니다.
+    """
+    def __init__(self, tickers, timeframes=None, grace_sec=None):
+        self.timeframes = list(timeframes or TIMEFRAME_MINUTES.keys())
+        self.grace_sec = config.CANDLE_CLOSE_GRACE_SEC if grace_sec is None else grace_sec
+        self.last_closed = {}
+        self.set_tickers(tickers)
+
+    def set_tickers(self, tickers):
+        """감시 대상 코인 목록을 교체합니다. 새 코인은 다음 마감부터 이벤트를 받습니다."""
+        self.tickers = list(tickers)
+        current = now()
+        for ticker in self.tickers:
+            for tf in self.timeframes:
+                self.last_closed.setdefault((ticker, tf), floor_to_close(current, tf))
+
+    def _emit_until(self, ticker, timeframe, latest_close):
+        """마지막 마감 이후 latest_close까지의 모든 경계를 하나씩 이벤트로 만듭니다."""
+        step = pd.Timedelta(minutes=TIMEFRAME_MINUTES[timeframe])
+        last = self.last_closed.get((ticker, timeframe), latest_close)
+        events = []
+        close_time = last + step
+        while close_time <= latest_close:
+            events.append(CandleCloseEvent(ticker, timeframe, close_time))
+            close_time += step
+        if latest_close > last:
+            self.last_closed[(ticker, timeframe)] = latest_close
+        return events
+
+    def poll(self, current=None):
+        """로컬 시계 기준으로 지난 poll 이후 마감된 모든 캔들의 이벤트를 반환합니다."""
+        current = current or now()
+        events = []
+        for ticker in self.tickers:
+            for tf in self.timeframes:
+                events.extend(self._emit_until(ticker, tf, floor_to_close(current, tf)))
+        base_events = sum(1 for e in events if e.timeframe == BASE_TIMEFRAME)
+        if base_events > len(self.tickers):
+            logger.warning(f"지연된 캔들 마감 이벤트 {len(events)}건을 한 번에 처리합니다.")
+        return events
+
+    def observe_candle(self, ticker, timeframe, latest_open_time):
+        """
+        캔들 피드에서 latest_open_time에 시작된 캔들을 확인했을 때 호출합니다.
+        새 캔들이 열렸다는 것은 직전 캔들이 latest_open_time에 마감되었다는 뜻입니다.
+        """
+        if latest_open_time.tzinfo is None:
+            latest_open_time = latest_open_time.tz_localize(config.TIMEZONE)
+        return self._emit_until(ticker, timeframe, floor_to_close(latest_open_time, timeframe))
+
+    def seconds_until_next_close(self, current=None):
+        current = current or now()
+        step = pd.Timedelta(minutes=TIMEFRAME_MINUTES[BASE_TIMEFRAME])
+        next_close = floor_to_close(current, BASE_TIMEFRAME) + step
+        return max(0.0, (next_close - current).total_seconds() + self.grace_sec)
+
+    def wait_for_events(self):
+        """다음 캔들 마감까지 대기한 후, 그 사이 마감된 모든 이벤트를 반환합니다."""
+        events = self.poll()
+        while not events:
+            time.sleep(self.seconds_until_next_close())
+            events = self.poll()
+        return events
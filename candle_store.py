@@ -0,0 +1,202 @@
+"""
+백테스트용 과거 캔들 일괄 다운로더와 열 단위(columnar) 저장소.
+
+저장 형식 ({DATA_DIR}/{ticker}/{timeframe}/)
+- ts.i64                    : 캔들 시작 시각. int64 초 (pyupbit 인덱스인 KST 시각을 그대로 에포크 초로 저장, market_data_service와 동일)
+- open.f64 ... value.f64    : 필드별 고정 폭 float64 배열. np.memmap으로 복사 없이 읽습니다.
+- meta.json                 : 행 수, 저장 범위, 진행 중인 다운로드 작업(체크포인트)
+- pages/                    : 아직 병합되지 않은 페이지. 중단되더라도 다음 실행이 이어서 받은 뒤 병합합니다.
+
+업비트 캔들 API는 한 번에 최대 200개를 주므로, 시세 API 요청 한도 안에서 과거 방향으로 페이지를 넘기며 받습니다.
+이미 저장된 범위는 다시 요청하지 않습니다. (최신 쪽 빈 구간과 과거 쪽 빈 구간만 받음)
+"""
+import os
+import sys
+import json
+import time
+import numpy as np
+import pandas as pd
+from logger_config import logger
+import config
+import candle_clock
+import exchange_client
+from market_data_service import TIMEFRAMES, FIELDS
+
+VALUE_FIELDS = FIELDS[1:] # open, high, low, close, volume, value
+
+def _tf_dir(ticker, timeframe, root=None):
+    return os.path.join(root or config.HISTORY_CONFIG["DATA_DIR"], ticker, timeframe)
+
+def _to_seconds(index):
+    # 인덱스 해상도(pandas 2는 ns, 3은 s/us 등)와 무관하게 초 단위로
+    return index.as_unit('s').asi8
+
+# --- 저장소 읽기/쓰기 ---
+def _read_meta(path):
+    meta_file = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_file):
+        return {"rows": 0, "first": None, "last": None, "listing_start_reached": False, "job": None}
+    with open(meta_file) as f:
+        return json.load(f)
+
+def _write_meta(path, meta):
+    tmp = os.path.join(path, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(path, "meta.json")) # 중간에 끊겨도 이전 체크포인트가 남도록 교체
+
+def load_arrays(ticker, timeframe, root=None):
+    """{'ts': int64 memmap, 'open': float64 memmap, ...}을 반환합니다. 저장된 데이터가 없으면 None."""
+    path = _tf_dir(ticker, timeframe, root)
+    rows = _read_meta(path)["rows"]
+    if rows == 0:
+        return None
+    arrays = {'ts': np.memmap(os.path.join(path, "ts.i64"), dtype=np.int64, mode='r', shape=(rows,))}
+    for field in VALUE_FIELDS:
+        arrays[field] = np.memmap(os.path.join(path, f"{field}.f64"), dtype=np.float64, mode='r', shape=(rows,))
+    return arrays
+
+def load_frame(ticker, timeframe, start=None, end=None, root=None):
+    """[start, end] 범위의 캔들을 exchange_client.get_ohlcv와 같은 형태(KST 시각 인덱스)의 DataFrame으로 반환합니다."""
+    arrays = load_arrays(ticker, timeframe, root)
+    if arrays is None:
+        return None
+    ts = arrays['ts']
+    lo = np.searchsorted(ts, _to_seconds(pd.DatetimeIndex([pd.Timestamp(start)]))[0]) if start is not None else 0
+    hi = np.searchsorted(ts, _to_seconds(pd.DatetimeIndex([pd.Timestamp(end)]))[0], side='right') if end is not None else len(ts)
+    index = pd.to_datetime(np.asarray(ts[lo:hi]), unit='s')
+    return pd.DataFrame({field: arrays[field][lo:hi] for field in VALUE_FIELDS}, index=index)
+
+def _save_page(path, df):
+    pages = os.path.join(path, "pages")
+    os.makedirs(pages, exist_ok=True)
+    ts = _to_seconds(df.index)
+    np.savez(os.path.join(pages, f"page_{ts[0]}.npz"), ts=ts, values=df[VALUE_FIELDS].to_numpy(dtype=np.float64))
+
+def _compact(path, meta):
+    """저장된 배열과 받아 둔 페이지를 시각 순으로 합쳐(중복 제거) 필드별 파일을 다시 씁니다."""
+    pages_dir = os.path.join(path, "pages")
+    page_files = sorted(os.listdir(pages_dir)) if os.path.isdir(pages_dir) else []
+    if not page_files:
+        return meta
+    parts_ts, parts_values = [], []
+    if meta["rows"]:
+        parts_ts.append(np.fromfile(os.path.join(path, "ts.i64"), dtype=np.int64))
+        parts_values.append(np.column_stack([np.fromfile(os.path.join(path, f"{f}.f64"), dtype=np.float64) for f in VALUE_FIELDS]))
+    for name in page_files:
+        with np.load(os.path.join(pages_dir, name)) as page:
+            parts_ts.append(page['ts'])
+            parts_values.append(page['values'])
+    ts = np.concatenate(parts_ts)
+    values = np.concatenate(parts_values)
+    ts, first_pos = np.unique(ts, return_index=True) # 정렬 + 중복 제거
+    values = values[first_pos]
+
+    for name, array in [("ts.i64", ts)] + [(f"{f}.f64", values[:, i]) for i, f in enumerate(VALUE_FIELDS)]:
+        tmp = os.path.join(path, name + ".tmp")
+        np.ascontiguousarray(array).tofile(tmp)
+        os.replace(tmp, os.path.join(path, name))
+    meta.update(rows=int(len(ts)), first=int(ts[0]), last=int(ts[-1]))
+    _write_meta(path, meta)
+    for name in page_files:
+        os.remove(os.path.join(pages_dir, name))
+    return meta
+
+# --- 다운로드 ---
+def _fetch_page(ticker, timeframe, to_seconds, count):
+    """to 시각(KST 기준 에포크 초, 미포함) 이전의 캔들을 최대 count개 받습니다. 재시도 후에도 실패하면 None."""
+    hc = config.HISTORY_CONFIG
+    # tz 없는 시각의 해석이 라이브러리마다 다르므로, UTC 시각을 명시해 전달
+    to = pd.Timestamp(to_seconds, unit='s').tz_localize(config.TIMEZONE).tz_convert('UTC').to_pydatetime() if to_seconds else None
+    for attempt in range(1, hc["MAX_RETRIES"] + 1):
+        df = exchange_client.get_ohlcv(ticker, interval=TIMEFRAMES[timeframe], count=count, to=to)
+        if df is not None:
+            return df
+        logger.warning(f"[{ticker}] {timeframe} 캔들 페이지 요청 실패 ({attempt}/{hc['MAX_RETRIES']})")
+        time.sleep(attempt)
+    return None
+
+def _plan_jobs(meta, since_sec):
+    """
+    받아야 할 빈 구간을 {cursor, boundary} 목록으로 만듭니다. cursor(None이면 진행 중인 캔들)부터 과거 방향으로,
+    boundary(미포함, None이면 상장 시점)보다 새로운 캔들만 받습니다.
+    """
+    boundary_since = since_sec - 1 if since_sec is not None else None
+    if meta["rows"] == 0:
+        return [{"cursor": None, "boundary": boundary_since}]
+    jobs = [{"cursor": None, "boundary": meta["last"]}] # 최신 쪽: 현재 → 마지막 저장 캔들
+    if not meta["listing_start_reached"] and (since_sec is None or since_sec < meta["first"]):
+        jobs.append({"cursor": meta["first"], "boundary": boundary_since}) # 과거 쪽: 첫 저장 캔들 → since
+    return jobs
+
+def _page_count(job, timeframe):
+    """경계까지 남은 캔들 수만큼만 요청하여, 이미 받은 캔들을 다시 받지 않도록 합니다. 남은 캔들이 없으면 0."""
+    page_size = config.HISTORY_CONFIG["PAGE_SIZE"]
+    if job["boundary"] is None:
+        return page_size
+    step = candle_clock.TIMEFRAME_MINUTES[timeframe] * 60
+    remaining = -(-(job["cursor"] - job["boundary"]) // step) - 1 # cursor와 boundary 사이(양끝 제외)의 캔들 수
+    return int(min(page_size, max(remaining, 0)))
+
+def download(ticker, timeframe, since=None, root=None):
+    """
+    (ticker, timeframe)의 캔들을 since(KST)까지 받아 저장소에 병합하고, 저장된 총 행 수를 반환합니다.
+    페이지마다 체크포인트를 남기므로 중단 후 다시 실행하면 마지막 페이지부터 이어서 받습니다.
+    """
+    path = _tf_dir(ticker, timeframe, root)
+    os.makedirs(path, exist_ok=True)
+    meta = _read_meta(path)
+    if not meta.get("job"):
+        meta = _compact(path, meta) # 병합 직전에 끊긴 페이지가 남아 있으면 먼저 병합
+    since = since if since is not None else config.HISTORY_CONFIG["SINCE"]
+    since_sec = int(_to_seconds(pd.DatetimeIndex([pd.Timestamp(since)]))[0]) if since else None
+
+    jobs = _plan_jobs(meta, since_sec)
+    if meta.get("job"): # 중단된 작업을 먼저 이어서 진행 (그 작업의 페이지는 아직 병합 전)
+        jobs = [meta["job"]] + [j for j in jobs if j["cursor"] != meta["job"]["origin"]]
+    fetched = 0
+    for job in jobs:
+        job.setdefault("origin", job["cursor"])
+        if job["cursor"] is None: # 진행 중인 캔들은 받지 않도록, 그 시작 시각 이전부터 받음
+            job["cursor"] = int(_to_seconds(pd.DatetimeIndex([candle_clock.floor_to_close(candle_clock.now(), timeframe).tz_localize(None)]))[0])
+        meta["job"] = job
+        _write_meta(path, meta)
+        while True:
+            count = _page_count(job, timeframe)
+            if count == 0:
+                break
+            df = _fetch_page(ticker, timeframe, job["cursor"], count)
+            if df is None:
+                logger.error(f"[{ticker}] {timeframe} 다운로드를 중단합니다. 다음 실행 시 이어서 받습니다.")
+                return meta["rows"]
+            if df.empty:
+                meta["listing_start_reached"] = True
+                break
+            ts = _to_seconds(df.index)
+            keep = (ts < meta["first"]) | (ts > meta["last"]) if meta["rows"] else np.ones(len(ts), dtype=bool)
+            if keep.any(): # 이미 저장된 범위는 버림
+                _save_page(path, df[keep])
+                fetched += int(keep.sum())
+            job["cursor"] = int(ts[0])
+            _write_meta(path, meta) # 체크포인트: 다음 요청은 이 페이지의 가장 오래된 캔들 이전부터
+            if len(df) < count:
+                meta["listing_start_reached"] = True # 상장 시점까지 모두 받음
+                break
+        meta["job"] = None
+        meta = _compact(path, meta)
+    _write_meta(path, meta)
+    logger.info(f"[{ticker}] {timeframe} 캔들 {fetched}개를 새로 받았습니다. (저장 {meta['rows']}개)")
+    return meta["rows"]
+
+def download_all(tickers, timeframes=None, since=None, root=None):
+    timeframes = timeframes or config.HISTORY_CONFIG["TIMEFRAMES"]
+    for ticker in tickers:
+        for tf in timeframes:
+            try:
+                download(ticker, tf, since, root)
+            except Exception as e:
+                logger.error(f"[{ticker}] {tf} 캔들 다운로드 실패: {e}")
+
+if __name__ == "__main__":
+    # 사용법: python candle_store.py [TICKER ...]   (생략하면 TICKER_ALLOCATION의 코인)
+    download_all(sys.argv[1:] or list(config.TICKER_ALLOCATION.keys()))
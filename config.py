@@ -9,7 +9,26 @@ ACCESS_KEY = os.getenv("UPBIT_ACCESS_KEY", "YOUR_ACCESS_KEY")
 SECRET_KEY = os.getenv("UPBIT_SECRET_KEY", "YOUR_SECRET_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY") 
 
-API_CALL_DELAY_SEC = 0.3
+# 업비트 초당 요청 한도 (시세 API / 거래 API)
+RATE_LIMIT_CONFIG = {
+    "QUOTATION_PER_SEC": 10,
+    "EXCHANGE_PER_SEC": 8,
+}
+# 업비트 REST 클라이언트 (exchange_client.py): 연결 풀, 타임아웃, 재시도, 서킷 브레이커
+EXCHANGE_CLIENT_CONFIG = {
+    "POOL_SIZE": 16,  # API 종류(시세/거래)별 keep-alive 연결 수 (워커 수 + 스탑 감시/분할 실행 여유)
+    "CONNECT_TIMEOUT_SEC": 3.05,
+    "READ_TIMEOUT_SEC": 10,
+    "MAX_RETRIES": 4,  # 429/5xx/연결 오류 재시도 횟수
+    "BACKOFF_BASE_SEC": 0.25,  # n번째 재시도 전 0 ~ min(MAX, BASE·2^n)초 사이 무작위 대기
+    "BACKOFF_MAX_SEC": 4,
+    "REMAINING_RESERVE": 1,  # Remaining-Req의 이번 1초 남은 요청 수가 이 이하이면 다음 창까지 대기
+    "BREAKER_FAILURES": 5,  # 재시도 후에도 연속 이만큼 실패하면 서킷 브레이커가 열림
+    "BREAKER_OPEN_SEC": 30,  # 열려 있는 동안은 요청하지 않고 바로 실패 (이후 한 요청으로 회복 확인)
+}
+TIMEZONE = "Asia/Seoul"
+# 캔들 마감 직후 거래소에 새 캔들이 반영될 때까지 기다리는 여유 시간
+CANDLE_CLOSE_GRACE_SEC = 2
 
 # --- 거래 규칙 및 대상 설정 ---
 TICKER_ALLOCATION = {
@@ -30,6 +49,12 @@ MIN_ORDER_KRW = 5000
 
 # --- 파일 및 데이터베이스 경로 ---
 LOG_FILE = "trading_bot.log"
+# 로그 기록은 별도 스레드(QueueListener)가 처리합니다. (logger_config.py)
+LOGGING_CONFIG = {
+    "JSON_FILE": True,  # LOG_FILE을 JSON lines로 기록 (False면 콘솔과 같은 텍스트 형식)
+    "PAYLOADS_ENABLED": True,  # AI 원문 응답/브리핑을 압축 사이드카 로그에 기록
+    "PAYLOAD_DIR": "logs",
+}
 DB_FILE = "trading_bot.db"
 
 # --- 매매 전략 파라미터 ---
@@ -49,4 +74,200 @@ STRATEGY_CONFIG = {
 RISK_CONFIG = {
     "ENABLE_DAILY_LOSS_LIMIT": True,
     "DAILY_LOSS_LIMIT_PERCENTAGE": Decimal('-0.05'),
-}
\ No newline at end of file
+    # 포트폴리오 위험 지표 (risk.py, 주기마다 계산)
+    "RISK_TIMEFRAME": "60m",  # 변동성/상관계수를 계산할 캔들
+    "VOL_WINDOW": 48,  # 롤링 창 (마감 캔들 수익률 개수, 캔들 링 용량보다 작게)
+    "MIN_VOL_PERIODS": 12,  # 이보다 표본이 적은 코인은 변동성/상관계수를 계산하지 않음
+    "CORRELATION_TOP_N": 20,  # risk_log에 저장할 상관계수 행렬의 코인 수 (노출이 큰 보유 코인 순)
+    "ENABLE_KILL_SWITCH": True,
+    "MAX_INTRADAY_DRAWDOWN": 0.05,  # 당일 최고 총자산 대비 이 비율 이상 하락하면 그날은 새 매수 중단
+}
+
+# --- 동적 코인 선정(마켓 스크리너) 설정 ---
+# 활성화 시 TICKER_ALLOCATION 대신 전체 KRW 마켓을 4시간봉 마감마다 스크리닝하여 상위 후보만 거래합니다.
+SCREENER_CONFIG = {
+    "ENABLED": False,
+    "MAX_ACTIVE_TICKERS": 4,
+    "CANDLE_COUNT": 50,
+    "EXCLUDED_TICKERS": ["KRW-USDT"],
+}
+
+# --- 시세 공유 서비스 설정 (여러 봇 프로세스가 같은 시세를 공유) ---
+MARKET_DATA_CONFIG = {
+    "USE_SHARED_SERVICE": False,  # True면 market_data_service.py가 게시한 공유 메모리 시세를 우선 사용
+    "SHM_NAME": "upbit_market_data",
+    "TICKERS": [],  # 서비스가 게시할 코인 (비어 있으면 TICKER_ALLOCATION 사용)
+    "CAPACITY": 200,  # (코인, 타임프레임)별 보관 캔들 수
+    "QUOTE_INTERVAL_SEC": 1,
+    "MAX_QUOTE_AGE_SEC": 10,  # 이보다 오래된 현재가는 사용하지 않음
+    "MAX_WAIT_SEC": 10,  # 캔들 마감 후 서비스의 게시를 기다리는 최대 시간
+}
+
+# --- 코인별 병렬 실행 설정 ---
+WORKER_CONFIG = {
+    "MAX_WORKERS": 8,
+    "TICKER_TIMEOUT_SEC": 120,  # 한 코인의 실행 단위가 (워커에서 시작한 뒤) 이 시간을 넘기면 이번 주기에서 제외
+    "LOCK_WAIT_SEC": 5,  # 스탑 감시 등 다른 작업이 봇을 점유 중일 때 기다리는 최대 시간
+}
+
+# --- 주기 사이 스탑 감시 설정 ---
+STOP_WATCHER_CONFIG = {
+    "ENABLED": False,  # True면 주기 사이에도 POLL_INTERVAL_SEC마다 현재가로 스탑 가격 이탈을 확인 (stop_watcher.py)
+    "POLL_INTERVAL_SEC": 3,
+    "WATCH_VANGUARD_BB_LOW": True,  # 선발대 보유 중 1시간봉 BB 하단 이탈 즉시 청산
+}
+
+# --- 파라미터 스윕(백테스트 최적화) 설정 ---
+SWEEP_CONFIG = {
+    "MAX_WORKERS": 4,
+    "RESULTS_DB": "sweep_results.db",
+    # 스윕할 후보값. SWEEP_PARAMS(sweep.py)에 정의된 이름만 사용할 수 있습니다.
+    "GRID": {
+        "bbands_length": [20, 30],
+        "bbands_std": [2.0, 2.5],
+        "cci_length": [14, 20],
+        "cci_overbought": [100, 150],
+        "cci_oversold": [-100, -150],
+        "SUPERTREND_PERIOD": [7, 10],
+        "SUPERTREND_MULTIPLIER": [2.0, 3.0],
+        "DAILY_LOSS_LIMIT_PERCENTAGE": [-0.03, -0.05],
+    },
+}
+
+# --- 워크포워드 최적화 설정 (SWEEP_CONFIG의 GRID를 구간마다 최적화) ---
+WALK_FORWARD_CONFIG = {
+    "IN_SAMPLE_DAYS": 60,
+    "OUT_OF_SAMPLE_DAYS": 14,  # 구간 이동 간격이기도 합니다.
+    "OBJECTIVE": "sharpe",  # 인샘플 최적 파라미터 선택 기준 (sweep.METRICS 중 하나)
+    "MIN_TRADES": 3,  # 인샘플 거래 수가 이보다 적은 조합은 최적 후보에서 제외
+}
+
+# --- AI 판단 기록/재생 설정 ---
+AI_REPLAY_CONFIG = {
+    "RECORD_LIVE": False,  # True면 실거래의 AI 요청/응답을 STORE_FILE에 기록
+    "STORE_FILE": "ai_records.db",
+    "USE_IN_BACKTEST": True,  # 기록 파일이 있으면 백테스트/스윕에서 기록된 판단을 재생
+    "SURROGATE_K": 5,  # 일치하는 기록이 없을 때 대리 모델이 참고하는 최근접 기록 수
+}
+
+# --- 과거 캔들 저장소 (백테스트용 일괄 다운로드) ---
+HISTORY_CONFIG = {
+    "DATA_DIR": "history",
+    "TIMEFRAMES": ["15m", "60m", "240m"],
+    "SINCE": "2021-01-01",  # 이 시각(KST)까지 과거 방향으로 받음. None이면 상장 시점까지
+    "PAGE_SIZE": 200,  # pyupbit.get_ohlcv 1회 최대 개수
+    "MAX_RETRIES": 3,
+}
+
+# --- 모의 거래소 설정 (실제 주문 없이 전체 봇을 실행) ---
+SIM_EXCHANGE_CONFIG = {
+    "ENABLED": False,  # True면 main.py가 pyupbit.Upbit 대신 exchange_sim.SimulatedExchange를 사용
+    "DB_FILE": "paper_trading.db",  # 모의 거래 상태/거래 내역은 실거래 DB와 분리
+    "INITIAL_KRW": 10_000_000,
+    "FILL_MODE": "partial",  # "immediate" 또는 "partial"
+    "FILL_DELAY_SEC": 0.5,  # 접수 후 첫 체결까지 걸리는 시간
+    "MATCH_INTERVAL_SEC": 1.0,
+    "PARTIAL_FILL_RATIO": 0.6,  # 체결 단계마다 남은 수량 중 체결되는 비율
+    "MAX_MATCH_STEPS": 5,  # 이 단계 안에 다 체결되지 않으면 나머지 취소
+    "SLIPPAGE_BPS": 5,
+    "LATENCY_SEC": 0.05,
+    "ERROR_RATE": 0.0,  # API 오류 응답 확률
+    "EXCEPTION_RATE": 0.0,  # 네트워크 예외 확률
+    "SEED": 42,
+}
+
+# --- 거래 주기 지표 (단계별 소요 시간) ---
+METRICS_CONFIG = {
+    "ENABLED": True,
+    "HTTP_ENABLED": False,  # True면 Prometheus 형식의 로컬 엔드포인트를 엶 (http://HOST:PORT/metrics)
+    "HOST": "127.0.0.1",
+    "PORT": 9108,
+    "SAVE_TO_DB": True,  # 주기마다 단계별 합계를 cycle_metrics 테이블에 저장
+    "BUCKETS": [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60],  # 히스토그램 경계(초)
+}
+
+# --- 성능 벤치마크 (benchmark.py) ---
+BENCHMARK_CONFIG = {
+    "BASELINE_FILE": "benchmark_baseline.json",  # 측정한 기계에서만 의미가 있으므로 기계마다 따로 저장
+    "REPEAT": 5,  # 반복 측정 횟수. 가장 빠른 회차의 호출당 시간을 비교
+    "MIN_ROUND_SEC": 0.2,  # 한 회차에서 측정 대상 코드만 최소 이 시간만큼 실행
+    "REGRESSION_THRESHOLD": 0.25,  # 기준선보다 이 비율 이상 느려지면 실패
+    "THRESHOLDS": {"trading_cycle": 0.5},  # 항목별 허용 비율 (스레드/IO가 섞여 편차가 큰 항목)
+    "SEED": 7,
+}
+
+# --- 거래 주기 프로파일러 (profiler.py, 평소에는 꺼져 있음) ---
+PROFILER_CONFIG = {
+    "ENABLED": False,  # True면 main이 profiler를 불러와 거래 주기를 감싸고 아래 방법으로 프로파일링을 켤 수 있음
+    "PROFILE_NEXT_CYCLES": 0,  # 시작 직후 프로파일링할 주기 수
+    "CYCLES_PER_TRIGGER": 3,  # SIGUSR1 또는 TRIGGER_FILE로 켰을 때 프로파일링할 주기 수
+    "TRIGGER_FILE": "profile.trigger",  # 이 파일을 만들면 다음 주기부터 프로파일링 (신호가 없는 윈도우용)
+    "OUTPUT_DIR": "profiles",
+    "KEEP": 20,  # 남겨 둘 최근 주기 수
+    "SAMPLE_INTERVAL_SEC": 0.005,
+    "THREAD_PREFIXES": ["MainThread", "TickerWorker"],  # 스택을 수집할 스레드 (워커 풀 + 스케줄러)
+    "TOP_N": 30,
+}
+
+# --- 캔들 링 버퍼 (candle_buffer.py) ---
+CANDLE_BUFFER_CONFIG = {
+    "ENABLED": True,  # 실거래 주기에서 DataFrame 대신 코인·타임프레임별 링 버퍼와 NumPy 지표를 사용
+    "CAPACITY": 50,  # 보관할 캔들 수 (지표 계산 창. 기존 get_ohlcv count와 같게 유지)
+}
+
+# --- 캔들 마감 신호 테이블 (signals.py) ---
+SIGNAL_CONFIG = {
+    "SAVE_TO_DB": True,  # 새로 계산한 신호를 signals 테이블에 기록 (대시보드/분석용. 전략은 메모리의 값을 사용)
+}
+
+# --- 시작 경로 (재시작/장애 복구 시 거래 준비 시간) ---
+STARTUP_CONFIG = {
+    "WARM_CACHES": True,  # 거래 시작 전에 모든 코인의 캔들/지표/신호를 워커 풀에서 동시에 미리 채움
+    "WARM_TIMEOUT_SEC": 60,  # 예열을 기다리는 최대 시간 (끝나지 않은 코인은 첫 주기에 수집)
+    "PRELOAD_AI_SDK": True,  # 준비 완료 후 백그라운드에서 AI SDK를 미리 불러와 첫 AI 판단 지연을 없앰
+}
+
+# --- 대시보드용 읽기 전용 DB 스냅샷 (db_snapshot.py) ---
+SNAPSHOT_CONFIG = {
+    "ENABLED": False,  # True면 거래 주기가 끝날 때 SQLite 백업 API로 DB 스냅샷을 게시하고 대시보드는 스냅샷을 읽음 (끄면 실거래 DB를 읽기 전용으로 읽음)
+    "INTERVAL_SEC": 60,  # 최소 게시 간격
+    "SUFFIX": "_snapshot",  # trading_bot.db → trading_bot_snapshot.db
+}
+
+# --- 대량 시장가 주문 분할 실행 (execution.py) ---
+EXECUTION_CONFIG = {
+    "ENABLED": False,  # True면 호가 대비 큰 시장가 주문을 자식 주문으로 나눠 실행 (백테스트/리플레이는 사용하지 않음)
+    "ALGO": "TWAP",  # "TWAP"(균등 분할) 또는 "PARTICIPATION"(매번 호가 잔량의 일정 비율)
+    "ORDER_TYPES": ["BUY_VANGUARD", "BUY_MAIN_FORCE", "SELL_PARTIAL", "SELL_ALL_FINAL"],  # 분할 대상 (손절/추적 손절은 즉시 청산)
+    "BAND_BPS": 30,  # 최우선 호가에서 이 범위(bp) 안의 잔량만 유동성으로 봄
+    "PARTICIPATION_RATE": 0.2,  # 한 번에 가져갈 잔량 비율. 주문이 이보다 크면 분할
+    "MAX_SLICES": 10,  # TWAP 최대 조각 수
+    "DURATION_SEC": 60,  # TWAP 전체 실행 시간 / PARTICIPATION에서 남은 수량을 한 번에 낼 때까지의 시간
+    "INTERVAL_SEC": 5,  # PARTICIPATION 자식 주문 간격
+    "CHILD_POLL_SEC": 0.5,
+    "CHILD_TIMEOUT_SEC": 30,  # 자식 주문이 이 시간 안에 끝나지 않으면 취소
+    "MAX_CHILD_ERRORS": 3,  # 연속 제출 실패 시 모주문 중단 (체결분만 반영)
+    "MAX_PARENTS": 4,  # 동시에 실행하는 모주문 수
+    "ORDERBOOK_TTL_SEC": 1.0,  # 호가 스냅샷 재사용 시간
+}
+
+# --- 고정소수점 금액/수량 (fixed_point.py) ---
+FIXED_POINT_CONFIG = {
+    "MONEY_SCALE": 8,  # KRW 금액/가격의 소수 자릿수
+    "VOLUME_SCALE": 8,  # 체결/보유 수량의 소수 자릿수 (업비트 체결 수량 단위. 주문 수량은 TICKER_CONFIG로 내림)
+}
+
+# --- DB 보존 기간과 압축 (retention.py) ---
+RETENTION_CONFIG = {
+    # True면 거래 주기가 끝날 때 INTERVAL_SEC마다 백그라운드에서 오래된 기록을 정리 (기본은 꺼짐: 켜면 오래된 거래가 trade_log에서
+    # 압축 파일로 옮겨지므로 직접 켜야 함. 대시보드는 보관 파일의 거래도 함께 읽음)
+    # 이전에 만든 DB는 켜기 전에 봇을 멈추고 python retention.py --convert 로 한 번 증분 vacuum 모드로 전환
+    "ENABLED": False,
+    "INTERVAL_SEC": 86400,
+    "RAW_DAYS": 14,  # capital_log를 15분 단위 그대로 두는 기간 (이전 기록은 시간봉/일봉 OHLC로 합침)
+    "HOURLY_DAYS": 180,  # 시간봉 보관 기간 (이전은 일봉만 보관)
+    "TRADE_DAYS": 365,  # trade_log에 남겨 둘 거래 (청산 시각 기준. 이전 거래는 압축 파일로 이동)
+    "ARCHIVE_DIR": "archive",  # 오래된 거래를 옮길 gzip JSON Lines 파일의 폴더
+    "PRUNE_DAYS": {"cycle_metrics": 30, "signals": 30, "risk_positions": 30, "risk_log": 90},  # 진단 기록 보관 기간
+    "VACUUM_PAGES": 0,  # 한 번에 파일에서 돌려줄 빈 페이지 수 (0이면 전부)
+}
@@ -1,20 +1,31 @@
+import os
+import glob
+import json
 import streamlit as st
 import pandas as pd
-import sqlite3
 from decimal import Decimal
 import plotly.graph_objects as go
-import pyupbit
+import exchange_client
 import config # DB 파일 경로 참조를 위해 추가
+import db_snapshot
 
 # --- 페이지 기본 설정 ---
 st.set_page_config(page_title="AI 자동매매 봇 대시보드", page_icon="🤖", layout="wide")
 
+def load_archived_trades():
+    """retention.py가 trade_log에서 옮긴 보관 파일(ARCHIVE_DIR/{DB 이름}_trade_log_*.jsonl.gz)의 거래. 없으면 빈 데이터프레임."""
+    stem = os.path.splitext(os.path.basename(config.DB_FILE))[0]
+    files = sorted(glob.glob(os.path.join(config.RETENTION_CONFIG["ARCHIVE_DIR"], f"{stem}_trade_log_*.jsonl.gz")))
+    if not files:
+        return pd.DataFrame()
+    return pd.concat([pd.read_json(f, lines=True, compression='gzip', dtype=False) for f in files], ignore_index=True)
+
 # --- [수정] 데이터 로딩 함수 (DB에서 직접 로드) ---
 @st.cache_data(ttl=60) # 60초마다 데이터 캐시 만료
 def load_data_from_db():
     """봇의 상태 및 로그를 SQLite DB에서 직접 불러옵니다."""
     try:
-        conn = sqlite3.connect(config.DB_FILE, uri=True, check_same_thread=False)
+        conn, _ = db_snapshot.connect_readonly()
         
         # 1. 봇 상태 로드
         states_df = pd.read_sql_query("SELECT * FROM bot_states", conn)
@@ -23,6 +34,12 @@ def load_data_from_db():
         
         # 2. 거래 내역 로드
         trade_df = pd.read_sql_query("SELECT * FROM trade_log", conn)
+        # 보존 정책으로 보관 파일로 옮겨진 오래된 거래도 함께 집계 (옮기던 중 중단되어 양쪽에 있으면 DB 쪽을 사용)
+        archived_df = load_archived_trades()
+        trade_df['archived'] = False
+        if not archived_df.empty:
+            archived_df['archived'] = True
+            trade_df = pd.concat([archived_df, trade_df], ignore_index=True).drop_duplicates('id', keep='last')
         if not trade_df.empty:
             # 숫자형/날짜형으로 타입 변환
             for col in ['pnl', 'pnl_percentage', 'avg_entry_price', 'exit_price', 'quantity', 'total_fee']:
@@ -32,7 +49,17 @@ def load_data_from_db():
             trade_df.dropna(subset=['exit_time'], inplace=True)
 
         # 3. 자산 현황 로드
-        capital_df = pd.read_sql_query("SELECT * FROM capital_log ORDER BY timestamp ASC", conn)
+        # capital_log보다 오래된 구간은 retention.py가 합친 시간봉, 그보다 오래된 구간은 일봉 종가로 이어 붙임
+        capital_df = pd.read_sql_query("""
+            WITH raw_start AS (SELECT COALESCE(MIN(timestamp), '9999') AS t FROM capital_log),
+                 hourly_start AS (SELECT MIN(COALESCE((SELECT MIN(timestamp) FROM capital_rollup WHERE resolution = '1h'), '9999'), t) AS t FROM raw_start)
+            SELECT timestamp, total_equity FROM capital_log
+            UNION ALL
+            SELECT timestamp, close FROM capital_rollup WHERE resolution = '1h' AND timestamp < (SELECT t FROM raw_start)
+            UNION ALL
+            SELECT timestamp, close FROM capital_rollup WHERE resolution = '1d' AND timestamp < (SELECT t FROM hourly_start)
+            ORDER BY timestamp ASC
+        """, conn)
         if not capital_df.empty:
             capital_df['timestamp'] = pd.to_datetime(capital_df['timestamp'])
             capital_df['total_equity'] = pd.to_numeric(capital_df['total_equity'])
@@ -46,6 +73,48 @@ def load_data_from_db():
 
     return state_data, trade_df, capital_df
 
+@st.cache_data(ttl=60)
+def load_cycle_metrics():
+    """거래 주기 단계별 소요 시간(cycle_metrics)을 불러옵니다. 테이블이 없으면 빈 데이터프레임."""
+    try:
+        conn, _ = db_snapshot.connect_readonly()
+        metrics_df = pd.read_sql_query("SELECT * FROM cycle_metrics ORDER BY timestamp ASC", conn)
+        conn.close()
+    except Exception:
+        return pd.DataFrame()
+    if not metrics_df.empty:
+        metrics_df['timestamp'] = pd.to_datetime(metrics_df['timestamp'])
+    return metrics_df
+
+@st.cache_data(ttl=60)
+def load_signals(ticker, limit=200):
+    """한 코인의 최근 마감 캔들 신호(signals 테이블)를 불러옵니다. 테이블이 없으면 빈 데이터프레임."""
+    try:
+        conn, _ = db_snapshot.connect_readonly()
+        signals_df = pd.read_sql_query("SELECT * FROM signals WHERE ticker = ? ORDER BY candle_time DESC LIMIT ?",
+                                       conn, params=(ticker, limit))
+        conn.close()
+    except Exception:
+        return pd.DataFrame()
+    if not signals_df.empty:
+        signals_df['candle_time'] = pd.to_datetime(signals_df['candle_time'])
+    return signals_df
+
+@st.cache_data(ttl=60)
+def load_risk(days=7):
+    """최근 days일의 포트폴리오 위험 기록(risk_log)과 마지막 주기의 코인별 위험(risk_positions). 테이블이 없으면 빈 데이터프레임."""
+    try:
+        conn, _ = db_snapshot.connect_readonly()
+        since = (pd.Timestamp.now(tz=config.TIMEZONE) - pd.Timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+        risk_df = pd.read_sql_query("SELECT * FROM risk_log WHERE timestamp >= ? ORDER BY timestamp ASC", conn, params=(since,))
+        positions_df = pd.read_sql_query("SELECT * FROM risk_positions WHERE timestamp = (SELECT MAX(timestamp) FROM risk_log)", conn)
+        conn.close()
+    except Exception:
+        return pd.DataFrame(), pd.DataFrame()
+    if not risk_df.empty:
+        risk_df['timestamp'] = pd.to_datetime(risk_df['timestamp'])
+    return risk_df, positions_df
+
 # --- 분석 함수 ---
 def calculate_kpis(df):
     """주요 성과 지표(KPI)를 계산합니다."""
@@ -76,7 +145,7 @@ def calculate_kpis(df):
 def create_trade_chart(ticker, trade_df):
     """가격 및 매매 시점 캔들스틱 차트를 생성합니다."""
     try:
-        ohlcv = pyupbit.get_ohlcv(ticker, interval="minute60", count=360)
+        ohlcv = exchange_client.get_ohlcv(ticker, interval="minute60", count=360)
         if ohlcv is None or ohlcv.empty:
             st.warning(f"{ticker}의 OHLCV 데이터를 불러올 수 없습니다.")
             return None
@@ -112,6 +181,12 @@ ticker_list = list(bot_states.keys()) if bot_states else []
 options = ["종합 현황"] + sorted(ticker_list)
 choice = st.sidebar.selectbox("표시할 정보 선택", options)
 st.sidebar.info(f"마지막 데이터 로드: {pd.Timestamp.now(tz='Asia/Seoul').strftime('%Y-%m-%d %H:%M:%S')}")
+snapshot_file = db_snapshot.snapshot_path(config.DB_FILE)
+if config.SNAPSHOT_CONFIG["ENABLED"] and os.path.exists(snapshot_file):
+    snapshot_time = pd.Timestamp(os.path.getmtime(snapshot_file), unit='s', tz='UTC').tz_convert('Asia/Seoul')
+    st.sidebar.caption(f"DB 스냅샷 시각: {snapshot_time.strftime('%Y-%m-%d %H:%M:%S')}")
+else:
+    st.sidebar.caption("DB 스냅샷을 쓰지 않거나 아직 없어 실거래 DB를 읽기 전용으로 읽습니다.")
 
 if not bot_states:
     st.warning("봇 상태 데이터(`trading_bot.db`)를 찾을 수 없거나 데이터가 없습니다. 봇을 먼저 실행해주세요.")
@@ -129,6 +204,8 @@ else:
         c2.metric("승률", kpis['승률'])
         c3.metric("수익 팩터", kpis['수익 팩터'])
         c4.metric("총 거래 수", kpis['총 거래'])
+        if not trade_df.empty and trade_df['archived'].any():
+            st.caption(f"보관 파일({config.RETENTION_CONFIG['ARCHIVE_DIR']})로 옮겨진 오래된 거래 {int(trade_df['archived'].sum())}건을 포함한 통계입니다.")
         
         st.subheader("📉 총자산 추이")
         if not capital_df.empty and len(capital_df) > 1:
@@ -143,6 +220,39 @@ else:
         else:
             st.info("거래 내역이 없습니다.")
 
+        st.subheader("🛡️ 포트폴리오 위험")
+        risk_df, positions_df = load_risk()
+        if not risk_df.empty:
+            latest = risk_df.iloc[-1]
+            if latest['kill_switch']:
+                st.error("🚨 장중 낙폭 한도를 넘어 오늘은 새 매수가 중단되었습니다. (청산 주문은 허용)")
+            r1, r2, r3, r4 = st.columns(4)
+            r1.metric("총 노출", f"{latest['exposure']:,.0f} 원", f"{latest['exposure_ratio']:.1%}", delta_color="off")
+            r2.metric("미실현 손익", f"{latest['unrealized_pnl']:,.0f} 원")
+            r3.metric("장중 낙폭", f"{latest['drawdown']:.2%}", f"한도 -{config.RISK_CONFIG['MAX_INTRADAY_DRAWDOWN']:.0%}", delta_color="off")
+            r4.metric("포트폴리오 변동성(연율)", f"{latest['portfolio_vol']:.1%}")
+            st.line_chart(risk_df.set_index('timestamp')[['drawdown']].rename(columns={'drawdown': '장중 낙폭'}))
+            if not positions_df.empty:
+                st.dataframe(positions_df.drop(columns=['timestamp']).set_index('ticker').sort_values('exposure', ascending=False))
+            correlation = json.loads(latest['correlation'] or '{}')
+            if len(correlation.get('tickers', [])) > 1:
+                st.caption("보유 코인 간 상관계수")
+                st.dataframe(pd.DataFrame(correlation['matrix'], index=correlation['tickers'], columns=correlation['tickers']))
+        else:
+            st.info("위험 지표 기록이 없습니다.")
+
+        st.subheader("⏱️ 거래 주기 소요 시간")
+        metrics_df = load_cycle_metrics()
+        if not metrics_df.empty:
+            cycle_latency = metrics_df[metrics_df['phase'] == 'cycle'].set_index('timestamp')['max_sec']
+            st.line_chart(cycle_latency.rename('주기 소요 시간(초)'))
+            # 최근 하루(96주기) 동안 단계별 평균 소요 시간 (워커 스레드들의 시간을 합한 값)
+            recent = metrics_df[metrics_df['timestamp'] >= metrics_df['timestamp'].max() - pd.Timedelta(days=1)]
+            phase_avg = recent[recent['phase'] != 'cycle'].groupby('phase')['total_sec'].sum() / max(recent['timestamp'].nunique(), 1)
+            st.bar_chart(phase_avg.sort_values(ascending=False).rename('주기당 평균(초)'))
+        else:
+            st.info("주기 지표 기록이 없습니다.")
+
         st.subheader("🧾 전체 거래 내역")
         st.dataframe(trade_df.sort_values('exit_time', ascending=False))
         
@@ -157,6 +267,15 @@ else:
         if not state.get('trading_enabled', True):
             st.error("🚨 일일 손실 한도 초과로 오늘 거래가 중단된 코인입니다.")
 
+        _, positions_df = load_risk()
+        ticker_risk = positions_df[positions_df['ticker'] == ticker] if not positions_df.empty else positions_df
+        if not ticker_risk.empty:
+            row = ticker_risk.iloc[0]
+            vol = f"{row['volatility']:.1%}" if pd.notna(row['volatility']) else "N/A"
+            corr = f"{row['corr_to_portfolio']:.2f}" if pd.notna(row['corr_to_portfolio']) else "N/A"
+            st.caption(f"노출 {row['exposure']:,.0f}원 (비중 {row['weight']:.1%}) · 미실현 손익 {row['unrealized_pnl']:,.0f}원 · "
+                       f"변동성(연율) {vol} · 포트폴리오 상관계수 {corr}")
+
         kpis = calculate_kpis(ticker_trades)
         c1, c2, c3, c4 = st.columns(4)
         c1.metric("현재 상태", state.get('position_status', 'N/A'))
@@ -168,6 +287,17 @@ else:
         if trade_chart_fig:
             st.plotly_chart(trade_chart_fig, use_container_width=True)
 
+        st.subheader(f"📡 {ticker} 마감 캔들 신호")
+        signals_df = load_signals(ticker)
+        if not signals_df.empty:
+            latest = signals_df.drop_duplicates('timeframe').set_index('timeframe')
+            st.dataframe(latest.drop(columns=['ticker']))
+            cci_1h = signals_df[signals_df['timeframe'] == '60m'].set_index('candle_time')[['cci_20', 'wma_cci_20']].sort_index()
+            if not cci_1h.empty:
+                st.line_chart(cci_1h)
+        else:
+            st.info("신호 기록이 없습니다.")
+
         st.subheader(f"🧾 {ticker} 거래 내역")
         display_cols = ['exit_time', 'exit_reason', 'entry_ai_reason', 'pnl', 'pnl_percentage']
         st.dataframe(ticker_trades[display_cols].sort_values('exit_time', ascending=False))
\ No newline at end of file
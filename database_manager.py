@@ -1,19 +1,53 @@
 import sqlite3
+import threading
 import pandas as pd
 from decimal import Decimal
+from fixed_point import Fixed, money, volume
 import json
 from logger_config import logger
+import metrics
 
 DB_FILE = "trading_bot.db"
 
+# 여러 워커 스레드가 동시에 기록하므로, 쓰기는 이 락으로 직렬화하여 SQLite 잠금 경합을 피합니다.
+_write_lock = threading.Lock()
+
+def set_db_file(path):
+    """사용할 데이터베이스 파일을 바꿉니다. (백테스트 결과를 실거래 DB와 분리할 때 사용)"""
+    global DB_FILE
+    DB_FILE = path
+
 def connect_db():
     """데이터베이스에 연결하고 커서를 반환합니다."""
     # isolation_level=None으로 설정하여 auto-commit 모드로 작동
     return sqlite3.connect(DB_FILE, isolation_level=None)
 
+def _warn_legacy_capital(cursor):
+    """
+    [마이그레이션 안내] pending_order_amount 컬럼이 없던 이전 버전은 매도 시 실현 손익만 capital에 더하고,
+    매수 때 차감한 원가는 돌려주지 않았습니다. 그래서 이전 버전에서 청산된 거래마다 capital이 원가만큼 적게 남아 있습니다.
+    현재 버전은 원가 + 손익을 돌려주고(main.process_sell_order), 총자산도 현금 + 보유 평가액으로 계산하므로(main.bot_equity)
+    업그레이드 직후 capital_log의 총자산이 한 번 불연속해집니다. 보유 중인 포지션은 원가가 이미 차감되어 있어 그대로 이어집니다.
+    capital은 자동으로 고치지 않고, 코인별로 돌려받지 못한 원가 합계를 경고로 남깁니다. (필요하면 봇을 멈추고 bot_states.capital을 직접 보정)
+    """
+    if not cursor.execute("SELECT 1 FROM bot_states LIMIT 1").fetchone():
+        return # 새 DB
+    if not cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'trade_log'").fetchone():
+        return
+    rows = cursor.execute("""
+        SELECT ticker, SUM(CAST(avg_entry_price AS REAL) * CAST(quantity AS REAL)) FROM trade_log
+        WHERE ticker IN (SELECT ticker FROM bot_states) GROUP BY ticker
+    """).fetchall()
+    for ticker, cost in rows:
+        if cost:
+            logger.warning(f"[{ticker}] 이전 버전 DB입니다. 이전 버전에서 청산된 거래의 원가 {cost:,.0f}원이 capital에 반영되어 있지 않습니다. "
+                           f"(매도 시 원가 + 손익을 돌려주도록 바뀜. database_manager._warn_legacy_capital 참고)")
+
 def create_tables():
     conn = connect_db()
     cursor = conn.cursor()
+    # 새 DB 파일은 지운 페이지를 증분 vacuum으로 돌려줄 수 있게 만듦 (기존 DB는 봇을 멈추고 python retention.py --convert 로 한 번 전환)
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
     # TradingBot의 모든 상태를 저장하도록 컬럼 추가
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS bot_states (
@@ -37,6 +71,12 @@ def create_tables():
     )
     """)
     
+    # 이전 버전 DB에 없던 컬럼 추가
+    existing_columns = {row[1] for row in cursor.execute("PRAGMA table_info(bot_states)")}
+    if 'pending_order_amount' not in existing_columns:
+        cursor.execute("ALTER TABLE bot_states ADD COLUMN pending_order_amount TEXT") # 매수 주문 실패 시 복구할 금액
+        _warn_legacy_capital(cursor)
+    
     # 완료된 거래 내역을 기록 (realtime_trade_log.csv 대체)
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS trade_log (
@@ -62,6 +102,105 @@ def create_tables():
         total_equity REAL NOT NULL
     )
     """)
+    # RAW_DAYS보다 오래된 capital_log를 합친 시간봉('1h')/일봉('1d') 자산 OHLC (retention.py)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS capital_rollup (
+        resolution TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        open REAL NOT NULL,
+        high REAL NOT NULL,
+        low REAL NOT NULL,
+        close REAL NOT NULL,
+        samples INTEGER NOT NULL,
+        PRIMARY KEY (resolution, timestamp)
+    )
+    """)
+    
+    # 거래 주기의 단계별 소요 시간 (metrics.collect_cycle 결과를 주기마다 저장)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS cycle_metrics (
+        timestamp TEXT NOT NULL,
+        phase TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        total_sec REAL NOT NULL,
+        max_sec REAL NOT NULL,
+        PRIMARY KEY (timestamp, phase)
+    )
+    """)
+
+    # 캔들 마감 시점의 전략 신호 (signals.SignalTable이 (코인, 타임프레임, 캔들)마다 한 번 기록)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS signals (
+        ticker TEXT NOT NULL,
+        timeframe TEXT NOT NULL,
+        candle_time TEXT NOT NULL,
+        rows INTEGER,
+        close REAL,
+        bb_low REAL,
+        cci_20 REAL,
+        wma_cci_20 REAL,
+        cci REAL,
+        wma_cci REAL,
+        avg_cci_4 REAL,
+        rsi REAL,
+        volume_ratio REAL,
+        supertrend REAL,
+        cond1 INTEGER,
+        cond2 INTEGER,
+        below_bb_low INTEGER,
+        cci_overbought INTEGER,
+        cci_below_wma INTEGER,
+        PRIMARY KEY (ticker, timeframe, candle_time)
+    )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_signals_candle_time ON signals (candle_time)")
+
+    # 포트폴리오 위험 지표 (risk.PortfolioRisk가 주기마다 기록)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS risk_log (
+        timestamp TEXT PRIMARY KEY,
+        total_equity REAL,
+        exposure REAL,
+        exposure_ratio REAL,
+        unrealized_pnl REAL,
+        peak_equity REAL,
+        drawdown REAL,
+        portfolio_vol REAL,
+        kill_switch INTEGER,
+        correlation TEXT
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS risk_positions (
+        timestamp TEXT NOT NULL,
+        ticker TEXT NOT NULL,
+        exposure REAL,
+        weight REAL,
+        unrealized_pnl REAL,
+        volatility REAL,
+        corr_to_portfolio REAL,
+        PRIMARY KEY (timestamp, ticker)
+    )
+    """)
+
+    # 분할 실행 모주문 (execution.ExecutionEngine이 자식 주문을 낼 때마다 갱신. 재시작 후 체결분 복원용)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS execution_orders (
+        parent_id TEXT PRIMARY KEY,
+        ticker TEXT NOT NULL,
+        side TEXT NOT NULL,
+        algo TEXT,
+        target TEXT,
+        decision_price TEXT,
+        state TEXT,
+        child_uuids TEXT,
+        executed_volume TEXT,
+        avg_price TEXT,
+        slippage_bps REAL,
+        created_at TEXT,
+        finished_at TEXT
+    )
+    """)
     
     logger.info("데이터베이스 테이블 준비 완료.")
     conn.close()
@@ -86,9 +225,11 @@ def load_all_states():
     for row in rows:
         state = dict(row)
         # DB에서 불러온 텍스트 값을 적절한 타입으로 변환
-        for key in ['capital', 'avg_entry_price', 'total_position_size', 'supertrend_stop_price', 'today_pnl', 'trade_capital']:
+        for key in ['capital', 'avg_entry_price', 'supertrend_stop_price', 'today_pnl', 'trade_capital', 'pending_order_amount']:
             if key in state and state[key] is not None:
-                state[key] = Decimal(state[key])
+                state[key] = money(state[key])
+        if state.get('total_position_size') is not None:
+            state['total_position_size'] = volume(state['total_position_size'])
         
         # AI 진입 이유는 '||' 구분자로 분리하여 리스트로 복원
         if 'entry_ai_reasons' in state and state['entry_ai_reasons']:
@@ -101,15 +242,13 @@ def load_all_states():
     conn.close()
     return states
 
-def update_state(ticker, state_dict):
-    """특정 코인의 상태를 데이터베이스에 업데이트(또는 삽입)합니다."""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
+def _state_upsert(ticker, state_dict):
+    """bot_states 업서트 쿼리와 값 목록을 만듭니다."""
     # DB에 저장하기 위해 타입들을 텍스트로 변환
     values_to_save = state_dict.copy()
+    values_to_save['ticker'] = ticker # 상태 딕셔너리에 ticker가 없으면 ON CONFLICT(ticker)가 적용되지 않고 행이 계속 추가됨
     for k, v in values_to_save.items():
-        if isinstance(v, Decimal):
+        if isinstance(v, (Fixed, Decimal)):
             values_to_save[k] = str(v)
         elif isinstance(v, list):
             # AI 진입 이유는 '||' 구분자를 사용하여 하나의 문자열로 결합
@@ -124,8 +263,32 @@ def update_state(ticker, state_dict):
     update_clause = ', '.join([f"{key} = excluded.{key}" for key in values_to_save if key != 'ticker'])
     
     query = f"INSERT INTO bot_states ({columns}) VALUES ({placeholders}) ON CONFLICT(ticker) DO UPDATE SET {update_clause}"
-    
-    cursor.execute(query, list(values_to_save.values()))
+    return query, list(values_to_save.values())
+
+def update_state(ticker, state_dict):
+    """특정 코인의 상태를 데이터베이스에 업데이트(또는 삽입)합니다."""
+    conn = connect_db()
+    cursor = conn.cursor()
+    query, values = _state_upsert(ticker, state_dict)
+    with metrics.timed('db_write'), _write_lock:
+        cursor.execute(query, values)
+    conn.close()
+
+def update_states(items):
+    """여러 코인의 상태 [(ticker, state_dict)]를 한 트랜잭션으로 기록합니다. (시작 시 새 봇 등록용)"""
+    if not items:
+        return
+    conn = connect_db()
+    cursor = conn.cursor()
+    with metrics.timed('db_write'), _write_lock:
+        cursor.execute("BEGIN")
+        try:
+            for ticker, state_dict in items:
+                cursor.execute(*_state_upsert(ticker, state_dict))
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
     conn.close()
 
 def log_trade(trade_data):
@@ -133,11 +296,12 @@ def log_trade(trade_data):
     conn = connect_db()
     cursor = conn.cursor()
     
-    values = {k: str(v) if isinstance(v, Decimal) else v for k, v in trade_data.items()}
+    values = {k: str(v) if isinstance(v, (Fixed, Decimal)) else v for k, v in trade_data.items()}
     columns = ', '.join(values.keys())
     placeholders = ', '.join(['?'] * len(values))
     
-    cursor.execute(f"INSERT INTO trade_log ({columns}) VALUES ({placeholders})", list(values.values()))
+    with metrics.timed('db_write'), _write_lock:
+        cursor.execute(f"INSERT INTO trade_log ({columns}) VALUES ({placeholders})", list(values.values()))
     conn.close()
     logger.info(f"[{trade_data['ticker']}] 거래가 데이터베이스에 기록되었습니다.")
 
@@ -146,5 +310,74 @@ def log_capital(timestamp, total_equity):
     conn = connect_db()
     cursor = conn.cursor()
     # INSERT OR REPLACE 구문을 사용하여 동일한 timestamp의 데이터는 덮어쓰기
-    cursor.execute("INSERT OR REPLACE INTO capital_log (timestamp, total_equity) VALUES (?, ?)", (timestamp, float(total_equity)))
-    conn.close()
\ No newline at end of file
+    with metrics.timed('db_write'), _write_lock:
+        cursor.execute("INSERT OR REPLACE INTO capital_log (timestamp, total_equity) VALUES (?, ?)", (timestamp, float(total_equity)))
+    conn.close()
+
+def log_cycle_metrics(timestamp, rows):
+    """한 주기의 단계별 지표 [(phase, count, total_sec, max_sec)]를 cycle_metrics 테이블에 기록합니다."""
+    if not rows:
+        return
+    conn = connect_db()
+    cursor = conn.cursor()
+    with _write_lock:
+        cursor.executemany("INSERT OR REPLACE INTO cycle_metrics (timestamp, phase, count, total_sec, max_sec) VALUES (?, ?, ?, ?, ?)",
+                           [(timestamp, *row) for row in rows])
+    conn.close()
+
+def log_signals(rows):
+    """[(ticker, timeframe, candle_time, signal 딕셔너리)]를 signals 테이블에 기록합니다. 불리언은 0/1로 저장됩니다."""
+    if not rows:
+        return
+    columns = list(rows[0][3])
+    sql = (f"INSERT OR REPLACE INTO signals (ticker, timeframe, candle_time, {', '.join(columns)}) "
+           f"VALUES ({', '.join(['?'] * (len(columns) + 3))})")
+    conn = connect_db()
+    cursor = conn.cursor()
+    with metrics.timed('db_write'), _write_lock:
+        cursor.executemany(sql, [(ticker, tf, candle_time, *signal.values()) for ticker, tf, candle_time, signal in rows])
+    conn.close()
+
+def log_risk(summary, positions):
+    """주기별 포트폴리오 위험 요약과 코인별 [(ticker, exposure, weight, unrealized_pnl, volatility, corr_to_portfolio)]를 기록합니다."""
+    columns = ', '.join(summary.keys())
+    placeholders = ', '.join(['?'] * len(summary))
+    conn = connect_db()
+    cursor = conn.cursor()
+    with metrics.timed('db_write'), _write_lock:
+        cursor.execute("BEGIN")
+        try:
+            cursor.execute(f"INSERT OR REPLACE INTO risk_log ({columns}) VALUES ({placeholders})", list(summary.values()))
+            cursor.executemany("INSERT OR REPLACE INTO risk_positions (timestamp, ticker, exposure, weight, unrealized_pnl, volatility, corr_to_portfolio) "
+                               "VALUES (?, ?, ?, ?, ?, ?, ?)", [(summary['timestamp'], *row) for row in positions])
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+    conn.close()
+
+def load_risk_day(day):
+    """day(YYYY-MM-DD)에 기록된 최고 총자산과 킬 스위치 작동 여부. 기록이 없으면 (None, False)."""
+    conn = connect_db()
+    row = conn.execute("SELECT MAX(total_equity), MAX(kill_switch) FROM risk_log WHERE timestamp >= ? AND timestamp < ?",
+                       (day, f"{day}~")).fetchone()
+    conn.close()
+    return row[0], bool(row[1])
+
+def save_execution_order(record):
+    """분할 실행 모주문 기록(execution.ParentOrder.record())을 저장합니다."""
+    columns = ', '.join(record.keys())
+    placeholders = ', '.join(['?'] * len(record))
+    conn = connect_db()
+    cursor = conn.cursor()
+    with metrics.timed('db_write'), _write_lock:
+        cursor.execute(f"INSERT OR REPLACE INTO execution_orders ({columns}) VALUES ({placeholders})", list(record.values()))
+    conn.close()
+
+def load_execution_order(parent_id):
+    """분할 실행 모주문 기록을 딕셔너리로 불러옵니다. 없으면 None."""
+    conn = connect_db()
+    conn.row_factory = sqlite3.Row
+    row = conn.execute("SELECT * FROM execution_orders WHERE parent_id = ?", (parent_id,)).fetchone()
+    conn.close()
+    return dict(row) if row else None
@@ -0,0 +1,81 @@
+"""
+대시보드/분석용 읽기 전용 DB 스냅샷.
+
+대시보드가 실거래 DB를 직접 읽으면 무거운 조회가 거래 기록과 SQLite 잠금을 두고 경쟁합니다. 그래서 봇이 거래 주기가 끝난 뒤
+(다음 캔들 마감까지 쓰기가 거의 없는 시점) SQLite 온라인 백업 API로 DB 전체를 임시 파일에 복사하고, 파일 교체(os.replace)로
+스냅샷을 원자적으로 게시합니다.
+- 실거래 DB는 복사하는 동안(수 ms)만 읽기 잠금이 걸리며, 대시보드 사용자 수와 무관합니다.
+- 대시보드는 스냅샷을 immutable 모드로 열어 잠금 없이 읽고, 교체 전에 연 연결은 이전 스냅샷을 끝까지 일관되게 읽습니다.
+"""
+import os
+import time
+import sqlite3
+import threading
+import config
+# 대시보드(별도 프로세스)도 이 모듈을 import하므로, 로그 리스너를 띄우는 logger_config와 metrics는 봇 쪽 함수 안에서만 불러옵니다.
+
+_lock = threading.Lock()
+_last_published = 0.0
+
+def snapshot_path(db_file):
+    """db_file의 스냅샷 파일 경로. 예: trading_bot.db → trading_bot_snapshot.db"""
+    base, ext = os.path.splitext(db_file)
+    return f"{base}{config.SNAPSHOT_CONFIG['SUFFIX']}{ext or '.db'}"
+
+def publish(db_file=None, path=None):
+    """db_file(기본: 봇이 사용 중인 DB)의 일관된 스냅샷을 path에 게시합니다. 게시한 경로를 반환합니다."""
+    import database_manager as db
+    import metrics
+    db_file = db_file or db.DB_FILE
+    path = path or snapshot_path(db_file)
+    tmp_path = f"{path}.tmp"
+    with metrics.timed('snapshot'):
+        source = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
+        target = sqlite3.connect(tmp_path)
+        try:
+            source.backup(target) # 한 번에 전체 페이지 복사 (복사 중에는 쓰기만 잠시 대기)
+            target.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            target.close()
+            source.close()
+        os.replace(tmp_path, path)
+    return path
+
+def maybe_publish(force=False):
+    """
+    INTERVAL_SEC이 지났으면 백그라운드 스레드에서 스냅샷을 게시합니다. (거래 주기 끝에 호출)
+    이전 게시가 아직 진행 중이면 건너뜁니다.
+    """
+    global _last_published
+    sc = config.SNAPSHOT_CONFIG
+    if not sc["ENABLED"]:
+        return False
+    now = time.monotonic()
+    if not force and now - _last_published < sc["INTERVAL_SEC"]:
+        return False
+    if not _lock.acquire(blocking=False):
+        return False
+    _last_published = now
+
+    def run():
+        try:
+            publish()
+        except Exception as e:
+            from logger_config import logger
+            logger.error(f"DB 스냅샷 게시 실패: {e}")
+        finally:
+            _lock.release()
+    threading.Thread(target=run, name="DBSnapshot", daemon=True).start()
+    return True
+
+def connect_readonly(db_file=None):
+    """
+    대시보드/분석용 읽기 전용 연결. 스냅샷을 켰고 스냅샷이 있으면 잠금 없이(immutable) 스냅샷을 열고,
+    아니면(꺼져 있거나 봇이 아직 게시하지 않음) 실거래 DB를 읽기 전용으로 엽니다. (연결, 스냅샷 여부)를 반환합니다.
+    스냅샷을 끈 뒤 남아 있는 이전 스냅샷 파일은 더 갱신되지 않으므로 읽지 않습니다.
+    """
+    db_file = db_file or config.DB_FILE
+    path = snapshot_path(db_file)
+    if config.SNAPSHOT_CONFIG["ENABLED"] and os.path.exists(path):
+        return sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True, check_same_thread=False), True
+    return sqlite3.connect(f"file:{db_file}?mode=ro", uri=True, check_same_thread=False), False
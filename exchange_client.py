@@ -0,0 +1,335 @@
+"""
+업비트 REST API 클라이언트.
+
+pyupbit의 모듈 함수와 Upbit 객체는 요청마다 requests.get/post로 새 연결을 맺고, 타임아웃과 재시도가 없으며
+응답의 남은 요청 수(Remaining-Req)를 버립니다. 봇과 대시보드의 시세/주문 호출은 모두 이 모듈을 거칩니다.
+- 연결: 시세(quotation)와 거래(exchange) API마다 keep-alive 연결 풀을 가진 requests.Session 하나를 모든 스레드가 공유
+- 속도 조절: 고정 한도(rate_limiter)에 더해 응답의 Remaining-Req(group=...; sec=N)로 그룹별 이번 1초의 남은 요청 수를 추적하고,
+  REMAINING_RESERVE 이하로 남으면 다음 1초까지 기다립니다. 429를 받으면 같은 그룹의 모든 스레드가 함께 물러납니다.
+- 재시도: 429/5xx/연결 오류는 지터를 준 지수 백오프(0 ~ BASE·2^n 사이 무작위)로 MAX_RETRIES번까지 재시도합니다.
+  주문 생성(POST)은 서버에 닿지 않은 것이 확실한 오류(429, 연결 시간 초과)만 재시도하고, 응답을 받지 못한 경우에는
+  주문에 붙인 identifier로 조회해 같은 주문을 두 번 내지 않습니다.
+- 서킷 브레이커: 재시도 후에도 BREAKER_FAILURES번 연속 실패하면 BREAKER_OPEN_SEC 동안 요청 없이 바로 실패하고,
+  그 뒤 한 요청으로 회복을 확인합니다.
+반환 형식과 실패 시 None을 반환하는 동작은 pyupbit와 같습니다.
+"""
+import re
+import json
+import time
+import uuid
+import random
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+import jwt
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+import config
+import metrics
+from rate_limiter import quotation_limiter, exchange_limiter
+
+# 대시보드(별도 프로세스)도 이 모듈을 import하므로 로그 리스너와 로그 파일을 여는 logger_config는 불러오지 않고 같은 이름의 로거만 씁니다.
+# 봇 프로세스에서는 logger_config가 이 로거에 핸들러를 붙이고, 대시보드에서는 경고 이상만 stderr로 나갑니다.
+logger = logging.getLogger('TradingBot')
+
+API_URL = "https://api.upbit.com/v1"
+OHLCV_PATHS = {
+    "minute1": "/candles/minutes/1", "minute3": "/candles/minutes/3", "minute5": "/candles/minutes/5",
+    "minute10": "/candles/minutes/10", "minute15": "/candles/minutes/15", "minute30": "/candles/minutes/30",
+    "minute60": "/candles/minutes/60", "minute240": "/candles/minutes/240",
+    "day": "/candles/days", "week": "/candles/weeks", "month": "/candles/months",
+}
+OHLCV_COLUMNS = {"opening_price": "open", "high_price": "high", "low_price": "low", "trade_price": "close",
+                 "candle_acc_trade_volume": "volume", "candle_acc_trade_price": "value"}
+MAX_CANDLES_PER_REQUEST = 200
+MAX_MARKETS_PER_REQUEST = 200
+_REMAINING_REQ = re.compile(r"group=([a-z\-]+);.*?sec=([0-9]+)")
+_RETRY_STATUS = {500, 502, 503, 504}
+
+def _new_session():
+    """keep-alive 연결 풀을 가진 세션. 풀이 가득 차면 새 연결을 만들지 않고 반납을 기다립니다. (pool_block)"""
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=config.EXCHANGE_CLIENT_CONFIG["POOL_SIZE"], pool_block=True))
+    session.headers.update({"Accept": "application/json"})
+    return session
+
+class RestClient:
+    """API 종류(시세/거래) 하나의 연결 풀, Remaining-Req 기반 속도 조절, 재시도, 서킷 브레이커."""
+    def __init__(self, name, limiter, session=None, clock=None, sleep=None):
+        self.name = name
+        self.limiter = limiter
+        self.session = session or _new_session()
+        self.clock = clock or time.monotonic
+        self.sleep = sleep or time.sleep
+        self._lock = threading.Lock()
+        self._windows = {} # Remaining-Req group -> [이번 1초의 남은 요청 수, 1초가 끝나는 시각]
+        self._path_groups = {} # 요청 경로 -> group (첫 응답에서 알게 됨)
+        self._failures = 0 # 재시도 후에도 실패한 연속 요청 수
+        self._open_until = None # 서킷 브레이커가 열려 있으면 닫힘을 시도할 시각
+        self._probing = False
+
+    # --- 속도 조절 ---
+    def _pace(self, path):
+        """경로가 속한 그룹의 이번 1초 남은 요청이 RESERVE 이하이면 다음 1초까지 기다린 뒤 한 요청을 예약합니다."""
+        reserve = config.EXCHANGE_CLIENT_CONFIG["REMAINING_RESERVE"]
+        while True:
+            with self._lock:
+                window = self._windows.get(self._path_groups.get(path))
+                now = self.clock()
+                if window is None or now >= window[1]:
+                    return
+                if window[0] > reserve:
+                    window[0] -= 1
+                    return
+                wait = window[1] - now
+            self.sleep(wait)
+
+    def _observe(self, path, resp):
+        """응답의 Remaining-Req를 반영합니다. 반환값은 그룹 이름 (헤더가 없으면 None)."""
+        matched = _REMAINING_REQ.search(resp.headers.get("Remaining-Req", ""))
+        if matched is None:
+            return None
+        group, remaining = matched.group(1), int(matched.group(2))
+        with self._lock:
+            self._path_groups[path] = group
+            window = self._windows.get(group)
+            now = self.clock()
+            if window is None or now >= window[1] or remaining > window[0]: # 서버 쪽 1초가 새로 시작됨
+                self._windows[group] = [remaining, now + 1.0]
+            else:
+                window[0] = remaining
+        return group
+
+    def _hold(self, group, delay):
+        """429: 그룹 전체를 delay초 동안 멈춥니다. (다른 스레드도 _pace에서 함께 대기)"""
+        if group is None:
+            self.sleep(delay)
+            return
+        with self._lock:
+            self._windows[group] = [0, self.clock() + delay]
+
+    def _backoff(self, attempt):
+        cc = config.EXCHANGE_CLIENT_CONFIG
+        return random.uniform(0, min(cc["BACKOFF_MAX_SEC"], cc["BACKOFF_BASE_SEC"] * 2 ** attempt))
+
+    # --- 서킷 브레이커 ---
+    def _allow(self):
+        with self._lock:
+            if self._open_until is None:
+                return True
+            if self.clock() < self._open_until or self._probing:
+                return False
+            self._probing = True # 열린 시간이 지나면 한 요청만 보내 회복을 확인
+            return True
+
+    def _record(self, ok):
+        cc = config.EXCHANGE_CLIENT_CONFIG
+        with self._lock:
+            self._probing = False
+            if ok:
+                if self._open_until is not None:
+                    logger.info("[업비트 API] %s API가 회복되어 서킷 브레이커를 닫습니다.", self.name)
+                self._failures, self._open_until = 0, None
+                return
+            self._failures += 1
+            if self._failures < cc["BREAKER_FAILURES"]:
+                return
+            reopened = self._open_until is not None
+            self._open_until = self.clock() + cc["BREAKER_OPEN_SEC"]
+        metrics.inc('http_breaker_open', api=self.name)
+        if not reopened:
+            logger.error("[업비트 API] %s API 요청이 연속 %s번 실패했습니다. "
+                         "%s초 동안 요청을 멈춥니다. (서킷 브레이커)", self.name, cc['BREAKER_FAILURES'], cc['BREAKER_OPEN_SEC'])
+
+    # --- 요청 ---
+    def request(self, method, path, params=None, sign=None):
+        """
+        요청 하나를 보내고 JSON 응답을 반환합니다. 재시도를 다 써도 실패하거나, 4xx 오류이거나, 서킷 브레이커가 열려 있으면 None.
+        sign(query)은 인증 헤더를 만드는 함수이며 매 시도마다 새로 호출됩니다. (nonce)
+        POST(주문 생성)에는 시도마다 새 identifier를 붙여, 응답을 받지 못했을 때 그 identifier로 주문을 조회합니다.
+        """
+        if not self._allow():
+            logger.warning("[업비트 API] 서킷 브레이커가 열려 있어 %s %s 요청을 건너뜁니다.", method, path)
+            return None
+        cc = config.EXCHANGE_CLIENT_CONFIG
+        timeout = (cc["CONNECT_TIMEOUT_SEC"], cc["READ_TIMEOUT_SEC"])
+        is_order = method == "POST"
+        for attempt in range(cc["MAX_RETRIES"] + 1):
+            sent = dict(params or {})
+            if is_order:
+                sent['identifier'] = str(uuid.uuid4())
+            query = urlencode(sent, doseq=True).replace("%5B%5D=", "[]=")
+            url, body = API_URL + path, None
+            if is_order:
+                body = json.dumps(sent)
+            elif query:
+                url = f"{url}?{query}"
+            headers = sign(query) if sign else {}
+            if body is not None:
+                headers["Content-Type"] = "application/json"
+
+            self.limiter.acquire()
+            self._pace(path)
+            started = time.perf_counter()
+            resp, error = None, None
+            try:
+                resp = self.session.request(method, url, data=body, headers=headers, timeout=timeout)
+            except requests.RequestException as e:
+                error = e
+            metrics.observe(f"http_{self.name}", time.perf_counter() - started)
+            metrics.inc('http_requests', api=self.name, status=resp.status_code if resp is not None else type(error).__name__)
+
+            group = None
+            unsent = isinstance(error, requests.ConnectTimeout) # 서버에 닿지 않은 것이 확실한 오류 (주문도 재시도 가능)
+            if resp is not None:
+                group = self._observe(path, resp)
+                if 200 <= resp.status_code < 300:
+                    try:
+                        data = resp.json()
+                    except ValueError as e:
+                        error = e
+                    else:
+                        self._record(True)
+                        return data
+                elif resp.status_code == 429: # 한도 초과 요청은 처리되지 않음
+                    error, unsent = "HTTP 429", True
+                elif resp.status_code not in _RETRY_STATUS:
+                    # 잘못된 요청/잔고 부족/IP 차단(418) 등은 재시도해도 같으므로 바로 실패 (418 외에는 서비스가 살아 있음)
+                    logger.warning("[업비트 API] %s %s 실패 (%s): %s", method, path, resp.status_code, _error_message(resp))
+                    self._record(resp.status_code != 418)
+                    return None
+                else:
+                    error = f"HTTP {resp.status_code}"
+
+            if is_order and not unsent:
+                logger.warning("[업비트 API] 주문 요청의 응답을 받지 못했습니다 (%s). identifier로 접수 여부를 확인합니다.", error)
+                self._record(False)
+                return self.request("GET", "/order", {'identifier': sent['identifier']}, sign)
+            if attempt == cc["MAX_RETRIES"]:
+                break
+            delay = self._backoff(attempt)
+            logger.warning("[업비트 API] %s %s 오류(%s). %.2f초 뒤 재시도 (%s/%s)", method, path, error, delay, attempt + 1, cc['MAX_RETRIES'])
+            if resp is not None and resp.status_code == 429:
+                self._hold(group, delay)
+            else:
+                self.sleep(delay)
+        logger.error("[업비트 API] %s %s 요청이 %s번 재시도 후에도 실패했습니다.", method, path, cc['MAX_RETRIES'])
+        self._record(False)
+        return None
+
+def _error_message(resp):
+    try:
+        error = resp.json().get('error') or {}
+        return f"{error.get('name')}: {error.get('message')}"
+    except (ValueError, AttributeError):
+        return resp.text[:200]
+
+quotation = RestClient("quotation", quotation_limiter)
+exchange = RestClient("exchange", exchange_limiter)
+
+# --- 시세 API (pyupbit 모듈 함수와 같은 형식) ---
+def get_tickers(fiat=""):
+    markets = quotation.request("GET", "/market/all", {'isDetails': 'false'})
+    if markets is None:
+        return None
+    return [m['market'] for m in markets if m['market'].startswith(fiat)]
+
+def get_ohlcv(ticker, interval="day", count=200, to=None):
+    """
+    최근(to 이전) count개 캔들을 KST 시각 인덱스의 DataFrame(open/high/low/close/volume/value)으로 반환합니다. 실패 시 None.
+    to는 tz 없는 시각이면 UTC로 해석합니다. (pyupbit와 같음) 200개가 넘으면 과거 방향으로 나눠 요청합니다.
+    """
+    path = OHLCV_PATHS.get(interval, OHLCV_PATHS["day"])
+    if to is None:
+        to = datetime.now(timezone.utc).replace(tzinfo=None)
+    else:
+        to = pd.Timestamp(to)
+        if to.tzinfo is not None:
+            to = to.tz_convert('UTC').tz_localize(None)
+        to = to.to_pydatetime()
+    rows = []
+    remaining = max(count, 1)
+    while remaining > 0:
+        contents = quotation.request("GET", path, {'market': ticker, 'count': min(MAX_CANDLES_PER_REQUEST, remaining),
+                                                   'to': to.strftime("%Y-%m-%d %H:%M:%S")})
+        if contents is None:
+            return None
+        if not contents:
+            break
+        rows.extend(contents)
+        remaining -= len(contents)
+        to = datetime.strptime(contents[-1]['candle_date_time_utc'], "%Y-%m-%dT%H:%M:%S")
+    if not rows:
+        return None
+    index = pd.to_datetime([row['candle_date_time_kst'] for row in rows], format="%Y-%m-%dT%H:%M:%S")
+    frame = pd.DataFrame(rows, columns=list(OHLCV_COLUMNS), index=index).sort_index()
+    return frame.rename(columns=OHLCV_COLUMNS)
+
+def get_current_price(ticker):
+    """현재가. ticker가 문자열이면 float, 목록이면 {ticker: float}. 실패 시 None."""
+    tickers = [ticker] if isinstance(ticker, str) else list(ticker)
+    prices = {}
+    for start in range(0, len(tickers), MAX_MARKETS_PER_REQUEST):
+        contents = quotation.request("GET", "/ticker", {'markets': ",".join(tickers[start:start + MAX_MARKETS_PER_REQUEST])})
+        if contents is None:
+            return None
+        prices.update({x['market']: x['trade_price'] for x in contents})
+    if isinstance(ticker, str):
+        return prices.get(ticker)
+    return prices
+
+def get_orderbook(ticker):
+    """호가. ticker가 문자열이면 dict 하나, 목록이면 dict 목록. 실패 시 None."""
+    markets = ticker if isinstance(ticker, str) else ",".join(ticker)
+    orderbooks = quotation.request("GET", "/orderbook", {'markets': markets})
+    if orderbooks is None or not isinstance(ticker, str):
+        return orderbooks
+    return orderbooks[0] if orderbooks else None
+
+# --- 거래 API (pyupbit.Upbit 호환) ---
+class Upbit:
+    """pyupbit.Upbit과 같은 주문/잔고 메서드. 모든 요청은 거래 API 클라이언트(exchange)를 거칩니다."""
+    def __init__(self, access, secret, client=None):
+        self.access = access
+        self.secret = secret
+        self.client = client or exchange
+
+    def _sign(self, query):
+        payload = {"access_key": self.access, "nonce": str(uuid.uuid4())}
+        if query:
+            payload['query_hash'] = hashlib.sha512(query.encode()).hexdigest()
+            payload['query_hash_alg'] = "SHA512"
+        return {"Authorization": f"Bearer {jwt.encode(payload, self.secret, algorithm='HS256')}"}
+
+    def get_balances(self):
+        return self.client.request("GET", "/accounts", sign=self._sign)
+
+    def get_balance(self, ticker="KRW"):
+        """보유 수량(float). 보유하지 않은 코인은 0, 조회 실패 시 None."""
+        fiat = "KRW"
+        if '-' in ticker:
+            fiat, ticker = ticker.split('-')
+        balances = self.get_balances()
+        if balances is None:
+            return None
+        for x in balances:
+            if x['currency'] == ticker and x['unit_currency'] == fiat:
+                return float(x['balance'])
+        return 0
+
+    def buy_market_order(self, ticker, price):
+        """시장가 매수 (price: KRW 금액)"""
+        return self.client.request("POST", "/orders", {'market': ticker, 'side': 'bid', 'price': str(price), 'ord_type': 'price'}, self._sign)
+
+    def sell_market_order(self, ticker, volume):
+        """시장가 매도 (volume: 코인 수량)"""
+        return self.client.request("POST", "/orders", {'market': ticker, 'side': 'ask', 'volume': str(volume), 'ord_type': 'market'}, self._sign)
+
+    def get_order(self, order_uuid):
+        return self.client.request("GET", "/order", {'uuid': order_uuid}, self._sign)
+
+    def cancel_order(self, order_uuid):
+        return self.client.request("DELETE", "/order", {'uuid': order_uuid}, self._sign)
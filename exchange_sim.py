@@ -0,0 +1,218 @@
+"""
+네트워크 없이 동작하는 업비트 거래 API 시뮬레이터. (모의 거래 및 부하 테스트용)
+
+pyupbit.Upbit과 같은 메서드(buy_market_order, sell_market_order, get_order, cancel_order, get_balance)와
+같은 응답 형식(숫자는 문자열, 오류는 {'error': {...}})을 제공하므로 main.py의 upbit 객체 자리에 그대로 넣을 수 있습니다.
+
+체결 모델 (SIM_EXCHANGE_CONFIG)
+- FILL_MODE "immediate": 주문 즉시 전량 체결 ('done')
+- FILL_MODE "partial"  : MATCH_INTERVAL_SEC마다 남은 수량의 PARTIAL_FILL_RATIO씩 체결. MAX_MATCH_STEPS 안에 다 체결되지
+                         않으면 나머지는 취소되어 'cancel' 상태가 됩니다. (업비트 시장가 주문의 부분 체결 후 취소와 동일)
+- 체결가는 현재가에 SLIPPAGE_BPS를 불리한 방향으로 더한 값이며, 수수료는 FEE_RATE로 계산합니다.
+- LATENCY_SEC만큼 응답을 지연하고, ERROR_RATE/EXCEPTION_RATE 확률로 API 오류 응답/네트워크 예외를 발생시킵니다.
+
+체결은 별도 스레드 없이, 메서드가 호출될 때 clock() 기준으로 지난 시간만큼 한꺼번에 진행합니다.
+clock과 sleep을 주입하면 가속된 시간에서도 같은 동작을 재현할 수 있습니다.
+"""
+import time
+import uuid
+import random
+import threading
+from decimal import Decimal
+from datetime import datetime
+from logger_config import logger
+import config
+import exchange_client
+
+class SimulatedExchange:
+    def __init__(self, krw_balance=None, price_source=None, clock=None, sleep=None, seed=None, **overrides):
+        self.conf = {**config.SIM_EXCHANGE_CONFIG, **overrides}
+        self.price_source = price_source # price_source(ticker) -> 현재가. 없으면 업비트 시세 API 조회
+        self.clock = clock or time.monotonic
+        self.sleep = sleep or time.sleep
+        self.random = random.Random(self.conf["SEED"] if seed is None else seed)
+        krw = self.conf["INITIAL_KRW"] if krw_balance is None else krw_balance
+        self.balances = {'KRW': {'balance': Decimal(str(krw)), 'locked': Decimal('0')}}
+        self.orders = {}
+        self._lock = threading.RLock()
+
+    # --- 내부 도우미 ---
+    def _call(self):
+        """응답 지연과 오류를 주입합니다. API 오류 응답이면 그 dict를, 아니면 None을 반환합니다."""
+        if self.conf["LATENCY_SEC"]:
+            self.sleep(self.conf["LATENCY_SEC"])
+        roll = self.random.random()
+        if roll < self.conf["EXCEPTION_RATE"]:
+            raise ConnectionError("Simulated network error")
+        if roll < self.conf["EXCEPTION_RATE"] + self.conf["ERROR_RATE"]:
+            return {'error': {'name': 'simulated_error', 'message': 'Simulated API error'}}
+        return None
+
+    def _price(self, ticker):
+        if self.price_source is not None:
+            price = self.price_source(ticker)
+        else:
+            price = exchange_client.get_current_price(ticker)
+        if price is None:
+            raise ValueError(f"{ticker} 현재가를 알 수 없습니다.")
+        return Decimal(str(price))
+
+    def _account(self, currency):
+        return self.balances.setdefault(currency, {'balance': Decimal('0'), 'locked': Decimal('0')})
+
+    def _new_order(self, ticker, side, ord_type, price=None, volume=None):
+        order = {
+            'uuid': str(uuid.uuid4()), 'side': side, 'ord_type': ord_type, 'market': ticker, 'state': 'wait',
+            'created_at': datetime.now().astimezone().isoformat(),
+            'price': price, 'volume': volume, # 시장가 매수는 price(주문 금액), 시장가 매도는 volume(수량)
+            'executed_volume': Decimal('0'), 'executed_funds': Decimal('0'), 'paid_fee': Decimal('0'),
+            'trades': [], '_steps': 0, '_next_match': self.clock() + self.conf["FILL_DELAY_SEC"],
+        }
+        self.orders[order['uuid']] = order
+        try:
+            self._match_order(order)
+        except Exception as e: # 접수된 주문은 유지하고, 다음 조회 때 다시 체결을 시도
+            logger.warning(f"[모의 거래소] {ticker} 주문({order['uuid']}) 체결 지연: {e}")
+        return order
+
+    def _match_order(self, order):
+        """주문이 대기 중인 동안 경과한 체결 단계를 모두 진행합니다."""
+        mode, interval = self.conf["FILL_MODE"], self.conf["MATCH_INTERVAL_SEC"]
+        while order['state'] == 'wait' and self.clock() >= order['_next_match']:
+            order['_steps'] += 1
+            ratio = Decimal('1') if mode == 'immediate' else Decimal(str(self.conf["PARTIAL_FILL_RATIO"]))
+            if mode != 'immediate' and order['_steps'] >= self.conf["MAX_MATCH_STEPS"]:
+                self._finish(order, 'cancel') # 유동성 부족으로 남은 수량 취소
+                break
+            self._fill(order, ratio)
+            order['_next_match'] += interval
+
+    def _fill(self, order, ratio):
+        ticker = order['market']
+        slippage = Decimal(str(self.conf["SLIPPAGE_BPS"])) / Decimal('10000')
+        fee_rate = config.FEE_RATE
+        coin = self._account(ticker.split('-')[1])
+        krw = self._account('KRW')
+        price = self._price(ticker)
+        if order['side'] == 'bid':
+            price *= 1 + slippage
+            remaining_funds = order['price'] - order['executed_funds']
+            funds = remaining_funds * ratio
+            if remaining_funds - funds < config.MIN_ORDER_KRW: # 최소 주문 금액 미만의 잔량은 함께 체결
+                funds = remaining_funds
+            volume = (funds / price).quantize(Decimal('0.00000001'))
+            fee = funds * fee_rate
+            krw['locked'] -= funds + fee
+            coin['balance'] += volume
+            done = funds == remaining_funds
+        else:
+            price *= 1 - slippage
+            remaining_volume = order['volume'] - order['executed_volume']
+            volume = (remaining_volume * ratio).quantize(Decimal('0.00000001'))
+            if (remaining_volume - volume) * price < config.MIN_ORDER_KRW:
+                volume = remaining_volume
+            funds = price * volume
+            fee = funds * fee_rate
+            coin['locked'] -= volume
+            krw['balance'] += funds - fee
+            done = volume == remaining_volume
+        order['executed_volume'] += volume
+        order['executed_funds'] += funds
+        order['paid_fee'] += fee
+        order['trades'].append({'market': ticker, 'uuid': str(uuid.uuid4()), 'price': str(price), 'volume': str(volume),
+                                'funds': str(funds), 'side': order['side'], 'created_at': datetime.now().astimezone().isoformat()})
+        if done:
+            order['state'] = 'done'
+
+    def _finish(self, order, state):
+        """남은 예약 잔고를 돌려주고 주문을 종료합니다."""
+        if order['side'] == 'bid':
+            remaining = order['price'] - order['executed_funds']
+            krw = self._account('KRW')
+            refund = remaining * (1 + config.FEE_RATE)
+            krw['locked'] -= refund
+            krw['balance'] += refund
+        else:
+            coin = self._account(order['market'].split('-')[1])
+            remaining = order['volume'] - order['executed_volume']
+            coin['locked'] -= remaining
+            coin['balance'] += remaining
+        order['state'] = state
+
+    def _public(self, order):
+        """업비트 응답 형식(숫자는 문자열)으로 변환합니다."""
+        fields = {k: v for k, v in order.items() if not k.startswith('_') and k != 'executed_funds'}
+        for key in ['price', 'volume', 'executed_volume', 'paid_fee']:
+            if fields[key] is not None:
+                fields[key] = str(fields[key])
+        if order['volume'] is not None:
+            fields['remaining_volume'] = str(order['volume'] - order['executed_volume'])
+        fields['trades_count'] = len(order['trades'])
+        fields['trades'] = list(order['trades'])
+        return fields
+
+    # --- pyupbit.Upbit 호환 메서드 ---
+    def buy_market_order(self, ticker, price, contain_req=False):
+        error = self._call() # 지연은 락 밖에서 (동시에 호출한 스레드끼리 서로 기다리지 않도록)
+        if error:
+            return error
+        with self._lock:
+            funds = Decimal(str(price))
+            krw = self._account('KRW')
+            required = funds * (1 + config.FEE_RATE)
+            if funds < config.MIN_ORDER_KRW or krw['balance'] < required:
+                return {'error': {'name': 'insufficient_funds_bid', 'message': '주문가능한 금액(KRW)이 부족합니다.'}}
+            krw['balance'] -= required
+            krw['locked'] += required
+            order = self._new_order(ticker, 'bid', 'price', price=funds)
+            logger.info(f"[모의 거래소] {ticker} 시장가 매수 접수 {funds:,.0f}원 ({order['uuid']})")
+            return self._public(order)
+
+    def sell_market_order(self, ticker, volume, contain_req=False):
+        error = self._call()
+        if error:
+            return error
+        with self._lock:
+            volume = Decimal(str(volume))
+            coin = self._account(ticker.split('-')[1])
+            if volume <= 0 or coin['balance'] < volume:
+                return {'error': {'name': 'insufficient_funds_ask', 'message': '주문가능한 수량이 부족합니다.'}}
+            coin['balance'] -= volume
+            coin['locked'] += volume
+            order = self._new_order(ticker, 'ask', 'market', volume=volume)
+            logger.info(f"[모의 거래소] {ticker} 시장가 매도 접수 {volume} ({order['uuid']})")
+            return self._public(order)
+
+    def get_order(self, ticker_or_uuid, state='wait', page=1, limit=100, contain_req=False):
+        error = self._call()
+        if error:
+            return error
+        with self._lock:
+            order = self.orders.get(ticker_or_uuid)
+            if order is None:
+                return {'error': {'name': 'order_not_found', 'message': '주문을 찾지 못했습니다.'}}
+            self._match_order(order)
+            return self._public(order)
+
+    def cancel_order(self, uuid, contain_req=False):
+        error = self._call()
+        if error:
+            return error
+        with self._lock:
+            order = self.orders.get(uuid)
+            if order is None:
+                return {'error': {'name': 'order_not_found', 'message': '주문을 찾지 못했습니다.'}}
+            self._match_order(order)
+            if order['state'] != 'wait':
+                return {'error': {'name': 'order_not_found', 'message': '이미 체결되었거나 취소된 주문입니다.'}}
+            self._finish(order, 'cancel')
+            return self._public(order)
+
+    def get_balance(self, ticker="KRW", verbose=False, contain_req=False):
+        if self._call():
+            return None # pyupbit.Upbit.get_balance는 오류 시 None을 반환
+        with self._lock:
+            for order in self.orders.values():
+                if order['state'] == 'wait':
+                    self._match_order(order)
+            return float(self._account(ticker.split('-')[-1])['balance'])
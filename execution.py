@@ -0,0 +1,326 @@
+"""
+대량 시장가 주문 분할 실행 엔진.
+
+한 번에 내면 호가를 크게 밀어 올릴 주문(모주문)을 캐시된 호가 스냅샷을 기준으로 여러 개의 시장가 자식 주문으로 나눠 실행합니다.
+- 분할 여부: 최우선 호가에서 BAND_BPS 안의 호가 잔량 중 PARTICIPATION_RATE 비율을 한 번에 낼 수 있는 최대 크기로 보고,
+             모주문이 이보다 크면 분할합니다. (작은 주문은 지금과 같이 단일 시장가 주문)
+- "TWAP"         : 필요한 조각 수(MAX_SLICES 이하)로 균등 분할해 DURATION_SEC 동안 일정 간격으로 제출
+- "PARTICIPATION": INTERVAL_SEC마다 새 호가를 보고 허용 크기만큼 제출. DURATION_SEC가 지나면 남은 수량을 한 번에 제출
+자식 주문의 체결은 모주문 하나로 합쳐 업비트 주문 조회와 같은 형식(state, executed_volume, trades)으로 돌려주므로,
+main의 check_pending_order → process_buy_order/process_sell_order가 그대로 처리합니다.
+모주문과 자식 주문 UUID는 execution_orders 테이블에 기록되어, 재시작 후에도 자식 주문을 다시 조회해 체결분을 복원합니다.
+완료 시 판단 시점 가격(decision_price) 대비 실현 슬리피지(bp, 불리한 방향이 양수)를 기록합니다.
+금액/가격/수량은 장부와 같은 fixed_point.Fixed이며, 호가와 체결 내역의 값은 받을 때 한 번만 변환합니다.
+"""
+import math
+import time
+import uuid
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from logger_config import logger
+import config
+import database_manager as db
+import metrics
+import exchange_client
+from fixed_point import money, volume, order_volume, ZERO
+
+PARENT_PREFIX = "slice-"
+
+def is_parent_id(order_uuid):
+    return bool(order_uuid) and str(order_uuid).startswith(PARENT_PREFIX)
+
+# --- 호가 스냅샷 ---
+class OrderbookCache:
+    """코인별 호가를 TTL_SEC 동안 재사용합니다. source(ticker) → exchange_client.get_orderbook 형식의 dict"""
+    def __init__(self, source=None, ttl=None, clock=None):
+        self.source = source
+        self.ttl = config.EXECUTION_CONFIG["ORDERBOOK_TTL_SEC"] if ttl is None else ttl
+        self.clock = clock or time.monotonic
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def get(self, ticker):
+        with self._lock:
+            cached = self._cache.get(ticker)
+        if cached and self.clock() - cached[0] < self.ttl:
+            return cached[1]
+        if self.source is not None:
+            orderbook = self.source(ticker)
+        else:
+            orderbook = exchange_client.get_orderbook(ticker)
+        if isinstance(orderbook, list):
+            orderbook = orderbook[0] if orderbook else None
+        units = (orderbook or {}).get('orderbook_units') or []
+        with self._lock:
+            self._cache[ticker] = (self.clock(), units)
+        return units
+
+def book_capacity(units, side, band_bps, rate):
+    """
+    최우선 호가에서 band_bps 안의 잔량 중 rate 비율. (매수: KRW 금액, 매도: 코인 수량)와 최우선 호가를 반환합니다.
+    호가가 없으면 (None, None).
+    """
+    if not units:
+        return None, None
+    band = money(band_bps) / 10000
+    if side == 'bid':
+        asks = [(money(u['ask_price']), volume(u['ask_size'])) for u in units]
+        best = asks[0][0]
+        limit = best * (1 + band)
+        depth = sum((price * size for price, size in asks if price <= limit), ZERO)
+    else:
+        bids = [(money(u['bid_price']), volume(u['bid_size'])) for u in units]
+        best = bids[0][0]
+        limit = best * (1 - band)
+        depth = sum((size for price, size in bids if price >= limit), volume(0))
+    return depth * rate, best
+
+# --- 모주문 ---
+class ParentOrder:
+    def __init__(self, parent_id, ticker, side, target, decision_price, algo):
+        self.parent_id = parent_id
+        self.ticker = ticker
+        self.side = side # 'bid'(매수: target은 KRW 금액) / 'ask'(매도: target은 수량)
+        self.target = money(target) if side == 'bid' else volume(target)
+        self.decision_price = money(decision_price) if decision_price else None
+        self.algo = algo
+        self.state = 'wait'
+        self.children = []
+        self.trades = []
+        self.executed_volume = volume(0)
+        self.executed_funds = ZERO
+        self.slippage_bps = None
+        self.created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.finished_at = None
+        self.cancel_requested = False
+        self.lock = threading.Lock()
+
+    @property
+    def remaining(self):
+        return self.target - (self.executed_funds if self.side == 'bid' else self.executed_volume)
+
+    @property
+    def avg_price(self):
+        return self.executed_funds / self.executed_volume if self.executed_volume > 0 else None
+
+    def add_fills(self, child_order):
+        """자식 주문 조회 결과의 체결 내역을 합칩니다."""
+        trades = child_order.get('trades') or []
+        with self.lock:
+            for trade in trades:
+                price, size = money(trade['price']), volume(trade['volume'])
+                self.trades.append({'price': trade['price'], 'volume': trade['volume']})
+                self.executed_volume += size
+                self.executed_funds += price * size
+
+    def as_order(self):
+        """업비트 주문 조회와 같은 형식."""
+        with self.lock:
+            return {'uuid': self.parent_id, 'market': self.ticker, 'side': self.side, 'ord_type': self.algo,
+                    'state': self.state, 'executed_volume': str(self.executed_volume), 'trades': list(self.trades),
+                    'trades_count': len(self.trades), 'children': list(self.children)}
+
+    def record(self):
+        avg_price = self.avg_price
+        return {'parent_id': self.parent_id, 'ticker': self.ticker, 'side': self.side, 'algo': self.algo,
+                'target': str(self.target), 'decision_price': str(self.decision_price) if self.decision_price else None,
+                'state': self.state, 'child_uuids': json.dumps(self.children),
+                'executed_volume': str(self.executed_volume), 'avg_price': str(avg_price) if avg_price else None,
+                'slippage_bps': self.slippage_bps, 'created_at': self.created_at, 'finished_at': self.finished_at}
+
+# --- 실행 엔진 ---
+class ExecutionEngine:
+    def __init__(self, upbit, orderbook_source=None, clock=None, sleep=None):
+        self.upbit = upbit
+        self.conf = config.EXECUTION_CONFIG
+        self.clock = clock or time.monotonic
+        self.sleep = sleep or time.sleep
+        self.orderbooks = OrderbookCache(orderbook_source)
+        self.parents = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.conf["MAX_PARENTS"], thread_name_prefix="Execution")
+
+    # --- 분할 판단 ---
+    def _child_cap(self, ticker, side):
+        """지금 호가에서 한 번에 낼 수 있는 자식 주문 크기 (매수: KRW, 매도: 수량)와 최우선 호가."""
+        return book_capacity(self.orderbooks.get(ticker), side, self.conf["BAND_BPS"], self.conf["PARTICIPATION_RATE"])
+
+    def submit(self, ticker, side, size, decision_price=None, order_type=None):
+        """
+        분할이 필요한 주문이면 모주문을 시작하고 {'uuid': 모주문 ID}를 반환합니다.
+        분할이 필요 없거나(호가 대비 작음) 판단할 수 없으면 None을 반환하며, 이때는 호출한 쪽에서 단일 주문을 냅니다.
+        """
+        if not self.conf["ENABLED"] or (order_type and order_type not in self.conf["ORDER_TYPES"]):
+            return None
+        size = money(size) if side == 'bid' else volume(size)
+        try:
+            cap, best = self._child_cap(ticker, side)
+        except Exception as e:
+            logger.warning("[%s] 호가 조회 실패로 분할 없이 주문합니다: %s", ticker, e)
+            return None
+        if not cap or size <= cap:
+            return None
+
+        parent = ParentOrder(f"{PARENT_PREFIX}{uuid.uuid4()}", ticker, side, size, decision_price or best, self.conf["ALGO"])
+        with self._lock:
+            self.parents[parent.parent_id] = parent
+        db.save_execution_order(parent.record())
+        slices = min(self.conf["MAX_SLICES"], math.ceil(float(size / cap)))
+        logger.info("[%s] 분할 실행 시작 (%s, 약 %s조각, %s초): %s", ticker, parent.algo, slices, self.conf['DURATION_SEC'], parent.parent_id)
+        self._pool.submit(self._run, parent, slices)
+        return {'uuid': parent.parent_id}
+
+    # --- 실행 ---
+    def _slice_size(self, parent, planned):
+        """이번 자식 주문 크기. 남은 양이 최소 주문 단위 미만으로 남지 않도록 마지막 조각에 합칩니다."""
+        remaining = parent.remaining
+        size = min(planned, remaining)
+        if parent.side == 'ask':
+            size = order_volume(size, parent.ticker)
+            price = parent.decision_price or ZERO
+            if (remaining - size) * price < config.MIN_ORDER_KRW:
+                size = order_volume(remaining, parent.ticker)
+        elif remaining - size < config.MIN_ORDER_KRW:
+            size = remaining
+        return size
+
+    def _run(self, parent, slices):
+        started = self.clock()
+        duration = self.conf["DURATION_SEC"]
+        errors = 0
+        try:
+            step = 0
+            while parent.remaining > 0 and not parent.cancel_requested:
+                elapsed = self.clock() - started
+                if parent.algo == 'TWAP':
+                    planned = parent.target / slices
+                else: # PARTICIPATION: 매번 새 호가 기준, 시간이 다 되면 남은 수량 전부
+                    cap, _ = self._child_cap(parent.ticker, parent.side)
+                    planned = parent.remaining if elapsed >= duration or not cap else cap
+                size = self._slice_size(parent, planned)
+                if size <= 0 or (parent.side == 'bid' and size < config.MIN_ORDER_KRW):
+                    break
+                if self._execute_child(parent, size):
+                    errors = 0
+                else:
+                    errors += 1
+                    if errors >= self.conf["MAX_CHILD_ERRORS"]:
+                        logger.error("[%s] 자식 주문이 연속 %s회 실패(또는 미체결)하여 분할 실행을 중단합니다.", parent.ticker, errors)
+                        break
+                step += 1
+                if parent.remaining <= 0:
+                    break
+                # 다음 조각까지 대기 (TWAP: 시작 시각 기준 균등 간격)
+                interval = duration / max(slices - 1, 1) if parent.algo == 'TWAP' else self.conf["INTERVAL_SEC"]
+                wait = started + step * interval - self.clock() if parent.algo == 'TWAP' else interval
+                if wait > 0:
+                    self.sleep(wait)
+        except Exception as e:
+            logger.error("[%s] 분할 실행 중 오류 발생: %s", parent.ticker, e)
+        self._finish(parent)
+
+    def _execute_child(self, parent, size):
+        """자식 시장가 주문을 내고 끝날 때까지 기다린 뒤 체결분을 모주문에 합칩니다. 체결분이 있으면 True."""
+        if parent.side == 'bid':
+            res = self.upbit.buy_market_order(parent.ticker, float(size))
+        else:
+            res = self.upbit.sell_market_order(parent.ticker, float(size))
+        if not res or 'uuid' not in res:
+            logger.warning("[%s] 자식 주문 제출 실패: %s", parent.ticker, res)
+            return False
+        child_uuid = res['uuid']
+        with parent.lock:
+            parent.children.append(child_uuid)
+        db.save_execution_order(parent.record())
+        metrics.inc('child_orders', side=parent.side)
+
+        order = self._wait_child(child_uuid)
+        if not order or not order.get('trades'):
+            logger.warning("[%s] 자식 주문(%s)이 체결 없이 끝났습니다.", parent.ticker, child_uuid)
+            return False
+        parent.add_fills(order)
+        return True
+
+    def _wait_child(self, child_uuid):
+        """자식 주문이 끝날 때까지 조회합니다. 시간 안에 끝나지 않으면 취소하고 마지막 조회 결과를 반환합니다."""
+        deadline = self.clock() + self.conf["CHILD_TIMEOUT_SEC"]
+        order = None
+        while True:
+            try:
+                order = self.upbit.get_order(child_uuid)
+                if order and order.get('state') in ('done', 'cancel'):
+                    return order
+            except Exception as e:
+                logger.error("자식 주문(%s) 조회 중 오류: %s", child_uuid, e)
+            if self.clock() >= deadline:
+                break
+            self.sleep(self.conf["CHILD_POLL_SEC"])
+        try:
+            self.upbit.cancel_order(child_uuid)
+            order = self.upbit.get_order(child_uuid)
+        except Exception as e:
+            logger.error("자식 주문(%s) 취소 중 오류: %s", child_uuid, e)
+        return order if order and 'error' not in order else None
+
+    def _finish(self, parent):
+        with parent.lock:
+            parent.state = 'done' if parent.remaining <= 0 else 'cancel'
+            parent.finished_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            avg_price = parent.avg_price
+            if avg_price and parent.decision_price:
+                sign = 1 if parent.side == 'bid' else -1 # 매수는 비싸게, 매도는 싸게 체결될수록 양수
+                parent.slippage_bps = float(sign * (avg_price / parent.decision_price - 1) * 10000)
+        db.save_execution_order(parent.record())
+        metrics.inc('executions', algo=parent.algo, side=parent.side, state=parent.state)
+        slippage = f"{parent.slippage_bps:+.1f}bp" if parent.slippage_bps is not None else "N/A"
+        logger.info("[%s] 분할 실행 종료 (%s): 자식 %s건, 체결 수량 %s, 평균가 %.2f, 판단 가격 대비 슬리피지 %s",
+                    parent.ticker, parent.state, len(parent.children), parent.executed_volume, avg_price or 0, slippage)
+
+    # --- 업비트 주문 조회/취소 호환 ---
+    def owns(self, order_uuid):
+        """이 엔진이 만드는 모주문 ID인지. (아니면 호출한 쪽에서 거래소에 직접 조회/취소)"""
+        return is_parent_id(order_uuid)
+
+    def get_order(self, parent_id):
+        """모주문의 합산 체결 상태. 메모리에 없으면(재시작 등) 기록된 자식 주문을 다시 조회해 복원합니다."""
+        with self._lock:
+            parent = self.parents.get(parent_id)
+        if parent is None:
+            parent = self._restore(parent_id)
+        return parent.as_order() if parent else None
+
+    def cancel_order(self, parent_id):
+        """남은 조각을 더 내지 않도록 합니다. (이미 낸 자식 주문의 체결분은 유지)"""
+        with self._lock:
+            parent = self.parents.get(parent_id)
+        if parent is None or parent.state != 'wait':
+            return {'error': {'name': 'order_not_found', 'message': '진행 중인 분할 주문이 아닙니다.'}}
+        parent.cancel_requested = True
+        return parent.as_order()
+
+    def _restore(self, parent_id):
+        record = db.load_execution_order(parent_id)
+        if record is None:
+            return None
+        parent = ParentOrder(parent_id, record['ticker'], record['side'], record['target'], record['decision_price'], record['algo'])
+        parent.created_at = record['created_at']
+        for child_uuid in json.loads(record['child_uuids'] or '[]'):
+            parent.children.append(child_uuid)
+            try:
+                order = self.upbit.get_order(child_uuid)
+                if order and 'error' not in order:
+                    parent.add_fills(order)
+            except Exception as e:
+                logger.error("자식 주문(%s) 복원 조회 중 오류: %s", child_uuid, e)
+        if record['state'] == 'wait':
+            logger.warning("[%s] 진행 중이던 분할 주문(%s)을 복원했습니다. 남은 조각은 내지 않고 체결분만 반영합니다.", parent.ticker, parent_id)
+            self._finish(parent)
+        else:
+            parent.state = record['state']
+            parent.slippage_bps = record['slippage_bps']
+            parent.finished_at = record['finished_at']
+        with self._lock:
+            self.parents[parent_id] = parent
+        return parent
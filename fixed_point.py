@@ -0,0 +1,296 @@
+"""
+정수 기반 고정소수점 금액/수량.
+
+Fixed는 값을 (정수 units, 소수 자릿수 scale)로 보관합니다. 값 = units / 10**scale.
+- 덧셈/뺄셈/비교는 정수 연산이라 정확하고, 곱셈/나눗셈은 결과를 두 값 중 큰 자릿수로 한 번만 반올림(ROUND_HALF_EVEN)하므로
+  어느 기계에서나 같은 결과가 나옵니다. (Decimal의 전역 정밀도 설정에 의존하지 않음)
+- 금액(KRW)과 가격은 MONEY_SCALE, 체결/보유 수량은 VOLUME_SCALE 자릿수이며,
+  주문 수량은 config.TICKER_CONFIG의 코인별 정밀도로 내림합니다. (order_volume)
+- 외부(업비트 API의 float/문자열, 설정의 Decimal) 값은 경계에서 from_float/parse/from_decimal로 한 번만 변환합니다.
+- str()은 지수 표기 없는 정확한 10진 문자열이라 DB에 그대로 저장되고, parse()로 손실 없이 복원됩니다.
+"""
+import sqlite3
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_EVEN
+import config
+
+MONEY_SCALE = config.FIXED_POINT_CONFIG["MONEY_SCALE"]
+VOLUME_SCALE = config.FIXED_POINT_CONFIG["VOLUME_SCALE"]
+_POW10 = [10 ** i for i in range(160)] # Decimal 상대(정밀도 28~60자리)와의 곱셈까지
+
+def _div_round(n, d, rounding=ROUND_HALF_EVEN):
+    """정수 나눗셈 n / d를 rounding 방식으로 반올림합니다. (d > 0)"""
+    q, r = divmod(n, d)
+    if r == 0 or rounding == ROUND_DOWN and n >= 0:
+        return q
+    if rounding == ROUND_DOWN: # 음수는 0 쪽으로
+        return q + 1
+    twice = 2 * r
+    if twice > d or twice == d and q % 2:
+        return q + 1
+    return q
+
+def _rescale(units, scale, new_scale, rounding=ROUND_HALF_EVEN):
+    if new_scale >= scale:
+        return units * _POW10[new_scale - scale]
+    return _div_round(units, _POW10[scale - new_scale], rounding)
+
+def _coerce(value, scale):
+    """연산 상대를 Fixed로 바꿉니다. 지원하지 않는 타입이면 None."""
+    if isinstance(value, Fixed):
+        return value
+    if isinstance(value, int):
+        return Fixed(value * _POW10[scale], scale)
+    if isinstance(value, Decimal):
+        return Fixed.from_decimal(value)
+    if isinstance(value, float):
+        return Fixed.from_float(value, scale)
+    return None
+
+class Fixed:
+    __slots__ = ('units', 'scale')
+
+    def __init__(self, units=0, scale=MONEY_SCALE):
+        self.units = units
+        self.scale = scale
+
+    # --- 생성 ---
+    @classmethod
+    def from_float(cls, value, scale=MONEY_SCALE):
+        """
+        API 등에서 받은 float를 scale 자릿수로 반올림합니다. float의 최단 10진 표기(repr)를 기준으로 하므로
+        Decimal(str(value))와 같은 값이 됩니다. (큰 가격에서는 float 자체에 소수 8자리 정보가 없음)
+        numpy 2의 np.float64 같은 float 하위 타입은 repr이 'np.float64(1.5)'이므로 먼저 float로 바꿉니다.
+        """
+        return cls.parse(repr(float(value)), scale)
+
+    @classmethod
+    def from_decimal(cls, value, scale=None):
+        """Decimal을 변환합니다. scale이 없으면 Decimal의 소수 자릿수를 그대로 씁니다. (문자열 변환 없음)"""
+        sign, digits, exponent = value.as_tuple()
+        units = 0
+        for digit in digits:
+            units = units * 10 + digit
+        if sign:
+            units = -units
+        own_scale = max(-exponent, 0)
+        if exponent > 0:
+            units *= _POW10[exponent]
+        fixed = cls(units, own_scale)
+        return fixed if scale is None else fixed.rescale(scale)
+
+    @classmethod
+    def parse(cls, text, scale=MONEY_SCALE):
+        """DB 등에 저장된 10진 문자열을 scale 자릿수로 복원합니다. (이전에 Decimal로 저장한 지수 표기도 허용)"""
+        whole, _, frac = text.strip().partition('.')
+        try:
+            units = int(whole + frac)
+        except ValueError: # 지수 표기 등
+            return cls.from_decimal(Decimal(text), scale)
+        digits = len(frac)
+        if digits == scale: # DB에 저장한 값은 대부분 그대로
+            return cls(units, scale)
+        if digits > scale:
+            return cls(_div_round(units, _POW10[digits - scale]), scale)
+        return cls(units * _POW10[scale - digits], scale)
+
+    @classmethod
+    def of(cls, value, scale=MONEY_SCALE):
+        """Fixed/int/Decimal/float/문자열/None(→0)을 scale 자릿수의 Fixed로 변환합니다."""
+        if value is None:
+            return cls(0, scale)
+        if isinstance(value, str):
+            return cls.parse(value, scale)
+        return _coerce(value, scale).rescale(scale)
+
+    # --- 변환 ---
+    def rescale(self, scale, rounding=ROUND_HALF_EVEN):
+        if scale == self.scale:
+            return self
+        return Fixed(_rescale(self.units, self.scale, scale, rounding), scale)
+
+    def quantize(self, exp, rounding=ROUND_HALF_EVEN):
+        """Decimal.quantize와 같은 용법. exp는 Decimal('0.001') 같은 단위 또는 자릿수(int)."""
+        scale = exp if isinstance(exp, int) else max(-exp.as_tuple().exponent, 0)
+        return Fixed(_rescale(self.units, self.scale, scale, rounding), scale)
+
+    def to_decimal(self):
+        return Decimal(self.units).scaleb(-self.scale)
+
+    def __float__(self):
+        return self.units / _POW10[self.scale]
+
+    def __int__(self):
+        return int(self.units / _POW10[self.scale]) if self.units < 0 else self.units // _POW10[self.scale]
+
+    def __str__(self):
+        if self.scale == 0:
+            return str(self.units)
+        digits = str(abs(self.units)).rjust(self.scale + 1, '0')
+        return f"{'-' if self.units < 0 else ''}{digits[:-self.scale]}.{digits[-self.scale:]}"
+
+    def __repr__(self):
+        return f"Fixed('{self}')"
+
+    def __format__(self, spec):
+        return format(self.to_decimal(), spec)
+
+    # --- 연산 ---
+    # 같은 자릿수의 Fixed끼리는 변환 없이 바로 계산합니다. 상대가 Decimal/int/float이면 정확히 계산한 뒤
+    # self의 자릿수로 한 번 반올림합니다. (Decimal('1') / 3 같은 비율이 자릿수를 늘리지 않도록)
+    def _other(self, other):
+        return other if other.__class__ is Fixed else _coerce(other, self.scale)
+
+    def __add__(self, other):
+        if other.__class__ is Fixed and other.scale == self.scale: # 장부 연산 대부분
+            return Fixed(self.units + other.units, self.scale)
+        fixed = self._other(other)
+        if fixed is None:
+            return NotImplemented
+        if fixed.scale == self.scale:
+            return Fixed(self.units + fixed.units, self.scale)
+        scale = max(self.scale, fixed.scale)
+        result = Fixed(self.units * _POW10[scale - self.scale] + fixed.units * _POW10[scale - fixed.scale], scale)
+        return result if fixed is other else result.rescale(self.scale)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if other.__class__ is Fixed and other.scale == self.scale:
+            return Fixed(self.units - other.units, self.scale)
+        fixed = self._other(other)
+        if fixed is None:
+            return NotImplemented
+        if fixed.scale == self.scale:
+            return Fixed(self.units - fixed.units, self.scale)
+        result = self + Fixed(-fixed.units, fixed.scale)
+        return result if fixed is other else result.rescale(self.scale)
+
+    def __rsub__(self, other):
+        return -self + other
+
+    def __mul__(self, other):
+        if other.__class__ is int: # 정수배는 반올림 없음
+            return Fixed(self.units * other, self.scale)
+        fixed = self._other(other)
+        if fixed is None:
+            return NotImplemented
+        if fixed.scale == 0:
+            return Fixed(self.units * fixed.units, self.scale)
+        scale = self.scale if self.scale >= fixed.scale or fixed is not other else fixed.scale
+        d = _POW10[self.scale + fixed.scale - scale]
+        q, r = divmod(self.units * fixed.units, d)
+        if r and (2 * r > d or 2 * r == d and q & 1): # ROUND_HALF_EVEN (_div_round를 펼침)
+            q += 1
+        return Fixed(q, scale)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        fixed = self._other(other)
+        if fixed is None:
+            return NotImplemented
+        if fixed.units == 0:
+            raise ZeroDivisionError("Fixed division by zero")
+        scale = self.scale if self.scale >= fixed.scale or fixed is not other else fixed.scale
+        n, d = self.units * _POW10[scale + fixed.scale - self.scale], fixed.units
+        if d < 0:
+            n, d = -n, -d
+        q, r = divmod(n, d)
+        if r and (2 * r > d or 2 * r == d and q & 1): # ROUND_HALF_EVEN
+            q += 1
+        return Fixed(q, scale)
+
+    def __rtruediv__(self, other):
+        fixed = _coerce(other, self.scale)
+        if fixed is None:
+            return NotImplemented
+        return (fixed / self).rescale(self.scale)
+
+    def __neg__(self):
+        return Fixed(-self.units, self.scale)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return Fixed(abs(self.units), self.scale)
+
+    def __bool__(self):
+        return self.units != 0
+
+    # --- 비교 ---
+    def _cmp(self, other):
+        """self - other의 부호를 가진 정수. 비교할 수 없는 타입이면 None. (Decimal 등과도 정확히 비교)"""
+        if other.__class__ is not Fixed:
+            other = _coerce(other, self.scale)
+            if other is None:
+                return None
+        if other.scale == self.scale:
+            return self.units - other.units
+        scale = max(self.scale, other.scale)
+        return self.units * _POW10[scale - self.scale] - other.units * _POW10[scale - other.scale]
+
+    def __eq__(self, other):
+        diff = self._cmp(other)
+        return NotImplemented if diff is None else diff == 0
+
+    def __lt__(self, other):
+        diff = self._cmp(other)
+        return NotImplemented if diff is None else diff < 0
+
+    def __le__(self, other):
+        diff = self._cmp(other)
+        return NotImplemented if diff is None else diff <= 0
+
+    def __gt__(self, other):
+        diff = self._cmp(other)
+        return NotImplemented if diff is None else diff > 0
+
+    def __ge__(self, other):
+        diff = self._cmp(other)
+        return NotImplemented if diff is None else diff >= 0
+
+    def __hash__(self):
+        return hash(self.to_decimal())
+
+# --- 자릿수 ---
+def quantity_scale(ticker):
+    """코인 주문 수량의 소수 자릿수. (config.TICKER_CONFIG, 없으면 8자리)"""
+    precision = config.TICKER_CONFIG.get(ticker, Decimal('0.00000001'))
+    return max(-precision.as_tuple().exponent, 0)
+
+def money(value):
+    """금액/가격 (MONEY_SCALE 자릿수). float/Decimal/문자열/None을 받습니다."""
+    if value.__class__ is str: # DB/API 문자열이 가장 흔하므로 바로 파싱
+        return Fixed.parse(value, MONEY_SCALE)
+    return Fixed.of(value, MONEY_SCALE)
+
+def volume(value):
+    """체결/보유 수량 (거래소가 알려주는 VOLUME_SCALE 자릿수)."""
+    if value.__class__ is str:
+        return Fixed.parse(value, VOLUME_SCALE)
+    return Fixed.of(value, VOLUME_SCALE)
+
+def volume_step(ticker):
+    """ticker의 최소 주문 수량 단위. (이보다 작은 잔량은 주문할 수 없음)"""
+    return Fixed(1, quantity_scale(ticker))
+
+def order_volume(value, ticker):
+    """
+    ticker의 주문 수량 정밀도(TICKER_CONFIG)로 내림한 수량. 주문 수량은 모두 이 함수로 자릅니다.
+    입력을 다른 자릿수로 먼저 반올림하지 않고 정확한 값에서 한 번만 내림하므로, 결과가 입력보다 커지지 않습니다.
+    """
+    if value.__class__ is str:
+        value = Decimal(value)
+    elif isinstance(value, float):
+        value = Decimal(repr(value))
+    if isinstance(value, Decimal):
+        value = Fixed.from_decimal(value)
+    elif isinstance(value, int):
+        value = Fixed(value, 0)
+    return value.rescale(quantity_scale(ticker), ROUND_DOWN)
+
+ZERO = Fixed(0, MONEY_SCALE)
+
+# SQLite에는 정확한 10진 문자열로 바로 저장
+sqlite3.register_adapter(Fixed, str)
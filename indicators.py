@@ -0,0 +1,105 @@
+"""
+NumPy로 구현한 전략 지표. (pandas-ta 0.3.14b와 같은 정의)
+
+DataFrame을 만들지 않고 float64 배열을 받아 같은 길이의 배열을 반환합니다. 계산할 수 없는 앞부분은 NaN이며,
+pandas의 rolling(min_periods=length)과 ewm(adjust=True, min_periods=length) 규칙을 그대로 따릅니다.
+- sma, stdev(ddof=0), wma(가중치 1..n), rma(= ewm alpha=1/n)
+- cci(c=0.015, 전형가격 hlc3), bbands, rsi, atr(rma), supertrend
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+def _rolling(x, length, func):
+    out = np.full(len(x), np.nan)
+    if len(x) >= length:
+        out[length - 1:] = func(sliding_window_view(x, length))
+    return out
+
+def sma(x, length):
+    return _rolling(x, length, lambda w: w.mean(axis=1))
+
+def stdev(x, length):
+    return _rolling(x, length, lambda w: w.std(axis=1))
+
+def wma(x, length=9):
+    weights = np.arange(1, length + 1, dtype=float)
+    return _rolling(x, length, lambda w: w @ weights / weights.sum())
+
+def rma(x, length):
+    """ewm(alpha=1/length, adjust=True, min_periods=length).mean(). 중간의 NaN은 가중치만 감쇠시킵니다."""
+    decay = 1 - 1 / length
+    out = np.full(len(x), np.nan)
+    num = den = 0.0
+    valid = 0
+    for i, value in enumerate(x):
+        num *= decay
+        den *= decay
+        if value == value: # NaN이 아닌 값
+            num += value
+            den += 1
+            valid += 1
+        if valid >= length:
+            out[i] = num / den
+    return out
+
+def cci(high, low, close, length=20, c=0.015):
+    typical = (high + low + close) / 3
+    def calc(w):
+        mean = w.mean(axis=1)
+        mad = np.abs(w - mean[:, None]).mean(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (w[:, -1] - mean) / (c * mad)
+    return _rolling(typical, length, calc)
+
+def bbands(close, length=20, std=2.0):
+    """(하단, 중간, 상단)"""
+    mid = sma(close, length)
+    deviation = std * stdev(close, length)
+    return mid - deviation, mid, mid + deviation
+
+def rsi(close, length=14):
+    diff = np.empty(len(close))
+    diff[:1] = np.nan
+    diff[1:] = np.diff(close)
+    positive = np.where(diff < 0, 0.0, diff)
+    negative = np.where(diff > 0, 0.0, diff)
+    positive_avg, negative_avg = rma(positive, length), rma(negative, length)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 * positive_avg / (positive_avg + np.abs(negative_avg))
+
+def atr(high, low, close, length=14):
+    high_low = high - low
+    if (high_low == 0).any():
+        high_low = high_low + np.finfo(float).eps # pandas-ta non_zero_range와 동일
+    prev_close = np.empty(len(close))
+    prev_close[:1] = np.nan
+    prev_close[1:] = close[:-1]
+    true_range = np.nanmax(np.abs(np.vstack([high_low, high - prev_close, prev_close - low])), axis=0)
+    true_range[:1] = np.nan
+    return rma(true_range, length)
+
+def supertrend(high, low, close, length=10, multiplier=2.0):
+    """(trend, direction, long, short). pandas-ta의 SUPERT, SUPERTd, SUPERTl, SUPERTs 열과 같습니다."""
+    n = len(close)
+    hl2 = (high + low) / 2
+    band = multiplier * atr(high, low, close, length)
+    upper, lower = hl2 + band, hl2 - band
+    direction = np.ones(n)
+    trend = np.zeros(n)
+    long, short = np.full(n, np.nan), np.full(n, np.nan)
+    for i in range(1, n):
+        if close[i] > upper[i - 1]:
+            direction[i] = 1
+        elif close[i] < lower[i - 1]:
+            direction[i] = -1
+        else:
+            direction[i] = direction[i - 1]
+            if direction[i] > 0 and lower[i] < lower[i - 1]:
+                lower[i] = lower[i - 1]
+            if direction[i] < 0 and upper[i] > upper[i - 1]:
+                upper[i] = upper[i - 1]
+        if direction[i] > 0:
+            trend[i] = long[i] = lower[i]
+        else:
+            trend[i] = short[i] = upper[i]
+    return trend, direction, long, short
@@ -1,16 +1,189 @@
+"""
+비동기 구조화 로깅.
+
+거래 스레드에서는 QueueHandler가 레코드를 큐에 넣기만 하고, 파일/콘솔 기록은 QueueListener 스레드가 처리하므로
+로그 I/O가 판단 경로의 지연에 더해지지 않습니다.
+- LOG_FILE          : JSON lines (ts, level, logger, thread, ticker, msg[, exc]). ticker는 ticker_context로 지정한 값
+- 콘솔              : 기존과 같은 사람이 읽는 형식
+- 페이로드 사이드카 : log_payload로 남긴 AI 원문 응답/브리핑 등 큰 데이터는 {PAYLOAD_DIR}/payloads_YYYYMMDD.jsonl.gz에
+                      gzip으로 따로 기록합니다. JSON 직렬화는 호출 시점에 하고(넘긴 dict가 나중에 바뀌어도 무관),
+                      압축과 기록은 리스너 스레드에서 합니다.
+- fork된 자식 프로세스(스윕 워커 등)는 부모의 LOG_FILE을 함께 쓰거나 회전시키지 않도록 콘솔에만 기록합니다.
+- 메시지 포맷      : 거래 주기의 로그는 logger.info("[%s] ...", ticker)처럼 %-style 인자로 남기며, 인자가 모두 불변 값이면
+                      포맷도 리스너 스레드에서 합니다. 원화 금액은 Krw(amount)로 감싸면 천 단위 구분 기호가 붙습니다.
+"""
+import os
+import gzip
+import json
+import queue
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 import config
+from fixed_point import Fixed
+
+PAYLOAD_LOGGER_NAME = 'TradingBot.payload'
 
 log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+# 현재 처리 중인 코인. 워커 스레드의 process_ticker에서 지정하며 모든 로그 레코드에 ticker 필드로 붙습니다.
+_ticker = contextvars.ContextVar('ticker', default=None)
+
+@contextmanager
+def ticker_context(ticker):
+    token = _ticker.set(ticker)
+    try:
+        yield
+    finally:
+        _ticker.reset(token)
+
+class Krw:
+    """원화 금액 로그 인자. logger.info("%s원", Krw(amount))처럼 쓰면 천 단위 구분 포맷을 리스너 스레드에서 합니다."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return f"{self.value:,.0f}"
+
+# 나중에 포맷해도 값이 바뀌지 않는 인자 타입. %-style 인자가 모두 이 타입이면 메시지 포맷을 리스너 스레드로 미룹니다.
+_DEFERRABLE_ARGS = (str, int, float, Decimal, Fixed, Krw, type(None))
+
+class _ContextQueueHandler(QueueHandler):
+    """
+    호출한 스레드에서 ticker를 붙여 큐에 넣습니다. (예외 트레이스백은 따로 보존)
+    logger.info("... %s", x)의 인자가 모두 불변 값이면 메시지 포맷도 리스너 스레드에서 하고,
+    dict나 예외 객체처럼 나중에 바뀔 수 있는 인자가 있으면 호출 시점의 값으로 여기서 포맷합니다.
+    """
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        if getattr(record, 'ticker', None) is None:
+            record.ticker = _ticker.get()
+        if record.args and not (isinstance(record.args, tuple) and all(isinstance(arg, _DEFERRABLE_ARGS) for arg in record.args)):
+            record.msg, record.args = record.getMessage(), None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = log_formatter.formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'ticker': getattr(record, 'ticker', None),
+            'msg': record.getMessage(),
+        }
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+class GzipPayloadHandler(logging.Handler):
+    """log_payload 레코드를 날짜별 gzip JSON lines 파일에 이어 씁니다. (리스너 스레드에서만 호출됨)"""
+    def __init__(self, directory):
+        super().__init__()
+        self.directory = directory
+        self._date = None
+        self._file = None
+
+    def emit(self, record):
+        try:
+            date = datetime.fromtimestamp(record.created).strftime('%Y%m%d')
+            if date != self._date:
+                self.close_file()
+                os.makedirs(self.directory, exist_ok=True)
+                self._file = gzip.open(os.path.join(self.directory, f"payloads_{date}.jsonl.gz"), 'at', encoding='utf-8')
+                self._date = date
+            entry = json.dumps({'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+                                'kind': record.getMessage(), 'ticker': getattr(record, 'ticker', None)}, ensure_ascii=False)
+            # payload는 log_payload가 호출 시점에 직렬화해 둔 JSON 텍스트이므로 그대로 붙임
+            self._file.write(f'{entry[:-1]}, "payload": {getattr(record, "payload_json", "null")}}}\n')
+            self._file.flush() # 비정상 종료 시에도 이미 쓴 레코드는 읽을 수 있도록
+        except Exception:
+            self.handleError(record)
+
+    def close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        self.close_file()
+        super().close()
+
+def _only_payloads(record):
+    return record.name == PAYLOAD_LOGGER_NAME
+
+def _without_payloads(record):
+    return record.name != PAYLOAD_LOGGER_NAME
+
+def _build_handlers(to_file=True):
+    """리스너 핸들러 목록. to_file=False면 콘솔만 (LOG_FILE과 페이로드 파일은 열지 않음)"""
+    lc = config.LOGGING_CONFIG
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(log_formatter)
+    console_handler.addFilter(_without_payloads)
+    if not to_file:
+        return [console_handler]
+
+    file_handler = RotatingFileHandler(config.LOG_FILE, maxBytes=10*1024*1024, backupCount=5, encoding='utf-8')
+    file_handler.setFormatter(JsonFormatter() if lc["JSON_FILE"] else log_formatter)
+    file_handler.addFilter(_without_payloads)
+
+    payload_handler = GzipPayloadHandler(lc["PAYLOAD_DIR"])
+    payload_handler.addFilter(_only_payloads)
+    return [file_handler, console_handler, payload_handler]
+
+_listener = None
+
+def _start_listener(to_file=True):
+    """큐와 리스너 스레드를 (다시) 만듭니다."""
+    global _listener
+    log_queue = queue.SimpleQueue()
+    _queue_handler.queue = log_queue
+    _listener = QueueListener(log_queue, *_build_handlers(to_file), respect_handler_level=True)
+    _listener.start()
+
+def _start_child_listener():
+    """
+    fork된 자식 프로세스에는 리스너 스레드가 없으므로 새로 만듭니다. 부모가 연 LOG_FILE을 함께 쓰고 회전시키면
+    부모의 기록이 섞이거나 잘리므로, 자식은 콘솔로만 기록합니다.
+    """
+    _start_listener(to_file=False)
+
+def stop():
+    """남은 로그를 모두 기록하고 리스너를 멈춥니다. (프로그램 종료 시 자동 호출)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
 logger = logging.getLogger('TradingBot')
 logger.setLevel(logging.INFO)
+payload_logger = logging.getLogger(PAYLOAD_LOGGER_NAME)
 
 if not logger.handlers:
-    file_handler = RotatingFileHandler(config.LOG_FILE, maxBytes=10*1024*1024, backupCount=5, encoding='utf-8')
-    file_handler.setFormatter(log_formatter)
-    logger.addHandler(file_handler)
+    _queue_handler = _ContextQueueHandler(queue.SimpleQueue())
+    logger.addHandler(_queue_handler) # payload_logger도 상위(TradingBot)의 이 핸들러로 전달됨
+    _start_listener()
+    atexit.register(stop)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_start_child_listener)
 
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(log_formatter)
-    logger.addHandler(console_handler)
\ No newline at end of file
+def log_payload(kind, payload, ticker=None):
+    """
+    AI 원문 응답, 브리핑처럼 큰 데이터를 압축 사이드카 로그에 남깁니다. payload는 여기서 바로 JSON으로 직렬화하므로
+    넘긴 dict를 호출한 쪽에서 나중에 고쳐도 기록되는 내용은 호출 시점의 값입니다.
+    """
+    if config.LOGGING_CONFIG["PAYLOADS_ENABLED"]:
+        payload_json = json.dumps(payload, ensure_ascii=False, default=str)
+        payload_logger.info(kind, extra={'payload_json': payload_json, **({'ticker': ticker} if ticker else {})})
@@ -1,43 +1,94 @@
 import time
-import pyupbit
-import pandas as pd
-from decimal import Decimal, getcontext, ROUND_DOWN
+_import_started = time.perf_counter() # 시작 시간 측정 (모듈 로드 포함)
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import os
 import sys
+import math
 
 # --- 모듈 임포트 ---
-from apscheduler.schedulers.blocking import BlockingScheduler
+# 설정으로 켜는 부가 기능(모의 거래소, AI 기록, 시세 공유, 분할 실행, 스크리너, 프로파일러)은 켜져 있을 때만 main()에서 불러옵니다.
 import config
-from logger_config import logger
+from logger_config import logger, ticker_context, Krw
 import database_manager as db
 from trading_bot import TradingBot
 import ai_interface
-
-# Decimal 정밀도 설정
-getcontext().prec = 30
+import exchange_client
+import candle_clock
+from stop_watcher import StopWatcher
+import metrics
+import candle_buffer
+import signals
+import db_snapshot
+import retention
+import risk
+from fixed_point import money, volume, order_volume, volume_step, ZERO
+
+# 여러 워커 스레드가 봇별 자본/포지션을 갱신하므로, 자본 장부 변경과 총자산 집계는 이 락으로 직렬화합니다.
+ledger_lock = threading.RLock()
+# 시세 공유 서비스 클라이언트 (main에서 연결, 연결되지 않으면 업비트 API 직접 조회)
+_shared_market_data = None
+# 코인·타임프레임별 캔들 링 버퍼. 수집한 캔들을 병합하고 지표까지 계산된 링을 전략에 넘깁니다.
+_candle_buffers = candle_buffer.CandleBufferStore() if config.CANDLE_BUFFER_CONFIG["ENABLED"] else None
+# 마감 캔들별 전략 신호. 캔들이 마감될 때 한 번 계산해 두고 run_strategy는 조회만 합니다.
+_signal_table = signals.SignalTable()
+# 코인별 실행 단위를 처리하는 워커 풀 (시간 초과된 작업이 다음 주기를 막지 않도록 주기 간에 재사용)
+_worker_pool = ThreadPoolExecutor(max_workers=config.WORKER_CONFIG["MAX_WORKERS"], thread_name_prefix="TickerWorker")
+# 포트폴리오 위험 지표 (주기마다 노출/변동성/장중 낙폭 계산, 낙폭 한도를 넘으면 그날은 새 매수 중단)
+_risk = risk.PortfolioRisk()
+# 대량 시장가 주문 분할 실행 엔진 (main에서 생성. 백테스트/리플레이에서는 None이라 모든 주문을 단일 주문으로 냄)
+_execution = None
 
 # --- 주문 및 결과 처리 유틸리티 함수 ---
+def place_market_order(upbit, ticker, side, size, order_type=None, decision_price=None):
+    """
+    시장가 주문을 제출합니다. (side: 'bid'는 KRW 금액, 'ask'는 수량)
+    분할 실행 엔진이 호가 대비 크다고 판단하면 분할 실행 모주문을 시작하고 그 ID를 담아 반환합니다.
+    """
+    if _execution is not None:
+        res = _execution.submit(ticker, side, size, decision_price, order_type)
+        if res:
+            return res
+    if side == 'bid':
+        return upbit.buy_market_order(ticker, float(size))
+    return upbit.sell_market_order(ticker, float(size))
+
+def get_order(upbit, uuid):
+    """주문 조회. 분할 실행 모주문이면 자식 주문의 체결을 합친 결과를 반환합니다."""
+    if _execution is not None and _execution.owns(uuid):
+        return _execution.get_order(uuid)
+    return upbit.get_order(uuid)
+
+def cancel_order(upbit, uuid):
+    if _execution is not None and _execution.owns(uuid):
+        return _execution.cancel_order(uuid)
+    return upbit.cancel_order(uuid)
+
+def order_fill_details(order):
+    """주문 조회 결과의 체결 내역으로 평균 체결가와 체결 수량을 계산합니다. 체결된 수량이 없으면 None."""
+    trades = order.get('trades', [])
+    total_cost = sum((money(trade['price']) * volume(trade['volume']) for trade in trades), ZERO)
+    total_volume = volume(order.get('executed_volume') or '0')
+    if total_volume > 0:
+        return {'avg_price': total_cost / total_volume, 'volume': total_volume}
+    return None
+
 def wait_for_order_completion(upbit, uuid, timeout=120):
     start_time = time.time()
     while time.time() - start_time < timeout:
         try:
-            order = upbit.get_order(uuid)
-            if order and order['state'] == 'done':
-                trades = order.get('trades', [])
-                total_cost = sum(Decimal(trade['price']) * Decimal(trade['volume']) for trade in trades)
-                total_volume = Decimal(order['executed_volume'])
-                if total_volume > 0:
-                    avg_price = total_cost / total_volume
-                    return {'avg_price': avg_price, 'volume': total_volume}
-                return None
+            order = get_order(upbit, uuid)
+            if order and order.get('state') == 'done':
+                return order_fill_details(order)
         except Exception as e:
-            logger.error(f"주문({uuid}) 정보 조회 중 오류: {e}")
+            logger.error("주문(%s) 정보 조회 중 오류: %s", uuid, e)
         time.sleep(2)
-    logger.warning(f"주문({uuid}) 체결 대기 시간 초과.")
+    logger.warning("주문(%s) 체결 대기 시간 초과.", uuid)
     try:
-        upbit.cancel_order(uuid)
-        logger.info(f"주문({uuid})을 취소했습니다.")
+        cancel_order(upbit, uuid)
+        logger.info("주문(%s)을 취소했습니다.", uuid)
     except Exception as e:
-        logger.error(f"주문({uuid}) 취소 실패: {e}")
+        logger.error("주문(%s) 취소 실패: %s", uuid, e)
     return None
 
 def process_buy_order(bot, order_details):
@@ -45,12 +96,13 @@ def process_buy_order(bot, order_details):
     avg_price = order_details['avg_price']
     volume = order_details['volume']
     
-    current_value = state['avg_entry_price'] * state['total_position_size']
-    new_value = avg_price * volume
-    
-    state['total_position_size'] += volume
-    if state['total_position_size'] > 0:
-        state['avg_entry_price'] = (current_value + new_value) / state['total_position_size']
+    with ledger_lock:
+        current_value = state['avg_entry_price'] * state['total_position_size']
+        new_value = avg_price * volume
+        
+        state['total_position_size'] += volume
+        if state['total_position_size'] > 0:
+            state['avg_entry_price'] = (current_value + new_value) / state['total_position_size']
 
 def process_sell_order(bot, order_details, exit_reason, order_type):
     state = bot.state
@@ -61,60 +113,90 @@ def process_sell_order(bot, order_details, exit_reason, order_type):
     exit_value = exit_price * volume
     fee = (entry_cost + exit_value) * config.FEE_RATE
     pnl = (exit_value - entry_cost) - fee
-    pnl_percentage = (exit_price / state['avg_entry_price'] - 1) * 100 if state['avg_entry_price'] > 0 else Decimal('0')
+    pnl_percentage = (exit_price / state['avg_entry_price'] - 1) * 100 if state['avg_entry_price'] > 0 else ZERO
     
-    trade_log = { 'ticker': bot.ticker, 'entry_time': state.get('entry_date'), 'exit_time': pd.Timestamp.now(tz="Asia/Seoul").strftime('%Y-%m-%d %H:%M:%S'), 'pnl': pnl, 'pnl_percentage': pnl_percentage, 'exit_reason': exit_reason, 'entry_ai_reason': ", ".join(state.get('entry_ai_reasons', [])), 'avg_entry_price': state['avg_entry_price'], 'exit_price': exit_price, 'quantity': volume, 'total_fee': fee }
+    trade_log = { 'ticker': bot.ticker, 'entry_time': state.get('entry_date'), 'exit_time': candle_clock.now().strftime('%Y-%m-%d %H:%M:%S'), 'pnl': pnl, 'pnl_percentage': pnl_percentage, 'exit_reason': exit_reason, 'entry_ai_reason': ", ".join(state.get('entry_ai_reasons', [])), 'avg_entry_price': state['avg_entry_price'], 'exit_price': exit_price, 'quantity': volume, 'total_fee': fee }
     db.log_trade(trade_log)
     
-    state['capital'] += pnl
-    state['today_pnl'] += pnl
-    state['total_position_size'] -= volume
+    with ledger_lock:
+        # 매수 시 자본에서 미리 차감한 원가를 실현 손익과 함께 돌려줍니다.
+        # (이전 버전은 손익만 더했음. 기존 DB의 capital 보정은 database_manager._warn_legacy_capital 참고)
+        state['capital'] += entry_cost + pnl
+        state['today_pnl'] += pnl
+        state['total_position_size'] -= volume
     
-    precision = config.TICKER_CONFIG.get(bot.ticker, Decimal('0.00000001'))
-    if state['total_position_size'] < precision:
+    if state['total_position_size'] < volume_step(bot.ticker):
         reset_bot_state(bot)
     elif order_type == 'SELL_PARTIAL':
         state['position_status'] = 'PARTIAL_EXIT'
         state['trailing_stop_active'] = True
-        logger.info(f"[{bot.ticker}] 부분 익절. PARTIAL_EXIT 상태로 전환하고 Trailing Stop을 활성화합니다.")
+        logger.info("[%s] 부분 익절. PARTIAL_EXIT 상태로 전환하고 Trailing Stop을 활성화합니다.", bot.ticker)
     
     return pnl
 
+def refund_unfilled(bot, details):
+    """매수 주문 때 capital에서 미리 차감한 금액 중 체결에 쓰이지 않은 부분을 돌려줍니다."""
+    unfilled = (bot.state.get('pending_order_amount') or ZERO) - details['avg_price'] * details['volume']
+    with ledger_lock:
+        bot.state['capital'] += max(unfilled, ZERO)
+
+def bot_equity(state, current_price):
+    """
+    봇 하나의 총자산을 계산합니다. 매수 원가는 주문 시 capital에서 차감되므로,
+    현금(capital) + 보유 물량 평가액 + 체결 확인 전인 매수 주문 금액을 더합니다.
+    """
+    equity = state.get('capital', ZERO)
+    size = state.get('total_position_size', ZERO)
+    if size > 0:
+        price = money(current_price) if current_price else state['avg_entry_price']
+        equity += price * size
+    if state.get('position_status') == 'ORDER_PENDING' and 'BUY' in (state.get('pending_order_type') or ''):
+        equity += state.get('pending_order_amount') or ZERO
+    return equity
+
 def reset_bot_state(bot):
-    logger.info(f"--- [{bot.ticker}] 포지션 완전 종료. 상태 초기화 ---")
+    logger.info("--- [%s] 포지션 완전 종료. 상태 초기화 ---", bot.ticker)
     bot.state.update({ "position_status": "NONE",
-                       "avg_entry_price": Decimal('0'),
-                       "total_position_size": Decimal('0'),
+                       "avg_entry_price": ZERO,
+                       "total_position_size": ZERO,
                        "trailing_stop_active": False,
-                       "supertrend_stop_price": Decimal('0'),
+                       "supertrend_stop_price": ZERO,
                        "entry_date": None,
-                       "trade_capital": Decimal('0'),
+                       "trade_capital": ZERO,
                        "entry_ai_reasons": [],
                        "pending_order_uuid": None,
                        "pending_order_type": None,
                        "is_take_profit_ready": False
                     })
     bot.current_task = 'WAITING_FOR_CONDITION1'
+    bot.vanguard_stop_price = ZERO
     bot.last_briefing_data = None
     bot.hold_reasons.clear()
     if config.RISK_CONFIG["ENABLE_DAILY_LOSS_LIMIT"]:
         loss_limit = bot.state['capital'] * config.RISK_CONFIG["DAILY_LOSS_LIMIT_PERCENTAGE"]
         if bot.state['today_pnl'] < 0 and bot.state['today_pnl'] <= loss_limit:
             bot.state['trading_enabled'] = False
-            logger.critical(f"🚨 [{bot.ticker}] 일일 손실 한도 초과! 오늘 거래를 중단합니다.")
+            logger.critical("🚨 [%s] 일일 손실 한도 초과! 오늘 거래를 중단합니다.", bot.ticker)
 
 def initialize_bots(upbit):
     """DB에서 상태를 로드하거나, 초기 자본을 할당하여 봇 인스턴스를 생성합니다."""
     db.create_tables()
     all_states = db.load_all_states()
+    if config.SCREENER_CONFIG["ENABLED"]:
+        # 동적 선정 모드: 포지션을 보유 중인 코인만 복원하고, 나머지는 refresh_universe에서 스크리너로 선정합니다.
+        tickers = [t for t, s in all_states.items() if s.get('position_status', 'NONE') != 'NONE']
+        logger.info("동적 코인 선정 모드. 보유 포지션 복원: %s", tickers)
+        return [TradingBot(t, all_states[t]) for t in tickers]
+
     tickers = list(config.TICKER_ALLOCATION.keys())
     
     new_tickers = [t for t in tickers if t not in all_states]
+    # 잔고 조회(get_balance)와 상태 기록은 새 코인이 있을 때만 합니다. 기존 코인은 DB의 상태를 그대로 사용
     if new_tickers:
-        logger.info(f"새로운 코인 발견: {new_tickers}. 초기 자본을 할당합니다.")
+        logger.info("새로운 코인 발견: %s. 초기 자본을 할당합니다.", new_tickers)
         try:
-            total_krw = Decimal(str(upbit.get_balance("KRW")))
-            existing_capital = sum(s.get('capital', Decimal('0')) for s in all_states.values())
+            total_krw = money(upbit.get_balance("KRW"))
+            existing_capital = sum((s.get('capital', ZERO) for s in all_states.values()), ZERO)
             available_krw = total_krw - existing_capital
             
             new_ratio_sum = sum(config.TICKER_ALLOCATION[t] for t in new_tickers)
@@ -124,57 +206,153 @@ def initialize_bots(upbit):
                     allocated_capital = (available_krw * ratio) / new_ratio_sum
                     if allocated_capital > 0:
                         all_states[ticker] = {"capital": allocated_capital}
-                        logger.info(f" -> [{ticker}]: {allocated_capital:,.0f}원 할당")
+                        logger.info(" -> [%s]: %s원 할당", ticker, Krw(allocated_capital))
             else:
                 logger.warning("새로운 코인에 할당할 가용 자본이 없거나 할당 비율이 0입니다.")
         except Exception as e:
-            logger.error(f"초기 자본 할당 실패: {e}")
+            logger.error("초기 자본 할당 실패: %s", e)
             sys.exit()
 
     bot_instances = [TradingBot(t, all_states.get(t)) for t in tickers]
-    for bot in bot_instances:
-        db.update_state(bot.ticker, bot.state)
+    db.update_states([(bot.ticker, bot.state) for bot in bot_instances if bot.ticker in new_tickers])
     return bot_instances
 
+def _warm_ticker(bot):
+    """한 코인의 캔들 링/지표와 마감 캔들 신호를 미리 채웁니다. 선발대 보유 중이면 스탑 감시용 손절 가격도 복원합니다."""
+    with bot.lock, ticker_context(bot.ticker):
+        cached_data = fetch_ticker_data(bot.ticker)
+        ticker_signals = _signal_table.update(bot.ticker, cached_data)
+        signal_1h = (ticker_signals or {}).get('60m')
+        if bot.state['position_status'] == 'VANGUARD_IN' and signal_1h and signal_1h['bb_low'] is not None:
+            bot.vanguard_stop_price = money(signal_1h['bb_low'])
+        return cached_data is not None
+
+def warm_caches(bots):
+    """
+    거래 시작 전에 모든 코인의 데이터 수집과 지표/신호 계산을 워커 풀에서 동시에 실행합니다.
+    첫 캔들 마감 주기는 새 캔들만 병합하면 되고, 스탑 감시는 재시작 직후부터 손절 가격을 갖습니다.
+    """
+    futures = {_worker_pool.submit(_warm_ticker, bot): bot for bot in bots}
+    done, not_done = wait(futures, timeout=config.STARTUP_CONFIG["WARM_TIMEOUT_SEC"])
+    warmed = 0
+    for future in done:
+        try:
+            warmed += bool(future.result())
+        except Exception as e:
+            logger.warning("[%s] 캐시 예열 실패 (첫 주기에 다시 수집): %s", futures[future].ticker, e)
+    if not_done:
+        logger.warning("캐시 예열이 %s초 내에 끝나지 않은 코인: %s", config.STARTUP_CONFIG['WARM_TIMEOUT_SEC'], [futures[f].ticker for f in not_done])
+    return warmed
+
+def refresh_universe(upbit, bots):
+    """
+    전체 KRW 마켓 스크리닝 결과로 거래 대상 코인을 갱신합니다. (bots 리스트를 제자리에서 수정)
+    포지션이 없고 후보에서 빠진 봇은 자본을 반납하고 제외되며, 빈 자리에는 가용 자본을 균등 배분해 새 봇을 생성합니다.
+    새로 추가된 코인 목록을 반환합니다.
+    """
+    import screener # SCREENER_CONFIG["ENABLED"]일 때만 호출됨
+    try:
+        shortlist = screener.build_shortlist()
+    except Exception as e:
+        logger.error("마켓 스크리닝 실패: %s. 기존 코인으로 계속 진행합니다.", e)
+        return []
+
+    with ledger_lock:
+        kept = []
+        for bot in bots:
+            if bot.ticker in shortlist or bot.state['position_status'] != 'NONE':
+                kept.append(bot)
+            else:
+                logger.info("[%s] 스크리닝 후보에서 제외되어 거래를 종료합니다. (반납 자본: %s원)", bot.ticker, Krw(bot.state['capital']))
+                bot.state['capital'] = ZERO
+                db.update_state(bot.ticker, bot.state)
+                if _candle_buffers is not None:
+                    _candle_buffers.drop(bot.ticker)
+                _signal_table.drop(bot.ticker)
+
+        kept_tickers = {bot.ticker for bot in kept}
+        free_slots = config.SCREENER_CONFIG["MAX_ACTIVE_TICKERS"] - len(kept)
+        new_tickers = [t for t in shortlist if t not in kept_tickers][:max(free_slots, 0)]
+
+        new_bots = []
+        if new_tickers:
+            try:
+                total_krw = money(upbit.get_balance("KRW"))
+                available_krw = total_krw - sum((bot.state['capital'] for bot in kept), ZERO)
+                allocated_capital = available_krw / len(new_tickers)
+                if allocated_capital > config.MIN_ORDER_KRW:
+                    for ticker in new_tickers:
+                        bot = TradingBot(ticker, {"capital": allocated_capital})
+                        db.update_state(bot.ticker, bot.state)
+                        new_bots.append(bot)
+                        logger.info(" -> [%s] 스크리닝 후보로 선정. %s원 할당", ticker, Krw(allocated_capital))
+                else:
+                    logger.warning("새로 선정된 코인에 할당할 가용 자본이 부족합니다.")
+            except Exception as e:
+                logger.error("선정 코인 자본 할당 실패: %s", e)
+
+        bots[:] = kept + new_bots
+    return [bot.ticker for bot in new_bots]
+
 def check_pending_order(upbit, bot):
     uuid = bot.state.get('pending_order_uuid')
     order_type = bot.state.get('pending_order_type')
     
     if not uuid or not order_type:
-        logger.warning(f"[{bot.ticker}] PENDING 상태이나 UUID/Type 정보가 없습니다. 상태를 NONE으로 강제 복구합니다.")
+        logger.warning("[%s] PENDING 상태이나 UUID/Type 정보가 없습니다. 상태를 NONE으로 강제 복구합니다.", bot.ticker)
         reset_bot_state(bot)
         db.update_state(bot.ticker, bot.state)
         return
 
     try:
-        order_info = upbit.get_order(uuid)
+        order_info = get_order(upbit, uuid)
         if not order_info:
-            logger.warning(f"[{bot.ticker}] 주문({uuid}) 정보를 가져올 수 없습니다. 다음 주기에 재시도.")
+            logger.warning("[%s] 주문(%s) 정보를 가져올 수 없습니다. 다음 주기에 재시도.", bot.ticker, uuid)
             return
 
         # 시나리오 1: 주문 성공
         if order_info['state'] == 'done':
-            logger.info(f"[{bot.ticker}] 보류 주문({uuid}, {order_type}) 체결을 확인했습니다.")
+            logger.info("[%s] 보류 주문(%s, %s) 체결을 확인했습니다.", bot.ticker, uuid, order_type)
             details = wait_for_order_completion(upbit, uuid, timeout=10) # 데이터 확보를 위해 짧게 재확인
             if details:
                 if 'BUY' in order_type:
                     process_buy_order(bot, details)
+                    refund_unfilled(bot, details) # 시장가 매수의 체결 금액은 주문 금액보다 조금 작을 수 있음
                     bot.state['position_status'] = 'VANGUARD_IN' if order_type == 'BUY_VANGUARD' else 'FULL_POSITION'
                 elif 'SELL' in order_type:
-                    pnl = process_sell_order(bot, details, order_type)
-                    logger.info(f" -> [{bot.ticker}] 매도 체결 완료! 실현 손익: {pnl:,.0f}원")
+                    pnl = process_sell_order(bot, details, order_type, order_type)
+                    logger.info(" -> [%s] 매도 체결 완료! 실현 손익: %s원", bot.ticker, Krw(pnl))
                 bot.state['pending_order_uuid'] = None
                 bot.state['pending_order_type'] = None
+                bot.state['pending_order_amount'] = None
             else: # 체결은 됐는데 정보 가져오기 실패
-                logger.error(f"[{bot.ticker}] 주문({uuid})은 체결되었으나 상세 정보 조회에 실패했습니다. 수동 확인 필요.")
+                logger.error("[%s] 주문(%s)은 체결되었으나 상세 정보 조회에 실패했습니다. 수동 확인 필요.", bot.ticker, uuid)
                 bot.state['trading_enabled'] = False # 안전을 위해 해당 코인 거래 중지
 
+        # 시나리오 2-1: 일부만 체결된 뒤 나머지가 취소됨 (시장가 주문의 유동성 부족 등)
+        elif order_info['state'] == 'cancel' and order_fill_details(order_info):
+            details = order_fill_details(order_info)
+            logger.warning("[%s] 보류 주문(%s, %s)이 일부(%s)만 체결된 뒤 취소되었습니다. 체결분만 반영합니다.", bot.ticker, uuid, order_type, details['volume'])
+            if 'BUY' in order_type:
+                process_buy_order(bot, details)
+                refund_unfilled(bot, details)
+                bot.state['position_status'] = 'VANGUARD_IN' if order_type == 'BUY_VANGUARD' else 'FULL_POSITION'
+            else:
+                pnl = process_sell_order(bot, details, order_type, order_type)
+                logger.info(" -> [%s] 부분 매도 체결! 실현 손익: %s원", bot.ticker, Krw(pnl))
+                if bot.state['position_status'] == 'ORDER_PENDING': # 남은 물량이 있으면 매도 이전 상태로 복구
+                    bot.state['position_status'] = 'VANGUARD_IN' if order_type == 'SELL_VANGUARD' else 'FULL_POSITION'
+            bot.state['pending_order_uuid'] = None
+            bot.state['pending_order_type'] = None
+            bot.state['pending_order_amount'] = None
+
         # 시나리오 3: 주문 실패/취소
         elif order_info['state'] in ['cancel', 'reject']:
-            logger.warning(f"[{bot.ticker}] 보류 주문({uuid}, {order_type})이 '{order_info['state']}' 상태입니다. 주문 이전으로 상태를 복구합니다.")
+            logger.warning("[%s] 보류 주문(%s, %s)이 '%s' 상태입니다. 주문 이전으로 상태를 복구합니다.", bot.ticker, uuid, order_type, order_info['state'])
             # 주문 제출 시 미리 차감했던 자본 복구
             if 'BUY' in order_type and bot.state.get('pending_order_amount'):
-                bot.state['capital'] += bot.state['pending_order_amount']
+                with ledger_lock:
+                    bot.state['capital'] += bot.state['pending_order_amount']
             
             # 이전 포지션 상태로 복구
             if order_type == 'BUY_VANGUARD': bot.state['position_status'] = 'NONE'
@@ -187,215 +365,429 @@ def check_pending_order(upbit, bot):
         
         # 시나리오 2: 주문 대기
         else: # wait, watch
-            logger.info(f"[{bot.ticker}] 주문({uuid}, {order_type}) 체결을 계속 대기합니다.")
+            logger.info("[%s] 주문(%s, %s) 체결을 계속 대기합니다.", bot.ticker, uuid, order_type)
             # 타임아웃 로직 추가 가능 (예: 제출 후 2주기(30분) 이상 대기 시 강제 취소)
 
         db.update_state(bot.ticker, bot.state)
 
     except Exception as e:
-        logger.error(f"[{bot.ticker}] 보류 주문({uuid}) 확인 중 심각한 오류 발생: {e}")
+        logger.error("[%s] 보류 주문(%s) 확인 중 심각한 오류 발생: %s", bot.ticker, uuid, e)
+
+def submit_order(upbit, bot, order_to_execute, order_data, now, decision_price=None):
+    """
+    매매 신호에 따라 주문을 제출하고, 성공 시 봇을 ORDER_PENDING 상태로 전환합니다. 제출된 주문의 UUID를 반환합니다.
+    decision_price: 판단 시점 가격 (분할 실행 시 슬리피지 기준)
+    """
+    order_uuid, res = None, None
+
+    # 주문 실행 전, 최종적으로 거래 가능 상태인지 다시 한번 확인 (손실 한도 우회 방지)
+    if not bot.state.get('trading_enabled', True):
+        logger.warning("[%s] 주문 실행 직전, 거래 중지 상태가 확인되어 주문을 취소합니다.", bot.ticker)
+        return None
+
+    if order_to_execute.startswith('BUY') and not _risk.allows_entry():
+        logger.warning("[%s] 포트폴리오 장중 낙폭 킬 스위치가 켜져 있어 %s 주문을 내지 않습니다.", bot.ticker, order_to_execute)
+        return None
 
-# --- 봇의 핵심 로직 (이전 while 루프의 내용) ---
-def run_trading_cycle(upbit, bots):
-    """15분마다 실행될 봇의 메인 사이클"""
     try:
-        now = pd.Timestamp.now(tz="Asia/Seoul")
-        today_str = now.strftime('%Y-%m-%d')
-        logger.info(f"--- 15분 주기 시작 ({now.strftime('%H:%M:%S')}) ---")
+        # 매수 주문
+        if order_to_execute.startswith('BUY'):
+            amount = ZERO
+            if order_to_execute == 'BUY_VANGUARD':
+                percentage = money(order_data.get('percentage', 0))
+                amount = bot.state['capital'] * percentage
+            elif order_to_execute == 'BUY_MAIN_FORCE':
+                vanguard_value = bot.state['avg_entry_price'] * bot.state['total_position_size']
+                remaining_capital = bot.state['trade_capital'] - vanguard_value
+                percentage = money(order_data.get('percentage', 0))
+                amount = remaining_capital * percentage
+
+            if amount >= config.MIN_ORDER_KRW:
+                logger.info("[%s] %s 신호에 따라 매수 주문 제출 (예상 금액: %s원)", bot.ticker, order_to_execute, Krw(amount))
+                res = place_market_order(upbit, bot.ticker, 'bid', amount, order_to_execute, decision_price)
+                if res and 'uuid' in res:
+                    order_uuid = res['uuid']
+                    # [버그 수정] 자본 즉시 차감
+                    with ledger_lock:
+                        bot.state['capital'] -= amount
+                    bot.state['pending_order_amount'] = amount # 복구용 금액 저장
+                    if order_to_execute == 'BUY_VANGUARD':
+                        bot.state['trade_capital'] = bot.state['capital'] + amount
+                        bot.state['entry_ai_reasons'] = [f"Vanguard: {order_data.get('reason')}"]
+                        bot.state['entry_date'] = now.strftime('%Y-%m-%d %H:%M:%S')
+                    else: # BUY_MAIN_FORCE
+                        bot.state['entry_ai_reasons'].append(f"Main Force: {order_data.get('reason')}")
+
+        # 매도 주문
+        elif order_to_execute.startswith('SELL'):
+            amount_to_sell = bot.state['total_position_size']
+            if order_to_execute == 'SELL_PARTIAL':
+                percentage = money(order_data.get('percentage', 0))
+                amount_to_sell *= percentage
+
+            final_amount_to_sell = order_volume(amount_to_sell, bot.ticker)
+            if final_amount_to_sell > 0:
+                logger.info("[%s] %s 신호에 따라 매도 주문 제출 (예상 수량: %s)", bot.ticker, order_to_execute, float(final_amount_to_sell))
+                res = place_market_order(upbit, bot.ticker, 'ask', final_amount_to_sell, order_to_execute, decision_price)
+                if res and 'uuid' in res:
+                    order_uuid = res['uuid']
 
-        # --- 1. 자정마다 일일 데이터 리셋 ---
-        for bot in bots:
-            if bot.state.get('today_date') != today_str:
-                logger.info(f"[{bot.ticker}] 새 거래일({today_str}) 시작. 일일 데이터를 초기화합니다.")
-                bot.state['today_date'] = today_str
-                bot.state['today_pnl'] = Decimal('0')
-                bot.state['trading_enabled'] = True
-                db.update_state(bot.ticker, bot.state)
+    except Exception as e:
+        logger.error("[%s] 주문 제출 중 오류 발생: %s. API 응답: %s", bot.ticker, e, res)
+        # 주문 제출 실패 시, 미리 차감했던 자본 복구
+        if 'BUY' in order_to_execute and bot.state.get('pending_order_amount'):
+            with ledger_lock:
+                bot.state['capital'] += bot.state['pending_order_amount']
+            bot.state['pending_order_amount'] = None
+            db.update_state(bot.ticker, bot.state)
 
-        # --- 2. 모든 코인 데이터 캐시 ---
-        data_cache = {}
-        for bot in bots:
-            try:
-                data_cache[bot.ticker] = {
-                    '15m': pyupbit.get_ohlcv(bot.ticker, interval="minute15", count=50),
-                    '60m': pyupbit.get_ohlcv(bot.ticker, interval="minute60", count=50),
-                    '240m': pyupbit.get_ohlcv(bot.ticker, interval="minute240", count=50),
-                    'price': pyupbit.get_current_price(bot.ticker)
-                }
-                time.sleep(config.API_CALL_DELAY_SEC)
-            except Exception as e:
-                logger.error(f"[{bot.ticker}] 데이터 수집 중 오류 발생: {e}")
-                data_cache[bot.ticker] = None # 오류 발생 시 None으로 처리
+    # 주문 제출 후 상태 변경
+    if order_uuid:
+        bot.state['position_status'] = 'ORDER_PENDING'
+        bot.state['pending_order_uuid'] = order_uuid
+        bot.state['pending_order_type'] = order_to_execute
+        db.update_state(bot.ticker, bot.state)
+        logger.info("[%s] 주문 제출 성공. UUID: %s. PENDING 상태로 전환합니다.", bot.ticker, order_uuid)
+    return order_uuid
+
+def run_bot_cycle(upbit, bot, cached_data_for_ticker, closed_event, now, ticker_signals=None):
+    """한 코인에 대해 보류 주문 확인, 전략 실행, AI 판단, 주문 제출을 수행합니다. ticker_signals: 마감 캔들 신호"""
+    # --- 3-1. 보류 주문 상태 최우선 확인 ---
+    if bot.state['position_status'] == 'ORDER_PENDING':
+        with metrics.timed('reconcile'):
+            check_pending_order(upbit, bot)
+        return
 
-        # --- 3. 각 봇의 전략 실행 및 주문 처리 ---
-        for bot in bots:
-            # --- 3-1. 보류 주문 상태 최우선 확인 ---
-            if bot.state['position_status'] == 'ORDER_PENDING':
-                check_pending_order(upbit, bot)
-                continue
-            
-            # --- 3-2. 거래 중지 상태 확인 ---
-            if not bot.state.get('trading_enabled', True):
-                continue
+    # --- 3-2. 거래 중지 상태 확인 ---
+    if not bot.state.get('trading_enabled', True):
+        return
 
-            cached_data_for_ticker = data_cache.get(bot.ticker)
-            if not cached_data_for_ticker: # 데이터 수집 실패 시 건너뛰기
-                continue
+    if not cached_data_for_ticker: # 데이터 수집 실패 시 건너뛰기
+        return
 
-            decision, data = bot.run_strategy(cached_data_for_ticker)
-            if not decision:
-                continue
+    if not closed_event: # 이 코인의 캔들 마감 이벤트가 없으면 건너뛰기
+        return
+    event_time, closed_timeframes = closed_event
+    with metrics.timed('strategy'):
+        decision, data = bot.run_strategy(cached_data_for_ticker, event_time, closed_timeframes, ticker_signals)
+    if not decision:
+        return
 
-            ai_decision_result = None
-            order_to_execute, order_data = None, {}
-
-            # --- 3-3. AI 판단 요청 ---
-            if decision.startswith('EVALUATE'):
-                ai_func_map = {
-                    'EVALUATE_VANGUARD': ai_interface.get_ai_decision,
-                    'EVALUATE_MAIN_FORCE': ai_interface.get_ai_main_force_decision,
-                    'EVALUATE_TAKE_PROFIT': ai_interface.get_ai_take_profit_decision
-                }
-                ai_func = ai_func_map[decision]
-                ai_output = ai_func(bot.ticker, data, bot.hold_reasons)
-                
-                if ai_output.get('decision') in ['Buy', 'BUY_MAIN_FORCE', 'Sell']:
-                    order_to_execute = decision.replace('EVALUATE_', '')
-                    if order_to_execute == 'TAKE_PROFIT': 
-                        order_to_execute = 'SELL_PARTIAL'
-                    order_data = ai_output
-                else:
-                    bot.hold_reasons.append(ai_output.get('reason'))
-                    if decision == 'EVALUATE_VANGUARD':
-                        logger.info(f"[{bot.ticker}] AI가 선발대 진입을 보류. 다음 15분 주기에 재평가합니다.")
-                    
-                    elif decision == 'EVALUATE_MAIN_FORCE':
-                        bot.current_task = 'CHECKING_MAIN_FORCE_EVERY_15_MIN'
-                        db.update_state(bot.ticker, bot.state)
-                        logger.info(f"[{bot.ticker}] AI가 후발대 투입을 보류. CHECKING_MAIN_FORCE_EVERY_15_MIN 임무로 전환합니다.")
-                    
-                    else:
-                        logger.info(f"[{bot.ticker}] AI가 익절을 보류. 다음 주기에 모든 조건을 다시 확인합니다.")
-
-            # --- 3-4. 기계적 매매 신호 처리 ---
-            elif decision in ['SELL_VANGUARD', 'SELL_ALL_FINAL', 'SELL_REMAINDER']:
-                order_to_execute, order_data = decision, data
-            
-            elif decision == 'UPDATE_TRAILING_STOP_PRICE':
-                bot.state['supertrend_stop_price'] = data['stop_price']
+    ai_decision_result = None
+    order_to_execute, order_data = None, {}
+
+    # --- 3-3. AI 판단 요청 ---
+    if decision.startswith('EVALUATE'):
+        with metrics.timed('ai'):
+            ai_output = ai_interface.request_decision(decision, bot.ticker, data, bot.hold_reasons)
+        metrics.inc('ai_requests', decision=ai_output.get('decision'))
+
+        if ai_output.get('decision') in ['Buy', 'BUY_MAIN_FORCE', 'Sell']:
+            order_to_execute = {'EVALUATE_VANGUARD': 'BUY_VANGUARD',
+                                'EVALUATE_MAIN_FORCE': 'BUY_MAIN_FORCE',
+                                'EVALUATE_TAKE_PROFIT': 'SELL_PARTIAL'}[decision]
+            order_data = ai_output
+        else:
+            bot.hold_reasons.append(ai_output.get('reason'))
+            if decision == 'EVALUATE_VANGUARD':
+                logger.info("[%s] AI가 선발대 진입을 보류. 다음 15분 주기에 재평가합니다.", bot.ticker)
+
+            elif decision == 'EVALUATE_MAIN_FORCE':
+                bot.current_task = 'CHECKING_MAIN_FORCE_EVERY_15_MIN'
                 db.update_state(bot.ticker, bot.state)
-                logger.info(f" -> [{bot.ticker}] SuperTrend Stop 가격 갱신: {bot.state['supertrend_stop_price']:,.0f}원")
-
-            # --- 3-5. 주문 실행 ---
-            if order_to_execute:
-                order_uuid, res = None, None
-                
-                # 주문 실행 전, 최종적으로 거래 가능 상태인지 다시 한번 확인 (손실 한도 우회 방지)
-                if not bot.state.get('trading_enabled', True):
-                    logger.warning(f"[{bot.ticker}] 주문 실행 직전, 거래 중지 상태가 확인되어 주문을 취소합니다.")
-                    continue
-                
+                logger.info("[%s] AI가 후발대 투입을 보류. CHECKING_MAIN_FORCE_EVERY_15_MIN 임무로 전환합니다.", bot.ticker)
+
+            else:
+                logger.info("[%s] AI가 익절을 보류. 다음 주기에 모든 조건을 다시 확인합니다.", bot.ticker)
+
+    # --- 3-4. 기계적 매매 신호 처리 ---
+    elif decision in ['SELL_VANGUARD', 'SELL_ALL_FINAL', 'SELL_REMAINDER']:
+        order_to_execute, order_data = decision, data
+
+    elif decision == 'UPDATE_TRAILING_STOP_PRICE':
+        bot.state['supertrend_stop_price'] = data['stop_price']
+        db.update_state(bot.ticker, bot.state)
+        logger.info(" -> [%s] SuperTrend Stop 가격 갱신: %s원", bot.ticker, Krw(bot.state['supertrend_stop_price']))
+
+    # --- 3-5. 주문 실행 ---
+    if order_to_execute:
+        with metrics.timed('order_submit'):
+            submit_order(upbit, bot, order_to_execute, order_data, now, cached_data_for_ticker.get('price'))
+        metrics.inc('orders', order_type=order_to_execute)
+
+def fetch_ticker_data(ticker, close_time=None):
+    """
+    한 코인의 15분/1시간/4시간봉과 현재가를 수집합니다. 시세 공유 서비스가 있으면 공유 메모리에서 읽고,
+    없거나 해당 코인이 게시되지 않았으면 업비트 API를 호출합니다. (exchange_client: 연결 재사용, 요청 한도 공유, 재시도)
+    재시도 후에도 받지 못한 시세가 있으면 None을 반환해 이번 주기에서 이 코인을 건너뜁니다.
+    링 버퍼를 사용하면 수집한 캔들을 링에 병합하고, DataFrame 대신 (지표가 계산된) 링을 반환합니다.
+    """
+    data = None
+    if _shared_market_data is not None:
+        data = _shared_market_data.get_ticker_data(ticker, close_time)
+    if data is None:
+        data = {}
+        for key, interval in [('15m', 'minute15'), ('60m', 'minute60'), ('240m', 'minute240')]:
+            data[key] = exchange_client.get_ohlcv(ticker, interval=interval, count=50)
+        data['price'] = exchange_client.get_current_price(ticker)
+        missing = [key for key, value in data.items() if value is None]
+        if missing:
+            logger.warning("[%s] 시세 수집 실패: %s", ticker, missing)
+            return None
+    if _candle_buffers is not None:
+        return _candle_buffers.update(ticker, data)
+    return data
+
+def reset_daily_state(bot, today_str):
+    if bot.state.get('today_date') != today_str:
+        logger.info("[%s] 새 거래일(%s) 시작. 일일 데이터를 초기화합니다.", bot.ticker, today_str)
+        bot.state['today_date'] = today_str
+        bot.state['today_pnl'] = ZERO
+        bot.state['trading_enabled'] = True
+        db.update_state(bot.ticker, bot.state)
+
+def process_ticker(upbit, bot, closed_event, now, today_str):
+    """
+    한 코인의 실행 단위. 일일 리셋, 데이터 수집, 전략 실행 및 주문 처리를 워커 스레드에서 독립적으로 수행합니다.
+    수집한 데이터를 반환하며, 이전 주기의 작업이 아직 끝나지 않은 봇은 건너뜁니다.
+    """
+    if not bot.lock.acquire(timeout=config.WORKER_CONFIG["LOCK_WAIT_SEC"]):
+        logger.warning("[%s] 이전 작업이 아직 진행 중이어서 이번 주기를 건너뜁니다.", bot.ticker)
+        return None
+    try:
+        with ticker_context(bot.ticker): # 이 코인 작업 중의 모든 로그에 ticker 필드를 붙임
+            # --- 1. 자정마다 일일 데이터 리셋 ---
+            with metrics.timed('daily_reset'):
+                reset_daily_state(bot, today_str)
+
+            # --- 2. 코인 데이터 수집 ---
+            try:
+                with metrics.timed('fetch'):
+                    cached_data = fetch_ticker_data(bot.ticker, closed_event[0] if closed_event else None)
+            except Exception as e:
+                logger.error("[%s] 데이터 수집 중 오류 발생: %s", bot.ticker, e)
+                cached_data = None # 오류 발생 시 None으로 처리
+
+            # --- 2-1. 마감된 캔들의 신호 계산 (캔들마다 한 번) ---
+            ticker_signals = None
+            if cached_data:
                 try:
-                    # 매수 주문
-                    if order_to_execute.startswith('BUY'):
-                        amount = Decimal('0')
-                        if order_to_execute == 'BUY_VANGUARD':
-                            percentage = Decimal(str(order_data.get('percentage', 0)))
-                            amount = bot.state['capital'] * percentage
-                        elif order_to_execute == 'BUY_MAIN_FORCE':
-                            vanguard_value = bot.state['avg_entry_price'] * bot.state['total_position_size']
-                            remaining_capital = bot.state['trade_capital'] - vanguard_value
-                            percentage = Decimal(str(order_data.get('percentage', 0)))
-                            amount = remaining_capital * percentage
-                        
-                        if amount >= config.MIN_ORDER_KRW:
-                            logger.info(f"[{bot.ticker}] {order_to_execute} 신호에 따라 매수 주문 제출 (예상 금액: {amount:,.0f}원)")
-                            res = upbit.buy_market_order(bot.ticker, float(amount))
-                            if res and 'uuid' in res:
-                                order_uuid = res['uuid']
-                                # [버그 수정] 자본 즉시 차감
-                                bot.state['capital'] -= amount
-                                bot.state['pending_order_amount'] = amount # 복구용 금액 저장
-                                if order_to_execute == 'BUY_VANGUARD':
-                                    bot.state['trade_capital'] = bot.state['capital'] + amount
-                                    bot.state['entry_ai_reasons'] = [f"Vanguard: {order_data.get('reason')}"]
-                                    bot.state['entry_date'] = now.strftime('%Y-%m-%d %H:%M:%S')
-                                else: # BUY_MAIN_FORCE
-                                    bot.state['entry_ai_reasons'].append(f"Main Force: {order_data.get('reason')}")
-
-                    # 매도 주문
-                    elif order_to_execute.startswith('SELL'):
-                        amount_to_sell = bot.state['total_position_size']
-                        if order_to_execute == 'SELL_PARTIAL':
-                            percentage = Decimal(str(order_data.get('percentage', 0)))
-                            amount_to_sell *= percentage
-                        
-                        precision = config.TICKER_CONFIG.get(bot.ticker, Decimal('0.00000001'))
-
-                        final_amount_to_sell = amount_to_sell.quantize(precision, rounding=ROUND_DOWN)
-                        if final_amount_to_sell > 0:
-                            logger.info(f"[{bot.ticker}] {order_to_execute} 신호에 따라 매도 주문 제출 (예상 수량: {float(final_amount_to_sell)})")
-                            res = upbit.sell_market_order(bot.ticker, float(final_amount_to_sell))
-                            if res and 'uuid' in res:
-                                order_uuid = res['uuid']
-                
+                    with metrics.timed('signals'):
+                        ticker_signals = _signal_table.update(bot.ticker, cached_data)
                 except Exception as e:
-                    logger.error(f"[{bot.ticker}] 주문 제출 중 오류 발생: {e}. API 응답: {res}")
-                    # 주문 제출 실패 시, 미리 차감했던 자본 복구
-                    if 'BUY' in order_to_execute and bot.state.get('pending_order_amount'):
-                        bot.state['capital'] += bot.state['pending_order_amount']
-                        bot.state['pending_order_amount'] = None
-                        db.update_state(bot.ticker, bot.state)
+                    logger.error("[%s] 신호 계산 중 오류 발생: %s", bot.ticker, e)
+
+            # --- 3. 전략 실행 및 주문 처리 ---
+            run_bot_cycle(upbit, bot, cached_data, closed_event, now, ticker_signals)
+            return cached_data
+    except Exception as e:
+        logger.error("[%s] 실행 단위 처리 중 오류 발생: %s", bot.ticker, e)
+        return None
+    finally:
+        bot.lock.release()
+
+def _submit_timed(started_at, key, func, *args):
+    """func(*args)를 워커 풀에 제출합니다. 워커에서 실제로 시작한 시각을 started_at[key]에 남깁니다."""
+    def run():
+        started_at[key] = time.monotonic()
+        return func(*args)
+    return _worker_pool.submit(run)
+
+def _wait_tickers(futures, started_at):
+    """
+    코인별 작업을 기다립니다. 제한 시간(TICKER_TIMEOUT_SEC)은 작업마다 워커에서 시작한 시각부터 잽니다.
+    (코인이 워커보다 많아 대기열에서 기다린 시간은 포함하지 않음)
+    워커가 모두 멈춘 작업에 묶여 시작하지 못하는 작업은 (대기열 차례 수 × 제한 시간)이 지나면 취소합니다.
+    futures는 {future: 키}이며, (끝난 future 집합, 시간 초과로 제외한 future 집합)을 반환합니다.
+    """
+    timeout = config.WORKER_CONFIG["TICKER_TIMEOUT_SEC"]
+    rounds = max(math.ceil(len(futures) / config.WORKER_CONFIG["MAX_WORKERS"]), 1)
+    queue_deadline = time.monotonic() + timeout * rounds
+    done, pending, timed_out = set(), set(futures), set()
+    while pending:
+        now = time.monotonic()
+        for future in list(pending):
+            if future.done():
+                continue
+            started = started_at.get(futures[future])
+            if now >= (queue_deadline if started is None else started + timeout):
+                future.cancel() # 아직 시작하지 않은 작업은 실행하지 않음 (실행 중이면 결과만 버림)
+                pending.discard(future)
+                timed_out.add(future)
+        if not pending:
+            break
+        deadlines = [started_at[futures[f]] + timeout for f in pending if futures[f] in started_at]
+        finished, pending = wait(pending, timeout=max(min(deadlines + [queue_deadline]) - now, 0), return_when=FIRST_COMPLETED)
+        done |= finished
+    return done, timed_out
 
-                # --- 3-6. 주문 제출 후 상태 변경 ---
-                if order_uuid:
-                    bot.state['position_status'] = 'ORDER_PENDING'
-                    bot.state['pending_order_uuid'] = order_uuid
-                    bot.state['pending_order_type'] = order_to_execute
-                    db.update_state(bot.ticker, bot.state)
-                    logger.info(f"[{bot.ticker}] 주문 제출 성공. UUID: {order_uuid}. PENDING 상태로 전환합니다.")
+# --- 봇의 핵심 로직 (이전 while 루프의 내용) ---
+def run_trading_cycle(upbit, bots, events=None):
+    """캔들 마감 이벤트마다 실행될 봇의 메인 사이클. events가 없으면 현재 시각 기준으로 실행합니다."""
+    cycle_started = time.perf_counter()
+    try:
+        now = candle_clock.now()
+        if events is None:
+            latest_close = candle_clock.floor_to_close(now, candle_clock.BASE_TIMEFRAME)
+            events = [candle_clock.CandleCloseEvent(bot.ticker, tf, latest_close)
+                      for bot in bots for tf in candle_clock.closed_timeframes_at(latest_close)]
+        closed_by_ticker = candle_clock.group_events(events)
+        if closed_by_ticker:
+            now = max(close_time for close_time, _ in closed_by_ticker.values())
+        today_str = now.strftime('%Y-%m-%d')
+        logger.info("--- 15분 주기 시작 (캔들 마감 %s) ---", now.strftime('%H:%M:%S'))
+
+        # --- 1~3. 코인별 실행 단위를 워커 풀에서 병렬 실행 ---
+        # 한 코인의 지연/오류가 다른 코인을 막지 않으며, 주기 소요 시간은 가장 느린 코인에 의해 결정됩니다.
+        started_at = {}
+        futures = {_submit_timed(started_at, bot.ticker, process_ticker, upbit, bot, closed_by_ticker.get(bot.ticker), now, today_str): bot
+                   for bot in bots}
+        done, timed_out = _wait_tickers({future: bot.ticker for future, bot in futures.items()}, started_at)
+        for future in timed_out:
+            ticker = futures[future].ticker
+            if ticker in started_at:
+                logger.error("[%s] 실행 단위가 %s초 내에 끝나지 않았습니다. 이번 주기에서 제외합니다.",
+                             ticker, config.WORKER_CONFIG['TICKER_TIMEOUT_SEC'])
+            else:
+                logger.error("[%s] 모든 워커가 다른 작업에 묶여 실행 단위를 시작하지 못했습니다. 이번 주기에서 제외합니다.", ticker)
+
+        data_cache = {}
+        for future in done:
+            ticker = futures[future].ticker
+            try:
+                data_cache[ticker] = future.result()
+            except Exception as e:
+                logger.error("[%s] 실행 단위에서 처리되지 않은 오류 발생: %s", ticker, e)
+                data_cache[ticker] = None
 
         # --- 4. 총자산 기록 ---
         try:
-            all_bot_states = db.load_all_states().values()
-            total_realized_capital = sum(s.get('capital', Decimal('0')) for s in all_bot_states)
-            unrealized_pnl = Decimal('0')
-            for state in all_bot_states:
-                if state.get('position_status') != 'NONE' and state.get('total_position_size', Decimal('0')) > 0:
-                    current_price = data_cache.get(state['ticker'], {}).get('price')
-                    if current_price:
-                        market_value = Decimal(str(current_price)) * state['total_position_size']
-                        cost = state['avg_entry_price'] * state['total_position_size']
-                        unrealized_pnl += (market_value - cost)
-            total_equity = total_realized_capital + unrealized_pnl
-            db.log_capital(now.strftime('%Y-%m-%d %H:%M:%S'), total_equity)
-            logger.info(f"총자산 기록 완료: {total_equity:,.0f}원")
+            with metrics.timed('equity_log'):
+                with ledger_lock:
+                    total_equity = sum(bot_equity(bot.state, (data_cache.get(bot.ticker) or {}).get('price')) for bot in bots)
+                db.log_capital(now.strftime('%Y-%m-%d %H:%M:%S'), total_equity)
+            logger.info("총자산 기록 완료: %s원", Krw(total_equity))
+        except Exception as e:
+            logger.error("총자산 기록 중 오류 발생: %s", e)
+
+        # --- 4-1. 포트폴리오 위험 지표 (노출, 미실현 손익, 변동성/상관계수, 장중 낙폭 킬 스위치) ---
+        try:
+            with metrics.timed('risk'):
+                with ledger_lock:
+                    summary = _risk.update(bots, {t: d for t, d in data_cache.items() if d}, now)
+            logger.info("포트폴리오 위험: 노출 %s원 (%.1f%%), 미실현 손익 %s원, 장중 낙폭 %.2f%%, 변동성(연율) %.1f%%",
+                        Krw(summary['exposure']), summary['exposure_ratio'] * 100, Krw(summary['unrealized_pnl']),
+                        summary['drawdown'] * 100, summary['portfolio_vol'] * 100)
         except Exception as e:
-            logger.error(f"총자산 기록 중 오류 발생: {e}")
+            logger.error("포트폴리오 위험 계산 중 오류 발생: %s", e)
+
+        # --- 5. 주기 지표 기록 ---
+        metrics.observe('cycle', time.perf_counter() - cycle_started)
+        metrics.inc('cycles')
+        cycle_rows = metrics.collect_cycle()
+        if config.METRICS_CONFIG["ENABLED"] and config.METRICS_CONFIG["SAVE_TO_DB"]:
+            try:
+                db.log_cycle_metrics(now.strftime('%Y-%m-%d %H:%M:%S'), cycle_rows)
+            except Exception as e:
+                logger.error("주기 지표 기록 중 오류 발생: %s", e)
+
+        # --- 6. 대시보드용 읽기 전용 스냅샷 게시 (백그라운드, 다음 캔들 마감까지 쓰기가 거의 없는 시점) ---
+        db_snapshot.maybe_publish()
+
+        # --- 7. 오래된 기록 압축/보존 (하루 한 번, 백그라운드) ---
+        retention.maybe_run()
 
     except (KeyboardInterrupt, SystemExit):
         logger.info("종료 신호(Ctrl+C)가 감지되어 거래 주기를 중단하고 프로그램을 종료합니다.")
         raise  # 스케줄러의 메인 except 블록으로 예외를 다시 던져서 정상 종료시킴
     except Exception as e:
-        logger.error(f"거래 주기 실행 중 심각한 오류 발생: {e}")
+        logger.error("거래 주기 실행 중 심각한 오류 발생: %s", e)
 
 def main():
     logger.info("✅ 자동매매 봇 프로그램이 시작되었습니다.")
+    startup = {'모듈 로드': time.perf_counter() - _import_started}
+    phase_started = time.perf_counter()
     try:
-        upbit = pyupbit.Upbit(config.ACCESS_KEY, config.SECRET_KEY)
-        logger.info(f"업비트 연결 성공! 현재 보유 KRW: {upbit.get_balance('KRW'):,.0f}원")
+        if config.SIM_EXCHANGE_CONFIG["ENABLED"]:
+            # 모의 거래: 실제 주문 대신 로컬 거래소 시뮬레이터를 사용하고, 상태는 별도 DB에 저장
+            import exchange_sim
+            db.set_db_file(config.SIM_EXCHANGE_CONFIG["DB_FILE"])
+            upbit = exchange_sim.SimulatedExchange()
+            logger.info("모의 거래소로 실행합니다. (DB: %s)", config.SIM_EXCHANGE_CONFIG['DB_FILE'])
+        else:
+            upbit = exchange_client.Upbit(config.ACCESS_KEY, config.SECRET_KEY)
+        logger.info("업비트 연결 성공! 현재 보유 KRW: %s원", Krw(upbit.get_balance('KRW')))
     except Exception as e:
-        logger.error(f"업비트 연결 실패: {e}")
+        logger.error("업비트 연결 실패: %s", e)
         return
-
+    startup['거래소 연결'] = time.perf_counter() - phase_started
+
+    if config.AI_REPLAY_CONFIG["RECORD_LIVE"]:
+        import ai_replay
+        ai_interface.set_provider(ai_replay.RecordingProvider())
+        logger.info("AI 판단을 %s에 기록합니다.", config.AI_REPLAY_CONFIG['STORE_FILE'])
+
+    if config.METRICS_CONFIG["ENABLED"] and config.METRICS_CONFIG["HTTP_ENABLED"]:
+        metrics.start_http_server()
+
+    global run_trading_cycle, _shared_market_data, _execution
+    if config.PROFILER_CONFIG["ENABLED"]:
+        import profiler
+        run_trading_cycle = profiler.profiled(run_trading_cycle)
+        if profiler.install_signal_handler():
+            logger.info("SIGUSR1 신호(kill -USR1 %s)로 거래 주기 프로파일링을 켤 수 있습니다.", os.getpid())
+        if config.PROFILER_CONFIG["PROFILE_NEXT_CYCLES"]:
+            profiler.arm(config.PROFILER_CONFIG["PROFILE_NEXT_CYCLES"])
+
+    if config.MARKET_DATA_CONFIG["USE_SHARED_SERVICE"]:
+        import market_data_service
+        _shared_market_data = market_data_service.connect()
+    if config.EXECUTION_CONFIG["ENABLED"]:
+        import execution
+        _execution = execution.ExecutionEngine(upbit)
+
+    phase_started = time.perf_counter()
     bots = initialize_bots(upbit)
+    if config.SCREENER_CONFIG["ENABLED"]:
+        refresh_universe(upbit, bots)
+    startup['봇 상태 로드'] = time.perf_counter() - phase_started
+
+    if config.STARTUP_CONFIG["WARM_CACHES"]:
+        phase_started = time.perf_counter()
+        warmed = warm_caches(bots)
+        startup['캐시 예열'] = time.perf_counter() - phase_started
+        logger.info("캐시 예열 완료: %s/%s개 코인", warmed, len(bots))
+    
+    clock = candle_clock.CandleClock([bot.ticker for bot in bots])
     
-    scheduler = BlockingScheduler(timezone='Asia/Seoul')
-    scheduler.add_job(run_trading_cycle, 'cron', minute='*/15', args=[upbit, bots])
+    if config.STOP_WATCHER_CONFIG["ENABLED"]:
+        def on_stop_triggered(bot, order_type, order_data):
+            submit_order(upbit, bot, order_type, order_data, candle_clock.now())
+        price_source = _shared_market_data.get_prices if _shared_market_data else None
+        StopWatcher(bots, on_stop_triggered, price_source=price_source).start()
+
+    # --- 거래 준비 완료까지 걸린 시간 ---
+    ready_sec = time.perf_counter() - _import_started
+    metrics.observe('startup', ready_sec)
+    logger.info("거래 준비 완료: %.2f초 (%s)", ready_sec, ', '.join(f'{name} {sec:.2f}초' for name, sec in startup.items()))
+    db_snapshot.maybe_publish(force=True)
+    if config.STARTUP_CONFIG["PRELOAD_AI_SDK"]:
+        threading.Thread(target=ai_interface.preload, name="AIPreload", daemon=True).start()
     
-    logger.info("스케줄러가 시작되었습니다. 15분 주기로 작업을 실행합니다.")
+    logger.info("스케줄러가 시작되었습니다. 캔들이 마감될 때마다 작업을 실행합니다.")
     try:
-        scheduler.start()
+        while True:
+            # 주기가 길어져 여러 경계가 지나갔더라도, 놓친 마감 이벤트를 모두 한 번에 전달받습니다.
+            events = clock.wait_for_events()
+            closes_4h = [e.close_time for e in events if e.timeframe == '240m']
+            if config.SCREENER_CONFIG["ENABLED"] and closes_4h:
+                # 4시간봉 마감마다 거래 대상을 갱신하고, 새 코인도 이번 마감 이벤트를 받도록 추가합니다.
+                added = refresh_universe(upbit, bots)
+                clock.set_tickers([bot.ticker for bot in bots])
+                latest_close = max(closes_4h)
+                events += [candle_clock.CandleCloseEvent(t, tf, latest_close)
+                           for t in added for tf in candle_clock.closed_timeframes_at(latest_close)]
+            run_trading_cycle(upbit, bots, events)
     except (KeyboardInterrupt, SystemExit):
         logger.info("스케줄러가 종료되었습니다.")
 
@@ -0,0 +1,235 @@
+"""
+여러 봇 프로세스가 같은 시세를 공유하기 위한 로컬 시세 서비스.
+
+서비스 프로세스(python market_data_service.py)만 업비트에서 캔들/현재가를 가져와 공유 메모리에 게시하고,
+각 봇 프로세스는 SharedMarketData로 공유 메모리를 붙여 필요한 최근 캔들만 복사해 읽습니다.
+봇 프로세스를 추가해도 API 요청은 늘지 않습니다.
+
+공유 메모리 구성 (모두 8바이트 정렬)
+- header  int64[8]                         : MAGIC, 코인 수, 캔들 용량, 필드 수, 구성 버전
+- names   bytes[n, 16]                     : 코인 이름
+- meta    int64[n, TF, 5]                  : 활성 버퍼 번호, 버퍼0 행 수, 버퍼1 행 수, 갱신 시각(ns), 게시 세대
+- candles float64[n, TF, 2, capacity, F]   : 이중 버퍼 캔들. 쓰기는 비활성 버퍼에 한 뒤 활성 번호만 바꿉니다.
+  게시 세대는 쓰기 전후에 1씩 올리는 seqlock 카운터(쓰는 중이면 홀수)입니다. 읽는 쪽은 복사 전후의 세대를 비교해,
+  복사하는 동안 다음 게시가 그 버퍼를 다시 쓰기 시작했으면 다시 읽습니다.
+- quotes  float64[n, 2]                    : 현재가, 갱신 시각(epoch 초)
+"""
+import time
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory, resource_tracker
+from logger_config import logger
+import config
+import candle_clock
+import exchange_client
+
+MAGIC = 0x55504254 # 'UPBT'
+LAYOUT_VERSION = 2 # meta에 게시 세대 추가
+READ_RETRIES = 100
+NAME_BYTES = 16
+TIMEFRAMES = {'15m': 'minute15', '60m': 'minute60', '240m': 'minute240'}
+FIELDS = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'value']
+
+def _layout(n_tickers, capacity):
+    """각 영역의 (오프셋, dtype, shape)를 계산합니다."""
+    n_tf, n_fields = len(TIMEFRAMES), len(FIELDS)
+    regions, offset = {}, 0
+    for name, dtype, shape in [
+        ('header', np.int64, (8,)),
+        ('names', np.uint8, (n_tickers, NAME_BYTES)),
+        ('meta', np.int64, (n_tickers, n_tf, 5)),
+        ('candles', np.float64, (n_tickers, n_tf, 2, capacity, n_fields)),
+        ('quotes', np.float64, (n_tickers, 2)),
+    ]:
+        regions[name] = (offset, dtype, shape)
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+        offset = (offset + 7) // 8 * 8
+    return regions, offset
+
+def _views(buf, regions):
+    return {name: np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset) for name, (offset, dtype, shape) in regions.items()}
+
+class MarketDataPublisher:
+    """서비스 프로세스에서 공유 메모리를 만들고 시세를 기록합니다."""
+    def __init__(self, tickers, name=None, capacity=None):
+        self.tickers = list(tickers)
+        self.index = {t: i for i, t in enumerate(self.tickers)}
+        capacity = capacity or config.MARKET_DATA_CONFIG["CAPACITY"]
+        regions, size = _layout(len(self.tickers), capacity)
+        name = name or config.MARKET_DATA_CONFIG["SHM_NAME"]
+        try:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            logger.warning("이전 시세 공유 메모리(%s)를 정리했습니다.", name)
+        except FileNotFoundError:
+            pass
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.arrays = _views(self.shm.buf, regions)
+        self.capacity = capacity
+        for ticker, i in self.index.items():
+            self.arrays['names'][i, :] = 0
+            encoded = ticker.encode()[:NAME_BYTES]
+            self.arrays['names'][i, :len(encoded)] = np.frombuffer(encoded, dtype=np.uint8)
+        self.arrays['header'][:5] = [MAGIC, len(self.tickers), capacity, len(FIELDS), LAYOUT_VERSION]
+
+    def publish_candles(self, ticker, timeframe, df):
+        if df is None or df.empty:
+            return
+        i, t = self.index[ticker], list(TIMEFRAMES).index(timeframe)
+        meta = self.arrays['meta'][i, t]
+        inactive = 1 - int(meta[0])
+        tail = df.iloc[-self.capacity:]
+        rows = len(tail)
+        block = self.arrays['candles'][i, t, inactive]
+        meta[4] += 1 # 게시 시작 (홀수)
+        # pyupbit 인덱스(KST, tz 없음)를 그대로 초 단위로 저장 (인덱스 해상도는 pandas 버전마다 다름)
+        block[:rows, 0] = tail.index.as_unit('s').asi8
+        block[:rows, 1:] = tail[FIELDS[1:]].to_numpy(dtype=float)
+        meta[1 + inactive] = rows
+        meta[3] = time.time_ns()
+        meta[0] = inactive # 마지막에 활성 버퍼를 바꿔 읽는 쪽이 항상 완성된 버퍼만 보도록 함
+        meta[4] += 1 # 게시 완료 (짝수)
+
+    def publish_prices(self, prices):
+        now = time.time()
+        for ticker, price in prices.items():
+            if ticker in self.index and price is not None:
+                i = self.index[ticker]
+                self.arrays['quotes'][i, 0] = price
+                self.arrays['quotes'][i, 1] = now
+
+    def close(self):
+        self.arrays = None
+        self.shm.close()
+        self.shm.unlink()
+
+class SharedMarketData:
+    """봇 프로세스에서 공유 메모리 시세를 읽습니다. 게시되지 않은 코인은 None을 반환하므로 호출 측에서 API로 대체합니다."""
+    def __init__(self, name=None):
+        name = name or config.MARKET_DATA_CONFIG["SHM_NAME"]
+        self.shm = shared_memory.SharedMemory(name=name)
+        # 읽기 전용 사용자가 종료될 때 공유 메모리가 해제되지 않도록 자원 추적에서 제외
+        resource_tracker.unregister(self.shm._name, 'shared_memory')
+        header = np.ndarray((8,), dtype=np.int64, buffer=self.shm.buf)
+        if header[0] != MAGIC or header[4] != LAYOUT_VERSION:
+            raise RuntimeError(f"시세 공유 메모리({name}) 형식이 올바르지 않습니다. (시세 서비스를 다시 시작하세요)")
+        n_tickers, capacity = int(header[1]), int(header[2])
+        regions, _ = _layout(n_tickers, capacity)
+        self.arrays = _views(self.shm.buf, regions)
+        for array in self.arrays.values():
+            array.flags.writeable = False
+        names = [bytes(row).rstrip(b'\0').decode() for row in self.arrays['names']]
+        self.index = {t: i for i, t in enumerate(names)}
+
+    def _read_block(self, i, t, count=None):
+        """활성 버퍼의 최근 count개 행을 복사합니다. 게시가 계속 겹쳐 온전한 복사본을 얻지 못하면 None."""
+        meta = self.arrays['meta'][i, t]
+        for _ in range(READ_RETRIES):
+            generation = int(meta[4])
+            active = int(meta[0])
+            rows = int(meta[1 + active])
+            block = self.arrays['candles'][i, t, active, max(0, rows - count) if count else 0:rows].copy()
+            # 게시는 비활성 버퍼에만 쓰므로, 복사한 버퍼는 다음 게시가 시작되기 전까지 온전합니다.
+            # 읽기 시작할 때 게시 중(홀수)이었다면 그 게시가 끝난 뒤의 게시가, 아니면 두 번째 게시가 이 버퍼를 씁니다.
+            if int(meta[4]) <= generation + (0 if generation % 2 else 2):
+                return block
+        return None
+
+    def get_candles(self, ticker, timeframe, min_open_time=None, count=None):
+        """
+        (ticker, timeframe)의 최근 count개 캔들을 DataFrame으로 반환합니다. (공유 메모리에서 복사하므로 이후 게시의 영향을 받지 않음)
+        min_open_time이 주어지면, 그 시각에 시작된 캔들이 게시되기 전까지는 None을 반환합니다.
+        """
+        i = self.index.get(ticker)
+        if i is None:
+            return None
+        block = self._read_block(i, list(TIMEFRAMES).index(timeframe), count)
+        if block is None or len(block) == 0:
+            return None
+        index = pd.to_datetime(block[:, 0].astype(np.int64), unit='s')
+        if min_open_time is not None and index[-1] < min_open_time:
+            return None
+        return pd.DataFrame(block[:, 1:], index=index, columns=FIELDS[1:], copy=False)
+
+    def get_prices(self, tickers, max_age_sec=None):
+        max_age_sec = max_age_sec or config.MARKET_DATA_CONFIG["MAX_QUOTE_AGE_SEC"]
+        now = time.time()
+        prices = {}
+        for ticker in tickers:
+            i = self.index.get(ticker)
+            if i is not None:
+                price, updated_at = self.arrays['quotes'][i]
+                if updated_at > 0 and now - updated_at <= max_age_sec:
+                    prices[ticker] = float(price)
+        return prices
+
+    def get_ticker_data(self, ticker, close_time=None, timeout=None, count=50):
+        """
+        main.fetch_ticker_data와 같은 형태({'15m', '60m', '240m', 'price'})로 반환합니다.
+        close_time이 주어지면 해당 마감 이후의 캔들이 게시될 때까지 최대 timeout초 기다립니다.
+        """
+        if ticker not in self.index:
+            return None
+        timeout = config.MARKET_DATA_CONFIG["MAX_WAIT_SEC"] if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            data = {}
+            for tf in TIMEFRAMES:
+                min_open = None
+                if close_time is not None:
+                    min_open = candle_clock.floor_to_close(close_time, tf).tz_localize(None)
+                data[tf] = self.get_candles(ticker, tf, min_open, count)
+            data['price'] = self.get_prices([ticker]).get(ticker)
+            if all(data[tf] is not None for tf in TIMEFRAMES) and data['price'] is not None:
+                return data
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.2)
+
+    def close(self):
+        self.arrays = None
+        self.shm.close()
+
+def connect():
+    """시세 서비스에 연결합니다. 서비스가 실행 중이 아니면 None을 반환합니다."""
+    try:
+        client = SharedMarketData()
+        logger.info("시세 공유 서비스에 연결했습니다. (%s개 코인)", len(client.index))
+        return client
+    except FileNotFoundError:
+        logger.warning("시세 공유 서비스가 실행 중이 아닙니다. 업비트 API에서 직접 조회합니다.")
+        return None
+
+def _fetch_and_publish(publisher, targets):
+    for ticker, tf in targets:
+        try:
+            publisher.publish_candles(ticker, tf, exchange_client.get_ohlcv(ticker, interval=TIMEFRAMES[tf], count=publisher.capacity))
+        except Exception as e:
+            logger.error("[%s] %s 캔들 게시 실패: %s", ticker, tf, e)
+
+def run_service(tickers=None):
+    """시세를 한 번만 가져와 공유 메모리에 게시하는 서비스 루프."""
+    tickers = tickers or config.MARKET_DATA_CONFIG["TICKERS"] or list(config.TICKER_ALLOCATION.keys())
+    publisher = MarketDataPublisher(tickers)
+    clock = candle_clock.CandleClock(tickers)
+    logger.info("시세 공유 서비스를 시작합니다. (%s개 코인)", len(tickers))
+    try:
+        _fetch_and_publish(publisher, [(t, tf) for t in tickers for tf in TIMEFRAMES])
+        while True:
+            events = clock.poll(candle_clock.now() - pd.Timedelta(seconds=clock.grace_sec))
+            if events:
+                _fetch_and_publish(publisher, sorted({(e.ticker, e.timeframe) for e in events}))
+            try:
+                prices = exchange_client.get_current_price(tickers)
+                publisher.publish_prices(prices or {})
+            except Exception as e:
+                logger.error("현재가 게시 실패: %s", e)
+            time.sleep(config.MARKET_DATA_CONFIG["QUOTE_INTERVAL_SEC"])
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("시세 공유 서비스를 종료합니다.")
+    finally:
+        publisher.close()
+
+if __name__ == "__main__":
+    run_service()
@@ -0,0 +1,132 @@
+"""
+거래 주기의 단계별 소요 시간과 횟수 지표.
+
+- timed(phase)   : with 블록의 소요 시간을 단계별 히스토그램에 기록합니다. (블록에서 예외가 나면 오류 카운터도 증가)
+- inc(name, ...) : 이름과 라벨별 카운터를 증가시킵니다.
+- render()       : Prometheus 텍스트 형식으로 모든 지표를 출력합니다.
+- start_http_server() : 로컬 /metrics 엔드포인트를 데몬 스레드로 엽니다.
+- collect_cycle() : 직전 collect_cycle() 이후 모인 단계별 합계를 꺼냅니다. (main이 주기마다 cycle_metrics 테이블에 저장)
+
+워커 스레드에서 동시에 기록하므로 모든 갱신은 하나의 락으로 보호합니다. 단계별 합계는 스레드들의 시간을 더한 값이며,
+주기 전체의 실제 경과 시간은 'cycle' 단계로 따로 기록합니다.
+"""
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import config
+
+PREFIX = "upbit_bot"
+
+_lock = threading.Lock()
+_histograms = {} # phase -> {'buckets': [누적 전 개수], 'sum': 초, 'count': 횟수}
+_counters = {} # (name, ((label, value), ...)) -> 값
+_cycle = {} # phase -> [횟수, 합계(초), 최대(초)]  (collect_cycle마다 초기화)
+
+def observe(phase, seconds):
+    """단계 하나의 소요 시간(초)을 기록합니다."""
+    if not config.METRICS_CONFIG["ENABLED"]:
+        return
+    bounds = config.METRICS_CONFIG["BUCKETS"]
+    with _lock:
+        hist = _histograms.get(phase)
+        if hist is None:
+            hist = _histograms[phase] = {'buckets': [0] * (len(bounds) + 1), 'sum': 0.0, 'count': 0}
+        hist['buckets'][bisect.bisect_left(bounds, seconds)] += 1
+        hist['sum'] += seconds
+        hist['count'] += 1
+        cycle = _cycle.setdefault(phase, [0, 0.0, 0.0])
+        cycle[0] += 1
+        cycle[1] += seconds
+        cycle[2] = max(cycle[2], seconds)
+
+def inc(name, amount=1, **labels):
+    if not config.METRICS_CONFIG["ENABLED"]:
+        return
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+@contextmanager
+def timed(phase):
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        inc('phase_errors', phase=phase)
+        raise
+    finally:
+        observe(phase, time.perf_counter() - started)
+
+def collect_cycle():
+    """이번 주기의 단계별 (phase, 횟수, 합계 초, 최대 초) 목록을 반환하고 초기화합니다."""
+    global _cycle
+    with _lock:
+        cycle, _cycle = _cycle, {}
+    return [(phase, count, total, peak) for phase, (count, total, peak) in sorted(cycle.items())]
+
+def reset():
+    """모든 지표를 비웁니다. (벤치마크/재생 도구가 측정 구간을 나눌 때 사용)"""
+    global _cycle
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _cycle = {}
+
+# --- Prometheus 텍스트 형식 ---
+def _labels(pairs):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}" if pairs else ""
+
+def render():
+    bounds = config.METRICS_CONFIG["BUCKETS"]
+    with _lock:
+        histograms = {phase: {**h, 'buckets': list(h['buckets'])} for phase, h in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = [f"# HELP {PREFIX}_phase_seconds Time spent in each trading cycle phase.",
+             f"# TYPE {PREFIX}_phase_seconds histogram"]
+    for phase, hist in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(bounds + ['+Inf'], hist['buckets']):
+            cumulative += count
+            lines.append(f'{PREFIX}_phase_seconds_bucket{{phase="{phase}",le="{bound}"}} {cumulative}')
+        lines.append(f'{PREFIX}_phase_seconds_sum{{phase="{phase}"}} {hist["sum"]:.6f}')
+        lines.append(f'{PREFIX}_phase_seconds_count{{phase="{phase}"}} {hist["count"]}')
+
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+        for (counter_name, pairs), value in sorted(counters.items()):
+            if counter_name == name:
+                lines.append(f"{PREFIX}_{name}_total{_labels(pairs)} {value}")
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # 수집기 요청마다 콘솔에 찍히지 않도록
+
+def start_http_server(host=None, port=None):
+    """지표 엔드포인트를 데몬 스레드로 시작하고 서버 객체를 반환합니다. 포트를 열지 못하면 None."""
+    from logger_config import logger # 대시보드가 exchange_client를 거쳐 이 모듈을 import해도 로그 리스너가 뜨지 않도록
+    mc = config.METRICS_CONFIG
+    host, port = host or mc["HOST"], port if port is not None else mc["PORT"]
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.error(f"지표 엔드포인트를 열 수 없습니다 ({host}:{port}): {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="MetricsServer", daemon=True).start()
+    logger.info(f"지표 엔드포인트 시작: http://{host}:{server.server_address[1]}/metrics")
+    return server
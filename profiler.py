@@ -0,0 +1,154 @@
+"""
+거래 주기 프로파일러. (필요할 때만 켜는 샘플링 방식)
+
+켜는 방법 (config.PROFILER_CONFIG["ENABLED"]가 True일 때만 main이 이 모듈을 불러와 거래 주기를 감쌉니다)
+- config.PROFILER_CONFIG["PROFILE_NEXT_CYCLES"]: 프로그램 시작 후 이 횟수만큼의 주기를 프로파일링
+- SIGUSR1 신호 (kill -USR1 <pid>, 리눅스/맥): 다음 CYCLES_PER_TRIGGER회 주기를 프로파일링
+- TRIGGER_FILE 생성 (윈도우 등 신호를 쓸 수 없는 환경): 다음 주기 시작 시 파일을 지우고 위와 같이 동작
+
+cProfile은 호출한 스레드만 측정하므로, 워커 풀에서 실행되는 코인별 작업까지 보려면 별도 스레드가 SAMPLE_INTERVAL_SEC마다
+sys._current_frames()로 THREAD_PREFIXES 스레드들의 호출 스택을 수집합니다. 주기마다 OUTPUT_DIR에
+- *.collapsed : "스레드;함수;함수 샘플수" 형식 (flamegraph.pl, speedscope 등에서 바로 열 수 있음)
+- *_top.txt   : 자기 시간(self)/누적 시간(inclusive) 기준 상위 함수 요약
+을 쓰고, 최근 KEEP개 주기만 남깁니다. 꺼져 있을 때는 주기마다 정수 비교와 파일 존재 확인만 합니다.
+"""
+import os
+import sys
+import time
+import signal
+import threading
+import functools
+from collections import Counter
+from datetime import datetime
+from logger_config import logger
+import config
+
+# 작업을 기다리며 쉬고 있는 스레드의 맨 위 프레임. 이런 샘플은 버려 실제로 일한 시간만 남깁니다.
+IDLE_FRAMES = {('_worker', 'thread.py')} # concurrent.futures 워커가 작업 큐에서 대기 중
+
+_lock = threading.Lock()
+_remaining = 0
+
+def arm(cycles=None):
+    """다음 cycles회 주기를 프로파일링하도록 예약합니다."""
+    global _remaining
+    cycles = cycles or config.PROFILER_CONFIG["CYCLES_PER_TRIGGER"]
+    with _lock:
+        _remaining = max(_remaining, cycles)
+    logger.info(f"다음 {cycles}회 거래 주기를 프로파일링합니다.")
+
+def install_signal_handler():
+    """SIGUSR1로 프로파일링을 켤 수 있게 합니다. 신호가 없는 플랫폼이거나 메인 스레드가 아니면 무시합니다."""
+    if not hasattr(signal, 'SIGUSR1'):
+        return False
+    try:
+        signal.signal(signal.SIGUSR1, lambda signum, frame: arm())
+    except ValueError:
+        return False
+    return True
+
+def _take():
+    """이번 주기를 프로파일링할지 결정합니다."""
+    global _remaining
+    trigger = config.PROFILER_CONFIG["TRIGGER_FILE"]
+    if trigger and os.path.exists(trigger):
+        try:
+            os.remove(trigger)
+        except OSError:
+            pass
+        arm()
+    with _lock:
+        if _remaining <= 0:
+            return False
+        _remaining -= 1
+        return True
+
+# --- 샘플링 ---
+class _Sampler(threading.Thread):
+    def __init__(self, interval, prefixes):
+        super().__init__(name="CycleProfiler", daemon=True)
+        self.interval = interval
+        self.prefixes = tuple(prefixes)
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate() if t.name.startswith(self.prefixes)}
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident)
+                if name is None or (frame.f_code.co_name, os.path.basename(frame.f_code.co_filename)) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                # 워커 스레드는 번호를 떼어 하나의 flamegraph로 합침
+                self.stacks[(name.rstrip('_0123456789'),) + tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+def _top_functions(stacks, top_n):
+    self_counts, inclusive_counts = Counter(), Counter()
+    for stack, count in stacks.items():
+        frames = stack[1:]
+        if frames:
+            self_counts[frames[-1]] += count
+        for func in set(frames): # 재귀 호출은 한 번만 셈
+            inclusive_counts[func] += count
+    return self_counts.most_common(top_n), inclusive_counts.most_common(top_n)
+
+def _rotate(directory, keep):
+    """가장 최근 keep개 주기의 파일만 남깁니다."""
+    prefixes = sorted({name.rsplit('.', 1)[0].removesuffix('_top') for name in os.listdir(directory) if name.startswith('cycle_')})
+    for prefix in prefixes[:-keep] if keep else []:
+        for suffix in ['.collapsed', '_top.txt']:
+            path = os.path.join(directory, prefix + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+def _write(sampler, wall_sec):
+    pc = config.PROFILER_CONFIG
+    os.makedirs(pc["OUTPUT_DIR"], exist_ok=True)
+    prefix = os.path.join(pc["OUTPUT_DIR"], f"cycle_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}")
+    with open(prefix + ".collapsed", "w", encoding="utf-8") as f:
+        for stack, count in sampler.stacks.most_common():
+            f.write(f"{';'.join(stack)} {count}\n")
+
+    total = sum(sampler.stacks.values()) or 1
+    self_top, inclusive_top = _top_functions(sampler.stacks, pc["TOP_N"])
+    lines = [f"주기 소요 시간: {wall_sec:.3f}초, 샘플링 {sampler.samples}회 (간격 {sampler.interval * 1000:.1f}ms), 스택 샘플 {total}개", "",
+             "[자기 시간 상위]"]
+    lines += [f"{count:8d} {count / total:7.1%}  {func}" for func, count in self_top]
+    lines += ["", "[누적 시간 상위]"]
+    lines += [f"{count:8d} {count / total:7.1%}  {func}" for func, count in inclusive_top]
+    with open(prefix + "_top.txt", "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    _rotate(pc["OUTPUT_DIR"], pc["KEEP"])
+    return prefix
+
+def profiled(func):
+    """예약된 횟수가 남아 있을 때만 func 실행 동안 샘플링합니다."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _take():
+            return func(*args, **kwargs)
+        pc = config.PROFILER_CONFIG
+        sampler = _Sampler(pc["SAMPLE_INTERVAL_SEC"], pc["THREAD_PREFIXES"])
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sampler.stop()
+            try:
+                prefix = _write(sampler, time.perf_counter() - started)
+                logger.info(f"거래 주기 프로파일 저장: {prefix}.collapsed / {prefix}_top.txt")
+            except Exception as e:
+                logger.error(f"거래 주기 프로파일 저장 실패: {e}")
+    return wrapper
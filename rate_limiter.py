@@ -0,0 +1,38 @@
+import time
+import threading
+import config
+
+# 백테스트처럼 실제 API를 호출하지 않는 실행에서는 set_enabled(False)로 대기를 끕니다.
+_enabled = True
+
+def set_enabled(enabled):
+    global _enabled
+    _enabled = enabled
+
+class RateLimiter:
+    """
+    스레드 안전한 토큰 버킷. 여러 워커 스레드가 같은 초당 요청 한도를 공유할 때 사용합니다.
+    토큰이 부족하면 미리 예약(음수 잔량)한 뒤 락 밖에서 대기하므로, 대기 중에도 다른 스레드를 막지 않습니다.
+    """
+    def __init__(self, rate_per_sec, burst=None):
+        self.rate = float(rate_per_sec)
+        self.capacity = float(burst or rate_per_sec)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not _enabled:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+# 업비트 요청 한도는 시세(Quotation) API와 거래(Exchange) API에 각각 따로 적용됩니다.
+quotation_limiter = RateLimiter(config.RATE_LIMIT_CONFIG["QUOTATION_PER_SEC"])
+exchange_limiter = RateLimiter(config.RATE_LIMIT_CONFIG["EXCHANGE_PER_SEC"])
@@ -0,0 +1,189 @@
+"""
+DB 보존 기간과 압축.
+
+capital_log는 15분마다 한 행씩, trade_log는 거래마다 한 행씩 쌓이기만 하므로, RETENTION_CONFIG["ENABLED"]를 켜면
+INTERVAL_SEC(기본 하루)마다 백그라운드에서 정리합니다. (기본은 꺼짐)
+- capital_log: 최근 RAW_DAYS일은 그대로 두고, 그보다 오래된 행은 capital_rollup 테이블의 시간봉('1h')/일봉('1d') OHLC
+  (시가/고가/저가/종가, 표본 수)로 합친 뒤 지웁니다. 시간봉은 HOURLY_DAYS일까지만 두고 일봉은 계속 보관합니다.
+  경계가 날짜 단위라 합쳐지는 구간은 항상 완전하며, 같은 구간이 다시 합쳐지면(예: 늦게 기록된 행) 고가/저가/종가/표본 수를 병합합니다.
+- trade_log: 청산 시각이 TRADE_DAYS일보다 오래된 거래를 ARCHIVE_DIR의 gzip JSON Lines 파일로 옮깁니다. (pd.read_json(path, lines=True))
+  파일 이름에 id 범위가 들어가므로, 파일을 쓴 뒤 삭제 전에 중단되더라도 다음 실행이 같은 파일을 다시 씁니다.
+- cycle_metrics/signals/risk_log/risk_positions: PRUNE_DAYS보다 오래된 진단 기록을 지웁니다.
+- 지운 페이지는 증분 vacuum(auto_vacuum=INCREMENTAL)으로 파일 크기에서 돌려줍니다. 이전에 만든 DB는 전체 VACUUM이 DB 전체를
+  다시 쓰는 동안 모든 기록을 막으므로, 봇을 멈춘 상태에서 python retention.py --convert 로 한 번 전환합니다. (전환 전에는 건너뜀)
+대시보드는 capital_log 앞에 시간봉/일봉 종가를 이어 붙여 전체 기간의 자산 곡선을 그리고, 보관 파일의 거래도 함께 집계합니다.
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import sqlite3
+import threading
+from datetime import timedelta
+from logger_config import logger
+import config
+import candle_clock
+import database_manager as db
+
+# 진단 테이블별 시각 컬럼
+PRUNE_COLUMNS = {"cycle_metrics": "timestamp", "signals": "candle_time", "risk_log": "timestamp", "risk_positions": "timestamp"}
+# 롤업 해상도 → 구간 키로 쓸 시각 문자열 앞부분의 길이와 채울 꼬리 ('YYYY-MM-DD HH' + ':00:00')
+RESOLUTIONS = {"1h": (13, ":00:00"), "1d": (10, " 00:00:00")}
+
+_lock = threading.Lock()
+_last_run = 0.0
+
+def _cutoff(now, days):
+    """now에서 days일 전 날짜의 자정 (시각 문자열). 이보다 오래된 기록이 정리 대상입니다."""
+    return (now - timedelta(days=days)).strftime('%Y-%m-%d 00:00:00')
+
+def rollup(rows, resolution):
+    """시각순 [(timestamp, equity)]를 구간별 [(구간 시작, open, high, low, close, 표본 수)]로 합칩니다."""
+    width, tail = RESOLUTIONS[resolution]
+    buckets = []
+    for timestamp, equity in rows:
+        key = timestamp[:width] + tail
+        if buckets and buckets[-1][0] == key:
+            bucket = buckets[-1]
+            bucket[2] = max(bucket[2], equity)
+            bucket[3] = min(bucket[3], equity)
+            bucket[4] = equity
+            bucket[5] += 1
+        else:
+            buckets.append([key, equity, equity, equity, equity, 1])
+    return [tuple(bucket) for bucket in buckets]
+
+def compact_capital(cursor, now):
+    """RAW_DAYS보다 오래된 capital_log를 시간봉/일봉으로 합치고 지웁니다. HOURLY_DAYS보다 오래된 시간봉도 지웁니다."""
+    rc = config.RETENTION_CONFIG
+    cutoff = _cutoff(now, rc["RAW_DAYS"])
+    rows = cursor.execute("SELECT timestamp, total_equity FROM capital_log WHERE timestamp < ? ORDER BY timestamp", (cutoff,)).fetchall()
+    for resolution in RESOLUTIONS:
+        cursor.executemany("""
+            INSERT INTO capital_rollup (resolution, timestamp, open, high, low, close, samples) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(resolution, timestamp) DO UPDATE SET
+                high = MAX(high, excluded.high), low = MIN(low, excluded.low), close = excluded.close, samples = samples + excluded.samples
+        """, [(resolution, *bucket) for bucket in rollup(rows, resolution)])
+    cursor.execute("DELETE FROM capital_log WHERE timestamp < ?", (cutoff,))
+    hourly = cursor.execute("DELETE FROM capital_rollup WHERE resolution = '1h' AND timestamp < ?",
+                            (_cutoff(now, rc["HOURLY_DAYS"]),)).rowcount
+    return {'capital_rows': len(rows), 'hourly_dropped': hourly}
+
+def archive_path(db_file, first_id, last_id):
+    stem = os.path.splitext(os.path.basename(db_file))[0]
+    return os.path.join(config.RETENTION_CONFIG["ARCHIVE_DIR"], f"{stem}_trade_log_{first_id:08d}-{last_id:08d}.jsonl.gz")
+
+def archive_trades(cursor, now, db_file):
+    """청산 시각이 TRADE_DAYS보다 오래된 거래를 압축 파일에 쓰고 trade_log에서 지웁니다. (파일 경로, 거래 수)를 반환합니다."""
+    cursor.execute("SELECT * FROM trade_log WHERE exit_time < ? ORDER BY id", (_cutoff(now, config.RETENTION_CONFIG["TRADE_DAYS"]),))
+    columns = [d[0] for d in cursor.description]
+    trades = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    if not trades:
+        return None, 0
+    path = archive_path(db_file, trades[0]['id'], trades[-1]['id'])
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        for trade in trades:
+            f.write(json.dumps(trade, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path) # 파일이 완성된 뒤에만 보이도록
+    cursor.executemany("DELETE FROM trade_log WHERE id = ?", [(trade['id'],) for trade in trades])
+    return path, len(trades)
+
+def prune(cursor, now):
+    """PRUNE_DAYS보다 오래된 진단 기록을 지웁니다. {테이블: 지운 행 수}"""
+    removed = {}
+    for table, days in config.RETENTION_CONFIG["PRUNE_DAYS"].items():
+        removed[table] = cursor.execute(f"DELETE FROM {table} WHERE {PRUNE_COLUMNS[table]} < ?", (_cutoff(now, days),)).rowcount
+    return removed
+
+def vacuum(conn):
+    """빈 페이지를 파일에서 돌려줍니다. auto_vacuum이 꺼진 이전 DB는 건너뛰고 False를 반환합니다. (convert로 먼저 전환)"""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        logger.warning("증분 vacuum 모드가 아닌 DB라 빈 페이지를 돌려주지 않았습니다. 봇을 멈춘 뒤 python retention.py --convert 를 한 번 실행하세요.")
+        return False
+    pages = config.RETENTION_CONFIG["VACUUM_PAGES"]
+    # execute()는 이 PRAGMA를 한 단계(한 페이지)만 실행하므로 끝까지 실행하는 executescript로
+    conn.executescript(f"PRAGMA incremental_vacuum({pages})" if pages else "PRAGMA incremental_vacuum")
+    return True
+
+def convert(db_file=None):
+    """
+    auto_vacuum이 꺼진 이전 DB를 전체 VACUUM으로 INCREMENTAL 모드로 전환합니다. DB 전체를 다시 쓰므로 봇을 멈춘 상태에서 실행하는
+    오프라인 명령입니다. (봇의 쓰기 잠금을 잡지 않으며, 다른 연결이 DB를 쓰는 중이면 sqlite3가 'database is locked' 오류를 냄)
+    이미 전환된 DB면 False를 반환합니다.
+    """
+    conn = sqlite3.connect(db_file or db.DB_FILE, isolation_level=None)
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return False
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        return True
+    finally:
+        conn.close()
+
+def run(db_file=None, now=None):
+    """보존 정책을 한 번 적용합니다. 정리한 내용을 요약한 딕셔너리를 반환합니다."""
+    db_file = db_file or db.DB_FILE
+    now = now or candle_clock.now()
+    size_before = os.path.getsize(db_file)
+    conn = sqlite3.connect(db_file, isolation_level=None)
+    cursor = conn.cursor()
+    try:
+        with db._write_lock: # 봇의 기록은 정리가 끝날 때까지 기다림
+            cursor.execute("BEGIN")
+            try:
+                summary = compact_capital(cursor, now)
+                summary['archive'], summary['trades_archived'] = archive_trades(cursor, now, db_file)
+                summary['pruned'] = prune(cursor, now)
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            summary['vacuumed'] = vacuum(conn)
+    finally:
+        conn.close()
+    summary['size_before'], summary['size_after'] = size_before, os.path.getsize(db_file)
+    return summary
+
+def maybe_run(force=False):
+    """INTERVAL_SEC이 지났으면 백그라운드 스레드에서 run()을 실행합니다. (거래 주기 끝에 호출)"""
+    global _last_run
+    rc = config.RETENTION_CONFIG
+    if not rc["ENABLED"]:
+        return False
+    now = time.monotonic()
+    if not force and _last_run and now - _last_run < rc["INTERVAL_SEC"]:
+        return False
+    if not _lock.acquire(blocking=False):
+        return False
+    _last_run = now
+
+    def work():
+        try:
+            s = run()
+            archive = f" ({s['archive']})" if s['archive'] else ""
+            logger.info(f"DB 정리 완료: 자산 기록 {s['capital_rows']}행 압축, 거래 {s['trades_archived']}건 보관{archive}, "
+                        f"진단 기록 {sum(s['pruned'].values())}행 삭제, "
+                        f"DB {s['size_before'] / 1e6:.1f}MB → {s['size_after'] / 1e6:.1f}MB")
+        except Exception as e:
+            logger.error(f"DB 정리 실패: {e}")
+        finally:
+            _lock.release()
+    threading.Thread(target=work, name="DBRetention", daemon=True).start()
+    return True
+
+if __name__ == "__main__":
+    # 사용법: python retention.py [DB 파일]             보존 정책을 한 번 적용 (생략하면 config.DB_FILE)
+    #         python retention.py --convert [DB 파일]   이전 DB를 증분 vacuum 모드로 전환 (봇을 멈춘 상태에서)
+    args = sys.argv[1:]
+    converting = '--convert' in args
+    args = [a for a in args if a != '--convert']
+    db.set_db_file(args[0] if args else config.DB_FILE)
+    if converting:
+        print("전환 완료" if convert() else "이미 증분 vacuum 모드입니다.")
+    else:
+        db.create_tables()
+        print(run())
@@ -0,0 +1,159 @@
+"""
+포트폴리오 위험 지표.
+
+거래 주기마다 모든 봇의 상태와 이번 주기에 수집한 현재가/캔들로 포트폴리오 전체의 위험을 NumPy로 한 번에 계산합니다.
+- 코인별/전체 노출(보유 평가액)과 미실현 손익
+- 마감된 캔들 수익률의 롤링 변동성(연율)과 코인 간 상관계수, 포트폴리오 변동성
+- 장중(하루) 최고 총자산 대비 낙폭. MAX_INTRADAY_DRAWDOWN을 넘으면 킬 스위치가 켜져 그날은 새 매수를 막습니다.
+  (손절/익절 등 청산 주문은 계속 허용)
+계산 결과는 risk_log/risk_positions 테이블에 기록되어 대시보드에서 읽습니다.
+"""
+import json
+import threading
+import numpy as np
+from logger_config import logger
+import config
+import candle_buffer
+import database_manager as db
+
+def _closes(frame, count):
+    """마감된 최근 count개 캔들의 종가 (진행 중인 마지막 캔들 제외). 없으면 빈 배열."""
+    if frame is None or len(frame) < 2:
+        return np.empty(0)
+    if isinstance(frame, candle_buffer.CandleRing):
+        closes = frame.column('close')
+    else:
+        closes = frame['close'].to_numpy(dtype=np.float64)
+    return closes[-count - 1:-1]
+
+def return_matrix(frames, window):
+    """
+    코인별 종가로 (코인 수, window) 로그 수익률 행렬을 만듭니다. 모든 코인의 캔들 경계가 같으므로 오른쪽(최근)을 맞춰 채우고,
+    데이터가 모자란 앞부분은 NaN입니다.
+    """
+    closes = np.full((len(frames), window + 1), np.nan)
+    for i, frame in enumerate(frames):
+        c = _closes(frame, window + 1)
+        if len(c):
+            closes[i, -len(c):] = c
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.diff(np.log(closes), axis=1)
+
+def standardized_returns(returns, min_periods):
+    """
+    수익률 행렬의 코인별 표준편차(캔들 단위)와 정규화 수익률 zn을 계산합니다. 표본이 min_periods 미만인 코인은 표준편차 NaN, zn 0.
+    zn_i = (r_i - 평균) / (표준편차 · √(표본 수 - 1)) 이므로 상관계수 행렬은 zn @ zn.T 입니다. (n×n 행렬은 필요한 부분만 계산)
+    """
+    counts = (~np.isnan(returns)).sum(axis=1)
+    valid = counts >= min_periods
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nanmean(np.where(valid[:, None], returns, 0.0), axis=1)
+        std = np.sqrt(np.nansum((returns - mean[:, None]) ** 2, axis=1) / (counts - 1))
+        std = np.where(valid & (std > 0), std, np.nan)
+        zn = np.nan_to_num((returns - mean[:, None]) / (std * np.sqrt(counts - 1))[:, None])
+    return std, zn
+
+def correlation(zn, std, rows):
+    """rows 코인들 사이의 상관계수 행렬. 변동성을 계산할 수 없는 코인은 NaN."""
+    corr = np.clip(zn[rows] @ zn[rows].T, -1.0, 1.0)
+    invalid = np.isnan(std[rows])
+    corr[invalid, :] = np.nan
+    corr[:, invalid] = np.nan
+    return corr
+
+class PortfolioRisk:
+    """주기마다 update()로 다시 계산하고, 장중 최고 총자산과 킬 스위치 상태를 하루 동안 유지합니다."""
+    def __init__(self, save=True):
+        self.save = save
+        self.day = None
+        self.peak_equity = None
+        self.kill_switch = False
+        self.latest = None # 마지막 계산 결과 (요약 딕셔너리)
+        self._lock = threading.Lock()
+
+    def _start_day(self, day):
+        """새 거래일이면 최고 총자산과 킬 스위치를 초기화합니다. (재시작 시에는 오늘 기록에서 복원)"""
+        self.day = day
+        self.peak_equity, self.kill_switch = None, False
+        if self.save:
+            self.peak_equity, self.kill_switch = db.load_risk_day(day)
+            if self.kill_switch:
+                logger.critical(f"🚨 오늘({day}) 이미 포트폴리오 낙폭 킬 스위치가 켜져 있습니다. 새 매수를 계속 막습니다.")
+
+    def update(self, bots, data_cache, now):
+        """bots의 상태와 data_cache({ticker: 수집 데이터})로 위험 지표를 계산합니다. 요약 딕셔너리를 반환합니다."""
+        rc = config.RISK_CONFIG
+        timeframe = rc["RISK_TIMEFRAME"]
+        day = now.strftime('%Y-%m-%d')
+        n = len(bots)
+        tickers = [bot.ticker for bot in bots]
+        cash, size, entry, price, pending = (np.zeros(n) for _ in range(5))
+        frames = []
+        for i, bot in enumerate(bots):
+            state = bot.state
+            data = data_cache.get(bot.ticker) or {}
+            # 장부 값은 Fixed이므로 배열에 넣기 전에 명시적으로 float로 변환
+            cash[i] = float(state.get('capital') or 0)
+            size[i] = float(state.get('total_position_size') or 0)
+            entry[i] = float(state.get('avg_entry_price') or 0)
+            price[i] = float(data.get('price') or entry[i]) # 현재가를 모르면 평균 단가로 평가 (bot_equity와 같음)
+            if state.get('position_status') == 'ORDER_PENDING' and 'BUY' in (state.get('pending_order_type') or ''):
+                pending[i] = float(state.get('pending_order_amount') or 0)
+            frames.append(data.get(timeframe))
+
+        exposure = price * size
+        unrealized = (price - entry) * size
+        total_equity = cash.sum() + exposure.sum() + pending.sum()
+        weights = exposure / total_equity if total_equity > 0 else np.zeros(n)
+
+        returns = return_matrix(frames, rc["VOL_WINDOW"])
+        periods_per_year = 365 * 24 * 60 / int(timeframe.rstrip('m'))
+        std, zn = standardized_returns(returns, rc["MIN_VOL_PERIODS"])
+        vol = std * np.sqrt(periods_per_year)
+        # 포트폴리오 분산 wᵀΣw = uᵀ·C·u (u = σ·w, C = zn·znᵀ)를 n×n 행렬 없이 계산
+        u = np.nan_to_num(vol) * weights
+        corr_u = zn @ (zn.T @ u)
+        portfolio_vol = float(np.sqrt(max(u @ corr_u, 0.0)))
+        # 포트폴리오(보유 평가액 가중) 수익률과의 상관계수: (C·u)_i / σ_p
+        corr_to_portfolio = np.where(np.isnan(vol) | (portfolio_vol == 0), np.nan, corr_u / (portfolio_vol or 1.0))
+
+        # 대시보드용 상관계수 행렬은 노출이 큰 보유 코인 CORRELATION_TOP_N개만
+        held = np.argsort(-exposure)[:rc["CORRELATION_TOP_N"]]
+        held = held[exposure[held] > 0]
+        with self._lock:
+            if day != self.day:
+                self._start_day(day)
+            self.peak_equity = max(self.peak_equity or total_equity, total_equity)
+            drawdown = total_equity / self.peak_equity - 1 if self.peak_equity > 0 else 0.0
+            newly_killed = rc["ENABLE_KILL_SWITCH"] and not self.kill_switch and drawdown <= -rc["MAX_INTRADAY_DRAWDOWN"]
+            if newly_killed:
+                self.kill_switch = True
+            self.latest = {
+                'timestamp': now.strftime('%Y-%m-%d %H:%M:%S'),
+                'total_equity': float(total_equity),
+                'exposure': float(exposure.sum()),
+                'exposure_ratio': float(exposure.sum() / total_equity) if total_equity > 0 else 0.0,
+                'unrealized_pnl': float(unrealized.sum()),
+                'peak_equity': float(self.peak_equity),
+                'drawdown': float(drawdown),
+                'portfolio_vol': portfolio_vol,
+                'kill_switch': self.kill_switch,
+                'correlation': json.dumps({'tickers': [tickers[i] for i in held],
+                                           'matrix': np.round(correlation(zn, std, held), 4).tolist()}).replace('NaN', 'null'),
+            }
+            summary = dict(self.latest)
+        positions = [(tickers[i], float(exposure[i]), float(weights[i]), float(unrealized[i]),
+                      None if np.isnan(vol[i]) else float(vol[i]),
+                      None if np.isnan(corr_to_portfolio[i]) else float(corr_to_portfolio[i]))
+                     for i in range(n) if exposure[i] > 0 or pending[i] > 0]
+
+        if newly_killed:
+            logger.critical(f"🚨 포트폴리오 장중 낙폭 {drawdown:.2%}가 한도(-{rc['MAX_INTRADAY_DRAWDOWN']:.0%})를 넘었습니다. "
+                            f"오늘은 새 매수를 중단합니다. (청산 주문은 허용)")
+        if self.save:
+            db.log_risk(summary, positions)
+        return summary
+
+    def allows_entry(self):
+        """킬 스위치가 켜져 있으면 False (새 매수 금지)."""
+        return not self.kill_switch
@@ -0,0 +1,307 @@
+"""
+가속 시간 재생(time-travel replay)으로 실제 main.run_trading_cycle과 TradingBot을 대규모로 실행하는 부하 테스트 도구.
+
+- 시계: candle_clock.set_time_source로 15분봉 마감 시각을 주입합니다.
+- 시세: main._shared_market_data 자리에 ReplayMarketData를 넣어, fetch_ticker_data가 기록(candle_store) 또는
+  합성 캔들에서 매 주기 새 DataFrame을 받도록 합니다. (실거래의 pyupbit 응답과 같은 50개 창)
+- 거래소: exchange_sim.SimulatedExchange (네트워크 없음, 가속 시계 사용)
+- AI: backtest.default_ai_provider (기록된 판단 재생 또는 FixedAIProvider)
+
+speed를 주면 시뮬레이션 시간이 실제 시간의 speed배로 흐르도록 주기 간격을 맞추고, 주기가 그 예산(900초/speed)을
+넘긴 횟수를 셉니다. 결과로 단계별 소요 시간, 주기 지연 분포, 최대 메모리(RSS), DB 증가량을 보고합니다.
+"""
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import logging
+import resource
+import tempfile
+import threading
+from types import SimpleNamespace
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+from logger_config import logger
+import config
+import candle_clock
+import rate_limiter
+import database_manager as db
+import ai_interface
+import exchange_sim
+import candle_buffer
+import signals
+import risk
+import backtest
+import main as live
+from trading_bot import TradingBot
+
+FRAME_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'value']
+
+# --- 재생용 시세 ---
+def synthetic_candles(tickers, start, days, seed=0):
+    """코인별 15분봉 랜덤 워크를 만듭니다. {ticker: DataFrame(KST 인덱스, tz 없음)}"""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(pd.Timestamp(start), periods=int(days * 96), freq='15min')
+    n = len(index)
+    frames = {}
+    for ticker in tickers:
+        base = 10 ** rng.uniform(1, 8)
+        close = base * np.exp(np.cumsum(rng.normal(0, 0.004, n)))
+        open_ = np.r_[close[0], close[:-1]]
+        spread = np.abs(rng.normal(0, 0.002, n))
+        volume = rng.gamma(2.0, 50.0, n)
+        frames[ticker] = pd.DataFrame({
+            'open': open_, 'high': np.maximum(open_, close) * (1 + spread), 'low': np.minimum(open_, close) * (1 - spread),
+            'close': close, 'volume': volume, 'value': volume * close,
+        }, index=index)
+    return frames
+
+class ReplayMarketData:
+    """SharedMarketData와 같은 get_ticker_data/get_prices 인터페이스로, 주입된 시계 시점의 캔들 창을 돌려줍니다."""
+    def __init__(self, candles_15m, count=50):
+        self.count = count
+        self.series = {}
+        for ticker, df_15m in candles_15m.items():
+            frames = {'15m': df_15m, '60m': backtest.resample_candles(df_15m, '60m'), '240m': backtest.resample_candles(df_15m, '240m')}
+            # 창을 자를 때 searchsorted만 하도록 시각(ns)과 값을 배열로 보관
+            # (Timestamp.value와 비교하므로 인덱스 해상도와 무관하게 ns로)
+            self.series[ticker] = {tf: (df.index.as_unit('ns').asi8, df[FRAME_FIELDS].to_numpy(dtype=np.float64)) for tf, df in frames.items()}
+
+    def _window(self, ticker, timeframe, now_naive_ns):
+        ts, values = self.series[ticker][timeframe]
+        step_ns = candle_clock.TIMEFRAME_MINUTES[timeframe] * 60 * 10**9
+        # UTC 정렬 캔들의 시작 시각(KST 표기) ≤ now 인 캔들까지 = 진행 중인 캔들을 포함한 최근 count개
+        end = np.searchsorted(ts, now_naive_ns - (now_naive_ns - 9 * 3600 * 10**9) % step_ns, side='right')
+        start = max(0, end - self.count)
+        return pd.DataFrame(values[start:end], index=pd.to_datetime(ts[start:end]), columns=FRAME_FIELDS)
+
+    def price(self, ticker):
+        """현재가 = 지금 진행 중인 15분봉의 시가."""
+        ts, values = self.series[ticker]['15m']
+        end = np.searchsorted(ts, candle_clock.now().tz_localize(None).value, side='right')
+        return float(values[end - 1, 0]) if end else None
+
+    def get_ticker_data(self, ticker, close_time=None, timeout=None, count=50):
+        if ticker not in self.series:
+            return None
+        now_ns = candle_clock.now().tz_localize(None).value
+        data = {tf: self._window(ticker, tf, now_ns) for tf in ['15m', '60m', '240m']}
+        data['price'] = self.price(ticker)
+        return data
+
+    def get_prices(self, tickers, max_age_sec=None):
+        return {t: self.price(t) for t in tickers if t in self.series}
+
+# --- 가속 시계 ---
+class SimClock:
+    """
+    재생 중인 주기의 캔들 마감 시각에, 스레드별로 sleep한 만큼을 더한 시뮬레이션 시각(초)을 제공합니다.
+    main.time 자리에 넣어 체결 대기(wait_for_order_completion)의 폴링을 실제로 기다리지 않고 진행합니다.
+    """
+    def __init__(self, start):
+        self.current = start
+        self._local = threading.local()
+
+    def set(self, close_time):
+        self.current = close_time
+        self._local = threading.local() # 주기마다 워커별 경과 시간을 초기화
+
+    def time(self):
+        return self.current.value / 1e9 + getattr(self._local, 'offset', 0.0)
+
+    def sleep(self, seconds):
+        self._local.offset = getattr(self._local, 'offset', 0.0) + seconds
+
+# --- 측정 ---
+class PhaseTimer:
+    """모듈 함수를 감싸 호출별 소요 시간을 단계 이름으로 모읍니다. (워커 스레드에서 동시에 호출되어도 안전)"""
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+        self._patches = []
+
+    def wrap(self, owner, name, phase):
+        original = getattr(owner, name)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self.samples.setdefault(phase, []).append(elapsed)
+        setattr(owner, name, timed)
+        self._patches.append((owner, name, original))
+
+    def record(self, phase, elapsed):
+        with self._lock:
+            self.samples.setdefault(phase, []).append(elapsed)
+
+    def restore(self):
+        for owner, name, original in reversed(self._patches):
+            setattr(owner, name, original)
+        self._patches = []
+
+    def report(self):
+        rows = {}
+        for phase, values in self.samples.items():
+            ms = np.array(values) * 1000
+            rows[phase] = {'count': len(ms), 'total_ms': round(ms.sum(), 1), 'mean_ms': round(ms.mean(), 3),
+                           'p95_ms': round(np.percentile(ms, 95), 3), 'max_ms': round(ms.max(), 3)}
+        return pd.DataFrame(rows).T.sort_values('total_ms', ascending=False)
+
+def _rss_mb():
+    """현재 RSS(MB). /proc이 없으면 최대 RSS로 대신합니다."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _db_size(path):
+    return sum(os.path.getsize(p) for p in [path, path + '-wal', path + '-journal'] if os.path.exists(p))
+
+def _table_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")]
+        return {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in tables}
+    finally:
+        conn.close()
+
+# --- 실행 ---
+def run_replay(candles_15m, start=None, end=None, initial_krw=100_000_000, speed=None, db_file=None, quiet=True, exchange_overrides=None):
+    """
+    candles_15m({ticker: 15분봉})의 [start, end] 구간을 15분 주기마다 run_trading_cycle로 재생하고 측정 결과를 반환합니다.
+    speed가 None이면 가능한 한 빠르게 실행합니다.
+    """
+    tickers = list(candles_15m)
+    market = ReplayMarketData(candles_15m)
+    any_index = next(iter(candles_15m.values())).index
+    # 모든 타임프레임의 창(50개)이 채워진 뒤부터 재생
+    warmup = any_index[0] + pd.Timedelta(minutes=candle_clock.TIMEFRAME_MINUTES['240m'] * (market.count + 1))
+    close_times = any_index[any_index >= warmup]
+    if start is not None:
+        close_times = close_times[close_times >= pd.Timestamp(start)]
+    if end is not None:
+        close_times = close_times[close_times <= pd.Timestamp(end)]
+    close_times = close_times.tz_localize(config.TIMEZONE)
+
+    work_dir = None
+    if db_file is None:
+        work_dir = tempfile.mkdtemp(prefix="scale_replay_")
+        db_file = os.path.join(work_dir, "replay.db")
+    clock = SimClock(close_times[0])
+    exchange = exchange_sim.SimulatedExchange(
+        krw_balance=initial_krw, price_source=market.price, clock=clock.time, sleep=clock.sleep,
+        **{"LATENCY_SEC": 0, **(exchange_overrides or {})})
+
+    saved = {
+        'db_file': db.DB_FILE, 'allocation': config.TICKER_ALLOCATION, 'screener': config.SCREENER_CONFIG["ENABLED"],
+        'market': live._shared_market_data, 'level': logger.level, 'time': live.time, 'buffers': live._candle_buffers, 'signals': live._signal_table,
+        'risk': live._risk,
+    }
+    timer = PhaseTimer()
+    cycle_ms, lagged = [], 0
+    budget = 900 / speed if speed else None
+    try:
+        db.set_db_file(db_file)
+        candle_clock.set_time_source(lambda: clock.current)
+        ai_interface.set_provider(backtest.default_ai_provider())
+        rate_limiter.set_enabled(False)
+        live._shared_market_data = market
+        if live._candle_buffers is not None: # 이전 재생의 링(더 늦은 시각)이 남아 있지 않도록 새로 만듦
+            live._candle_buffers = candle_buffer.CandleBufferStore()
+        live._signal_table = signals.SignalTable()
+        live._risk = risk.PortfolioRisk()
+        live.time = SimpleNamespace(time=clock.time, sleep=clock.sleep, perf_counter=time.perf_counter) # 체결 대기 폴링도 가속
+        config.TICKER_ALLOCATION = {t: Decimal('1') / len(tickers) for t in tickers}
+        config.SCREENER_CONFIG["ENABLED"] = False
+        if quiet:
+            logger.setLevel(logging.WARNING)
+
+        timer.wrap(live, 'fetch_ticker_data', 'fetch_data')
+        timer.wrap(TradingBot, 'run_strategy', 'strategy')
+        timer.wrap(ai_interface, 'request_decision', 'ai')
+        timer.wrap(live, 'submit_order', 'submit_order')
+        timer.wrap(live, 'check_pending_order', 'check_pending_order')
+        for name in ['update_state', 'log_trade', 'log_capital']:
+            timer.wrap(db, name, f"db.{name}")
+
+        db_start = _db_size(db_file) if os.path.exists(db_file) else 0
+        rss_start = _rss_mb()
+        bots = live.initialize_bots(exchange)
+        logger.warning(f"가속 재생 시작: {len(tickers)}개 코인, {len(close_times)}주기 ({close_times[0]} ~ {close_times[-1]})")
+        wall_started = time.perf_counter()
+        for close_time in close_times:
+            clock.set(close_time)
+            events = [candle_clock.CandleCloseEvent(t, tf, close_time) for t in tickers for tf in candle_clock.closed_timeframes_at(close_time)]
+            started = time.perf_counter()
+            live.run_trading_cycle(exchange, bots, events)
+            elapsed = time.perf_counter() - started
+            timer.record('cycle', elapsed)
+            cycle_ms.append(elapsed * 1000)
+            if budget is not None:
+                if elapsed > budget:
+                    lagged += 1
+                else:
+                    time.sleep(budget - elapsed)
+        wall = time.perf_counter() - wall_started
+    finally:
+        timer.restore()
+        candle_clock.set_time_source(None)
+        ai_interface.set_provider(None)
+        rate_limiter.set_enabled(True)
+        live._shared_market_data = saved['market']
+        live._candle_buffers = saved['buffers']
+        live._signal_table = saved['signals']
+        live._risk = saved['risk']
+        live.time = saved['time']
+        config.TICKER_ALLOCATION = saved['allocation']
+        config.SCREENER_CONFIG["ENABLED"] = saved['screener']
+        db.set_db_file(saved['db_file'])
+        logger.setLevel(saved['level'])
+
+    simulated_sec = len(close_times) * 900
+    cycles = np.array(cycle_ms)
+    summary = {
+        'tickers': len(tickers),
+        'cycles': len(close_times),
+        'simulated_days': round(simulated_sec / 86400, 1),
+        'wall_sec': round(wall, 1),
+        'speedup': round(simulated_sec / wall, 1) if wall > 0 else None,
+        'cycle_p50_ms': round(float(np.percentile(cycles, 50)), 1),
+        'cycle_p95_ms': round(float(np.percentile(cycles, 95)), 1),
+        'cycle_max_ms': round(float(cycles.max()), 1),
+        'lagged_cycles': lagged if speed else None,
+        'rss_start_mb': round(rss_start, 1),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'db_bytes_start': db_start,
+        'db_bytes_end': _db_size(db_file),
+        'db_rows': _table_rows(db_file),
+        'orders': len(exchange.orders),
+    }
+    summary['db_bytes_per_cycle'] = round((summary['db_bytes_end'] - db_start) / max(len(close_times), 1), 1)
+    if work_dir:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {'summary': summary, 'phases': timer.report(), 'cycle_ms': cycles}
+
+if __name__ == "__main__":
+    # 사용법: python scale_replay.py <코인 수> <일수> [배속]   (합성 캔들)
+    #        python scale_replay.py store <캔들 저장소 경로> <TICKER,...> [배속]
+    if len(sys.argv) >= 4 and sys.argv[1] == 'store':
+        import candle_store
+        candles = {t: candle_store.load_frame(t, '15m', root=sys.argv[2]) for t in sys.argv[3].split(',')}
+        speed = float(sys.argv[4]) if len(sys.argv) > 4 else None
+    elif len(sys.argv) >= 3:
+        candles = synthetic_candles([f"KRW-SIM{i:03d}" for i in range(int(sys.argv[1]))], "2025-01-01", float(sys.argv[2]))
+        speed = float(sys.argv[3]) if len(sys.argv) > 3 else None
+    else:
+        print("사용법: python scale_replay.py <코인 수> <일수> [배속]  또는  python scale_replay.py store <저장소 경로> <TICKER,...> [배속]")
+        sys.exit(1)
+    result = run_replay(candles, speed=speed)
+    for key, value in result['summary'].items():
+        print(f"{key:>20}: {value}")
+    print(result['phases'].to_string())
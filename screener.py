@@ -0,0 +1,112 @@
+import time
+import numpy as np
+from logger_config import logger
+import config
+import exchange_client
+
+# --- 벡터화 지표 계산 (행: 코인, 열: 캔들) ---
+def _rolling_windows(values, length):
+    return np.lib.stride_tricks.sliding_window_view(values, length, axis=-1)
+
+def compute_cci(high, low, close, length=20, c=0.015):
+    """pandas_ta.cci와 같은 정의(hlc3, 평균 절대 편차)로 모든 코인의 CCI를 한 번에 계산합니다."""
+    typical = (high + low + close) / 3.0
+    cci = np.full(typical.shape, np.nan)
+    if typical.shape[-1] < length:
+        return cci
+    windows = _rolling_windows(typical, length)
+    mean = windows.mean(axis=-1)
+    mad = np.abs(windows - mean[..., None]).mean(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cci[..., length - 1:] = (typical[..., length - 1:] - mean) / (c * mad)
+    return cci
+
+def compute_wma(values, length=9):
+    """TradingBot._get_wma와 같은 가중치(1..length)의 가중 이동평균을 계산합니다. 창에 NaN이 있으면 NaN."""
+    wma = np.full(values.shape, np.nan)
+    if values.shape[-1] < length:
+        return wma
+    weights = np.arange(1, length + 1, dtype=float)
+    wma[..., length - 1:] = _rolling_windows(values, length) @ weights / weights.sum()
+    return wma
+
+def stack_candles(frames, tickers, count):
+    """코인별 OHLCV DataFrame을 (코인 수, count) 크기의 high/low/close 배열로 쌓습니다. 부족한 캔들은 앞쪽을 NaN으로 채웁니다."""
+    arrays = {field: np.full((len(tickers), count), np.nan) for field in ['high', 'low', 'close']}
+    for i, ticker in enumerate(tickers):
+        df = frames.get(ticker)
+        if df is None or df.empty:
+            continue
+        tail = df.iloc[-count:]
+        for field, array in arrays.items():
+            array[i, count - len(tail):] = tail[field].to_numpy(dtype=float)
+    return arrays
+
+# --- 스크리닝 ---
+def screen_markets(tickers, candles_4h, candles_1h):
+    """
+    TradingBot._a_check_condition1/_a_check_condition2의 진입 조건을 모든 코인에 대해 벡터 연산으로 평가하고,
+    진입 후보를 점수 순으로 정렬하여 [{'ticker', 'condition1', 'condition2', 'score', ...}] 형태로 반환합니다.
+    """
+    started = time.perf_counter()
+    cci_len = config.STRATEGY_CONFIG['cci_length']
+    oversold = config.STRATEGY_CONFIG['cci_oversold']
+    count = config.SCREENER_CONFIG["CANDLE_COUNT"]
+
+    results = {}
+    for tf_name, frames in [('4h', candles_4h), ('1h', candles_1h)]:
+        arrays = stack_candles(frames, tickers, count)
+        cci = compute_cci(arrays['high'], arrays['low'], arrays['close'], length=cci_len)
+        wma = compute_wma(cci)
+        # 마지막으로 마감된 캔들(-2)의 값만 사용
+        results[tf_name] = (cci[:, -2], wma[:, -2])
+
+    cci_4h, wma_4h = results['4h']
+    cci_1h, wma_1h = results['1h']
+    with np.errstate(invalid='ignore'):
+        condition1 = (cci_4h < oversold) & (wma_4h < oversold)
+        condition2 = (cci_1h < oversold) & (cci_1h > wma_1h)
+    recovery_strength = np.nan_to_num(cci_1h - wma_1h, nan=0.0)
+    depth = np.nan_to_num(oversold - cci_4h, nan=0.0)
+
+    # 조건1+2를 모두 통과한 코인이 우선이며, 같은 그룹 안에서는 1시간봉 회복 강도와 4시간봉 과매도 깊이로 순위를 매깁니다.
+    score = condition1 * (1000.0 + condition2 * 1000.0 + recovery_strength + depth)
+    order = np.argsort(-score, kind='stable')
+    candidates = [{
+        'ticker': tickers[i],
+        'condition1': bool(condition1[i]),
+        'condition2': bool(condition2[i]),
+        'score': float(score[i]),
+        '4h_cci': float(cci_4h[i]),
+        '1h_cci': float(cci_1h[i]),
+        'recovery_strength': float(recovery_strength[i]),
+    } for i in order if condition1[i]]
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"마켓 스크리닝 완료: {len(tickers)}개 코인 중 후보 {len(candidates)}개 ({elapsed_ms:.1f}ms)")
+    return candidates
+
+def fetch_market_candles(tickers, interval, count=None):
+    """스크리닝용 캔들을 코인별로 수집합니다. 요청 한도는 다른 작업과 공유합니다."""
+    count = count or config.SCREENER_CONFIG["CANDLE_COUNT"]
+    frames = {}
+    for ticker in tickers:
+        try:
+            frames[ticker] = exchange_client.get_ohlcv(ticker, interval=interval, count=count)
+        except Exception as e:
+            logger.error(f"[{ticker}] 스크리닝용 캔들 수집 실패: {e}")
+    return frames
+
+def get_krw_markets():
+    tickers = exchange_client.get_tickers(fiat="KRW") or []
+    excluded = set(config.SCREENER_CONFIG["EXCLUDED_TICKERS"])
+    return [t for t in tickers if t not in excluded]
+
+def build_shortlist(max_count=None):
+    """전체 KRW 마켓을 스크리닝하여 상위 후보 코인 목록을 반환합니다."""
+    max_count = max_count or config.SCREENER_CONFIG["MAX_ACTIVE_TICKERS"]
+    tickers = get_krw_markets()
+    candles_4h = fetch_market_candles(tickers, "minute240")
+    candles_1h = fetch_market_candles(tickers, "minute60")
+    candidates = screen_markets(tickers, candles_4h, candles_1h)
+    return [c['ticker'] for c in candidates[:max_count]]
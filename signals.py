@@ -0,0 +1,194 @@
+"""
+캔들 마감 시점의 전략 신호 테이블.
+
+TradingBot의 조건(4h CCI·WMA < -100, 1h CCI의 WMA 상향/하향 돌파, 4시간 롤링 평균 CCI, BB 하단 이탈 등)은 모두 마감된
+캔들만의 함수입니다. 그래서 (코인, 타임프레임, 마감된 캔들)마다 한 번만 계산해 두고, run_strategy의 상태 머신은
+이 신호를 조회만 합니다. 새로 계산한 신호는 DB의 signals 테이블에도 기록되어 대시보드와 분석에서 같은 값을 씁니다.
+
+- compute_arrays(frame, timeframe): 모든 캔들의 신호를 한 번에 계산하는 NumPy 구현 (frame은 DataFrame 또는 CandleRing)
+- compute(frame, timeframe): 마지막으로 마감된 캔들(pos -2)의 신호 딕셔너리
+- compute_records(frame, timeframe, window): 백테스트용 전체 구간의 캔들별 신호
+- SignalTable.update(ticker, cached_data): 마감 캔들이 바뀐 타임프레임만 다시 계산 (실거래/백테스트 공통)
+"""
+import threading
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import pandas as pd
+import config
+import candle_buffer
+import database_manager as db
+
+TIMEFRAMES = ['15m', '60m', '240m']
+
+# 신호 이름 → SQLite 컬럼 타입. (NaN은 NULL, 불리언은 0/1로 저장)
+SIGNAL_COLUMNS = {
+    'rows': 'INTEGER',          # 창의 캔들 수 (데이터 부족 판단용)
+    'close': 'REAL',
+    'bb_low': 'REAL',
+    'cci_20': 'REAL',           # 조건1/2용 CCI_20과 WMA
+    'wma_cci_20': 'REAL',
+    'cci': 'REAL',              # 익절/후발대용 CCI_{cci_length}와 WMA
+    'wma_cci': 'REAL',
+    'avg_cci_4': 'REAL',        # 최근 마감 4개 캔들의 CCI_{cci_length} 평균
+    'rsi': 'REAL',
+    'volume_ratio': 'REAL',
+    'supertrend': 'REAL',       # SUPERTREND_TIMEFRAME에서만 계산
+    'cond1': 'INTEGER',         # cci_20 < -100 and wma_cci_20 < -100
+    'cond2': 'INTEGER',         # cci_20 < -100 and cci_20 > wma_cci_20
+    'below_bb_low': 'INTEGER',  # close < bb_low
+    'cci_overbought': 'INTEGER',
+    'cci_below_wma': 'INTEGER',
+}
+
+VOLUME_LOOKBACK = 6
+AVG_CCI_CANDLES = 4
+
+def _ensure_indicators(frame, timeframe):
+    """DataFrame에 없는 지표 열을 링 버퍼와 같은 NumPy 구현으로 추가합니다. (링은 이미 계산되어 있음)"""
+    if isinstance(frame, candle_buffer.CandleRing):
+        return
+    specs = candle_buffer.indicator_columns(timeframe)
+    missing = [name for name in specs if name not in frame.columns]
+    if not missing:
+        return
+    arrays = {name: frame[name].to_numpy(dtype=np.float64) for name in frame.columns if name in specs or name in candle_buffer.BASE_FIELDS}
+    for name, func in specs.items():
+        if name not in arrays:
+            arrays[name] = func(arrays)
+        if name in missing:
+            frame[name] = arrays[name]
+
+def _column(frame, name):
+    if name not in frame.columns:
+        return np.full(len(frame), np.nan)
+    if isinstance(frame, candle_buffer.CandleRing):
+        return frame.column(name)
+    return frame[name].to_numpy(dtype=np.float64)
+
+def _trailing_mean(x, length, shift=0):
+    """각 위치 i에서 x[i-shift-length+1 : i-shift+1]의 NaN 제외 평균. 값이 하나도 없으면 NaN"""
+    out = np.full(len(x), np.nan)
+    start = length - 1 + shift
+    if len(x) > start:
+        windows = sliding_window_view(x, length)[:len(x) - start]
+        counts = (~np.isnan(windows)).sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[start:] = np.where(counts > 0, np.nansum(windows, axis=1) / counts, np.nan)
+    return out
+
+def compute_arrays(frame, timeframe, window=None):
+    """
+    frame의 모든 캔들 i에 대해 'i가 마지막으로 마감된 캔들일 때'의 신호 배열 {신호 이름: 배열}을 계산합니다.
+    window: 실거래 조회 창 크기. 데이터 부족 판단(rows)을 창 길이(i + 2, 최대 window)로 재현합니다.
+    """
+    sc = config.STRATEGY_CONFIG
+    _ensure_indicators(frame, timeframe)
+    n = len(frame)
+    cci_col = f"CCI_{sc['cci_length']}"
+    rows = np.minimum(np.arange(2, n + 2), window or n)
+
+    out = {'rows': rows}
+    out['close'] = _column(frame, 'close')
+    out['bb_low'] = _column(frame, f"BBL_{sc['bbands_length']}_{sc['bbands_std']}")
+    out['cci_20'] = _column(frame, 'CCI_20')
+    out['wma_cci_20'] = _column(frame, 'WMA_9_CCI_20')
+    out['cci'] = _column(frame, cci_col)
+    out['wma_cci'] = _column(frame, f"WMA_9_{cci_col}")
+    out['avg_cci_4'] = np.where(rows >= AVG_CCI_CANDLES + 1, _trailing_mean(out['cci'], AVG_CCI_CANDLES), np.nan)
+    out['rsi'] = _column(frame, 'RSI_14')
+
+    volume = _column(frame, 'volume')
+    avg_volume = _trailing_mean(volume, VOLUME_LOOKBACK, shift=1) # 직전 VOLUME_LOOKBACK개 캔들
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = volume / avg_volume
+    out['volume_ratio'] = np.where((rows >= VOLUME_LOOKBACK + 2) & (avg_volume > 0), ratio, 1.0)
+
+    out['supertrend'] = np.full(n, np.nan)
+    if timeframe == sc.get('SUPERTREND_TIMEFRAME', '60m'):
+        props = f"_{sc.get('SUPERTREND_PERIOD', 10)}_{sc.get('SUPERTREND_MULTIPLIER', 2.0):.1f}"
+        st_col = next((c for c in [f"SUPERTl{props}", f"SUPERT{props}"] if c in frame.columns), None)
+        if st_col:
+            out['supertrend'] = _column(frame, st_col)
+
+    # NaN 비교는 False
+    cci_20, wma_20, cci, wma = out['cci_20'], out['wma_cci_20'], out['cci'], out['wma_cci']
+    with np.errstate(invalid='ignore'):
+        out['cond1'] = (cci_20 < -100) & (wma_20 < -100)
+        out['cond2'] = (cci_20 < -100) & (cci_20 > wma_20)
+        out['below_bb_low'] = out['close'] < out['bb_low']
+        out['cci_overbought'] = cci > sc['cci_overbought']
+        out['cci_below_wma'] = cci < wma
+    return out
+
+def _record(arrays, i):
+    """배열들의 i번째 값을 신호 딕셔너리로 변환합니다. (NaN → None, 플래그 → bool)"""
+    signal = {}
+    for name, kind in SIGNAL_COLUMNS.items():
+        x = arrays[name][i]
+        if name == 'rows':
+            signal[name] = int(x)
+        elif kind == 'INTEGER':
+            signal[name] = bool(x)
+        else:
+            signal[name] = float(x) if x == x else None
+    return signal
+
+def compute(frame, timeframe):
+    """frame의 마지막으로 마감된 캔들(pos -2)에 대한 신호. 마감된 캔들이 없으면 None."""
+    if frame is None or len(frame) < 2:
+        return None
+    return _record(compute_arrays(frame, timeframe, window=len(frame)), -2)
+
+def compute_records(frame, timeframe, window):
+    """전체 구간의 캔들별 신호 딕셔너리 목록. (백테스트: i번째 = 캔들 i가 마지막으로 마감된 시점의 신호)"""
+    arrays = compute_arrays(frame, timeframe, window)
+    return [_record(arrays, i) for i in range(len(frame))]
+
+def candle_time(frame):
+    """마지막으로 마감된 캔들의 시각 (업비트 KST 기준, tz 없음)."""
+    if isinstance(frame, candle_buffer.CandleRing):
+        return pd.Timestamp(int(frame.timestamps()[-2]), unit='s')
+    return frame.index[-2]
+
+def compute_all(cached_data):
+    """캐시 없이 모든 타임프레임의 신호를 계산합니다."""
+    return {tf: compute(cached_data.get(tf), tf) for tf in TIMEFRAMES}
+
+class SignalTable:
+    """
+    (코인, 타임프레임)별로 마지막으로 계산한 캔들의 신호를 보관합니다. 마감 캔들이 바뀌었을 때만 다시 계산하며,
+    save=True면 새로 계산한 신호를 signals 테이블에 기록합니다.
+    """
+    def __init__(self, save=None):
+        self.save = config.SIGNAL_CONFIG["SAVE_TO_DB"] if save is None else save
+        self.latest = {} # (ticker, timeframe) → (candle_time, signal)
+        self._lock = threading.Lock()
+
+    def update(self, ticker, cached_data):
+        """cached_data의 모든 타임프레임에 대한 신호 {timeframe: signal}를 반환합니다."""
+        if not cached_data:
+            return None
+        result, new_rows = {}, []
+        for tf in TIMEFRAMES:
+            frame = cached_data.get(tf)
+            if frame is None or len(frame) < 2:
+                result[tf] = None
+                continue
+            closed_at = candle_time(frame)
+            cached = self.latest.get((ticker, tf))
+            if cached is not None and cached[0] == closed_at:
+                result[tf] = cached[1]
+                continue
+            signal = compute(frame, tf)
+            with self._lock:
+                self.latest[(ticker, tf)] = (closed_at, signal)
+            result[tf] = signal
+            new_rows.append((ticker, tf, closed_at.strftime('%Y-%m-%d %H:%M:%S'), signal))
+        if new_rows and self.save:
+            db.log_signals(new_rows)
+        return result
+
+    def drop(self, ticker):
+        with self._lock:
+            for tf in TIMEFRAMES:
+                self.latest.pop((ticker, tf), None)
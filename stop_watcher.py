@@ -0,0 +1,77 @@
+import threading
+from fixed_point import money
+from logger_config import logger
+import config
+import exchange_client
+
+class StopWatcher(threading.Thread):
+    """
+    15분 주기 사이에 현재가를 짧은 간격으로 확인하여, 이미 계산된 스탑 가격을 이탈하면 즉시 청산을 요청합니다.
+    지표는 다시 계산하지 않고 봇이 마지막 주기에 남긴 값(supertrend_stop_price, vanguard_stop_price)만 비교합니다.
+    """
+    def __init__(self, bots, on_trigger, interval_sec=None, price_source=None):
+        super().__init__(name="StopWatcher", daemon=True)
+        self.bots = bots
+        self.on_trigger = on_trigger # on_trigger(bot, order_type, order_data)
+        self.price_source = price_source # price_source(tickers) -> {ticker: price}. 없으면 업비트 API 조회
+        self.interval_sec = interval_sec or config.STOP_WATCHER_CONFIG["POLL_INTERVAL_SEC"]
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _stop_level(self, bot):
+        """봇의 현재 포지션에 해당하는 (스탑 가격, 주문 유형)을 반환합니다. 감시 대상이 아니면 None."""
+        state = bot.state
+        if not state.get('trading_enabled', True):
+            return None
+        status = state['position_status']
+        if status in ['FULL_POSITION', 'PARTIAL_EXIT'] and state.get('trailing_stop_active', False):
+            if state['supertrend_stop_price'] > 0:
+                return state['supertrend_stop_price'], 'SELL_REMAINDER'
+        elif status == 'VANGUARD_IN' and config.STOP_WATCHER_CONFIG["WATCH_VANGUARD_BB_LOW"]:
+            if bot.vanguard_stop_price > 0:
+                return bot.vanguard_stop_price, 'SELL_VANGUARD'
+        return None
+
+    def check_once(self, prices=None):
+        """모든 감시 대상의 현재가를 한 번에 조회하여 스탑 이탈 여부를 확인합니다."""
+        watched = {}
+        for bot in list(self.bots): # 거래 대상 갱신 중에도 안전하도록 복사본을 순회
+            level = self._stop_level(bot)
+            if level:
+                watched[bot.ticker] = (bot, level)
+        if not watched:
+            return
+
+        if prices is None and self.price_source is not None:
+            prices = self.price_source(list(watched.keys()))
+        if prices is None:
+            prices = exchange_client.get_current_price(list(watched.keys()))
+        if not prices:
+            return
+
+        for ticker, (bot, (stop_price, order_type)) in watched.items():
+            price = prices.get(ticker)
+            if price is None or money(price) >= stop_price:
+                continue
+            # 주기 실행 중인 봇은 건너뜀 (주기가 같은 가격 데이터로 스스로 판단함)
+            if not bot.lock.acquire(blocking=False):
+                continue
+            try:
+                # 락을 얻는 사이 주기가 상태를 바꿨을 수 있으므로 다시 확인
+                if self._stop_level(bot) != (stop_price, order_type):
+                    continue
+                reason = f"스탑 감시: 현재가({price:,.0f})가 스탑 가격({stop_price:,.0f}) 이탈."
+                logger.warning("🛑 [%s] %s %s", ticker, order_type, reason)
+                self.on_trigger(bot, order_type, {'reason': reason})
+            finally:
+                bot.lock.release()
+
+    def run(self):
+        logger.info("스탑 감시를 시작합니다. (확인 간격: %s초)", self.interval_sec)
+        while not self._stop_event.wait(self.interval_sec):
+            try:
+                self.check_once()
+            except Exception as e:
+                logger.error("스탑 감시 중 오류 발생: %s", e)
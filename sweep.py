@@ -0,0 +1,195 @@
+"""
+STRATEGY_CONFIG / RISK_CONFIG 파라미터 조합을 프로세스 풀에 나눠 백테스트하는 스윕 실행기.
+
+- 캔들과 파라미터와 무관한 지표(60/240분봉 리샘플링, CCI_20·WMA, RSI_14)는 부모 프로세스에서 한 번만 계산해
+  타임프레임별 .npy 배열로 저장하고, 워커는 np.load(mmap_mode='r')로 복사 없이 읽습니다.
+- 각 워커는 파라미터에 따라 달라지는 지표(BB, CCI_{cci_length}, SuperTrend)만 추가로 계산합니다.
+- 실행 결과는 SWEEP_CONFIG["RESULTS_DB"]의 sweep_runs 테이블에 한 행씩 저장되어 SQL로 조회할 수 있습니다.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import tempfile
+import itertools
+import logging
+from decimal import Decimal
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from logger_config import logger
+import config
+import backtest
+
+# 스윕 가능한 파라미터: 이름 → (설정 딕셔너리 이름, 값 변환 함수)
+SWEEP_PARAMS = {
+    'bbands_length': ('STRATEGY_CONFIG', int),
+    'bbands_std': ('STRATEGY_CONFIG', float),
+    'cci_length': ('STRATEGY_CONFIG', int),
+    'cci_overbought': ('STRATEGY_CONFIG', float),
+    'cci_oversold': ('STRATEGY_CONFIG', float),
+    'SUPERTREND_PERIOD': ('STRATEGY_CONFIG', int),
+    'SUPERTREND_MULTIPLIER': ('STRATEGY_CONFIG', float),
+    'DAILY_LOSS_LIMIT_PERCENTAGE': ('RISK_CONFIG', lambda v: Decimal(str(v))),
+}
+METRICS = ['trades', 'win_rate', 'profit_factor', 'total_return_pct', 'max_drawdown_pct', 'sharpe', 'elapsed_sec']
+
+# --- 파라미터 조합 생성 ---
+def grid_params(grid):
+    """{이름: [후보값]} 격자의 모든 조합을 반환합니다."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+def random_params(grid, count, seed=None):
+    """격자에서 중복 없이 count개 조합을 무작위로 고릅니다."""
+    combos = grid_params(grid)
+    return random.Random(seed).sample(combos, min(count, len(combos)))
+
+def apply_params(params):
+    """파라미터를 config에 적용하고, 복원용 이전 값을 반환합니다."""
+    previous = {}
+    for name, value in params.items():
+        section, convert = SWEEP_PARAMS[name]
+        target = getattr(config, section)
+        previous[name] = target[name]
+        target[name] = convert(value)
+    return previous
+
+def restore_params(previous):
+    for name, value in previous.items():
+        getattr(config, SWEEP_PARAMS[name][0])[name] = value
+
+# --- 공유 배열 (메모리 매핑) ---
+def export_frames(candles_15m, directory):
+    """15분봉을 리샘플링하고 파라미터와 무관한 지표를 붙여 타임프레임별 배열 파일로 저장합니다."""
+    os.makedirs(directory, exist_ok=True)
+    frames = {
+        '15m': candles_15m.copy(),
+        '60m': backtest.resample_candles(candles_15m, '60m'),
+        '240m': backtest.resample_candles(candles_15m, '240m'),
+    }
+    columns = {}
+    for tf, df in frames.items():
+        backtest.add_base_indicators(df)
+        np.save(os.path.join(directory, f"{tf}_ts.npy"), df.index.as_unit('ns').asi8) # 인덱스 해상도와 무관하게 ns로 저장
+        np.save(os.path.join(directory, f"{tf}.npy"), np.ascontiguousarray(df.to_numpy(dtype=np.float64)))
+        columns[tf] = list(df.columns)
+    with open(os.path.join(directory, "columns.json"), "w") as f:
+        json.dump(columns, f)
+    return directory
+
+def load_frames(directory):
+    """export_frames로 저장한 배열을 메모리 매핑하여, 데이터 복사 없이 DataFrame으로 감쌉니다."""
+    with open(os.path.join(directory, "columns.json")) as f:
+        columns = json.load(f)
+    frames = {}
+    for tf, cols in columns.items():
+        values = np.load(os.path.join(directory, f"{tf}.npy"), mmap_mode='r')
+        index = pd.to_datetime(np.load(os.path.join(directory, f"{tf}_ts.npy")), unit='ns')
+        frames[tf] = pd.DataFrame(values, index=index, columns=cols, copy=False)
+    return frames
+
+# --- 워커 ---
+_worker_frames = {}
+_worker_tmp = None
+
+def _init_worker(data_dirs):
+    global _worker_frames, _worker_tmp
+    logger.setLevel(logging.WARNING) # 수백 번의 백테스트 거래 로그가 로그 파일을 채우지 않도록 함
+    _worker_frames = {ticker: load_frames(path) for ticker, path in data_dirs.items()}
+    _worker_tmp = tempfile.mkdtemp(prefix="sweep_worker_")
+
+def _run_one(ticker, params, start=None, end=None):
+    previous = apply_params(params)
+    db_file = os.path.join(_worker_tmp, "run.db")
+    try:
+        if os.path.exists(db_file):
+            os.remove(db_file)
+        frames = _worker_frames[ticker]
+        engine = backtest.BacktestEngine(ticker, frames['15m'], frames['60m'], frames['240m'], db_file=db_file)
+        return engine.run(start, end)['summary']
+    finally:
+        restore_params(previous)
+
+# --- 결과 저장 ---
+def create_results_table(conn):
+    param_cols = ", ".join(f"{name} REAL" for name in SWEEP_PARAMS)
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS sweep_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sweep_id TEXT NOT NULL,
+            ticker TEXT NOT NULL,
+            {param_cols},
+            trades INTEGER, win_rate REAL, profit_factor REAL, total_return_pct REAL,
+            max_drawdown_pct REAL, sharpe REAL, elapsed_sec REAL,
+            params_json TEXT, error TEXT, created_at TEXT
+        )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sweep_runs_sweep ON sweep_runs (sweep_id, total_return_pct)")
+    conn.commit()
+
+def _save_result(conn, sweep_id, ticker, params, summary, error=None):
+    row = {'sweep_id': sweep_id, 'ticker': ticker, 'params_json': json.dumps(params), 'error': error,
+           'created_at': datetime.now().isoformat()}
+    row.update({name: float(params[name]) if name in params else None for name in SWEEP_PARAMS})
+    row.update({name: (summary or {}).get(name) for name in METRICS})
+    cols = ", ".join(row)
+    conn.execute(f"INSERT INTO sweep_runs ({cols}) VALUES ({', '.join('?' * len(row))})", list(row.values()))
+    conn.commit()
+
+def load_results(sweep_id=None, results_db=None):
+    """sweep_runs 테이블을 수익률 순으로 읽습니다."""
+    conn = sqlite3.connect(results_db or config.SWEEP_CONFIG["RESULTS_DB"])
+    query, args = "SELECT * FROM sweep_runs", []
+    if sweep_id:
+        query, args = query + " WHERE sweep_id = ?", [sweep_id]
+    df = pd.read_sql_query(query + " ORDER BY total_return_pct DESC", conn, params=args)
+    conn.close()
+    return df
+
+# --- 실행 ---
+def run_sweep(candles_by_ticker, param_sets, max_workers=None, results_db=None, sweep_id=None):
+    """
+    candles_by_ticker({ticker: 15분봉 DataFrame})의 각 코인에 대해 param_sets의 모든 조합을 병렬로 백테스트합니다.
+    결과는 sweep_runs 테이블에 저장되며, 이번 스윕의 결과를 DataFrame으로 반환합니다.
+    """
+    sweep_id = sweep_id or datetime.now().strftime('%Y%m%d-%H%M%S')
+    max_workers = max_workers or config.SWEEP_CONFIG["MAX_WORKERS"]
+    results_db = results_db or config.SWEEP_CONFIG["RESULTS_DB"]
+    data_root = tempfile.mkdtemp(prefix="sweep_data_")
+    conn = sqlite3.connect(results_db)
+    create_results_table(conn)
+    started = time.perf_counter()
+    try:
+        data_dirs = {ticker: export_frames(df, os.path.join(data_root, ticker)) for ticker, df in candles_by_ticker.items()}
+        tasks = [(ticker, params) for ticker in candles_by_ticker for params in param_sets]
+        logger.info(f"파라미터 스윕 시작 [{sweep_id}]: {len(tasks)}회 실행 (워커 {max_workers}개)")
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(data_dirs,)) as pool:
+            futures = {pool.submit(_run_one, ticker, params): (ticker, params) for ticker, params in tasks}
+            for done, future in enumerate(as_completed(futures), 1):
+                ticker, params = futures[future]
+                try:
+                    _save_result(conn, sweep_id, ticker, params, future.result())
+                except Exception as e:
+                    logger.error(f"[{ticker}] 스윕 실행 실패 {params}: {e}")
+                    _save_result(conn, sweep_id, ticker, params, None, error=str(e))
+                if done % 10 == 0 or done == len(tasks):
+                    logger.info(f"파라미터 스윕 진행: {done}/{len(tasks)}")
+    finally:
+        conn.close()
+        shutil.rmtree(data_root, ignore_errors=True)
+    logger.info(f"파라미터 스윕 완료 [{sweep_id}]: {time.perf_counter() - started:.1f}초")
+    return load_results(sweep_id, results_db)
+
+if __name__ == "__main__":
+    # 사용법: python sweep.py KRW-BTC candles_15m.csv [무작위 조합 개수]
+    if len(sys.argv) < 3:
+        print("사용법: python sweep.py <TICKER> <15분봉 CSV> [무작위 조합 개수]")
+        sys.exit(1)
+    grid = config.SWEEP_CONFIG["GRID"]
+    param_sets = random_params(grid, int(sys.argv[3])) if len(sys.argv) > 3 else grid_params(grid)
+    results = run_sweep({sys.argv[1]: backtest.load_candles_csv(sys.argv[2])}, param_sets)
+    print(results[['ticker'] + list(grid) + METRICS].head(20).to_string())
@@ -0,0 +1,63 @@
+"""backtest.py 테스트: 시뮬레이션 체결과 엔진 실행 후 전역 상태 복구를 확인합니다. (python -m pytest)"""
+import logging
+import sqlite3
+from decimal import Decimal
+import pandas as pd
+import pytest
+import backtest
+import config
+import database_manager as db
+import main
+import scale_replay
+from fixed_point import money, VOLUME_SCALE
+from trading_bot import TradingBot
+
+INITIAL = money(1_000_000)
+
+@pytest.fixture(autouse=True)
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_FILE', str(tmp_path / "bot.db"))
+    db.create_tables()
+
+def _buy(exchange, bot, percentage):
+    assert main.submit_order(exchange, bot, 'BUY_VANGUARD', {'percentage': percentage, 'reason': 'test'}, main.candle_clock.now())
+    main.check_pending_order(exchange, bot)
+    assert bot.state['pending_order_uuid'] is None
+
+def test_market_buy_fills_whole_amount_at_volume_scale():
+    """KRW-XRP의 주문 단위(1개)보다 작은 수량도 VOLUME_SCALE로 체결되고, 남는 1원 미만은 자본으로 돌아옴."""
+    exchange, bot = backtest.SimulatedFillModel(), TradingBot('KRW-XRP', {'capital': INITIAL})
+    exchange.set_price('KRW-XRP', 3)
+    _buy(exchange, bot, 0.5)
+    assert bot.state['total_position_size'] == Decimal('166666.66666666')
+    assert bot.state['total_position_size'].scale == VOLUME_SCALE
+    assert bot.state['position_status'] == 'VANGUARD_IN'
+    assert main.bot_equity(bot.state, Decimal('3')) == INITIAL
+
+def test_zero_fill_is_cancelled_and_refunded():
+    """한 단위도 살 수 없는 매수는 취소되어 주문 금액이 돌아오고 거래는 계속됨."""
+    exchange, bot = backtest.SimulatedFillModel(), TradingBot('KRW-BTC', {'capital': money(10_000)})
+    exchange.set_price('KRW-BTC', 10**12)
+    _buy(exchange, bot, 0.5)
+    assert bot.state['capital'] == 10_000
+    assert bot.state['position_status'] == 'NONE'
+    assert bot.state['total_position_size'] == 0
+    assert bot.state['trading_enabled']
+
+def test_run_keeps_trading_and_restores_pandas_option(tmp_path, monkeypatch):
+    monkeypatch.setitem(config.LOGGING_CONFIG, 'PAYLOADS_ENABLED', False)
+    candles = scale_replay.synthetic_candles(['KRW-XRP'], '2025-01-01', 10, seed=1)['KRW-XRP']
+    candles[['open', 'high', 'low', 'close']] *= 400_000 / candles['close'].iloc[0] # 1개 단위로는 살 수 없는 가격대
+    before = pd.options.mode.chained_assignment
+    logging.getLogger('TradingBot').disabled = True
+    try:
+        engine = backtest.BacktestEngine('KRW-XRP', candles, ai_provider=backtest.FixedAIProvider(),
+                                         db_file=str(tmp_path / "backtest.db"))
+        result = engine.run()
+    finally:
+        logging.getLogger('TradingBot').disabled = False
+    assert pd.options.mode.chained_assignment == before
+    conn = sqlite3.connect(result['db_file'])
+    status, trading_enabled = conn.execute("SELECT position_status, trading_enabled FROM bot_states").fetchone()
+    conn.close()
+    assert status != 'ORDER_PENDING' and trading_enabled
@@ -0,0 +1,35 @@
+"""candle_buffer.py 테스트. (python -m pytest)"""
+import numpy as np
+import pandas as pd
+import candle_buffer
+
+def _frame(times):
+    """pyupbit/exchange_client처럼 시각 문자열을 파싱한 인덱스의 캔들 프레임. (해상도는 설치된 pandas가 정함)"""
+    n = len(times)
+    close = np.linspace(100.0, 100.0 + n, n)
+    return pd.DataFrame({'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+                         'volume': np.ones(n), 'value': close}, index=pd.to_datetime(times))
+
+def test_ring_timestamps_are_epoch_seconds_for_any_index_unit():
+    times = ['2024-01-01 09:00:00', '2024-01-01 09:15:00', '2024-01-01 09:30:00']
+    expected = [int(pd.Timestamp(t).timestamp()) for t in times]
+    for unit in ['s', 'ms', 'us', 'ns']:
+        df = _frame(times)
+        df.index = df.index.as_unit(unit)
+        ring = candle_buffer.CandleRing('15m', capacity=8)
+        assert ring.update_frame(df)
+        assert ring.timestamps().tolist() == expected
+        assert len(ring) == 3 # 15분 간격 캔들이 서로 덮어쓰지 않음
+        assert ring.to_frame().index[-1] == pd.Timestamp(times[-1])
+
+def test_in_progress_candle_updates_in_place_and_wraps():
+    ring = candle_buffer.CandleRing('15m', capacity=4)
+    times = pd.date_range('2024-01-01 09:00', periods=6, freq='15min').strftime('%Y-%m-%d %H:%M:%S').tolist()
+    ring.update_frame(_frame(times[:3]))
+    df = _frame(times[2:3])
+    df['close'] = 999.0
+    ring.update_frame(df) # 진행 중인 마지막 캔들 갱신
+    assert len(ring) == 3 and ring.column('close')[-1] == 999.0
+    ring.update_frame(_frame(times))
+    assert len(ring) == 4
+    assert ring.timestamps().tolist() == [int(pd.Timestamp(t).timestamp()) for t in times[-4:]]
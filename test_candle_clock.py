@@ -0,0 +1,65 @@
+"""candle_clock.py 테스트. (python -m pytest)"""
+import pandas as pd
+import pytest
+import config
+import candle_clock
+from candle_clock import CandleClock, CandleCloseEvent
+
+def kst(text):
+    return pd.Timestamp(text, tz=config.TIMEZONE)
+
+@pytest.fixture
+def clock_at(monkeypatch):
+    """candle_clock.now()가 돌려줄 시각을 바꾸는 함수."""
+    current = {}
+    monkeypatch.setattr(candle_clock, '_time_source', lambda: current['now'])
+    def set_now(text):
+        current['now'] = kst(text)
+    return set_now
+
+def test_floor_to_close_follows_upbit_utc_alignment():
+    assert candle_clock.floor_to_close(kst('2026-10-19 09:14:59'), '15m') == kst('2026-10-19 09:00')
+    assert candle_clock.floor_to_close(kst('2026-10-19 09:15'), '15m') == kst('2026-10-19 09:15')
+    # 4시간봉은 UTC 00시 기준이므로 KST 01, 05, 09, 13, 17, 21시에 마감
+    assert candle_clock.floor_to_close(kst('2026-10-19 08:59'), '240m') == kst('2026-10-19 05:00')
+    assert candle_clock.floor_to_close(pd.Timestamp('2026-10-19 12:30'), '60m') == kst('2026-10-19 12:00') # tz 없으면 KST
+    index = pd.DatetimeIndex([kst('2026-10-19 08:59'), kst('2026-10-19 09:01')])
+    scalar = [candle_clock.floor_to_close(ts, '240m') for ts in index]
+    assert list(candle_clock.floor_to_close(index, '240m')) == scalar
+
+def test_closed_timeframes_at():
+    assert candle_clock.closed_timeframes_at(kst('2026-10-19 09:00')) == {'15m', '60m', '240m'}
+    assert candle_clock.closed_timeframes_at(kst('2026-10-19 10:00')) == {'15m', '60m'}
+    assert candle_clock.closed_timeframes_at(kst('2026-10-19 10:15')) == {'15m'}
+    assert candle_clock.closed_timeframes_at(pd.Timestamp('2026-10-19 13:00')) == {'15m', '60m', '240m'}
+
+def test_poll_emits_every_missed_boundary_once(clock_at):
+    clock_at('2026-10-19 09:01')
+    clock = CandleClock(['KRW-BTC'], grace_sec=2)
+    assert clock.poll() == []
+
+    clock_at('2026-10-19 10:05') # 주기가 한 시간 늦게 돌아와도 경계를 건너뛰지 않음
+    events = clock.poll()
+    assert [e.close_time.strftime('%H:%M') for e in events if e.timeframe == '15m'] == ['09:15', '09:30', '09:45', '10:00']
+    assert [e for e in events if e.timeframe == '60m'] == [CandleCloseEvent('KRW-BTC', '60m', kst('2026-10-19 10:00'))]
+    assert not [e for e in events if e.timeframe == '240m']
+    assert clock.poll() == []
+    assert clock.seconds_until_next_close() == 10 * 60 + 2
+
+    grouped = candle_clock.group_events(events)
+    assert grouped == {'KRW-BTC': (kst('2026-10-19 10:00'), {'15m', '60m'})}
+
+def test_new_tickers_start_from_the_next_close(clock_at):
+    clock_at('2026-10-19 09:01')
+    clock = CandleClock(['KRW-BTC'], timeframes=['15m'])
+    clock_at('2026-10-19 09:20')
+    clock.set_tickers(['KRW-BTC', 'KRW-ETH'])
+    assert clock.poll() == [CandleCloseEvent('KRW-BTC', '15m', kst('2026-10-19 09:15'))]
+
+def test_observe_candle_uses_the_feed_instead_of_the_local_clock(clock_at):
+    clock_at('2026-10-19 09:01')
+    clock = CandleClock(['KRW-BTC'], timeframes=['15m'])
+    # 09:15에 시작한 캔들이 보이면 09:00~09:15 캔들이 마감된 것
+    assert clock.observe_candle('KRW-BTC', '15m', pd.Timestamp('2026-10-19 09:15')) == [
+        CandleCloseEvent('KRW-BTC', '15m', kst('2026-10-19 09:15'))]
+    assert clock.observe_candle('KRW-BTC', '15m', pd.Timestamp('2026-10-19 09:15')) == []
@@ -0,0 +1,50 @@
+"""candle_store.py 테스트. (python -m pytest)"""
+import numpy as np
+import pandas as pd
+import config
+import candle_clock
+import candle_store
+
+LISTING = pd.Timestamp('2024-01-01 09:00')
+NOW = pd.Timestamp('2024-01-03 09:07', tz=config.TIMEZONE)
+
+def _history():
+    index = pd.date_range(LISTING, NOW.tz_localize(None), freq='15min')
+    close = np.arange(len(index), dtype=float) + 100
+    return pd.DataFrame({'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+                         'volume': np.ones(len(index)), 'value': close}, index=index)
+
+def _fake_get_ohlcv(history, calls):
+    def get_ohlcv(ticker, interval, count, to=None):
+        calls.append(count)
+        end = pd.Timestamp(to).tz_convert(config.TIMEZONE).tz_localize(None) if to is not None else NOW.tz_localize(None)
+        page = history[history.index < end].iloc[-count:]
+        # pyupbit처럼 시각 문자열을 파싱한 인덱스 (해상도는 설치된 pandas가 정함)
+        page.index = pd.to_datetime(page.index.strftime('%Y-%m-%d %H:%M:%S'))
+        return page
+    return get_ohlcv
+
+def test_download_resume_and_load_round_trip(tmp_path, monkeypatch):
+    history = _history()
+    calls = []
+    monkeypatch.setattr(candle_store.exchange_client, 'get_ohlcv', _fake_get_ohlcv(history, calls))
+    monkeypatch.setattr(candle_clock, '_time_source', lambda: NOW)
+    monkeypatch.setitem(config.HISTORY_CONFIG, 'PAGE_SIZE', 50)
+
+    rows = candle_store.download('KRW-BTC', '15m', since='2024-01-02 00:00', root=str(tmp_path))
+    closed = history[(history.index >= '2024-01-02 00:00') & (history.index < '2024-01-03 09:00')]
+    assert rows == len(closed)
+    arrays = candle_store.load_arrays('KRW-BTC', '15m', root=str(tmp_path))
+    assert arrays['ts'][0] == int(pd.Timestamp('2024-01-02 00:00').timestamp()) # 시각이 에포크 초로 저장됨
+    assert np.all(np.diff(arrays['ts']) == 15 * 60)
+
+    frame = candle_store.load_frame('KRW-BTC', '15m', start='2024-01-02 06:00', end='2024-01-02 07:00', root=str(tmp_path))
+    expected = history.loc['2024-01-02 06:00':'2024-01-02 07:00']
+    assert list(frame.index) == list(expected.index)
+    assert np.array_equal(frame.to_numpy(), expected.to_numpy())
+
+    # 과거 쪽으로 범위를 넓히면 이미 받은 구간은 다시 요청하지 않음
+    calls.clear()
+    rows = candle_store.download('KRW-BTC', '15m', since=None, root=str(tmp_path))
+    assert rows == len(history) - 1 # 진행 중인 캔들 제외
+    assert sum(calls) <= len(history[history.index < '2024-01-02 00:00']) + config.HISTORY_CONFIG['PAGE_SIZE']
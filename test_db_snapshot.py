@@ -0,0 +1,27 @@
+"""db_snapshot.py 테스트. (python -m pytest)"""
+import sqlite3
+import config
+import db_snapshot
+
+def _make_db(path, value):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (v TEXT)")
+    conn.execute("INSERT INTO t VALUES (?)", (value,))
+    conn.commit()
+    conn.close()
+
+def test_snapshot_is_read_only_when_enabled(tmp_path, monkeypatch):
+    db_file = str(tmp_path / "bot.db")
+    _make_db(db_file, 'live')
+    _make_db(db_snapshot.snapshot_path(db_file), 'stale') # 예전에 켰을 때 남은 스냅샷
+
+    monkeypatch.setitem(config.SNAPSHOT_CONFIG, 'ENABLED', False)
+    conn, from_snapshot = db_snapshot.connect_readonly(db_file)
+    assert not from_snapshot and conn.execute("SELECT v FROM t").fetchone() == ('live',)
+    conn.close()
+
+    monkeypatch.setitem(config.SNAPSHOT_CONFIG, 'ENABLED', True)
+    db_snapshot.publish(db_file)
+    conn, from_snapshot = db_snapshot.connect_readonly(db_file)
+    assert from_snapshot and conn.execute("SELECT v FROM t").fetchone() == ('live',)
+    conn.close()
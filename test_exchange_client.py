@@ -0,0 +1,123 @@
+"""exchange_client.py 테스트. (python -m pytest)"""
+import os
+import sys
+import json
+import subprocess
+import pytest
+import requests
+import config
+import exchange_client
+
+def test_import_has_no_logging_side_effects(tmp_path):
+    """대시보드가 import해도 logger_config(로그 리스너, trading_bot.log 교체)가 불러와지지 않는지. (새 프로세스에서 확인)"""
+    code = ("import sys, exchange_client, metrics, db_snapshot; "
+            "assert 'logger_config' not in sys.modules, 'logger_config'; "
+            "import os; assert not os.listdir('.'), os.listdir('.')")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.path.dirname(os.path.abspath(__file__)), os.environ.get('PYTHONPATH', '')]))
+    result = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class FakeResponse:
+    def __init__(self, status_code, data=None, remaining=None):
+        self.status_code = status_code
+        self._data = data
+        self.headers = {'Remaining-Req': f"group=market; min=600; sec={remaining}"} if remaining is not None else {}
+        self.text = str(data)
+
+    def json(self):
+        return self._data
+
+class FakeSession:
+    """미리 정한 응답(또는 예외)을 차례로 돌려주고 요청을 기록합니다."""
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def request(self, method, url, data=None, headers=None, timeout=None):
+        self.calls.append((method, url, data))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+class NoLimit:
+    def acquire(self):
+        pass
+
+@pytest.fixture(autouse=True)
+def max_backoff(monkeypatch):
+    """지터 없이 최대 대기 시간으로 재시도합니다."""
+    monkeypatch.setattr(exchange_client.random, 'uniform', lambda low, high: high)
+
+def _client(*responses):
+    clock = FakeClock()
+    session = FakeSession(*responses)
+    return exchange_client.RestClient("test", NoLimit(), session=session, clock=clock, sleep=clock.sleep), session, clock
+
+def test_retries_server_errors_with_exponential_backoff():
+    client, session, clock = _client(FakeResponse(503), requests.ConnectionError(), FakeResponse(200, [1]))
+    assert client.request("GET", "/ticker") == [1]
+    assert len(session.calls) == 3
+    assert clock.sleeps == [0.25, 0.5] # BASE·2^n
+
+def test_client_errors_are_not_retried():
+    client, session, _ = _client(FakeResponse(400, {'error': {'name': 'bad', 'message': 'request'}}))
+    assert client.request("GET", "/ticker") is None
+    assert len(session.calls) == 1 and client._failures == 0 # 서비스는 살아 있으므로 브레이커 실패가 아님
+
+def test_gives_up_after_max_retries():
+    cc = config.EXCHANGE_CLIENT_CONFIG
+    client, session, clock = _client(*[FakeResponse(500)] * (cc["MAX_RETRIES"] + 1))
+    assert client.request("GET", "/ticker") is None
+    assert len(session.calls) == cc["MAX_RETRIES"] + 1
+    assert clock.sleeps == [min(cc["BACKOFF_MAX_SEC"], cc["BACKOFF_BASE_SEC"] * 2 ** n) for n in range(cc["MAX_RETRIES"])]
+
+def test_remaining_req_paces_the_group_until_the_next_second():
+    client, session, clock = _client(FakeResponse(200, [], remaining=1), FakeResponse(200, [], remaining=9))
+    client.request("GET", "/candles/minutes/15")
+    clock.now = 0.4
+    client.request("GET", "/candles/minutes/15") # 남은 요청 1 ≤ RESERVE → 다음 1초까지 대기
+    assert clock.sleeps == [pytest.approx(0.6)]
+
+def test_429_holds_the_whole_group():
+    client, session, clock = _client(FakeResponse(429, remaining=0), FakeResponse(200, [1], remaining=5))
+    assert client.request("GET", "/ticker") == [1]
+    assert clock.sleeps == [0.25] # 그룹 창을 0.25초 막고, 다음 시도가 _pace에서 기다림
+
+def test_breaker_opens_after_consecutive_failures_and_probes_once():
+    cc = config.EXCHANGE_CLIENT_CONFIG
+    attempts = cc["MAX_RETRIES"] + 1
+    client, session, clock = _client(*[requests.ConnectionError()] * (attempts * cc["BREAKER_FAILURES"]), FakeResponse(200, [1]))
+    for _ in range(cc["BREAKER_FAILURES"]):
+        assert client.request("GET", "/ticker") is None
+    calls = len(session.calls)
+    assert client.request("GET", "/ticker") is None and len(session.calls) == calls # 열려 있는 동안은 요청하지 않음
+
+    clock.now += cc["BREAKER_OPEN_SEC"]
+    assert client.request("GET", "/ticker") == [1] # 한 요청으로 회복 확인
+    assert client._open_until is None and client._failures == 0
+
+def test_unanswered_order_is_looked_up_by_identifier_instead_of_resent():
+    client, session, _ = _client(requests.ReadTimeout(), FakeResponse(200, {'uuid': 'order-1', 'state': 'wait'}))
+    assert client.request("POST", "/orders", {'market': 'KRW-BTC', 'side': 'bid'}) == {'uuid': 'order-1', 'state': 'wait'}
+    (post, _, body), (get, url, _) = session.calls
+    assert post == "POST" and get == "GET"
+    assert url.endswith(f"/order?identifier={json.loads(body)['identifier']}")
+
+def test_order_rejected_by_rate_limit_is_resent_with_a_new_identifier():
+    client, session, _ = _client(FakeResponse(429), FakeResponse(201, {'uuid': 'order-1'}))
+    assert client.request("POST", "/orders", {'market': 'KRW-BTC'}) == {'uuid': 'order-1'}
+    identifiers = [json.loads(body)['identifier'] for method, _, body in session.calls]
+    assert len(identifiers) == 2 and identifiers[0] != identifiers[1]
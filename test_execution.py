@@ -0,0 +1,162 @@
+"""execution.py 테스트: 가짜 거래소와 가짜 시계로 분할 실행 엔진을 동기적으로 확인합니다. (python -m pytest)"""
+from decimal import Decimal
+import pytest
+import config
+import database_manager as db
+import execution
+import main
+from fixed_point import money
+from trading_bot import TradingBot
+
+PRICE = Decimal('100')
+# 최우선 호가 100원에 1000개 → 매수 쪽 BAND_BPS 안의 잔량 100,000원, 참여율 0.2 → 한 번에 20,000원 / 매도 쪽 200개
+ORDERBOOK = {'orderbook_units': [{'ask_price': 100.0, 'ask_size': 1000.0, 'bid_price': 99.0, 'bid_size': 1000.0},
+                                 {'ask_price': 110.0, 'ask_size': 1000.0, 'bid_price': 90.0, 'bid_size': 1000.0}]}
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class FakeUpbit:
+    """시장가 주문을 PRICE에 즉시 전량 체결합니다. on_order(uuid)로 주문마다 끼어들 수 있습니다."""
+    def __init__(self, on_order=None):
+        self.orders = {}
+        self.buys, self.sells = [], []
+        self.on_order = on_order
+
+    def _fill(self, side, volume):
+        order_uuid = f"child-{len(self.orders) + 1}"
+        self.orders[order_uuid] = {'uuid': order_uuid, 'side': side, 'state': 'done', 'executed_volume': str(volume),
+                                   'trades': [{'price': str(PRICE), 'volume': str(volume)}]}
+        if self.on_order:
+            self.on_order(order_uuid)
+        return {'uuid': order_uuid}
+
+    def buy_market_order(self, ticker, krw_amount):
+        self.buys.append(krw_amount)
+        return self._fill('bid', Decimal(str(krw_amount)) / PRICE)
+
+    def sell_market_order(self, ticker, volume):
+        self.sells.append(volume)
+        return self._fill('ask', Decimal(str(volume)))
+
+    def get_order(self, order_uuid):
+        return self.orders.get(order_uuid)
+
+    def cancel_order(self, order_uuid):
+        return self.orders.get(order_uuid)
+
+@pytest.fixture(autouse=True)
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_FILE', str(tmp_path / "bot.db"))
+    db.create_tables()
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setitem(config.EXECUTION_CONFIG, "ENABLED", True)
+    monkeypatch.setitem(config.EXECUTION_CONFIG, "ALGO", "TWAP")
+
+def _engine(upbit, clock):
+    return execution.ExecutionEngine(upbit, orderbook_source=lambda ticker: ORDERBOOK, clock=clock, sleep=clock.sleep)
+
+def _run(engine, *args, **kwargs):
+    """주문을 내고 실행 스레드가 끝날 때까지 기다립니다."""
+    res = engine.submit(*args, **kwargs)
+    engine._pool.shutdown(wait=True)
+    return res
+
+def test_disabled_by_default():
+    assert config.EXECUTION_CONFIG["ENABLED"] is False
+    upbit = FakeUpbit()
+    assert _engine(upbit, FakeClock()).submit('KRW-BTC', 'bid', Decimal('100000'), PRICE, 'BUY_VANGUARD') is None
+
+def test_small_order_is_not_split(enabled):
+    clock = FakeClock()
+    engine = _engine(FakeUpbit(), clock)
+    assert engine.submit('KRW-BTC', 'bid', Decimal('20000'), PRICE, 'BUY_VANGUARD') is None
+    assert engine.submit('KRW-BTC', 'bid', Decimal('100000'), PRICE, 'SELL_STOP') is None # 분할 대상이 아닌 주문 종류
+
+def test_twap_splits_into_even_slices_over_duration(enabled):
+    clock, upbit = FakeClock(), FakeUpbit()
+    engine = _engine(upbit, clock)
+    res = _run(engine, 'KRW-BTC', 'bid', Decimal('100000'), PRICE, 'BUY_VANGUARD')
+    assert execution.is_parent_id(res['uuid'])
+    assert upbit.buys == [20000.0] * 5 # 100,000 / 20,000 = 5조각
+    assert clock.now == config.EXECUTION_CONFIG["DURATION_SEC"] # 조각 사이 간격 = 60 / 4
+    order = engine.get_order(res['uuid'])
+    assert order['state'] == 'done' and Decimal(order['executed_volume']) == 1000 and len(order['trades']) == 5
+    record = db.load_execution_order(res['uuid'])
+    assert record['slippage_bps'] == 0.0
+    assert record['executed_volume'] == '1000.00000000' and record['avg_price'] == '100.00000000' # 장부와 같은 Fixed 자릿수
+
+def test_remainder_below_min_order_is_merged_into_last_slice(enabled, monkeypatch):
+    monkeypatch.setitem(config.EXECUTION_CONFIG, "ALGO", "PARTICIPATION")
+    upbit = FakeUpbit()
+    _run(_engine(upbit, FakeClock()), 'KRW-BTC', 'bid', Decimal('44000'), PRICE, 'BUY_VANGUARD')
+    assert upbit.buys == [20000.0, 24000.0] # 4,000원(< MIN_ORDER_KRW)만 남기지 않고 합침
+
+def test_sell_slices_are_floored_to_ticker_precision(enabled):
+    upbit = FakeUpbit()
+    engine = _engine(upbit, FakeClock())
+    res = _run(engine, 'KRW-ETH', 'ask', Decimal('450.123457'), Decimal('99'), 'SELL_ALL_FINAL')
+    assert upbit.sells == [150.041152, 150.041152, 150.041153] # 0.000001개 자투리는 마지막 조각에 합침
+    assert engine.get_order(res['uuid'])['state'] == 'done'
+
+def test_cancel_keeps_fills_and_check_pending_order_applies_them(enabled, monkeypatch):
+    """첫 조각 체결 뒤 취소된 매수 모주문이 main.check_pending_order의 '일부 체결 후 취소'(시나리오 2-1)로 반영되는지."""
+    engine = None
+
+    def cancel_after_first(order_uuid):
+        for parent_id in list(engine.parents):
+            engine.cancel_order(parent_id)
+
+    upbit = FakeUpbit(on_order=cancel_after_first)
+    engine = _engine(upbit, FakeClock())
+    monkeypatch.setattr(main, '_execution', engine)
+
+    bot = TradingBot('KRW-BTC', {'capital': money(1_000_000)})
+    amount = money(100_000)
+    res = main.place_market_order(upbit, 'KRW-BTC', 'bid', amount, 'BUY_VANGUARD', money(PRICE))
+    engine._pool.shutdown(wait=True)
+    # submit_order가 주문 제출 직후 하는 일
+    bot.state['capital'] -= amount
+    bot.state.update(pending_order_amount=amount, position_status='ORDER_PENDING',
+                     pending_order_uuid=res['uuid'], pending_order_type='BUY_VANGUARD')
+
+    assert upbit.buys == [20000.0]
+    assert engine.get_order(res['uuid'])['state'] == 'cancel'
+    assert 'error' in engine.cancel_order(res['uuid']) # 끝난 모주문은 다시 취소할 수 없음
+
+    main.check_pending_order(upbit, bot)
+    assert bot.state['total_position_size'] == 200
+    assert bot.state['avg_entry_price'] == 100
+    assert bot.state['capital'] == 1_000_000 - 20_000 # 체결되지 않은 80,000원은 자본으로 돌아옴
+    assert bot.state['position_status'] == 'VANGUARD_IN'
+    assert bot.state['pending_order_uuid'] is None and bot.state['pending_order_amount'] is None
+
+def test_restore_after_restart_rebuilds_fills_from_children(enabled):
+    upbit = FakeUpbit()
+    children = [upbit.buy_market_order('KRW-BTC', 20000.0)['uuid'] for _ in range(2)]
+    # 자식 주문 두 건을 낸 뒤 프로세스가 종료된 모주문 기록
+    parent = execution.ParentOrder(f"{execution.PARENT_PREFIX}restart", 'KRW-BTC', 'bid', Decimal('100000'), PRICE, 'TWAP')
+    parent.children.extend(children)
+    db.save_execution_order(parent.record())
+
+    restarted = _engine(upbit, FakeClock())
+    order = restarted.get_order(parent.parent_id)
+    assert order['state'] == 'cancel' # 남은 조각은 내지 않고 체결분만 반영
+    assert Decimal(order['executed_volume']) == 400 and order['children'] == children
+    assert upbit.buys == [20000.0, 20000.0]
+    assert db.load_execution_order(parent.parent_id)['state'] == 'cancel'
+
+    again = _engine(upbit, FakeClock()).get_order(parent.parent_id) # 끝난 기록은 그대로 복원
+    assert again['state'] == 'cancel' and Decimal(again['executed_volume']) == 400
+    assert restarted.get_order('slice-unknown') is None
@@ -0,0 +1,66 @@
+"""fixed_point.py 테스트. (python -m pytest)"""
+import sqlite3
+from decimal import Decimal, ROUND_DOWN
+import numpy as np
+import pytest
+from fixed_point import Fixed, money, volume, order_volume, volume_step, MONEY_SCALE, VOLUME_SCALE
+
+def test_mul_and_div_round_half_even_once():
+    assert Fixed.parse('0.15', 1) * 1 == Fixed.parse('0.15', 1) # 정수배는 반올림 없음
+    # 0.25 * 0.5 = 0.125 → 소수 2자리에서 짝수로 (0.12), 0.375 → 0.38
+    assert (Fixed.parse('0.25', 2) * Fixed.parse('0.5', 2)).units == 12
+    assert (Fixed.parse('0.75', 2) * Fixed.parse('0.5', 2)).units == 38
+    assert str(Fixed.parse('1', 2) / 3) == '0.33'
+    assert str(Fixed.parse('2', 2) / 3) == '0.67'
+    assert str(Fixed.parse('-2', 2) / 3) == '-0.67'
+    assert str(Fixed.parse('1', 2) / Fixed.parse('-8', 2)) == '-0.12' # -0.125 → 짝수
+    # 결과 자릿수는 두 값 중 큰 쪽 (Decimal 상대는 self의 자릿수)
+    assert (Fixed.parse('1.5', 1) * Fixed.parse('0.333', 3)).scale == 3
+    assert (Fixed.parse('1.5', 1) * Decimal('0.333')).scale == 1
+    with pytest.raises(ZeroDivisionError):
+        Fixed.parse('1', 2) / 0
+
+def test_round_down_truncates_toward_zero():
+    assert str(Fixed.parse('1.999', 3).rescale(2, ROUND_DOWN)) == '1.99'
+    assert str(Fixed.parse('-1.999', 3).rescale(2, ROUND_DOWN)) == '-1.99'
+    assert str(Fixed.parse('-0.001', 3).quantize(Decimal('0.01'), ROUND_DOWN)) == '0.00'
+    assert int(Fixed.parse('-1.5', 1)) == -1 and int(Fixed.parse('1.5', 1)) == 1
+
+def test_order_volume_never_rounds_up():
+    assert str(order_volume('0.123456789', 'KRW-BTC')) == '0.12345678'
+    assert str(order_volume(Decimal('0.123456789'), 'KRW-BTC')) == '0.12345678'
+    assert str(order_volume(0.999999999, 'KRW-BTC')) == '0.99999999'
+    assert str(order_volume(volume('1.9999999'), 'KRW-ETH')) == '1.999999'
+    assert str(order_volume(Fixed.parse('12.9', 1), 'KRW-XRP')) == '12'
+    assert str(order_volume(3, 'KRW-XRP')) == '3'
+    for text in ['0.000000019', '5.55555555555', '123.456789123']:
+        assert order_volume(text, 'KRW-BTC') <= Decimal(text)
+    assert volume_step('KRW-ETH') == Decimal('0.000001')
+    assert volume_step('KRW-UNKNOWN') == Decimal('0.00000001')
+
+def test_str_parse_and_sqlite_round_trip():
+    values = [money('1234567.891'), money('-0.5'), money(0), volume('0.00000001'), volume('-12345.6789'), Fixed(10**30, MONEY_SCALE)]
+    for value in values:
+        assert 'e' not in str(value).lower()
+        assert Fixed.parse(str(value), value.scale) == value
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE t (v TEXT)")
+    conn.executemany("INSERT INTO t VALUES (?)", [(v,) for v in values])
+    stored = [row[0] for row in conn.execute("SELECT v FROM t ORDER BY rowid")]
+    assert stored == [str(v) for v in values]
+    assert [Fixed.parse(s, v.scale) for s, v in zip(stored, values)] == values
+    # 이전에 Decimal로 저장한 지수 표기도 복원
+    assert money('1E+3') == 1000 and volume('1E-8') == volume('0.00000001')
+
+def test_boundary_conversions_match_decimal():
+    assert money(0.1) == Decimal('0.1') # float는 최단 10진 표기 기준
+    assert money(None) == 0
+    assert str(money(Decimal('1.23456789123'))) == str(Decimal('1.23456789123').quantize(Decimal(1).scaleb(-MONEY_SCALE)))
+    assert volume('1.5').scale == VOLUME_SCALE
+    assert money('10') + 1 == 11 and money('10') - Decimal('0.5') == Decimal('9.5')
+    assert sorted([money('2'), money('-1'), money('0.5')]) == [money('-1'), money('0.5'), money('2')]
+
+def test_numpy_scalars_convert_like_floats():
+    assert money(np.float64(1.5)) == Decimal('1.5')
+    assert money('10') * np.float64(0.1) == Decimal('1')
+    assert volume(np.float64(0.1)) == volume(0.1)
@@ -0,0 +1,53 @@
+"""logger_config.py 테스트: 큐 핸들러의 메시지 포맷 시점과 페이로드 직렬화 시점. (python -m pytest)"""
+import gzip
+import json
+import queue
+import logging
+from decimal import Decimal
+import logger_config
+from logger_config import Krw
+from fixed_point import money
+
+def _prepare(msg, *args):
+    record = logging.LogRecord('TradingBot', logging.INFO, __file__, 1, msg, args, None)
+    return logger_config._ContextQueueHandler(queue.SimpleQueue()).prepare(record)
+
+def test_immutable_args_are_formatted_on_the_listener():
+    record = _prepare("[%s] 총자산 %s원, 낙폭 %.2f%%, %s", 'KRW-BTC', Krw(money('1234567.5')), -1.5, Decimal('0.1'))
+    assert record.args # 포맷하지 않고 인자 그대로 큐에 넣음
+    assert record.getMessage() == "[KRW-BTC] 총자산 1,234,568원, 낙폭 -1.50%, 0.1"
+
+def test_mutable_args_are_formatted_at_call_time():
+    state = {'capital': 1}
+    record = _prepare("상태 %s", state)
+    state['capital'] = 2 # 큐에 넣은 뒤 바뀌어도 호출 시점의 값이 남음
+    assert record.args is None and record.getMessage() == "상태 {'capital': 1}"
+
+def test_ticker_context_is_attached():
+    with logger_config.ticker_context('KRW-ETH'):
+        assert _prepare("메시지").ticker == 'KRW-ETH'
+
+def test_payload_is_serialized_at_call_time(tmp_path, monkeypatch):
+    records = []
+    capture = logging.Handler()
+    capture.emit = records.append
+    monkeypatch.setattr(logger_config.payload_logger, 'propagate', False) # 실제 리스너로 보내지 않음
+    logger_config.payload_logger.addHandler(capture)
+    try:
+        briefing = {'price': 1}
+        logger_config.log_payload('ai_briefing', briefing, 'KRW-BTC')
+        briefing['price'] = 2 # 큐에 넣은 뒤 바뀌어도 호출 시점의 값이 기록됨
+    finally:
+        logger_config.payload_logger.removeHandler(capture)
+
+    handler = logger_config.GzipPayloadHandler(str(tmp_path))
+    handler.emit(records[0])
+    handler.close()
+    (path,) = tmp_path.iterdir()
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        entry = json.loads(f.readline())
+    assert entry['kind'] == 'ai_briefing' and entry['ticker'] == 'KRW-BTC' and entry['payload'] == {'price': 1}
+
+def test_forked_child_logs_to_console_only():
+    (handler,) = logger_config._build_handlers(to_file=False)
+    assert type(handler) is logging.StreamHandler # 부모의 LOG_FILE/페이로드 파일을 열지 않음
@@ -0,0 +1,128 @@
+"""main.py 주문 처리 테스트: 매수 → 부분 매도 → 최종 매도 동안 자본 장부가 보존되는지 확인합니다. (python -m pytest)"""
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+import pytest
+import config
+import database_manager as db
+import main
+from fixed_point import money, ZERO
+from trading_bot import TradingBot
+
+INITIAL = money(1_000_000)
+
+class FakeUpbit:
+    """시장가 주문을 현재 price에 즉시 전량 체결합니다."""
+    def __init__(self):
+        self.price = Decimal('100')
+        self.orders = {}
+
+    def _fill(self, side, volume):
+        order_uuid = f"order-{len(self.orders) + 1}"
+        self.orders[order_uuid] = {'uuid': order_uuid, 'side': side, 'state': 'done', 'executed_volume': str(volume),
+                                   'trades': [{'price': str(self.price), 'volume': str(volume)}]}
+        return {'uuid': order_uuid}
+
+    def buy_market_order(self, ticker, krw_amount):
+        return self._fill('bid', Decimal(str(krw_amount)) / self.price)
+
+    def sell_market_order(self, ticker, volume):
+        return self._fill('ask', Decimal(str(volume)))
+
+    def get_order(self, order_uuid):
+        return self.orders.get(order_uuid)
+
+@pytest.fixture(autouse=True)
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_FILE', str(tmp_path / "bot.db"))
+    db.create_tables()
+
+def _execute(upbit, bot, order_type, percentage):
+    """주문을 제출하고 다음 주기의 보류 주문 확인으로 체결을 반영합니다."""
+    assert main.submit_order(upbit, bot, order_type, {'percentage': percentage, 'reason': 'test'}, main.candle_clock.now())
+    main.check_pending_order(upbit, bot)
+    assert bot.state['pending_order_uuid'] is None
+
+def test_capital_is_conserved_over_buy_partial_sell_and_final_sell():
+    upbit, bot = FakeUpbit(), TradingBot('KRW-BTC', {'capital': INITIAL})
+
+    _execute(upbit, bot, 'BUY_VANGUARD', 0.5)
+    assert bot.state['capital'] == INITIAL - 500_000 # 원가는 매수 시 차감
+    assert bot.state['total_position_size'] == 5000
+    assert main.bot_equity(bot.state, upbit.price) == INITIAL # 같은 가격이면 총자산은 그대로
+
+    fees = ZERO
+    for price, order_type, percentage in [(Decimal('110'), 'SELL_PARTIAL', 0.5), (Decimal('120'), 'SELL_ALL_FINAL', 1)]:
+        upbit.price = price
+        before = main.bot_equity(bot.state, price)
+        size = bot.state['total_position_size']
+        _execute(upbit, bot, order_type, percentage)
+        sold = size - bot.state['total_position_size']
+        fee = (Decimal('100') + price) * sold * config.FEE_RATE
+        fees += fee
+        # 매도는 보유 물량을 현금으로 바꿀 뿐이므로 총자산은 수수료만큼만 줄어듦
+        assert main.bot_equity(bot.state, price) == before - fee
+
+    assert bot.state['position_status'] == 'NONE' and bot.state['total_position_size'] == 0
+    conn = sqlite3.connect(db.DB_FILE)
+    realized = sum(Decimal(pnl) for (pnl,) in conn.execute("SELECT pnl FROM trade_log"))
+    conn.close()
+    # 2500개 × (110-100) + 2500개 × (120-100) - 수수료
+    assert realized == 75_000 - fees
+    assert bot.state['capital'] == INITIAL + realized
+
+def test_legacy_db_warns_about_unreturned_cost_basis(tmp_path, caplog):
+    """pending_order_amount 컬럼이 없는 이전 버전 DB는 청산된 거래의 원가 합계를 경고로 알리고 capital은 고치지 않음."""
+    legacy = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(legacy)
+    conn.execute("CREATE TABLE bot_states (ticker TEXT PRIMARY KEY, capital TEXT NOT NULL, position_status TEXT NOT NULL)")
+    conn.execute("INSERT INTO bot_states VALUES ('KRW-BTC', '500000', 'NONE')")
+    conn.execute("CREATE TABLE trade_log (id INTEGER PRIMARY KEY AUTOINCREMENT, ticker TEXT NOT NULL, exit_time TEXT NOT NULL, "
+                 "pnl TEXT NOT NULL, pnl_percentage TEXT NOT NULL, avg_entry_price TEXT, quantity TEXT)")
+    conn.execute("INSERT INTO trade_log (ticker, exit_time, pnl, pnl_percentage, avg_entry_price, quantity) "
+                 "VALUES ('KRW-BTC', '2026-01-01 00:00:00', '100', '1', '100', '5000')")
+    conn.commit()
+    conn.close()
+
+    db.DB_FILE = legacy
+    with caplog.at_level(logging.WARNING, logger='TradingBot'):
+        db.create_tables()
+    assert any('500,000원' in r.getMessage() for r in caplog.records)
+    conn = sqlite3.connect(legacy)
+    assert conn.execute("SELECT capital FROM bot_states").fetchone()[0] == '500000'
+    conn.close()
+
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger='TradingBot'):
+        db.create_tables() # 컬럼이 생긴 뒤에는 다시 경고하지 않음
+    assert not caplog.records
+
+@pytest.fixture
+def single_worker(monkeypatch):
+    """워커 1개, 제한 시간 0.3초의 코인 워커 풀."""
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(main, '_worker_pool', pool)
+    monkeypatch.setitem(config.WORKER_CONFIG, 'MAX_WORKERS', 1)
+    monkeypatch.setitem(config.WORKER_CONFIG, 'TICKER_TIMEOUT_SEC', 0.3)
+    yield pool
+    pool.shutdown(wait=True)
+
+def test_ticker_timeout_counts_from_when_each_task_starts(single_worker):
+    """코인이 워커보다 많아도 대기열에서 기다린 시간은 제한 시간에 포함하지 않음."""
+    started_at = {}
+    futures = {main._submit_timed(started_at, ticker, time.sleep, 0.15): ticker for ticker in ['KRW-A', 'KRW-B', 'KRW-C']}
+    done, timed_out = main._wait_tickers(futures, started_at)
+    assert len(done) == 3 and not timed_out # 합계 0.45초 > 0.3초이지만 각 코인은 0.15초
+
+def test_tasks_stuck_behind_a_hung_worker_are_cancelled(single_worker):
+    release = threading.Event()
+    started_at = {}
+    futures = {main._submit_timed(started_at, 'KRW-HUNG', release.wait, 5): 'KRW-HUNG',
+               main._submit_timed(started_at, 'KRW-NEXT', time.sleep, 0): 'KRW-NEXT'}
+    done, timed_out = main._wait_tickers(futures, started_at)
+    release.set()
+    assert not done and set(timed_out) == set(futures)
+    assert 'KRW-NEXT' not in started_at # 시작하지 못한 작업은 취소되어 실행되지 않음
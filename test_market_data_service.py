@@ -0,0 +1,76 @@
+"""market_data_service.py 테스트. (python -m pytest)"""
+import os
+import multiprocessing
+import numpy as np
+import pandas as pd
+import pytest
+from multiprocessing import resource_tracker
+import market_data_service as mds
+
+@pytest.fixture
+def shm_pair():
+    name = f"upbt_test_{os.getpid()}"
+    publisher = mds.MarketDataPublisher(['KRW-BTC'], name=name, capacity=4096)
+    reader = mds.SharedMarketData(name=name)
+    # 같은 프로세스에서는 읽는 쪽의 추적 해제가 게시자의 등록까지 지우므로 다시 등록 (close 시 unlink 경고 방지)
+    resource_tracker.register(publisher.shm._name, 'shared_memory')
+    yield publisher, reader
+    reader.close()
+    publisher.close()
+
+def _frame(start, n, fill=None):
+    """시각 문자열을 파싱한 인덱스(pyupbit와 같은 형태)의 15분봉. fill이 있으면 모든 값을 fill로 채움."""
+    index = pd.to_datetime(pd.date_range(start, periods=n, freq='15min').strftime('%Y-%m-%d %H:%M:%S'))
+    values = np.full((n, 6), float(fill)) if fill is not None else np.arange(n * 6, dtype=float).reshape(n, 6)
+    return pd.DataFrame(values, index=index, columns=mds.FIELDS[1:])
+
+def test_published_timestamps_round_trip(shm_pair):
+    publisher, reader = shm_pair
+    df = _frame('2024-01-01 09:00', 5)
+    publisher.publish_candles('KRW-BTC', '15m', df)
+    got = reader.get_candles('KRW-BTC', '15m')
+    assert list(got.index) == list(df.index)
+    assert np.array_equal(got.to_numpy(), df.to_numpy())
+    assert len(reader.get_candles('KRW-BTC', '15m', count=2)) == 2
+    assert reader.get_candles('KRW-BTC', '15m', min_open_time=pd.Timestamp('2024-01-01 10:15')) is None
+
+def test_returned_frame_survives_later_publishes(shm_pair):
+    publisher, reader = shm_pair
+    publisher.publish_candles('KRW-BTC', '15m', _frame('2024-01-01 09:00', 4, fill=1))
+    held = reader.get_candles('KRW-BTC', '15m')
+    for k in (2, 3): # 두 번 게시하면 처음 읽은 버퍼가 다시 쓰임
+        publisher.publish_candles('KRW-BTC', '15m', _frame('2024-01-02 09:00', 4, fill=k))
+    assert (held.to_numpy() == 1).all()
+    assert held.index[0] == pd.Timestamp('2024-01-01 09:00')
+    assert (reader.get_candles('KRW-BTC', '15m').to_numpy() == 3).all()
+
+def _publish_forever(publisher, frames, stop):
+    while not stop.is_set():
+        for df in frames:
+            publisher.publish_candles('KRW-BTC', '15m', df)
+
+def test_reads_during_concurrent_publishes_are_never_torn(shm_pair):
+    """다른 프로세스가 계속 게시하는 동안 읽은 프레임은 항상 한 번의 게시(시각과 값이 같은 k)만 담아야 합니다."""
+    publisher, reader = shm_pair
+    base = pd.Timestamp('2024-01-01 09:00')
+    frames = [_frame(base + pd.Timedelta(days=k), 4096, fill=k) for k in range(8)] # 큰 프레임으로 복사와 게시가 겹치도록
+    publisher.publish_candles('KRW-BTC', '15m', frames[0])
+    ctx = multiprocessing.get_context('fork')
+    stop = ctx.Event()
+    writer = ctx.Process(target=_publish_forever, args=(publisher, frames, stop))
+    writer.start()
+    try:
+        reads = 0
+        for _ in range(2000):
+            got = reader.get_candles('KRW-BTC', '15m')
+            if got is None: # 재시도를 모두 써도 게시가 겹친 경우 (호출 측은 API로 대체)
+                continue
+            values = got.to_numpy()
+            k = values[0, 0]
+            assert (values == k).all(), "한 프레임에 서로 다른 게시의 값이 섞임"
+            assert got.index[0] == base + pd.Timedelta(days=int(k)), "시각과 값이 서로 다른 게시에서 옴"
+            reads += 1
+        assert reads > 0
+    finally:
+        stop.set()
+        writer.join()
@@ -0,0 +1,91 @@
+"""retention.py 테스트. (python -m pytest)"""
+import gzip
+import json
+import sqlite3
+from datetime import datetime, timedelta
+import pytest
+import config
+import database_manager as db
+import retention
+
+NOW = datetime(2026, 10, 19, 12, 0)
+
+@pytest.fixture
+def db_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "bot.db")
+    monkeypatch.setattr(db, 'DB_FILE', path)
+    monkeypatch.setitem(config.RETENTION_CONFIG, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    db.create_tables()
+    return path
+
+def _fill(path, days=60):
+    conn = sqlite3.connect(path)
+    t, rows = NOW - timedelta(days=days), []
+    while t < NOW:
+        rows.append((t.strftime('%Y-%m-%d %H:%M:%S'), 1_000_000.0 + len(rows) % 97))
+        t += timedelta(minutes=15)
+    conn.executemany("INSERT INTO capital_log (timestamp, total_equity) VALUES (?, ?)", rows)
+    for i in range(10):
+        exit_time = (NOW - timedelta(days=400 - i * 10)).strftime('%Y-%m-%d %H:%M:%S')
+        conn.execute("INSERT INTO trade_log (ticker, entry_time, exit_time, pnl, pnl_percentage) VALUES (?, ?, ?, ?, ?)",
+                     ('KRW-BTC', exit_time, exit_time, str(i), '0.01'))
+    conn.commit()
+    conn.close()
+    return rows
+
+def test_rollup_ohlc():
+    rows = [('2024-01-01 09:00:00', 5.0), ('2024-01-01 09:15:00', 7.0), ('2024-01-01 09:30:00', 3.0), ('2024-01-01 10:00:00', 4.0)]
+    assert retention.rollup(rows, '1h') == [('2024-01-01 09:00:00', 5.0, 7.0, 3.0, 3.0, 3), ('2024-01-01 10:00:00', 4.0, 4.0, 4.0, 4.0, 1)]
+    assert retention.rollup(rows, '1d') == [('2024-01-01 00:00:00', 5.0, 7.0, 3.0, 4.0, 4)]
+
+def test_run_compacts_archives_and_is_idempotent(db_file):
+    rows = _fill(db_file)
+    summary = retention.run(db_file, NOW)
+    cutoff = (NOW - timedelta(days=config.RETENTION_CONFIG["RAW_DAYS"])).strftime('%Y-%m-%d 00:00:00')
+    old = [r for r in rows if r[0] < cutoff]
+    assert summary['capital_rows'] == len(old)
+    assert summary['vacuumed'] # 새 DB는 증분 vacuum 모드로 만들어짐
+
+    conn = sqlite3.connect(db_file)
+    assert conn.execute("SELECT MIN(timestamp) FROM capital_log").fetchone()[0] == cutoff
+    daily = conn.execute("SELECT SUM(samples), MAX(high), MIN(low) FROM capital_rollup WHERE resolution = '1d'").fetchone()
+    assert daily == (len(old), max(e for _, e in old), min(e for _, e in old))
+
+    # TRADE_DAYS보다 오래 전에 청산된 거래는 보관 파일로 옮겨지고 trade_log에서 지워짐
+    with gzip.open(summary['archive'], 'rt', encoding='utf-8') as f:
+        archived = [json.loads(line) for line in f]
+    remaining = conn.execute("SELECT COUNT(*) FROM trade_log").fetchone()[0]
+    assert summary['trades_archived'] == len(archived) > 0
+    assert len(archived) + remaining == 10
+    conn.close()
+
+    again = retention.run(db_file, NOW)
+    assert again['capital_rows'] == 0 and again['trades_archived'] == 0 and again['archive'] is None
+
+def test_run_never_rewrites_a_legacy_db(db_file, tmp_path):
+    legacy = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(legacy)
+    conn.execute("CREATE TABLE placeholder (x)") # auto_vacuum이 꺼진 상태로 만들어진 이전 DB
+    conn.commit()
+    conn.close()
+    db.DB_FILE = legacy
+    db.create_tables()
+    _fill(legacy)
+
+    summary = retention.run(legacy, NOW)
+    conn = sqlite3.connect(legacy)
+    assert not summary['vacuumed'] # 쓰기 잠금을 잡은 채 전체 VACUUM을 하지 않음
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+    conn.close()
+
+    assert retention.convert(legacy) # 오프라인 전환
+    assert not retention.convert(legacy)
+    conn = sqlite3.connect(legacy)
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    conn.close()
+    assert retention.run(legacy, NOW)['vacuumed']
+
+def test_maybe_run_is_opt_in(monkeypatch):
+    monkeypatch.setattr(retention, 'run', lambda: pytest.fail("보존 정책이 켜지지 않았는데 실행됨"))
+    assert config.RETENTION_CONFIG["ENABLED"] is False
+    assert retention.maybe_run(force=True) is False
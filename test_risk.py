@@ -0,0 +1,68 @@
+"""risk.py 테스트: 포트폴리오 장중 낙폭 킬 스위치. (python -m pytest)"""
+import pandas as pd
+import pytest
+import config
+import database_manager as db
+import main
+import risk
+from fixed_point import money, volume
+from trading_bot import TradingBot
+
+MORNING = pd.Timestamp('2026-10-19 09:00', tz=config.TIMEZONE)
+
+@pytest.fixture(autouse=True)
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_FILE', str(tmp_path / "bot.db"))
+    db.create_tables()
+
+def _holding():
+    """현금 0원, 100원에 10개를 보유한 봇 (장부 값은 Fixed)."""
+    return [TradingBot('KRW-BTC', {'capital': money(0), 'position_status': 'VANGUARD_IN',
+                                   'total_position_size': volume(10), 'avg_entry_price': money(100)})]
+
+def _update(portfolio, bots, price, now):
+    return portfolio.update(bots, {'KRW-BTC': {'price': price}}, now)
+
+def test_kill_switch_trips_on_intraday_drawdown_and_holds_for_the_day():
+    portfolio, bots = risk.PortfolioRisk(), _holding()
+    summary = _update(portfolio, bots, 100.0, MORNING)
+    assert summary['total_equity'] == 1000 and summary['exposure_ratio'] == 1
+    assert portfolio.allows_entry()
+
+    summary = _update(portfolio, bots, 96.0, MORNING + pd.Timedelta(hours=1))
+    assert summary['drawdown'] == pytest.approx(-0.04) and portfolio.allows_entry()
+
+    summary = _update(portfolio, bots, 94.0, MORNING + pd.Timedelta(hours=2))
+    assert summary['kill_switch'] and not portfolio.allows_entry()
+    _update(portfolio, bots, 100.0, MORNING + pd.Timedelta(hours=3)) # 회복해도 그날은 유지
+    assert not portfolio.allows_entry()
+
+    # 재시작해도 오늘 기록에서 복원
+    restarted = risk.PortfolioRisk()
+    _update(restarted, bots, 100.0, MORNING + pd.Timedelta(hours=4))
+    assert not restarted.allows_entry() and restarted.peak_equity == 1000
+
+    _update(portfolio, bots, 94.0, MORNING + pd.Timedelta(days=1)) # 다음 거래일에는 초기화
+    assert portfolio.allows_entry() and portfolio.peak_equity == 940
+
+def test_pending_buy_counts_as_equity():
+    bots = [TradingBot('KRW-BTC', {'capital': money(500), 'position_status': 'ORDER_PENDING',
+                                   'pending_order_type': 'BUY_VANGUARD', 'pending_order_amount': money(500)})]
+    summary = risk.PortfolioRisk(save=False).update(bots, {}, MORNING)
+    assert summary['total_equity'] == main.bot_equity(bots[0].state, None) == 1000
+
+def test_kill_switch_blocks_new_buys_only(monkeypatch):
+    portfolio = risk.PortfolioRisk(save=False)
+    portfolio.kill_switch = True
+    monkeypatch.setattr(main, '_risk', portfolio)
+    bot = _holding()[0]
+    bot.state['capital'] = money(1_000_000)
+    assert main.submit_order(None, bot, 'BUY_MAIN_FORCE', {'percentage': 0.5}, MORNING) is None
+    assert bot.state['capital'] == 1_000_000
+
+def test_disabled_kill_switch_never_trips(monkeypatch):
+    monkeypatch.setitem(config.RISK_CONFIG, "ENABLE_KILL_SWITCH", False)
+    portfolio, bots = risk.PortfolioRisk(save=False), _holding()
+    _update(portfolio, bots, 100.0, MORNING)
+    _update(portfolio, bots, 50.0, MORNING + pd.Timedelta(hours=1))
+    assert portfolio.allows_entry()
@@ -0,0 +1,23 @@
+"""scale_replay.py 테스트. (python -m pytest)"""
+import numpy as np
+import pandas as pd
+import pytest
+import config
+import candle_clock
+import scale_replay
+
+@pytest.mark.parametrize('unit', ['s', 'us', 'ns'])
+def test_replay_window_ends_at_in_progress_candle(unit, monkeypatch):
+    candles = scale_replay.synthetic_candles(['KRW-AAA'], '2024-01-01 09:00', days=3)
+    candles['KRW-AAA'].index = candles['KRW-AAA'].index.as_unit(unit) # candle_store/pandas 버전에 따라 해상도가 다름
+    market = scale_replay.ReplayMarketData(candles, count=10)
+    now = pd.Timestamp('2024-01-02 13:07', tz=config.TIMEZONE)
+    monkeypatch.setattr(candle_clock, '_time_source', lambda: now)
+
+    data = market.get_ticker_data('KRW-AAA')
+    df_15m = candles['KRW-AAA']
+    assert len(data['15m']) == 10
+    assert data['15m'].index[-1] == pd.Timestamp('2024-01-02 13:00') # 진행 중인 15분봉까지
+    assert np.array_equal(data['15m'].to_numpy(), df_15m.loc['2024-01-02 10:45':'2024-01-02 13:00', scale_replay.FRAME_FIELDS].to_numpy())
+    assert data['240m'].index[-1] == pd.Timestamp('2024-01-02 13:00') # 4시간봉은 KST 01/05/09/13/17/21시 시작
+    assert data['price'] == df_15m.loc['2024-01-02 13:00', 'open']
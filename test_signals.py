@@ -0,0 +1,71 @@
+"""signals.py 테스트: 마감 캔들 신호 테이블. (python -m pytest)"""
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+import database_manager as db
+import signals
+
+def _frame(rows, freq, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+    index = pd.date_range('2026-10-01', periods=rows, freq=freq)
+    return pd.DataFrame({'open': close, 'high': close * 1.005, 'low': close * 0.995, 'close': close,
+                         'volume': rng.uniform(1, 10, rows)}, index=index)
+
+def _data(rows=200):
+    return {'15m': _frame(rows, '15min', 1), '60m': _frame(rows, '60min', 2), '240m': _frame(rows, '240min', 3)}
+
+@pytest.fixture
+def computed(monkeypatch):
+    """signals.compute 호출을 (timeframe, 마감 캔들 시각)으로 기록합니다."""
+    calls = []
+    original = signals.compute
+    def spy(frame, timeframe):
+        calls.append((timeframe, signals.candle_time(frame)))
+        return original(frame, timeframe)
+    monkeypatch.setattr(signals, 'compute', spy)
+    return calls
+
+def test_recomputes_only_when_the_closed_candle_changes(computed):
+    table, data = signals.SignalTable(save=False), _data()
+    first = table.update('KRW-BTC', data)
+    assert list(first) == signals.TIMEFRAMES and len(computed) == 3
+    assert first['60m']['cci'] is not None and first['15m']['rsi'] is not None
+    assert table.update('KRW-BTC', data) == first and len(computed) == 3 # 같은 마감 캔들은 조회만
+
+    # 15분봉 하나가 새로 마감되면 15m만 다시 계산
+    data['15m'] = _frame(201, '15min', 1)
+    second = table.update('KRW-BTC', data)
+    assert computed[3:] == [('15m', data['15m'].index[-2])]
+    assert second['60m'] is first['60m'] and second['15m'] != first['15m']
+
+    table.drop('KRW-BTC')
+    table.update('KRW-BTC', data)
+    assert len(computed) == 7
+
+def test_signal_matches_backtest_records():
+    """실거래(compute)와 백테스트(compute_records)가 같은 마감 캔들에서 같은 신호를 내는지."""
+    frame = _frame(200, '60min', 4)
+    live = signals.compute(frame.copy(), '60m')
+    records = signals.compute_records(frame.copy(), '60m', window=len(frame))
+    assert live == records[-2]
+    assert live['rows'] == 200 and set(live) == set(signals.SIGNAL_COLUMNS)
+    assert live['cond1'] == (live['cci_20'] < -100 and live['wma_cci_20'] < -100)
+
+def test_short_or_missing_frames_have_no_signal():
+    table = signals.SignalTable(save=False)
+    assert table.update('KRW-BTC', None) is None
+    result = table.update('KRW-BTC', {'15m': _frame(1, '15min')})
+    assert result == {'15m': None, '60m': None, '240m': None}
+
+def test_new_signals_are_saved(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_FILE', str(tmp_path / "bot.db"))
+    db.create_tables()
+    table, data = signals.SignalTable(save=True), _data()
+    table.update('KRW-BTC', data)
+    table.update('KRW-BTC', data) # 다시 계산하지 않았으므로 기록도 없음
+    conn = sqlite3.connect(db.DB_FILE)
+    rows = conn.execute("SELECT timeframe, candle_time FROM signals ORDER BY timeframe").fetchall()
+    conn.close()
+    assert sorted(rows) == sorted((tf, data[tf].index[-2].strftime('%Y-%m-%d %H:%M:%S')) for tf in signals.TIMEFRAMES)
@@ -0,0 +1,15 @@
+"""sweep.py 테스트. (python -m pytest)"""
+import numpy as np
+import pandas as pd
+import pytest
+import scale_replay
+import sweep
+
+@pytest.mark.parametrize('unit', ['s', 'us', 'ns'])
+def test_exported_frames_keep_candle_times(unit, tmp_path):
+    candles = scale_replay.synthetic_candles(['KRW-AAA'], '2024-01-01 09:00', days=4)['KRW-AAA']
+    candles.index = candles.index.as_unit(unit)
+    frames = sweep.load_frames(sweep.export_frames(candles, str(tmp_path)))
+    assert list(frames['15m'].index) == list(candles.index)
+    assert np.array_equal(frames['15m']['close'].to_numpy(), candles['close'].to_numpy())
+    assert frames['240m'].index[0] == pd.Timestamp('2024-01-01 09:00')
@@ -0,0 +1,204 @@
+"""
+워크포워드 최적화 및 아웃오브샘플 검증.
+
+히스토리를 달력에 고정된 구간으로 나누어, 각 구간의 인샘플(IS) 기간에서 SWEEP_CONFIG["GRID"]를 스윕해
+최적 파라미터를 고르고, 바로 다음 아웃오브샘플(OOS) 기간에서 그 파라미터로 백테스트합니다.
+
+- 모든 백테스트는 sweep의 워커(메모리 매핑된 공유 배열)로 병렬 실행됩니다.
+- 실행 결과는 (코인, 기간, 파라미터, 데이터 해시) 단위로 walk_forward_runs 테이블에 캐시됩니다.
+  구간 경계가 에포크 기준으로 고정되어 있으므로, 최근 캔들을 추가해 히스토리를 늘려도 새로 생긴 구간만 계산됩니다.
+"""
+import os
+import sys
+import json
+import shutil
+import hashlib
+import sqlite3
+import tempfile
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from logger_config import logger
+import config
+import backtest
+import sweep
+
+# --- 구간 나누기 ---
+def make_windows(index, is_days=None, oos_days=None):
+    """[(IS 시작, IS 끝, OOS 끝)] 목록을 반환합니다. 시작점은 에포크 기준 OOS 간격의 배수에 맞춥니다."""
+    wf = config.WALK_FORWARD_CONFIG
+    is_len = pd.Timedelta(days=is_days or wf["IN_SAMPLE_DAYS"])
+    oos_len = pd.Timedelta(days=oos_days or wf["OUT_OF_SAMPLE_DAYS"])
+    if len(index) <= backtest.WINDOW:
+        return []
+    first = index[backtest.WINDOW].ceil(oos_len) # 지표 준비 구간 이후부터
+    last = index[-1] + pd.Timedelta(minutes=15)
+    windows, start = [], first
+    while start + is_len + oos_len <= last:
+        windows.append((start, start + is_len, start + is_len + oos_len))
+        start += oos_len
+    return windows
+
+def _data_hash(df_15m, end):
+    """end 이전 캔들의 내용 해시. 같은 기간의 데이터가 바뀌면 캐시를 쓰지 않습니다."""
+    values = np.ascontiguousarray(df_15m.loc[:end - pd.Timedelta(seconds=1)].to_numpy(dtype=np.float64))
+    return hashlib.sha1(values.tobytes()).hexdigest()[:16]
+
+# --- 캐시 ---
+def create_cache_table(conn):
+    metric_cols = ", ".join(f"{m} REAL" for m in sweep.METRICS)
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS walk_forward_runs (
+            ticker TEXT NOT NULL,
+            phase TEXT NOT NULL,
+            start_time TEXT NOT NULL,
+            end_time TEXT NOT NULL,
+            params_json TEXT NOT NULL,
+            data_hash TEXT NOT NULL,
+            {metric_cols},
+            created_at TEXT,
+            PRIMARY KEY (ticker, start_time, end_time, params_json, data_hash)
+        )''')
+    conn.commit()
+
+def _cache_key(ticker, start, end, params, data_hash):
+    return (ticker, start.isoformat(), end.isoformat(), json.dumps(params, sort_keys=True), data_hash)
+
+def _load_cached(conn, key):
+    row = conn.execute(f"SELECT {', '.join(sweep.METRICS)} FROM walk_forward_runs WHERE ticker = ? AND start_time = ? AND end_time = ? AND params_json = ? AND data_hash = ?", key).fetchone()
+    return dict(zip(sweep.METRICS, row)) if row else None
+
+def _save_cached(conn, key, phase, summary):
+    values = list(key) + [phase] + [summary.get(m) for m in sweep.METRICS] + [datetime.now().isoformat()]
+    conn.execute(f'''
+        INSERT OR REPLACE INTO walk_forward_runs (ticker, start_time, end_time, params_json, data_hash, phase, {', '.join(sweep.METRICS)}, created_at)
+        VALUES ({', '.join('?' * len(values))})''', values)
+    conn.commit()
+
+def _run_batch(pool, conn, phase, runs):
+    """runs: [(ticker, start, end, params, data_hash)] 중 캐시에 없는 것만 병렬 실행하고, 캐시 키별 요약을 반환합니다."""
+    results, futures = {}, {}
+    for ticker, start, end, params, data_hash in runs:
+        key = _cache_key(ticker, start, end, params, data_hash)
+        if key in results:
+            continue
+        results[key] = _load_cached(conn, key)
+        if results[key] is None:
+            # BacktestEngine.run의 end는 포함 범위이므로 다음 구간 시작 직전까지만 실행
+            futures[pool.submit(sweep._run_one, ticker, params, start, end - pd.Timedelta(seconds=1))] = key
+    logger.info(f"워크포워드 {phase}: {len(results)}회 중 캐시 {len(results) - len(futures)}회, 신규 {len(futures)}회")
+    for future in as_completed(futures):
+        key = futures[future]
+        try:
+            results[key] = future.result()
+            _save_cached(conn, key, phase, results[key])
+        except Exception as e:
+            logger.error(f"[{key[0]}] 워크포워드 실행 실패 {key[1]}~{key[2]} {key[3]}: {e}")
+    return results
+
+def _select_best(summaries, objective, min_trades):
+    """[(params, summary)] 중 objective가 가장 높은 조합을 고릅니다. 거래 수 기준을 만족하는 조합이 없으면 전체에서 고릅니다."""
+    valid = [(p, s) for p, s in summaries if s is not None]
+    eligible = [(p, s) for p, s in valid if (s.get('trades') or 0) >= min_trades] or valid
+    if not eligible:
+        return None, None
+    return max(eligible, key=lambda item: item[1].get(objective) if item[1].get(objective) is not None else -np.inf)
+
+# --- 실행 ---
+def run_walk_forward(candles_by_ticker, param_sets=None, max_workers=None, results_db=None):
+    """
+    코인별로 워크포워드를 실행하고, 구간별 IS/OOS 성과와 성과 저하 지표를 담은 DataFrame을 반환합니다.
+    요약 지표는 summarize_walk_forward로 계산합니다.
+    """
+    wf = config.WALK_FORWARD_CONFIG
+    param_sets = param_sets or sweep.grid_params(config.SWEEP_CONFIG["GRID"])
+    max_workers = max_workers or config.SWEEP_CONFIG["MAX_WORKERS"]
+    conn = sqlite3.connect(results_db or config.SWEEP_CONFIG["RESULTS_DB"])
+    create_cache_table(conn)
+    data_root = tempfile.mkdtemp(prefix="walk_forward_data_")
+    rows = []
+    try:
+        plans = {}
+        for ticker, df in candles_by_ticker.items():
+            windows = make_windows(df.index)
+            hashes = {end: _data_hash(df, end) for end in {w[1] for w in windows} | {w[2] for w in windows}}
+            plans[ticker] = (windows, hashes)
+            logger.info(f"[{ticker}] 워크포워드 구간 {len(windows)}개 (IS {wf['IN_SAMPLE_DAYS']}일 / OOS {wf['OUT_OF_SAMPLE_DAYS']}일)")
+
+        data_dirs = {ticker: sweep.export_frames(df, os.path.join(data_root, ticker)) for ticker, df in candles_by_ticker.items()}
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=sweep._init_worker, initargs=(data_dirs,)) as pool:
+            # 1. 모든 코인·구간의 인샘플 스윕을 한 번에 병렬 실행
+            is_runs = [(ticker, start, is_end, params, hashes[is_end])
+                       for ticker, (windows, hashes) in plans.items()
+                       for start, is_end, _ in windows for params in param_sets]
+            is_results = _run_batch(pool, conn, 'IS', is_runs)
+
+            # 2. 구간별 최적 파라미터로 아웃오브샘플 실행
+            best, oos_runs = {}, []
+            for ticker, (windows, hashes) in plans.items():
+                for start, is_end, oos_end in windows:
+                    summaries = [(p, is_results.get(_cache_key(ticker, start, is_end, p, hashes[is_end]))) for p in param_sets]
+                    params, is_summary = _select_best(summaries, wf["OBJECTIVE"], wf["MIN_TRADES"])
+                    if params is None:
+                        continue
+                    best[(ticker, start)] = (params, is_summary)
+                    oos_runs.append((ticker, is_end, oos_end, params, hashes[oos_end]))
+            oos_results = _run_batch(pool, conn, 'OOS', oos_runs)
+    finally:
+        conn.close()
+        shutil.rmtree(data_root, ignore_errors=True)
+
+    for ticker, (windows, hashes) in plans.items():
+        for start, is_end, oos_end in windows:
+            if (ticker, start) not in best:
+                continue
+            params, is_summary = best[(ticker, start)]
+            oos_summary = oos_results.get(_cache_key(ticker, is_end, oos_end, params, hashes[oos_end]))
+            if oos_summary is None:
+                continue
+            rows.append(_window_row(ticker, start, is_end, oos_end, params, is_summary, oos_summary))
+    return pd.DataFrame(rows)
+
+def _window_row(ticker, start, is_end, oos_end, params, is_summary, oos_summary):
+    is_days = (is_end - start).total_seconds() / 86400
+    oos_days = (oos_end - is_end).total_seconds() / 86400
+    is_daily = (is_summary['total_return_pct'] or 0) / is_days
+    oos_daily = (oos_summary['total_return_pct'] or 0) / oos_days
+    return {
+        'ticker': ticker, 'is_start': start, 'is_end': is_end, 'oos_end': oos_end,
+        'params': json.dumps(params, sort_keys=True),
+        'is_return_pct': is_summary['total_return_pct'], 'oos_return_pct': oos_summary['total_return_pct'],
+        'is_sharpe': is_summary['sharpe'], 'oos_sharpe': oos_summary['sharpe'],
+        'is_trades': is_summary['trades'], 'oos_trades': oos_summary['trades'],
+        'oos_max_drawdown_pct': oos_summary['max_drawdown_pct'],
+        # 워크포워드 효율: 일평균 OOS 수익률 / 일평균 IS 수익률 (1에 가까울수록 과최적화가 적음)
+        'efficiency': round(oos_daily / is_daily, 3) if is_daily > 0 else None,
+        'sharpe_degradation': round((oos_summary['sharpe'] or 0) - (is_summary['sharpe'] or 0), 2),
+    }
+
+def summarize_walk_forward(report):
+    """구간별 결과를 코인별 성과 저하 지표로 요약합니다."""
+    if report.empty:
+        return pd.DataFrame()
+    grouped = report.groupby('ticker')
+    return pd.DataFrame({
+        'windows': grouped.size(),
+        'mean_is_return_pct': grouped['is_return_pct'].mean().round(2),
+        'mean_oos_return_pct': grouped['oos_return_pct'].mean().round(2),
+        # OOS 구간을 이어 붙였을 때의 누적 수익률
+        'compounded_oos_return_pct': grouped['oos_return_pct'].apply(lambda r: ((1 + r / 100).prod() - 1) * 100).round(2),
+        'oos_win_rate': grouped['oos_return_pct'].apply(lambda r: (r > 0).mean() * 100).round(1),
+        'mean_efficiency': grouped['efficiency'].mean().round(3),
+        'mean_sharpe_degradation': grouped['sharpe_degradation'].mean().round(2),
+        'param_changes': grouped['params'].apply(lambda p: int((p != p.shift()).sum() - 1)),
+    })
+
+if __name__ == "__main__":
+    # 사용법: python walk_forward.py KRW-BTC candles_15m.csv
+    if len(sys.argv) < 3:
+        print("사용법: python walk_forward.py <TICKER> <15분봉 CSV>")
+        sys.exit(1)
+    report = run_walk_forward({sys.argv[1]: backtest.load_candles_csv(sys.argv[2])})
+    print(report.drop(columns=['params']).to_string())
+    print(summarize_walk_forward(report).to_string())